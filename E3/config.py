@@ -117,6 +117,7 @@ TIMERS: Dict[str, float] = {
     
     # Loop timing
     "MAIN_LOOP_DELAY": 0.1,  # Main loop iteration delay
+    "FRAME_MAX_AGE_MS": 150.0,  # Reuse last screenshot this long (until next click/drag)
     "CAMP_LOOPS": 4,  # Number of loops at bottom (Camp phase)
     "CREEP_DISTANCE": 0.3,  # How far to scroll up (30% of screen)
     # 40s scroll cycle (Quartz)
@@ -134,12 +135,10 @@ TIMERS: Dict[str, float] = {
     # Перелёт: ожидание анимации после Fly_confirm (дольше, чем реновация)
     "FLY_ANIMATION_WAIT": 5.0,
     "FLY_OPEN_WAIT_AFTER": 2.0,
-    # После подтверждения реновации/флай: ждём кнопку OPEN до N секунд, опрос каждые M с
+    # После подтверждения реновации/флай: ждём кнопку OPEN до N секунд (WAIT_FOR_ANY)
     "RENOVATE_OPEN_WAIT_MAX": 10.0,
-    "RENOVATE_OPEN_POLL_INTERVAL": 0.4,
-    # Реклама: ожидание показа и частота проверки крестиков
+    # Реклама: сколько ждём, что реклама закончится (крестики/иконки — WAIT_FOR_ANY)
     "AD_MAX_DURATION": 60.0,   # максимум 60 секунд ждём, что реклама закончится
-    "AD_POLL_INTERVAL": 0.7,   # как часто проверяем наличие крестиков/кнопок закрытия
     # Ограничение на общее число кликов по кнопкам закрытия за один ролик
     "AD_MAX_CLOSE_CLICKS": 8,
 }
@@ -154,6 +153,227 @@ INPUT_CONFIG: Dict[str, any] = {
     "SCROLL_STEPS": 20,  # Number of steps for smooth scrolling
 }
 
+# ===== INPUT BACKEND =====
+# Кто отправляет события мыши (core/input_backends.py). Бэкенды сами не спят
+# (у pyautogui нет PAUSE после каждого вызова) — все паузы клика перечислены здесь.
+INPUT_BACKEND: Dict[str, any] = {
+    "BACKEND": "auto",  # auto | quartz | xtest | pynput | pyautogui | null (auto: macOS quartz, Linux xtest)
+    "MOVE_DURATION": 0.0,  # плавное подведение курсора перед кликом (0 = сразу в точку)
+    "CLICK_HOLD": 0.03,  # mouseDown → mouseUp обычного клика
+    "STEP_DELAY": 0.01,  # шаг плавного движения/драга
+}
+
+# ===== PYRAMID MATCHING (coarse-to-fine) =====
+# Матчинг на уменьшенных кадре и шаблоне (1/2 или 1/4), затем уточнение top-k кандидатов
+# в маленьком окне полного разрешения. Координаты совпадают с обычным матчингом.
+PYRAMID_MATCHING: Dict[str, any] = {
+    "ENABLED": False,
+    "MAX_FACTOR": 4,  # 1/2 или 1/4 — не сильнее
+    "MIN_TEMPLATE_SIDE": 8,  # меньшая сторона шаблона после уменьшения (иначе фактор ниже)
+    # Худший score уменьшенного шаблона по всем субпиксельным сдвигам (самопроверка при
+    # первом использовании). Мелкая текстура (box_floor) не переживает уменьшение → фактор ниже.
+    "MIN_PHASE_SCORE": 0.75,
+    "TOP_K": 3,  # кандидатов на уточнение (для find_all — все пики грубого уровня)
+    "COARSE_SLACK": 0.15,  # минимум: порог кандидатов = порог - max(slack, 1 - phase score + 0.05)
+}
+
+# ===== GRAYSCALE MATCHING + COLOR VERIFICATION =====
+# Этап 1: матчинг по одному каналу (кэшированная gray-копия кадра и шаблонов) — ~3x дешевле BGR.
+# Этап 2: каждый кандидат проверяется по цветовой сигнатуре шаблона (средний BGR центра +
+# серый/цветной, как _is_button_active_red в Eat) и переоценивается по BGR в окне ±1px,
+# поэтому пороги THRESHOLDS (btn_buy 0.93, blue_button 0.92) работают как раньше.
+GRAY_MATCHING: Dict[str, any] = {
+    "ENABLED": False,
+    "CHANNEL": "gray",  # "gray" или канал "b" / "g" / "r"
+    "SLACK": 0.10,  # порог кандидатов этапа 1 = порог - slack
+    "MIN_THRESHOLD": 0.5,  # при пороге ниже (boost_ready 0.42) gray и BGR score слабо связаны — сразу BGR
+    "TOP_K": 5,  # кандидатов на проверку для одиночного поиска
+    # Шаблоны, которые отличаются в основном цветом (синяя/серая кнопка, крестики рекламы).
+    # Остальные проверяются только BGR-переоценкой.
+    "COLOR_VERIFY": ["btn_buy", "blue_button", "btn_ad_close_x", "ad_close_x_gray", "ad_close_x1"],
+    "COLOR_TOLERANCE": 45.0,  # макс. отличие среднего B/G/R центра кандидата от шаблона
+    "GRAY_CHROMA": 40.0,  # max(B,G,R) - min(B,G,R) ниже этого = серый
+}
+
+# ===== BACKGROUND CAPTURE =====
+# Отдельный поток снимает GAME_REGION с заданным FPS в кольцевой буфер (core/capture.py).
+# capture_screen() берёт новейший кадр без блокировки на mss; после клика ждёт первый
+# кадр, снятый после него.
+CAPTURE_SERVICE: Dict[str, any] = {
+    "ENABLED": False,
+    "FPS": 20.0,
+    "RING_SIZE": 4,
+    "WAIT_TIMEOUT": 0.5,  # сколько ждать кадр из потока, потом синхронный grab
+}
+
+# ===== FRAME DIFF =====
+# Одна серая миниатюра на кадр (кэш, core/frame_diff.py): из неё считают изменения
+# settle, wait_for_any, маска анимаций и проверка края по % изменившихся пикселей.
+FRAME_DIFF: Dict[str, any] = {
+    "SCALE": 0.25,  # миниатюра 1/4 разрешения
+    "PIXEL_THRESHOLD": 30,  # |diff| (0-255) пикселя миниатюры = изменился (для % изменений)
+    "CACHE_SIZE": 8,  # миниатюр последних кадров в кэше
+}
+
+# ===== FRAME SETTLE =====
+# Вместо фиксированных sleep после действий (драг, открытие/закрытие меню): опрашиваем кадры
+# (миниатюра FRAME_DIFF) и продолжаем, как только область перестала меняться
+# STABLE_FRAMES кадров подряд (VisionSystem.wait_until_stable). Старые паузы из TIMERS —
+# верхняя граница ожидания (× MAX_WAIT_FACTOR). Статистика по местам вызова — в логе Stats.
+SETTLE: Dict[str, any] = {
+    "ENABLED": True,
+    "EPS": 2.0,  # средний |diff| (0-255) меньше — кадры "одинаковые" (ходящие посетители дают ~0.5-1.5)
+    "STABLE_FRAMES": 2,  # столько сравнений подряд ниже EPS = устоялось
+    "POLL_INTERVAL": 0.03,  # сек между кадрами
+    "MIN_WAIT": 0.08,  # сек до первого кадра: игра успевает начать реагировать на клик
+    "MAX_WAIT_FACTOR": 1.5,  # верхняя граница = старая пауза × это (старые были местами коротковаты)
+}
+
+# ===== WAIT FOR ANY =====
+# Ожидание "появится одна из кнопок" (OPEN после реновации, крестики рекламы, иконки меню):
+# кадры идут с частотой захвата, все шаблоны матчатся одним detect_all и только если
+# их области изменились с последней проверки (VisionSystem.wait_for_any).
+WAIT_FOR_ANY: Dict[str, any] = {
+    "POLL_INTERVAL": 0.03,  # сек между кадрами без фонового захвата (с ним — каждый новый кадр)
+    "CHANGE_THRESHOLD": 12,  # max |diff| (0-255) серой 1/4-миниатюры областей: меньше — кадр не изменился
+    "REEVALUATE_EVERY": 1.0,  # сек: матчинг без изменений всё равно раз в столько (медленные fade-in)
+}
+
+# ===== LEARNED SEARCH REGIONS (ROI) =====
+# Где шаблон уже находили — там и ищем сначала (core/roi.py). Области хранятся по размеру
+# кадра в learned_rois.json рядом с config.py, после перезапуска работают сразу.
+LEARNED_ROI: Dict[str, any] = {
+    "ENABLED": True,
+    "TEMPLATES": ["btn_renovate", "btn_open", "icon_upgrades", "btn_buy", "unlock_btn", "blue_button"],
+    "PADDING": 24,  # запас вокруг границ найденных прямоугольников (px кадра)
+    "MIN_HITS": 3,  # сколько находок нужно, прежде чем искать только в области
+    "HISTORY": 40,  # область строится по последним N находкам (старые выпадают — область сужается)
+    "OUTLIER_FRACTION": 0.1,  # доля крайних значений каждой границы, отбрасываемых как выбросы
+    "MISS_FALLBACK_RATE": 0.25,  # доля промахов в области, после которых ищем по всему кадру
+    "SAVE_INTERVAL": 30.0,  # секунды между сохранениями файла
+}
+
+# ===== TILE CHANGE GATING =====
+# detect_all() кэширует результаты и на следующем кадре перематчит только изменившиеся
+# тайлы (+ размер шаблона вокруг) — core/tiles.py. Кэш сбрасывается после любого клика/драга.
+TILE_GATING: Dict[str, any] = {
+    "ENABLED": True,
+    "TILE": 32,  # размер тайла (px кадра, кратно 8)
+    "DIFF_THRESHOLD": 6.0,  # тайл "изменился", если среднее 8x8 блока сдвинулось сильнее (0-255)
+    "MAX_DIRTY_FRACTION": 0.6,  # больше этой доли области изменилось — матчим область целиком
+}
+
+# ===== PARALLEL MATCHING =====
+# Независимые шаблоны/области detect_all матчатся в общем пуле потоков (core/parallel.py):
+# cv2.matchTemplate отпускает GIL. Результаты собираются в порядке спеков.
+MATCH_EXECUTOR: Dict[str, any] = {
+    "ENABLED": True,
+    "WORKERS": None,  # None = число ядер
+    "CV_THREADS": None,  # cv2.setNumThreads; None = ядра / WORKERS (обычно 1), чтобы не драться за ядра
+    "MIN_JOBS": 2,  # меньше задач — без пула
+}
+
+# ===== FFT MATCHING =====
+# Несколько шаблонов в одном кадре/кропе detect_all: спектр картинки и оконные суммы
+# считаются один раз, каждый шаблон — произведение спектров + один обратный DFT
+# (core/fft_match.py). Выбор на каждую картинку — по модели стоимости (MatchCostModel):
+#   matchTemplate: (h-th+1)·(w-tw+1) · (BASE + PER_SIDE·sqrt(th·tw)) нс на шаблон
+#   общий спектр:  dft_h·dft_w · (SPECTRUM·каналы + PER_TEMPLATE·k) нс
+# Коэффициенты — `python tools/benchmark_vision.py fft` (1 поток OpenCV, 349x748 BGR).
+# Замер: кадр 349x748 и полоса 349x224 — спектр выгоднее уже с k = 1 для шаблонов
+# 8-128 px; угол 87x187 — с k = 1 до 32 px, шаблон 64 px — с k = 2 (модель: тоже).
+# matchTemplate остаётся для шаблонов почти во весь маленький кроп.
+FFT_MATCHING: Dict[str, any] = {
+    "ENABLED": True,
+    "COST_DIRECT_BASE_NS": 143.0,  # matchTemplate: нс на выходной пиксель
+    "COST_DIRECT_PER_SIDE_NS": 3.0,  # ... плюс нс на пиксель стороны шаблона
+    "COST_SPECTRUM_NS": 10.0,  # спектр картинки: нс на элемент DFT и канал
+    "COST_PER_TEMPLATE_NS": 40.0,  # шаблон по общему спектру: нс на элемент DFT
+    "MAX_CACHED_TEMPLATES": 256,  # спектры шаблонов (по имени и размеру DFT)
+}
+
+# ===== SCROLL TRACKER =====
+# Реальный сдвиг контента после драга (cv2.phaseCorrelate на полосе 1/4 разрешения, core/scroll_tracker.py).
+# Сдвиг ~0 px = край уровня, сразу, без повторных свайпов. Если отклик ниже MIN_RESPONSE
+# (полоса без деталей, открыта панель) — старая проверка по % изменившихся пикселей.
+SCROLL_TRACKER: Dict[str, any] = {
+    "ENABLED": True,
+    "SCALE": 0.25,  # уменьшение полосы
+    "UI_TOP": 0.12,  # статичный UI сверху (доля высоты), не участвует
+    "UI_BOTTOM": 0.15,  # статичный UI снизу (доля высоты)
+    "EDGE_SHIFT_PX": 4.0,  # |сдвиг| меньше — контент не сдвинулся (px полного кадра)
+    "MIN_RESPONSE": 0.05,  # пик корреляции ниже — сдвигу не доверяем
+}
+
+# ===== ANIMATION MASK =====
+# Какие пиксели меняются сами (посетители, машины, готовка) при неподвижной камере:
+# попиксельная временная дисперсия по кадрам захвата (core/animation_mask.py). Проверки края
+# и "экран устоялся" не считают эти пиксели — при упоре статичные пиксели не меняются вовсе,
+# поэтому край определяется с одного свайпа по фиксированному порогу EDGE_CHANGE_PCT.
+# Пока маска не набрала MIN_FRAMES кадров — старые пороги (SCROLL_CHANGE_THRESHOLD_PCT и т.п.).
+ANIMATION_MASK: Dict[str, any] = {
+    "ENABLED": True,
+    "ALPHA": 0.05,  # скорость обучения (≈ 1/кадров памяти)
+    "PIXEL_THRESHOLD": 20,  # |diff| (0-255) пикселя миниатюры = изменился
+    "STD_THRESHOLD": 6.0,  # временное std выше — пиксель анимированный
+    "MIN_FRAMES": 6,  # кадров при неподвижной камере до использования маски
+    "MAX_LEARN_CHANGE": 0.3,  # доля изменившихся пикселей: больше — камера/панель двигается, не учимся
+    "EDGE_CHANGE_PCT": 8.0,  # % статичных пикселей: меньше — контент не сдвинулся (край)
+}
+
+# ===== LEVEL PANORAMA =====
+# Кадры прохода сверху вниз склеиваются в панораму уровня (core/panorama.py); станции, стрелки
+# и боксы хранятся в мировых координатах Y. Цикл 40с вместо слепого прохода едет прямо к
+# местам с недавними стрелками/боксами; полный проход — раз в FULL_SWEEP_INTERVAL или если
+# панорама неполная / камера потеряна. Сбрасывается при смене уровня (BotState.on_level_change).
+PANORAMA: Dict[str, any] = {
+    "ENABLED": True,
+    "SCALE": 0.25,  # разрешение панорамы относительно кадра
+    "ARROW_RECENT_SECONDS": 120.0,  # стрелки старше — не цель (нужен новый проход)
+    "FULL_SWEEP_INTERVAL": 240.0,  # сек между полными проходами (новые боксы/стрелки вне экрана)
+    "MERGE_PX": 50,  # ближе — тот же объект
+    "MIN_LOCALIZE_SCORE": 0.6,  # совпадение кадра с панорамой, чтобы найти потерянную камеру
+    "MAX_DRAG": 250,  # px за один драг при перелёте к цели (больше — сдвиг хуже измеряется)
+    "CAMERA_TOLERANCE": 40,  # px: камера "на месте"
+    "SAVE_DEBUG": False,  # сохранять панораму с метками в tools/output/ после прохода
+}
+
+# ===== SCREEN SIGNATURES =====
+# Какой сейчас экран — по 64-битным хэшам (dHash/pHash) стабильных областей, а не матчингом
+# шаблонов (core/screen_signature.py). Образцы снимает tools/capture_signatures.py в
+# screen_signatures.json рядом с config.py. Экран → ScreenState (core/screen_state.py) →
+# обработчики тика из STATE_HANDLERS (run.py); неизвестный экран (или нет файла) — весь водопад.
+SCREEN_SIGNATURES: Dict[str, any] = {
+    "ENABLED": True,
+    "HASH": "dhash",  # dhash (быстрее) | phash (устойчивее к сдвигам на пару px)
+    "MAX_DISTANCE": 10,  # бит из 64 на область: больше — область не совпала
+    "MAX_MEAN_DIFF": 25.0,  # средняя яркость области (0-255): затемнение попапом не совпадёт
+    # Области по умолчанию для capture_signatures.py (x, y, w, h — доли кадра); только то,
+    # что не двигается на этом экране: HUD, меню, рамка окна
+    "REGIONS": {
+        "main": [(0.0, 0.0, 1.0, 0.08), (0.0, 0.9, 1.0, 0.1)],
+        "station_popup": [(0.05, 0.55, 0.9, 0.3)],
+        "general_upgrades": [(0.05, 0.12, 0.9, 0.12), (0.05, 0.85, 0.9, 0.1)],
+        "ad": [(0.0, 0.0, 1.0, 0.1), (0.0, 0.88, 1.0, 0.12)],
+        "renovate": [(0.1, 0.3, 0.8, 0.35)],
+        "fly": [(0.1, 0.3, 0.8, 0.35)],
+        "open_level": [(0.15, 0.55, 0.7, 0.25)],
+    },
+}
+
+# ===== PIPELINE =====
+# Сбор боксов и чаевых в два потока (core/pipeline.py): восприятие (захват + detect_all)
+# крутится, пока актуатор кликает и выжидает паузы между кликами. Клик, спланированный по
+# кадру до последнего меняющего экран действия, перепланируется по свежему кадру или
+# отбрасывается. False — старый последовательный сбор.
+PIPELINE: Dict[str, any] = {
+    "ENABLED": True,
+    "PERCEPTION_INTERVAL": 0.0,  # сек между детекциями (0 — подряд; с фоновым захватом — каждый новый кадр)
+    "IDLE_TIMEOUT": 0.5,  # сек ждать свежую детекцию, потом сбор окончен
+    "MAX_QUEUE": 8,  # кликов в очереди актуатора максимум
+    "SAME_TARGET_PX": 25,  # цель ближе к уже кликнутой — та же (монета ещё гаснет)
+}
+
 # ===== ASSET PATHS =====
 ASSETS_DIR = "assets"
 # Папка с картинками «не нажимать» — при старте бот ищет все *.png/*.jpg в ней и запрещает клики по ним
@@ -0,0 +1,269 @@
+"""
+EatventureBot V3 - Shared-Spectrum FFT Matching
+TM_CCOEFF_NORMED for many templates on one image with one forward transform.
+
+cv2.matchTemplate transforms the image again for every template. When several
+templates are searched in the same image (main tick: ~7 UI templates on the full
+frame; ad loop: 13 crosses per corner/band), the image spectrum and the window
+sums are computed once here and every template costs only a spectrum product and
+one inverse DFT.
+
+Score (same as OpenCV TM_CCOEFF_NORMED, summed over channels):
+    T' = T - mean(T) per channel
+    num(x, y) = sum_c corr(I_c, T'_c)(x, y)                 (one idft of sum_c F(I_c)·conj(F(T'_c)))
+    var(x, y) = sum_c [S2_c - S1_c² / n]                    (window sums from integral images,
+                                                             shared by templates of the same size)
+    R = num / (sqrt(var) · |T'|), with OpenCV's handling of flat windows
+Float32 transforms: scores differ from cv2.matchTemplate by up to ~4e-3 (near-flat
+windows), ~1e-4 elsewhere.
+
+Whether a batch is worth a spectrum is decided per image by MatchCostModel from the
+image size, the template sizes and their count (coefficients fitted by
+`python tools/benchmark_vision.py fft`).
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _window_sums(integral: np.ndarray, th: int, tw: int, out_h: int, out_w: int) -> np.ndarray:
+    """Sums over every th x tw window (top-left at y, x) from an integral image."""
+    return (
+        integral[th:th + out_h, tw:tw + out_w]
+        - integral[0:out_h, tw:tw + out_w]
+        - integral[th:th + out_h, 0:out_w]
+        + integral[0:out_h, 0:out_w]
+    )
+
+
+class TemplateSpectrum:
+    """Zero-mean template channels transformed at one DFT size."""
+
+    def __init__(self, template: np.ndarray, dft_shape: Tuple[int, int]):
+        th, tw = template.shape[:2]
+        self.shape = (th, tw)
+        t = template.astype(np.float32).reshape(th, tw, -1)
+        t = t - t.reshape(-1, t.shape[2]).mean(axis=0)
+        self.norm = float(np.sqrt(np.sum(t.astype(np.float64) ** 2)))
+        self.spectra: List[np.ndarray] = []
+        for c in range(t.shape[2]):
+            padded = np.zeros(dft_shape, np.float32)
+            padded[:th, :tw] = t[:, :, c]
+            self.spectra.append(cv2.dft(padded))
+
+
+class ImageSpectrum:
+    """Per-image data shared by all templates: channel spectra and integral images."""
+
+    def __init__(self, image: np.ndarray):
+        h, w = image.shape[:2]
+        self.shape = (h, w)
+        self.dft_shape = (cv2.getOptimalDFTSize(h), cv2.getOptimalDFTSize(w))
+        img = image.reshape(h, w, -1)
+        self.channels = img.shape[2]
+        self.spectra: List[np.ndarray] = []
+        for c in range(self.channels):
+            # Без заворота: для допустимых позиций x + x' < w <= ширина DFT
+            padded = np.zeros(self.dft_shape, np.float32)
+            padded[:h, :w] = img[:, :, c]
+            self.spectra.append(cv2.dft(padded))
+        # Оконные суммы: S1 по каналам (int32 — точно), S2 = сумма квадратов по всем каналам
+        # (float64: S2 - S1²/n на ровных участках — разность больших близких чисел)
+        self._sum = cv2.integral(img, sdepth=cv2.CV_32S).reshape(h + 1, w + 1, -1)
+        squares = img.astype(np.float64)
+        squares = cv2.multiply(squares, squares).reshape(h, w, -1)
+        if self.channels > 1:
+            squares = cv2.transform(squares, np.ones((1, self.channels)))
+        self._sqsum = cv2.integral(squares.reshape(h, w), sdepth=cv2.CV_64F)
+        # Знаменатель зависит только от размера шаблона: {(th, tw): sqrt(var) float32}
+        self._window_std: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def window_std(self, th: int, tw: int) -> np.ndarray:
+        """sqrt(sum_c [S2_c - S1_c² / n]) for every th x tw window (shared by same-size templates)."""
+        std = self._window_std.get((th, tw))
+        if std is not None:
+            return std
+        h, w = self.shape
+        out_h, out_w = h - th + 1, w - tw + 1
+        n = float(th * tw)
+        s1 = _window_sums(self._sum, th, tw, out_h, out_w).astype(np.float64)
+        s1_sq = cv2.multiply(s1, s1).reshape(out_h, out_w, -1)
+        if self.channels > 1:
+            s1_sq = cv2.transform(s1_sq, np.ones((1, self.channels)))
+        s2 = _window_sums(self._sqsum, th, tw, out_h, out_w)
+        # n·S2 - S1² в целых числах (< 2^53) — ровное окно даёт ровно 0, как в OpenCV
+        var_n = cv2.addWeighted(s2, n, s1_sq.reshape(out_h, out_w), -1.0, 0.0)
+        std = (cv2.sqrt(cv2.max(var_n, 0.0)) * (1.0 / np.sqrt(n))).astype(np.float32)
+        self._window_std[(th, tw)] = std
+        return std
+
+    def match(self, tspec: TemplateSpectrum) -> np.ndarray:
+        """TM_CCOEFF_NORMED score map, shape (h - th + 1, w - tw + 1), float32."""
+        h, w = self.shape
+        th, tw = tspec.shape
+        out_h, out_w = h - th + 1, w - tw + 1
+
+        acc = cv2.mulSpectrums(self.spectra[0], tspec.spectra[0], 0, conjB=True)
+        for c in range(1, self.channels):
+            acc += cv2.mulSpectrums(self.spectra[c], tspec.spectra[c], 0, conjB=True)
+        num = cv2.idft(acc, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)[:out_h, :out_w]
+
+        t = self.window_std(th, tw) * np.float32(tspec.norm)
+
+        # Как в OpenCV: |num| < t → num / t; чуть больше (погрешность) → ±1; ровное окно → 0
+        result = np.zeros((out_h, out_w), np.float32)
+        abs_num = np.abs(num)
+        ok = abs_num < t
+        np.divide(num, t, out=result, where=ok)
+        edge = ~ok & (abs_num < t * 1.125)
+        result[edge] = np.sign(num[edge])
+        return result
+
+
+class MatchCostModel:
+    """
+    Estimated cost (ns) of matching templates on one image:
+        direct = sum over templates of out_h·out_w · (direct_base + direct_per_side·sqrt(th·tw))
+        shared = dft_h·dft_w · (spectrum · channels + per_template · k)
+    (cv2.matchTemplate per template vs one image spectrum + a product and an inverse DFT
+    per template; template spectra are cached and not counted).
+    """
+
+    def __init__(
+        self,
+        direct_base: float = 143.0,
+        direct_per_side: float = 3.0,
+        spectrum: float = 10.0,
+        per_template: float = 40.0,
+    ):
+        self.direct_base = direct_base
+        self.direct_per_side = direct_per_side
+        self.spectrum = spectrum
+        self.per_template = per_template
+
+    def direct_ns(self, image_shape: Tuple[int, ...], template_shapes: List[Tuple[int, ...]]) -> float:
+        h, w = image_shape[:2]
+        total = 0.0
+        for shape in template_shapes:
+            th, tw = shape[:2]
+            total += (h - th + 1) * (w - tw + 1) * (self.direct_base + self.direct_per_side * np.sqrt(th * tw))
+        return total
+
+    def shared_ns(self, image_shape: Tuple[int, ...], count: int) -> float:
+        h, w = image_shape[:2]
+        channels = image_shape[2] if len(image_shape) > 2 else 1
+        dft_area = cv2.getOptimalDFTSize(h) * cv2.getOptimalDFTSize(w)
+        return dft_area * (self.spectrum * channels + self.per_template * count)
+
+    def prefers_shared(self, image_shape: Tuple[int, ...], template_shapes: List[Tuple[int, ...]]) -> bool:
+        if not template_shapes:
+            return False
+        return self.shared_ns(image_shape, len(template_shapes)) < self.direct_ns(image_shape, template_shapes)
+
+
+class SharedSpectrumMatcher:
+    """
+    Image spectra for the current batch (detect_all) + cached template spectra.
+
+    begin_batch() registers the templates that will be searched in each image;
+    only images where the cost model prefers a shared spectrum get one (computed
+    lazily, once, by whichever worker asks first).
+    """
+
+    def __init__(self, cost: Optional[MatchCostModel] = None, max_cached_templates: int = 256):
+        self.cost = cost or MatchCostModel()
+        self.max_cached_templates = max_cached_templates
+        self._expected: Dict[tuple, int] = {}
+        self._images: Dict[tuple, ImageSpectrum] = {}
+        self._templates: Dict[tuple, TemplateSpectrum] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+        self.stats = {"fft": 0, "spectra": 0}
+
+    @staticmethod
+    def image_key(image: np.ndarray) -> tuple:
+        # Кроп одного кадра узнаём по адресу данных, размеру и шагам
+        return (image.__array_interface__["data"][0], image.shape, image.strides)
+
+    def plan_batch(self, jobs: List[Tuple[np.ndarray, np.ndarray]]) -> Dict[tuple, int]:
+        """
+        jobs: (image, template) pairs of one detect_all.
+        Returns {image_key: template count} for the images worth a shared spectrum
+        (pass it to begin_batch / end_batch).
+        """
+        images: Dict[tuple, Tuple[Tuple[int, ...], List[Tuple[int, ...]]]] = {}
+        for image, template in jobs:
+            key = self.image_key(image)
+            if key not in images:
+                images[key] = (image.shape, [])
+            images[key][1].append(template.shape)
+        return {
+            key: len(shapes)
+            for key, (shape, shapes) in images.items()
+            if self.cost.prefers_shared(shape, shapes)
+        }
+
+    def begin_batch(self, counts: Dict[tuple, int]) -> None:
+        """
+        counts: {image_key: number of templates that will be matched on it} (plan_batch).
+        Batches from several threads may overlap (keys of live images never collide).
+        """
+        with self._lock:
+            for key, n in counts.items():
+                self._expected[key] = self._expected.get(key, 0) + n
+
+    def end_batch(self, counts: Dict[tuple, int]) -> None:
+        """Release the images of a finished batch (same counts as begin_batch)."""
+        with self._lock:
+            for key, n in counts.items():
+                if key not in self._expected:
+                    continue
+                left = self._expected[key] - n
+                if left > 0:
+                    self._expected[key] = left
+                    continue
+                del self._expected[key]
+                self._images.pop(key, None)
+                self._key_locks.pop(key, None)
+
+    def spectrum_for(self, image: np.ndarray) -> Optional[ImageSpectrum]:
+        """Shared spectrum if this image is part of the current batch, else None."""
+        key = self.image_key(image)
+        with self._lock:
+            if key not in self._expected:
+                return None
+            spectrum = self._images.get(key)
+            if spectrum is not None:
+                return spectrum
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            spectrum = self._images.get(key)
+            if spectrum is None:
+                spectrum = ImageSpectrum(image)
+                with self._lock:
+                    self._images[key] = spectrum
+                    self.stats["spectra"] += 1
+        return spectrum
+
+    def template_spectrum(self, name: str, template: np.ndarray, dft_shape: Tuple[int, int]) -> TemplateSpectrum:
+        key = (name, template.shape, dft_shape)
+        tspec = self._templates.get(key)
+        if tspec is None:
+            tspec = TemplateSpectrum(template, dft_shape)
+            with self._lock:
+                if len(self._templates) >= self.max_cached_templates:
+                    self._templates.clear()
+                self._templates[key] = tspec
+        return tspec
+
+    def match(self, spectrum: ImageSpectrum, name: str, template: np.ndarray) -> np.ndarray:
+        tspec = self.template_spectrum(name, template, spectrum.dft_shape)
+        with self._lock:
+            self.stats["fft"] += 1
+        return spectrum.match(tspec)
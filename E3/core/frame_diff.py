@@ -0,0 +1,186 @@
+"""
+Frame Diff
+"How different are these two frames" for scroll edges, settle waits and wall
+detection — one implementation instead of a per-caller absdiff / float MSE.
+
+Every frame is reduced ONCE to a gray uint8 thumbnail (1/4 resolution, INTER_AREA)
+and the thumbnail is cached per frame object; all metrics compare thumbnails with
+OpenCV integer ops (absdiff, threshold, countNonZero, norm) — no float copies of
+full frames, no per-channel work.
+
+Metrics (thumbnail pixels, gray 0-255):
+    changed_fraction — share of pixels with |diff| > pixel_threshold
+    mse              — mean squared difference
+    mean_diff        — mean |diff| (optionally only under a mask)
+    max_diff         — max |diff|
+    bands            — changed fraction + MSE per horizontal band (fractions of height)
+
+Capture code calls refresh() on every new frame: pooled capture buffers are
+rewritten in place, so a cached thumbnail must never outlive a re-capture
+into the same buffer. Arrays that were never refreshed get their thumbnail
+on first use (cached while the array object lives).
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class BandDiff(NamedTuple):
+    """Difference inside one horizontal band (y1, y2 as fractions of height)."""
+    y1: float
+    y2: float
+    changed: float  # доля пикселей с |diff| > pixel_threshold, 0..1
+    mse: float
+
+
+class FrameDiff:
+    """
+    Args:
+        scale: Thumbnail scale (0.25 = 1/4 resolution)
+        pixel_threshold: |diff| (0-255) of a thumbnail pixel that counts as changed
+        cache_size: Thumbnails kept (the last few captured frames)
+    """
+
+    def __init__(self, scale: float = 0.25, pixel_threshold: int = 30, cache_size: int = 8):
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[int, Tuple[weakref.ref, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ===== THUMBNAILS =====
+
+    def _make_thumb(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        size = (max(1, int(gray.shape[1] * self.scale)), max(1, int(gray.shape[0] * self.scale)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def _store(self, frame: np.ndarray, thumb: np.ndarray) -> None:
+        try:
+            ref = weakref.ref(frame)
+        except TypeError:
+            return
+        with self._lock:
+            self._cache[id(frame)] = (ref, thumb)
+            self._cache.move_to_end(id(frame))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def refresh(self, frame: np.ndarray) -> np.ndarray:
+        """New capture: (re)build the frame's thumbnail. Returns it."""
+        thumb = self._make_thumb(frame)
+        self._store(frame, thumb)
+        return thumb
+
+    def thumb(self, frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Gray uint8 thumbnail of a BGR (or gray) frame, from the cache when possible.
+        roi: (x, y, width, height) in frame px — crop of the cached thumbnail.
+        """
+        with self._lock:
+            entry = self._cache.get(id(frame))
+        if entry is not None and entry[0]() is frame:
+            thumb = entry[1]
+        else:
+            thumb = self.refresh(frame)
+        if roi is None:
+            return thumb
+        x, y, w, h = roi
+        th, tw = thumb.shape
+        fx, fy = tw / frame.shape[1], th / frame.shape[0]
+        x1, y1 = min(tw - 1, max(0, int(x * fx))), min(th - 1, max(0, int(y * fy)))
+        x2 = min(tw, max(x1 + 1, int(round((x + w) * fx))))
+        y2 = min(th, max(y1 + 1, int(round((y + h) * fy))))
+        return thumb[y1:y2, x1:x2]
+
+    def _pair(
+        self, a: np.ndarray, b: np.ndarray, roi: Optional[Tuple[int, int, int, int]]
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if a.shape[:2] != b.shape[:2]:
+            return None
+        return self.thumb(a, roi), self.thumb(b, roi)
+
+    # ===== METRICS =====
+
+    def changed_fraction(
+        self,
+        a: np.ndarray,
+        b: np.ndarray,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        pixel_threshold: Optional[int] = None,
+    ) -> float:
+        """Share (0..1) of thumbnail pixels that changed. Frames of different size = 1.0."""
+        pair = self._pair(a, b, roi)
+        if pair is None:
+            return 1.0
+        return self._changed(pair[0], pair[1], pixel_threshold)
+
+    def _changed(self, ta: np.ndarray, tb: np.ndarray, pixel_threshold: Optional[int]) -> float:
+        threshold = self.pixel_threshold if pixel_threshold is None else pixel_threshold
+        changed = cv2.threshold(cv2.absdiff(ta, tb), threshold, 255, cv2.THRESH_BINARY)[1]
+        return cv2.countNonZero(changed) / changed.size
+
+    def mse(self, a: np.ndarray, b: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> float:
+        """Mean squared difference (gray 0-255). Frames of different size = inf."""
+        pair = self._pair(a, b, roi)
+        if pair is None:
+            return float("inf")
+        return cv2.norm(pair[0], pair[1], cv2.NORM_L2SQR) / pair[0].size
+
+    def mean_diff(
+        self,
+        a: np.ndarray,
+        b: np.ndarray,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> float:
+        """Mean |diff|; mask (uint8, thumbnail/ROI size, non-zero = counted) limits the pixels."""
+        pair = self._pair(a, b, roi)
+        if pair is None:
+            return float("inf")
+        return self.thumb_mean_diff(pair[0], pair[1], mask)
+
+    @staticmethod
+    def thumb_mean_diff(ta: np.ndarray, tb: np.ndarray, mask: Optional[np.ndarray] = None) -> float:
+        """mean_diff of two ready thumbnails (callers that keep the previous thumbnail)."""
+        count = cv2.countNonZero(mask) if mask is not None else 0
+        if count:
+            return cv2.norm(ta, tb, cv2.NORM_L1, mask=mask) / count
+        return cv2.norm(ta, tb, cv2.NORM_L1) / ta.size
+
+    def max_diff(self, a: np.ndarray, b: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> float:
+        """Max |diff| (0-255). Frames of different size = 255."""
+        pair = self._pair(a, b, roi)
+        if pair is None:
+            return 255.0
+        return float(cv2.norm(pair[0], pair[1], cv2.NORM_INF))
+
+    def bands(
+        self,
+        a: np.ndarray,
+        b: np.ndarray,
+        bands: Sequence[Tuple[float, float]],
+        pixel_threshold: Optional[int] = None,
+    ) -> List[BandDiff]:
+        """changed fraction + MSE per horizontal band, e.g. static UI: [(0, 0.15), (0.85, 1)]."""
+        pair = self._pair(a, b, None)
+        if pair is None:
+            return [BandDiff(y1, y2, 1.0, float("inf")) for y1, y2 in bands]
+        ta, tb = pair
+        h = ta.shape[0]
+        result = []
+        for y1, y2 in bands:
+            r1 = min(h - 1, max(0, int(h * y1)))
+            r2 = min(h, max(r1 + 1, int(round(h * y2))))
+            sa, sb = ta[r1:r2], tb[r1:r2]
+            result.append(BandDiff(
+                y1, y2,
+                self._changed(sa, sb, pixel_threshold),
+                cv2.norm(sa, sb, cv2.NORM_L2SQR) / sa.size,
+            ))
+        return result
@@ -3,31 +3,49 @@ EatventureBot V3 - Input Control
 Human-like mouse and keyboard interactions.
 """
 
-import pyautogui
 import random
 import time
 import logging
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
 
-from config import GAME_REGION, INPUT_CONFIG, TIMERS
+from config import GAME_REGION, INPUT_CONFIG, INPUT_BACKEND, TIMERS
+from core.input_backends import InputBackend, create_backend, ease_out
 
 logger = logging.getLogger(__name__)
 
-# Disable pyautogui fail-safe (we use our own ESC handler)
-pyautogui.FAILSAFE = False
-
 
 class InputController:
     """
     Handles all mouse and keyboard inputs.
     Coordinates are relative to GAME_REGION.
+    Events go through an InputBackend (core/input_backends.py); every wait
+    below is explicit (INPUT_BACKEND timings, TIMERS), backends never sleep.
     """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[InputBackend] = None):
         self.game_x = GAME_REGION[0]
         self.game_y = GAME_REGION[1]
         self.game_w = GAME_REGION[2]
         self.game_h = GAME_REGION[3]
+        # Сколько действий мышью выполнено (клик/зажатие/драг) — по нему видно, что кадр устарел
+        self.action_count = 0
+        # Подписчики на действия (VisionSystem.invalidate_frame_cache и т.п.)
+        self._action_listeners: List[Callable[[], None]] = []
+        # Fail-safe pyautogui выключен: останавливаемся своим ESC-обработчиком
+        self.backend = backend or create_backend(INPUT_BACKEND.get("BACKEND", "auto"), failsafe=False)
+        self.move_duration: float = float(INPUT_BACKEND.get("MOVE_DURATION", 0.0))
+        self.click_hold: float = float(INPUT_BACKEND.get("CLICK_HOLD", 0.03))
+        self.step_delay: float = float(INPUT_BACKEND.get("STEP_DELAY", 0.01))
+    
+    def add_action_listener(self, callback: Callable[[], None]) -> None:
+        """Register a callback invoked after every screen-changing action."""
+        self._action_listeners.append(callback)
+    
+    def note_action(self) -> None:
+        """Отмечаем действие, меняющее экран (кэш кадров после него устарел)."""
+        self.action_count += 1
+        for callback in self._action_listeners:
+            callback()
     
     def translate_to_screen(self, x: int, y: int) -> Tuple[int, int]:
         """
@@ -51,14 +69,18 @@ class InputController:
         """Legacy wrapper for translate_to_screen."""
         return self.translate_to_screen(x, y)
     
-    def human_click(self, x: int, y: int, duration: float = 0.1) -> None:
+    def human_click(self, x: int, y: int, duration: Optional[float] = None) -> None:
         """
         Perform a human-like click at the given coordinates.
         
         Args:
             x, y: Coordinates relative to GAME_REGION
-            duration: Click duration (for long press)
+            duration: Hold between press and release (None = INPUT_BACKEND["CLICK_HOLD"];
+                long press passes its own)
         """
+        if duration is None:
+            duration = self.click_hold
+        
         # Add random jitter for human-like behavior
         jitter = INPUT_CONFIG["CLICK_JITTER"]
         x_jittered = x + random.randint(-jitter, jitter)
@@ -72,13 +94,10 @@ class InputController:
         screen_y = max(self.game_y, min(screen_y, self.game_y + self.game_h - 1))
         
         try:
-            # Move to position with slight curve
-            pyautogui.moveTo(screen_x, screen_y, duration=0.1, tween=pyautogui.easeInOutQuad)
-            
-            # Click with specified duration
-            pyautogui.mouseDown()
-            time.sleep(duration)
-            pyautogui.mouseUp()
+            # Подвести курсор (MOVE_DURATION > 0 — плавно), нажать, подержать duration, отпустить
+            self.backend.glide(screen_x, screen_y, self.move_duration, self.step_delay)
+            self.backend.click(screen_x, screen_y, hold=duration)
+            self.note_action()
             
             logger.debug(f"Clicked at ({x}, {y}) -> screen ({screen_x}, {screen_y})")
             
@@ -128,9 +147,10 @@ class InputController:
         try:
             # STEP 1: Зажимаем кнопку
             logger.debug("  ⬇️  Зажимаем кнопку (mouseDown)...")
-            pyautogui.moveTo(screen_x, screen_y, duration=0.1)
+            self.backend.glide(screen_x, screen_y, self.move_duration, self.step_delay)
             time.sleep(0.05)
-            pyautogui.mouseDown(screen_x, screen_y, button='left')
+            self.backend.down(screen_x, screen_y)
+            self.note_action()
             
             start_time = time.time()
             check_interval = 0.1  # Проверяем каждые 100ms
@@ -158,7 +178,8 @@ class InputController:
             
             # STEP 3: Отпускаем
             logger.debug("  ⬆️  Отпускаем кнопку (mouseUp)...")
-            pyautogui.mouseUp(button='left')
+            self.backend.up(screen_x, screen_y)
+            self.note_action()
             
             total_time = time.time() - start_time
             logger.info(f"✓ Умное зажатие завершено: держали {total_time:.1f}s")
@@ -170,8 +191,8 @@ class InputController:
             logger.error(f"❌ Ошибка умного зажатия: {e}")
             # Убедимся что кнопка отпущена
             try:
-                pyautogui.mouseUp(button='left')
-            except:
+                self.backend.up(screen_x, screen_y)
+            except Exception:
                 pass
             return 0.0
     
@@ -227,7 +248,8 @@ class InputController:
             self.drag_screen("down", pixels)
         else:
             # Scroll wheel (not recommended)
-            pyautogui.scroll(-pixels // 10)
+            self.backend.scroll(-pixels // 10, *self.translate_to_screen(self.game_w // 2, self.game_h // 2))
+            self.note_action()
             time.sleep(TIMERS["SCROLL_DURATION"])
     
     def scroll_up(self, pixels: int = None, smooth: bool = True) -> None:
@@ -242,7 +264,8 @@ class InputController:
             self.drag_screen("up", pixels)
         else:
             # Scroll wheel (not recommended)
-            pyautogui.scroll(pixels // 10)
+            self.backend.scroll(pixels // 10, *self.translate_to_screen(self.game_w // 2, self.game_h // 2))
+            self.note_action()
             time.sleep(TIMERS["SCROLL_DURATION"])
     
     def activate_window(self) -> None:
@@ -256,7 +279,8 @@ class InputController:
         
         logger.info("🔄 Activating game window...")
         try:
-            pyautogui.click(screen_x, screen_y)
+            self.backend.click(screen_x, screen_y, hold=self.click_hold)
+            self.note_action()
             time.sleep(0.3)  # Wait for window to become active
             logger.debug(f"✓ Window activated with click at screen ({screen_x}, {screen_y})")
         except Exception as e:
@@ -275,8 +299,8 @@ class InputController:
         """
         Один плавный жест, как на тачпаде: нажал → повёл → остановился → отпустил.
         
-        БЕЗ дёргания: один moveTo(..., duration=...) при зажатой кнопке даёт
-        плавное движение (pyautogui сам интерполирует). Не 60 шагов — одна тяга.
+        БЕЗ дёргания: одна тяга с ease-out при зажатой кнопке (backend.drag,
+        шаг INPUT_BACKEND["STEP_DELAY"]).
         
         Args:
             screen_x1, screen_y1: Старт (экран)
@@ -286,19 +310,18 @@ class InputController:
             hold_time: Пауза в конце перед отпусканием (инерция)
         """
         # 1. Подвести курсор в точку старта
-        pyautogui.moveTo(screen_x1, screen_y1, duration=0.12)
+        self.backend.glide(screen_x1, screen_y1, 0.12, self.step_delay)
         time.sleep(0.08)
         
-        # 2. Нажать (как нажатие на тачпад)
-        pyautogui.mouseDown(button='left')
-        time.sleep(grip_time)
-        
-        # 3. Одна плавная тяга в нужную сторону (как ведёшь пальцем)
-        pyautogui.moveTo(screen_x2, screen_y2, duration=duration, tween=pyautogui.easeOutQuad)
-        
-        # 4. Остановились — подержать, потом отпустить
-        time.sleep(hold_time)
-        pyautogui.mouseUp(button='left')
+        # 2-4. Нажать → подержать grip_time → одна плавная тяга → подержать hold_time → отпустить
+        self.backend.drag(
+            screen_x1, screen_y1, screen_x2, screen_y2,
+            duration=duration,
+            step_delay=self.step_delay,
+            grip=grip_time,
+            hold=hold_time,
+            ease=ease_out,
+        )
         time.sleep(0.25)
     
     def swipe_absolute(
@@ -338,10 +361,9 @@ class InputController:
             logger.debug(f"✓ Drag complete: {abs(screen_y2 - screen_y1)}px vertical")
         except Exception as e:
             logger.error(f"Drag scroll failed: {e}")
-            try:
-                pyautogui.mouseUp(button='left')
-            except Exception:
-                pass
+            self.backend.release_all()
+        finally:
+            self.note_action()
     
     def click_safe_spot(self) -> None:
         """
@@ -0,0 +1,509 @@
+"""
+EatventureBot V3 - Input Backends
+Mouse primitives behind one interface: Quartz (macOS), XTest (X11 / Xvfb),
+pynput, pyautogui and a null backend that only records events.
+
+Backends never sleep on their own: pyautogui is called with _pause=False
+(no PAUSE after every call), moves are instant. Every wait is an explicit
+argument of click() / glide() / drag() (hold, duration, step_delay, grip),
+so the caller sees exactly what one action costs.
+
+Fail-safe (create_backend(..., failsafe=True)) works for every backend like
+pyautogui.FAILSAFE: a gesture started while the mouse sits in a screen corner
+raises FailSafeException.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import sys
+import time
+import weakref
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[int, int]
+
+# Порядок для BACKEND = "auto": первый, который удалось создать
+AUTO_ORDER: Dict[str, Tuple[str, ...]] = {
+    "darwin": ("quartz", "pynput", "pyautogui"),
+    "linux": ("xtest", "pynput", "pyautogui"),
+}
+DEFAULT_AUTO_ORDER: Tuple[str, ...] = ("pynput", "pyautogui")
+
+class FailSafeException(Exception):
+    """Mouse in a screen corner with fail-safe on (emergency stop, like pyautogui.FailSafeException)."""
+
+
+# Все созданные бэкенды — release_all() отпускает зажатые кнопки (ESC, аварийный выход)
+_LIVE_BACKENDS: "weakref.WeakSet[InputBackend]" = weakref.WeakSet()
+
+
+def ease_in_out(t: float) -> float:
+    """Smoothstep: 3t² - 2t³."""
+    t = max(0.0, min(1.0, t))
+    return t * t * (3.0 - 2.0 * t)
+
+
+def linear(t: float) -> float:
+    """No easing (pyautogui's default tween)."""
+    return max(0.0, min(1.0, t))
+
+
+def ease_out(t: float) -> float:
+    """Quadratic ease-out (fast start, soft stop)."""
+    t = max(0.0, min(1.0, t))
+    return 1.0 - (1.0 - t) * (1.0 - t)
+
+
+class InputBackend:
+    """
+    Posts mouse events. Subclasses implement move/down/up/scroll/position;
+    gestures (click, glide, drag) are built here from those with explicit sleeps only.
+    """
+
+    name = "base"
+    # Мышь в углу экрана = аварийная остановка (create_backend(..., failsafe=True))
+    failsafe = False
+
+    def __init__(self):
+        self._pressed: Set[str] = set()
+        self._corners: Optional[Set[Point]] = None
+        _LIVE_BACKENDS.add(self)
+
+    # ----- primitives -----
+
+    def move(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def down(self, x: int, y: int, button: str = "left") -> None:
+        raise NotImplementedError
+
+    def up(self, x: int, y: int, button: str = "left") -> None:
+        raise NotImplementedError
+
+    def scroll(self, clicks: int, x: int, y: int) -> None:
+        """Wheel clicks at (x, y): > 0 up, < 0 down."""
+        raise NotImplementedError
+
+    def position(self) -> Point:
+        raise NotImplementedError
+
+    def screen_size(self) -> Optional[Point]:
+        """Size of the main screen, None if the backend can't tell (fail-safe checks (0, 0) only)."""
+        return None
+
+    def close(self) -> None:
+        pass
+
+    def check_failsafe(self) -> None:
+        """Raise FailSafeException if fail-safe is on and the mouse is in a screen corner."""
+        if not self.failsafe:
+            return
+        if self._corners is None:
+            corners = {(0, 0)}
+            size = self.screen_size()
+            if size is not None:
+                w, h = size
+                corners |= {(0, h - 1), (w - 1, 0), (w - 1, h - 1)}
+            self._corners = corners
+        x, y = self.position()
+        if (x, y) in self._corners:
+            raise FailSafeException(f"Fail-safe: мышь в углу экрана ({x}, {y}) — аварийная остановка")
+
+    # ----- gestures -----
+
+    def click(self, x: int, y: int, hold: float = 0.0, button: str = "left") -> None:
+        """Jump to (x, y), press, wait `hold` seconds, release."""
+        self.check_failsafe()
+        self.move(x, y)
+        self.down(x, y, button)
+        try:
+            if hold > 0:
+                time.sleep(hold)
+        finally:
+            self.up(x, y, button)
+
+    def glide(
+        self,
+        x: int,
+        y: int,
+        duration: float = 0.0,
+        step_delay: float = 0.01,
+        ease: Callable[[float], float] = ease_in_out,
+        start: Optional[Point] = None,
+    ) -> None:
+        """Move to (x, y) in steps over `duration` seconds (0 = jump). Buttons stay as they are."""
+        self.check_failsafe()
+        if duration <= 0:
+            self.move(x, y)
+            return
+        x0, y0 = start if start is not None else self.position()
+        steps = max(1, int(round(duration / max(step_delay, 0.001))))
+        for i in range(1, steps + 1):
+            if i > 1:
+                self.check_failsafe()
+            t = ease(i / steps)
+            self.move(round(x0 + (x - x0) * t), round(y0 + (y - y0) * t))
+            time.sleep(duration / steps)
+
+    def drag(
+        self,
+        x1: int,
+        y1: int,
+        x2: int,
+        y2: int,
+        duration: float,
+        step_delay: float = 0.01,
+        grip: float = 0.0,
+        hold: float = 0.0,
+        ease: Callable[[float], float] = ease_in_out,
+        button: str = "left",
+    ) -> None:
+        """
+        Press at (x1, y1), wait `grip`, glide to (x2, y2) over `duration`,
+        wait `hold`, release. The button is released even if a move fails.
+        """
+        self.check_failsafe()
+        self.move(x1, y1)
+        self.down(x1, y1, button)
+        try:
+            if grip > 0:
+                time.sleep(grip)
+            self.glide(x2, y2, duration, step_delay, ease, start=(x1, y1))
+            if hold > 0:
+                time.sleep(hold)
+        finally:
+            self.up(x2, y2, button)
+
+    def release_all(self) -> None:
+        """Release every button this backend still holds."""
+        x, y = self.position()
+        for button in list(self._pressed):
+            try:
+                self.up(x, y, button)
+            except Exception as e:
+                logger.debug(f"release {button} failed ({self.name}): {e}")
+
+
+def release_all() -> None:
+    """Release held buttons on every live backend (emergency stop)."""
+    for backend in list(_LIVE_BACKENDS):
+        backend.release_all()
+
+
+# ===== NULL (recording) =====
+
+class NullBackend(InputBackend):
+    """
+    Posts nothing. Records (timestamp, kind, x, y, button/clicks) for dry runs,
+    offline tools and latency measurements of the caller's own logic.
+    """
+
+    name = "null"
+
+    def __init__(self, max_events: int = 10000):
+        super().__init__()
+        self.events: Deque[Tuple[float, str, int, int, object]] = deque(maxlen=max_events)
+        self._pos: Point = (0, 0)
+
+    def _record(self, kind: str, x: int, y: int, extra: object = None) -> None:
+        self.events.append((time.perf_counter(), kind, int(x), int(y), extra))
+
+    def move(self, x: int, y: int) -> None:
+        self._pos = (int(x), int(y))
+        self._record("move", x, y)
+
+    def down(self, x: int, y: int, button: str = "left") -> None:
+        self._pos = (int(x), int(y))
+        self._pressed.add(button)
+        self._record("down", x, y, button)
+
+    def up(self, x: int, y: int, button: str = "left") -> None:
+        self._pos = (int(x), int(y))
+        self._pressed.discard(button)
+        self._record("up", x, y, button)
+
+    def scroll(self, clicks: int, x: int, y: int) -> None:
+        self._pos = (int(x), int(y))
+        self._record("scroll", x, y, clicks)
+
+    def position(self) -> Point:
+        return self._pos
+
+    def check_failsafe(self) -> None:
+        """Virtual cursor (starts at (0, 0)): there is no real mouse to stop."""
+
+    def kinds(self) -> List[str]:
+        return [e[1] for e in self.events]
+
+
+# ===== PYAUTOGUI =====
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui without its implicit waits (_pause=False, DARWIN_CATCH_UP_TIME = 0)."""
+
+    name = "pyautogui"
+
+    def __init__(self, failsafe: Optional[bool] = None):
+        import pyautogui
+        super().__init__()
+        self._gui = pyautogui
+        if failsafe is not None:
+            pyautogui.FAILSAFE = failsafe
+        # macOS: pyautogui спит DARWIN_CATCH_UP_TIME после каждого перемещения
+        if hasattr(pyautogui, "DARWIN_CATCH_UP_TIME"):
+            pyautogui.DARWIN_CATCH_UP_TIME = 0.0
+
+    def move(self, x: int, y: int) -> None:
+        self._gui.moveTo(x, y, _pause=False)
+
+    def down(self, x: int, y: int, button: str = "left") -> None:
+        self._gui.mouseDown(x, y, button=button, _pause=False)
+        self._pressed.add(button)
+
+    def up(self, x: int, y: int, button: str = "left") -> None:
+        self._gui.mouseUp(x, y, button=button, _pause=False)
+        self._pressed.discard(button)
+
+    def scroll(self, clicks: int, x: int, y: int) -> None:
+        self._gui.scroll(clicks, x, y, _pause=False)
+
+    def position(self) -> Point:
+        x, y = self._gui.position()
+        return (int(x), int(y))
+
+    def screen_size(self) -> Optional[Point]:
+        w, h = self._gui.size()
+        return (int(w), int(h))
+
+
+# ===== PYNPUT =====
+
+class PynputBackend(InputBackend):
+    """pynput mouse Controller (moves while a button is held become drag events)."""
+
+    name = "pynput"
+
+    def __init__(self):
+        from pynput.mouse import Button, Controller
+        super().__init__()
+        self._mouse = Controller()
+        self._buttons = {"left": Button.left, "right": Button.right, "middle": Button.middle}
+
+    def move(self, x: int, y: int) -> None:
+        self._mouse.position = (x, y)
+
+    def down(self, x: int, y: int, button: str = "left") -> None:
+        self._mouse.position = (x, y)
+        self._mouse.press(self._buttons[button])
+        self._pressed.add(button)
+
+    def up(self, x: int, y: int, button: str = "left") -> None:
+        self._mouse.position = (x, y)
+        self._mouse.release(self._buttons[button])
+        self._pressed.discard(button)
+
+    def scroll(self, clicks: int, x: int, y: int) -> None:
+        self._mouse.position = (x, y)
+        self._mouse.scroll(0, clicks)
+
+    def position(self) -> Point:
+        x, y = self._mouse.position
+        return (int(x), int(y))
+
+
+# ===== QUARTZ (macOS) =====
+
+class QuartzBackend(InputBackend):
+    """CoreGraphics events posted to the HID tap (same path as core/scroll.py)."""
+
+    name = "quartz"
+
+    def __init__(self):
+        import Quartz
+        super().__init__()
+        self._q = Quartz
+        self._events = {
+            "left": (Quartz.kCGEventLeftMouseDown, Quartz.kCGEventLeftMouseUp,
+                     Quartz.kCGEventLeftMouseDragged, Quartz.kCGMouseButtonLeft),
+            "right": (Quartz.kCGEventRightMouseDown, Quartz.kCGEventRightMouseUp,
+                      Quartz.kCGEventRightMouseDragged, Quartz.kCGMouseButtonRight),
+        }
+
+    def _post(self, event_type, x: int, y: int, button) -> None:
+        event = self._q.CGEventCreateMouseEvent(None, event_type, (x, y), button)
+        self._q.CGEventPost(self._q.kCGHIDEventTap, event)
+
+    def move(self, x: int, y: int) -> None:
+        # При зажатой кнопке macOS ждёт Dragged, а не MouseMoved (иначе игра не видит драг)
+        for button in ("left", "right"):
+            if button in self._pressed:
+                _, _, dragged, cg_button = self._events[button]
+                self._post(dragged, x, y, cg_button)
+                return
+        self._post(self._q.kCGEventMouseMoved, x, y, self._q.kCGMouseButtonLeft)
+
+    def down(self, x: int, y: int, button: str = "left") -> None:
+        down, _, _, cg_button = self._events[button]
+        self._post(down, x, y, cg_button)
+        self._pressed.add(button)
+
+    def up(self, x: int, y: int, button: str = "left") -> None:
+        _, up, _, cg_button = self._events[button]
+        self._post(up, x, y, cg_button)
+        self._pressed.discard(button)
+
+    def scroll(self, clicks: int, x: int, y: int) -> None:
+        self.move(x, y)
+        event = self._q.CGEventCreateScrollWheelEvent(None, self._q.kCGScrollEventUnitLine, 1, clicks)
+        self._q.CGEventPost(self._q.kCGHIDEventTap, event)
+
+    def position(self) -> Point:
+        loc = self._q.CGEventGetLocation(self._q.CGEventCreate(None))
+        return (int(loc.x), int(loc.y))
+
+    def screen_size(self) -> Optional[Point]:
+        bounds = self._q.CGDisplayBounds(self._q.CGMainDisplayID())
+        return (int(bounds.size.width), int(bounds.size.height))
+
+
+# ===== XTEST (X11 / Xvfb) =====
+
+class XTestBackend(InputBackend):
+    """
+    XTest fake input through libX11/libXtst (ctypes, no pip dependency).
+    Works on any X server including Xvfb: `xvfb-run python tools/benchmark_input.py --backend xtest`.
+    up() ends with XSync, so a click returns only after the server has processed it.
+    """
+
+    name = "xtest"
+    BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+    def __init__(self, display: Optional[str] = None):
+        x11_path = ctypes.util.find_library("X11")
+        xtst_path = ctypes.util.find_library("Xtst")
+        if not x11_path or not xtst_path:
+            raise OSError("libX11 / libXtst не найдены")
+        x11 = ctypes.CDLL(x11_path)
+        xtst = ctypes.CDLL(xtst_path)
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XFlush.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XQueryPointer.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_uint),
+        ]
+        xtst.XTestFakeMotionEvent.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        xtst.XTestFakeButtonEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+
+        name = display if display is not None else os.environ.get("DISPLAY", "")
+        if not name:
+            raise OSError("DISPLAY не задан")
+        dpy = x11.XOpenDisplay(name.encode())
+        if not dpy:
+            raise OSError(f"не удалось открыть X-дисплей {name!r}")
+        super().__init__()
+        self._x11, self._xtst, self._dpy = x11, xtst, dpy
+        self._root = x11.XDefaultRootWindow(dpy)
+
+    def move(self, x: int, y: int) -> None:
+        self._xtst.XTestFakeMotionEvent(self._dpy, -1, int(x), int(y), 0)
+        self._x11.XFlush(self._dpy)
+
+    def down(self, x: int, y: int, button: str = "left") -> None:
+        self._xtst.XTestFakeMotionEvent(self._dpy, -1, int(x), int(y), 0)
+        self._xtst.XTestFakeButtonEvent(self._dpy, self.BUTTONS[button], 1, 0)
+        self._x11.XFlush(self._dpy)
+        self._pressed.add(button)
+
+    def up(self, x: int, y: int, button: str = "left") -> None:
+        self._xtst.XTestFakeMotionEvent(self._dpy, -1, int(x), int(y), 0)
+        self._xtst.XTestFakeButtonEvent(self._dpy, self.BUTTONS[button], 0, 0)
+        self._x11.XSync(self._dpy, 0)
+        self._pressed.discard(button)
+
+    def scroll(self, clicks: int, x: int, y: int) -> None:
+        self._xtst.XTestFakeMotionEvent(self._dpy, -1, int(x), int(y), 0)
+        wheel = 4 if clicks > 0 else 5
+        for _ in range(abs(int(clicks))):
+            self._xtst.XTestFakeButtonEvent(self._dpy, wheel, 1, 0)
+            self._xtst.XTestFakeButtonEvent(self._dpy, wheel, 0, 0)
+        self._x11.XFlush(self._dpy)
+
+    def position(self) -> Point:
+        root, child = ctypes.c_ulong(), ctypes.c_ulong()
+        rx, ry, wx, wy = ctypes.c_int(), ctypes.c_int(), ctypes.c_int(), ctypes.c_int()
+        mask = ctypes.c_uint()
+        self._x11.XQueryPointer(
+            self._dpy, self._root, ctypes.byref(root), ctypes.byref(child),
+            ctypes.byref(rx), ctypes.byref(ry), ctypes.byref(wx), ctypes.byref(wy), ctypes.byref(mask),
+        )
+        return (rx.value, ry.value)
+
+    def screen_size(self) -> Optional[Point]:
+        screen = self._x11.XDefaultScreen(self._dpy)
+        return (self._x11.XDisplayWidth(self._dpy, screen), self._x11.XDisplayHeight(self._dpy, screen))
+
+    def close(self) -> None:
+        if self._dpy:
+            self._x11.XCloseDisplay(self._dpy)
+            self._dpy = None
+
+
+BACKENDS = {
+    "quartz": QuartzBackend,
+    "xtest": XTestBackend,
+    "pynput": PynputBackend,
+    "pyautogui": PyAutoGUIBackend,
+    "null": NullBackend,
+}
+
+
+def create_backend(name: str = "auto", failsafe: Optional[bool] = None) -> InputBackend:
+    """
+    Backend by name, or the first one that works on this platform for "auto"
+    (macOS: quartz → pynput → pyautogui; Linux: xtest → pynput → pyautogui).
+    Raises if the backend (for "auto": none of them) can't be created — the null
+    backend is used only when asked for by name.
+    failsafe: True/False turns the screen-corner emergency stop on/off for any backend.
+    """
+    name = (name or "auto").lower()
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown input backend {name!r} (known: {', '.join(BACKENDS)}, auto)")
+        backend = BACKENDS[name](failsafe) if name == "pyautogui" else BACKENDS[name]()
+        if failsafe is not None:
+            backend.failsafe = failsafe
+        logger.info(f"🖱️  Input backend: {backend.name}")
+        return backend
+
+    for candidate in AUTO_ORDER.get(sys.platform, DEFAULT_AUTO_ORDER):
+        try:
+            backend = BACKENDS[candidate](failsafe) if candidate == "pyautogui" else BACKENDS[candidate]()
+        except Exception as e:
+            logger.debug(f"Input backend {candidate} недоступен: {e}")
+            continue
+        if failsafe is not None:
+            backend.failsafe = failsafe
+        logger.info(f"🖱️  Input backend: {backend.name} (auto)")
+        return backend
+    raise RuntimeError(
+        f"Ни один input backend недоступен ({', '.join(AUTO_ORDER.get(sys.platform, DEFAULT_AUTO_ORDER))}); "
+        f"для прогона без кликов задайте backend \"null\""
+    )
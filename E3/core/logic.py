@@ -8,13 +8,18 @@ import time
 import logging
 import math
 import json
-from typing import Optional, Tuple, List
+from typing import Optional, Sequence, Tuple, List
 
-from core.vision import VisionSystem
+import numpy as np
+
+from core.vision import VisionSystem, DetectionSpec, Frame, FrameDetections
 from core.input import InputController
 from core.state import BotState
 from core.scroll import GameScroller
-from config import TIMERS, THRESHOLDS
+from core.scroll_tracker import ScrollTracker
+from core.panorama import LevelPanorama
+from core.pipeline import Pipeline, harvest
+from config import TIMERS, THRESHOLDS, PANORAMA, PIPELINE, ANIMATION_MASK, SETTLE, SCROLL_TRACKER
 try:
     from config import RENOVATE_CLICK_OFFSET_Y, FLY_CLICK_OFFSET_Y
 except ImportError:
@@ -46,6 +51,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Кнопки закрытия рекламы, которые проверяются в главном цикле (check_and_close_ads)
+AD_CLOSE_BUTTONS = ["btn_ad_close_x", "ad_close_x_gray", "ad_close_x1"]
+
 
 class GameLogic:
     """
@@ -64,6 +72,21 @@ class GameLogic:
         self.no_click_rects: List[Tuple[int, int, int, int]] = []  # (x1,y1,x2,y2) game-relative
         # Детектор "упёрлись в низ" для скролла при простое
         self.idle_scroll_stuck_count = 0
+        # Последняя открытая станция (клик повторно закрывает её попап) и группы детекторов тика
+        self.last_station_click: Optional[Tuple[int, int]] = None
+        self._tick_groups: Optional[Sequence[str]] = None
+        # Реальный сдвиг контента после драга (phaseCorrelate) — край уровня без повторных свайпов
+        self.scroll_tracker: Optional[ScrollTracker] = None
+        if SCROLL_TRACKER.get("ENABLED", True):
+            self.scroll_tracker = ScrollTracker(
+                scale=float(SCROLL_TRACKER.get("SCALE", 0.25)),
+                ui_top=float(SCROLL_TRACKER.get("UI_TOP", 0.12)),
+                ui_bottom=float(SCROLL_TRACKER.get("UI_BOTTOM", 0.15)),
+                edge_px=float(SCROLL_TRACKER.get("EDGE_SHIFT_PX", 4.0)),
+                min_response=float(SCROLL_TRACKER.get("MIN_RESPONSE", 0.05)),
+            )
+        # Любой клик/драг делает кэшированный кадр VisionSystem устаревшим
+        self.input.add_action_listener(self.vision.invalidate_frame_cache)
 
         if self.zones_enabled and self.danger_zone_center:
             logger.info(f"✓ Danger zone safety enabled (Burger button at {self.danger_zone_center})")
@@ -74,6 +97,145 @@ class GameLogic:
         # Загрузка зон «не нажимать» из no_click_zones.json (поиск по картинке при старте)
         self._load_no_click_zones()
     
+    # ===== PER-TICK DETECTION =====
+
+    def _progression_specs(self) -> List[DetectionSpec]:
+        """Детекторы реновации/перелёта/открытия уровня (check_level_progression)."""
+        return [
+            DetectionSpec("btn_renovate"),
+            DetectionSpec("btn_open"),
+            DetectionSpec("btn_fly"),
+        ]
+
+    def _confirm_specs(self) -> List[DetectionSpec]:
+        """Кнопки подтверждения реновации/перелёта (confirm_progression)."""
+        return [
+            DetectionSpec("btn_confirm_renovate"),
+            DetectionSpec("btn_fly_confirm"),
+        ]
+
+    def _close_x_specs(self) -> List[DetectionSpec]:
+        """Крестик окна бургер/клуб — только верхняя правая часть окна (check_and_close_x)."""
+        return [DetectionSpec("btn_close_x", region=self._get_close_x_region())]
+
+    def _ad_close_specs(self) -> List[DetectionSpec]:
+        """Крестики рекламы в верхней полосе (check_and_close_ads)."""
+        return [
+            DetectionSpec(ad_button, region=self._get_ad_close_region(ad_button))
+            for ad_button in AD_CLOSE_BUTTONS
+        ]
+
+    def _general_specs(self) -> List[DetectionSpec]:
+        """Иконка меню общих улучшений (upgrade_general)."""
+        return [DetectionSpec("icon_upgrades")]
+
+    def _collect_specs(self) -> List[DetectionSpec]:
+        """
+        Боксы и чаевые (collect_items).
+        Боксы ищем сразу по запасному (пониженному) порогу: основной порог
+        применяется фильтром по score к тому же результату — без второго прохода.
+        Чаевые — только если подошло время (раз за PEEK_INTERVAL).
+        """
+        specs = [
+            DetectionSpec("box_floor", threshold=self._box_thresholds()[1], find_all=True),
+        ]
+        if self._tips_due():
+            specs.append(DetectionSpec("tip_coin", find_all=True))
+        return specs
+
+    def _station_specs(self) -> List[DetectionSpec]:
+        """Стрелки улучшений станций — в зоне Kitchen Floor, если зоны настроены (upgrade_stations)."""
+        return [
+            DetectionSpec(
+                "upgrade_arrow",
+                find_all=True,
+                station_zone=self.vision.zones_enabled,
+            )
+        ]
+
+    def tick_specs(self, groups: Optional[Sequence[str]] = None) -> List[DetectionSpec]:
+        """
+        Детекторы одного прохода главного цикла (в порядке приоритета).
+        groups — только эти группы (обработчики экрана из STATE_HANDLERS в run.py); None — все.
+        """
+        builders = [
+            ("progression", self._progression_specs),
+            ("confirm", self._confirm_specs),
+            ("close_x", self._close_x_specs),
+            ("ad_close", self._ad_close_specs),
+            ("general", self._general_specs),
+            ("collect", self._collect_specs),
+            ("station", self._station_specs),
+        ]
+        specs: List[DetectionSpec] = []
+        for group, build in builders:
+            if groups is None or group in groups:
+                specs += build()
+        return specs
+
+    def detect_tick(self, frame: Optional[Frame] = None, groups: Optional[Sequence[str]] = None) -> FrameDetections:
+        """
+        Один захват экрана (или готовый frame, уже классифицированный ScreenStateClassifier)
+        + детекторы тика (VisionSystem.detect_all). groups — см. tick_specs; запоминаются
+        для refresh_tick. Результат передаётся во все обработчики главного цикла вместо
+        отдельного скриншота в каждом из них.
+        """
+        self._tick_groups = groups
+        if frame is None:
+            frame = self.vision.capture_screen()
+        detections = self.vision.detect_all(frame, self.tick_specs(groups))
+        logger.debug(
+            f"📸 Тик: группы {', '.join(groups) if groups is not None else 'все'}, "
+            f"детекция за {detections.elapsed_ms:.1f}ms"
+        )
+        return detections
+
+    def refresh_tick(self, detections: FrameDetections) -> FrameDetections:
+        """Кадр тика устарел, если после него было действие мышью — тогда снимаем новый (те же группы)."""
+        if self.vision.is_frame_stale(detections.frame_id):
+            return self.detect_tick(groups=self._tick_groups)
+        return detections
+
+    def _detect(self, specs: List[DetectionSpec]) -> FrameDetections:
+        """Свежий кадр + только указанные детекторы (когда обработчик вызван без detections)."""
+        return self.vision.detect_all(self.vision.capture_screen(), specs)
+
+    def _settle(
+        self,
+        label: str,
+        fixed_sleep: float,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        require_change: bool = False,
+        reference: Optional[np.ndarray] = None,
+    ) -> float:
+        """
+        Вместо time.sleep(fixed_sleep) после действия: ждём, пока экран (roi) перестанет
+        меняться, не дольше fixed_sleep × SETTLE["MAX_WAIT_FACTOR"]. Returns сколько ждали.
+        require_change — сначала дождаться реакции (меню открывается/закрывается):
+        reference = self.vision.settle_reference(roi) ДО действия; экран не изменился —
+        не дольше fixed_sleep.
+        """
+        factor = float(SETTLE.get("MAX_WAIT_FACTOR", 1.5))
+        return self.vision.wait_until_stable(
+            roi=roi,
+            max_wait=fixed_sleep * factor,
+            require_change=require_change,
+            label=label,
+            baseline=fixed_sleep,
+            reference=reference,
+        ).waited
+
+    def _scroller(self) -> GameScroller:
+        """Quartz-драги в области игры; после драга ждёт остановки контента (_settle)."""
+        return GameScroller(
+            self.input.game_x,
+            self.input.game_y,
+            self.input.game_w,
+            self.input.game_h,
+            on_action=self.input.note_action,
+            settle=self._settle,
+        )
+
     # ===== SAFETY SYSTEM =====
 
     def _load_no_click_zones(self) -> None:
@@ -81,7 +243,6 @@ class GameLogic:
         1) из no_click_zones.json (если есть);
         2) автоматически — все картинки из папки ASSETS_NO_DIR (assets/No): ищем на экране, зона = размер картинки + NO_CLICK_AUTO_EXPAND.
         """
-        import cv2
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         screenshot = self.vision.capture_screen()
         gw, gh = screenshot.shape[1], screenshot.shape[0]
@@ -126,7 +287,7 @@ class GameLogic:
                 continue
             name = os.path.splitext(fn)[0]
             full_path = os.path.join(no_dir, fn)
-            img = cv2.imread(full_path)
+            img = self.vision.load_image(full_path)
             if img is None:
                 logger.warning(f"No-click auto: не удалось загрузить {fn}")
                 continue
@@ -215,54 +376,55 @@ class GameLogic:
             region_h = top_h
         return region_x, region_y, region_w, region_h
 
-    def check_and_close_ads(self) -> bool:
+    def check_and_close_ads(self, detections: Optional[FrameDetections] = None) -> bool:
         """
         Check for ad close buttons and click them immediately.
         Returns True if an ad was closed.
+        
+        Args:
+            detections: Результат detect_tick() текущего тика (или None — снимем свой кадр)
         """
-        screenshot = self.vision.capture_screen()
+        if detections is None:
+            detections = self._detect(self._ad_close_specs())
         
         # Check for ad close buttons (в верхней части экрана)
-        for ad_button in ["btn_ad_close_x", "ad_close_x_gray", "ad_close_x1"]:
-            region = self._get_ad_close_region(ad_button)
-            pos = self.vision.find_template_in_region(
-                ad_button,
-                region,
-                screenshot=screenshot,
-            )
+        for ad_button in AD_CLOSE_BUTTONS:
+            pos = detections.get(ad_button)
             if pos:
                 logger.warning(f"РЕКЛАМА: закрываем ({ad_button})")
                 self.input.human_click(pos[0], pos[1])
-                time.sleep(0.5)
+                self._settle("ad_close", 0.5)
                 return True
         
         return False
     
-    def check_and_close_x(self) -> bool:
+    def _get_close_x_region(self) -> Tuple[int, int, int, int]:
         """
-        Если виден крестик (красный X) — закрыть окно (бургер/клуб и т.п.).
-        Вызывать периодически в главном цикле, чтобы выйти из случайно открытого окна.
-        Returns True если крестик найден и нажат.
+        Область поиска крестика окна (бургер/клуб).
+        Важно: ищем крестик ТОЛЬКО в верхней правой части окна игры,
+        где реально находится закрытие окна клуба/бургер-меню.
+        Это уменьшает шанс случайно кликнуть по другим крестикам/иконкам.
         """
-        screenshot = self.vision.capture_screen()
-
-        # Важно: ищем крестик ТОЛЬКО в верхней правой части окна игры,
-        # где реально находится закрытие окна клуба/бургер-меню.
-        # Это уменьшает шанс случайно кликнуть по другим крестикам/иконкам.
         region_x = int(self.input.game_w * 0.55)
         region_y = 0
         region_w = self.input.game_w - region_x
         region_h = int(self.input.game_h * 0.35)
+        return region_x, region_y, region_w, region_h
 
-        close_pos = self.vision.find_template_in_region(
-            "btn_close_x",
-            (region_x, region_y, region_w, region_h),
-            screenshot=screenshot,
-        )
+    def check_and_close_x(self, detections: Optional[FrameDetections] = None) -> bool:
+        """
+        Если виден крестик (красный X) — закрыть окно (бургер/клуб и т.п.).
+        Вызывать периодически в главном цикле, чтобы выйти из случайно открытого окна.
+        Returns True если крестик найден и нажат.
+        """
+        if detections is None:
+            detections = self._detect(self._close_x_specs())
+
+        close_pos = detections.get("btn_close_x")
         if close_pos:
             logger.info("❌ Крестик найден — закрываем окно (бургер/клуб)")
             self.input.human_click(close_pos[0], close_pos[1])
-            time.sleep(0.4)
+            self._settle("close_x", 0.4)
             return True
         return False
     
@@ -307,18 +469,22 @@ class GameLogic:
         region_y = self.input.game_h - bottom_h
         region_w = self.input.game_w
         region_h = bottom_h
-        boost_pos = self.vision.find_template_in_region(
+        # Один проход матчинга: и позиция, и лучшая похожесть для лога ниже
+        boost = self.vision.match(
             "boost_ready",
-            (region_x, region_y, region_w, region_h),
             screenshot=screenshot,
+            region=(region_x, region_y, region_w, region_h),
         )
+        boost_pos = boost.location if boost is not None else None
         if boost_pos:
             logger.info(
                 f"🎥 РЕЖИМ РЕКЛАМЫ: найден значок буста boost_ready at {boost_pos}, кликаем и ждём рекламу"
             )
+            before = self.vision.settle_reference()
             self.input.human_click(boost_pos[0], boost_pos[1])
-            # Даём рекламе стартовать, не ищем отдельную кнопку Play — просто ждём крестики
-            time.sleep(3.0)
+            # Даём рекламе стартовать, не ищем отдельную кнопку Play — просто ждём крестики.
+            # Статичный первый экран рекламы — дальше сразу; видео не устаивается — ждём весь лимит.
+            self._settle("ad_start", 3.0, require_change=True, reference=before)
 
             # При первом входе можно сохранить скриншот для анализа
             if debug_screenshot_dir:
@@ -338,14 +504,11 @@ class GameLogic:
         else:
             # Буст не найден. Либо его нет, либо мы УЖЕ находимся внутри рекламы.
             # 1) Логируем для отладки порогов.
-            best = self.vision.get_template_max_confidence(
-                "boost_ready", screenshot=screenshot
-            )
             thr = THRESHOLDS.get("boost_ready", THRESHOLDS["default"])
-            if best is not None:
+            if boost is not None:
                 logger.info(
-                    f"🎥 РЕЖИМ РЕКЛАМЫ: значок буста (boost_ready) не найден "
-                    f"(лучшая похожесть: {best:.2f}, порог: {thr:.2f})"
+                    f"🎥 РЕЖИМ РЕКЛАМЫ: значок буста (boost_ready) не найден в нижней полосе "
+                    f"(лучшая похожесть: {boost.score:.2f}, порог: {thr:.2f})"
                 )
             else:
                 logger.info(
@@ -376,7 +539,6 @@ class GameLogic:
             )
 
         max_duration = float(TIMERS.get("AD_MAX_DURATION", 35.0))
-        poll_interval = float(TIMERS.get("AD_POLL_INTERVAL", 0.7))
         deadline = time.monotonic() + max_duration
         close_clicks = 0
         ever_seen_close = False  # хотя бы раз увидели кнопку закрытия
@@ -410,6 +572,7 @@ class GameLogic:
 
         def _is_in_cooldown_zone(gx: int, gy: int) -> bool:
             """Проверяет, попадает ли точка (gx, gy) в зону любого активного охлаждения."""
+            now = time.monotonic()
             for px, py, t_until in cooldown_spots:
                 if t_until <= now:
                     continue
@@ -434,37 +597,38 @@ class GameLogic:
                 best_name: Optional[str] = None
                 best_pos: Optional[Tuple[int, int]] = None
                 best_score: float = 0.0
-                for (rx1, ry1, rx2, ry2) in regions:
-                    crop = frame[ry1:ry2, rx1:rx2]
-                    if crop.size == 0:
+                # Все пары (зона, шаблон) — одним detect_all: матчинг идёт в пуле потоков,
+                # а разбор ниже — в исходном порядке (зона за зоной, шаблон за шаблоном)
+                specs = [
+                    DetectionSpec(
+                        ad_button,
+                        name=f"{ad_button}@{i}",
+                        region=(rx1, ry1, rx2 - rx1, ry2 - ry1),
+                    )
+                    for i, (rx1, ry1, rx2, ry2) in enumerate(regions)
+                    for ad_button in AD_TEMPLATES
+                ]
+                detections = self.vision.detect_all(frame, specs)
+                for spec in specs:
+                    score = detections.best_score(spec.key)
+                    if score is None:
                         continue
-                    for ad_button in AD_TEMPLATES:
-                        thr = THRESHOLDS.get(ad_button, THRESHOLDS["default"])
-                        score = self.vision.get_template_max_confidence(
-                            ad_button, screenshot=crop
-                        )
-                        if score is None:
-                            continue
-                        logger.debug(
-                            f"🎥 РЕКЛАМА: зона ({rx1},{ry1})-({rx2},{ry2}), '{ad_button}' "
-                            f"— похожесть {score:.2f} (порог {thr:.2f})"
-                        )
-                        if score >= thr and score > best_score:
-                            pos_local = self.vision.find_template(
-                                ad_button,
-                                screenshot=crop,
-                                threshold=thr,
-                                find_all=False,
-                            )
-                            if pos_local:
-                                gx = rx1 + pos_local[0]
-                                gy = ry1 + pos_local[1]
-                                # Игнорируем кандидата, если он в уже кликнутой зоне
-                                if _is_in_cooldown_zone(gx, gy):
-                                    continue
-                                best_name = ad_button
-                                best_pos = (gx, gy)
-                                best_score = score
+                    rx1, ry1, rw, rh = spec.region
+                    thr = THRESHOLDS.get(spec.template, THRESHOLDS["default"])
+                    logger.debug(
+                        f"🎥 РЕКЛАМА: зона ({rx1},{ry1})-({rx1 + rw},{ry1 + rh}), '{spec.template}' "
+                        f"— похожесть {score:.2f} (порог {thr:.2f})"
+                    )
+                    if score >= thr and score > best_score:
+                        pos = detections.get(spec.key)
+                        if pos:
+                            gx, gy = pos
+                            # Игнорируем кандидата, если он в уже кликнутой зоне
+                            if _is_in_cooldown_zone(gx, gy):
+                                continue
+                            best_name = spec.template
+                            best_pos = (gx, gy)
+                            best_score = score
                 if best_name and best_pos:
                     return best_name, best_pos, best_score
                 return None
@@ -482,25 +646,45 @@ class GameLogic:
             upper_regions = [(0, 0, w, upper_h)]
             return scan_regions(upper_regions)
 
-        while time.monotonic() < deadline:
-            now = time.monotonic()
+        # Крестики ищем в верхней полосе 30% (углы 25% — внутри неё); иконки главного
+        # экрана — по всему кадру, и только после первого клика по крестику
+        frame_h, frame_w = self.vision.capture_screen().shape[:2]
+        upper_band = (0, 0, frame_w, int(frame_h * 0.30))
+        MAIN_ICONS = ("icon_gear", "icon_coin")
+
+        def _accept(name: str, match) -> bool:
+            return name in MAIN_ICONS or not _is_in_cooldown_zone(match.x, match.y)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
 
             # Чистим устаревшие точки из «охлаждения»
             if cooldown_spots:
+                now = time.monotonic()
                 cooldown_spots = [
                     (x, y, t_until)
                     for (x, y, t_until) in cooldown_spots
                     if t_until > now
                 ]
 
-            screenshot = self.vision.capture_screen()
-            best = _find_best_close_button(screenshot)
+            # Дополнительный критерий выхода: появление статичной иконки на главном меню.
+            # Это может быть либо шестерёнка настроек (icon_gear), либо монетка (icon_coin).
+            targets = {icon: None for icon in MAIN_ICONS} if clicked_any_close else {}
+            targets.update({ad_button: upper_band for ad_button in AD_TEMPLATES})
+            hit = self.vision.wait_for_any(targets, remaining, accept=_accept, label="ad_close")
+            if hit is None:
+                break
+            if hit.name in MAIN_ICONS:
+                logger.info(
+                    f"🎥 РЕКЛАМА: обнаружен главный индикатор {hit.name} at ({hit.x}, {hit.y}) "
+                    f"после {close_clicks} кликов — возвращаемся в игру и завершаем цикл рекламы"
+                )
+                return True
 
-            # Если ни одна кнопка не прошла порог — просто ждём следующую проверку
-            if not best:
-                logger.debug("🎥 РЕКЛАМА: подходящих кнопок закрытия пока нет, ждём...")
-                time.sleep(poll_interval)
-                continue
+            # Крестик появился — выбираем лучший на этом кадре (сначала углы), вне зон охлаждения
+            best = _find_best_close_button(hit.frame) or (hit.name, (hit.x, hit.y), hit.score)
 
             best_button, (cx_raw, cy_raw), best_score = best
             # best уже гарантированно вне зон охлаждения (фильтр внутри _find_best_close_button)
@@ -574,33 +758,9 @@ class GameLogic:
                 "в ближайшее время сюда больше не кликаем."
             )
 
-            # Проверяем, остались ли ещё крестики
-            screenshot = self.vision.capture_screen()
-            any_close_left = False
-            for ad_button in AD_TEMPLATES:
-                if self.vision.find_template(ad_button, screenshot=screenshot):
-                    any_close_left = True
-                    break
-
-            # Дополнительный критерий выхода: появление статичной иконки на главном меню.
-            # Это может быть либо шестерёнка настроек (icon_gear), либо монетка (icon_coin).
-            gear_pos = self.vision.find_template("icon_gear", screenshot=screenshot)
-            coin_pos = self.vision.find_template("icon_coin", screenshot=screenshot)
-            if clicked_any_close and (gear_pos is not None or coin_pos is not None):
-                which = "icon_gear" if gear_pos is not None else "icon_coin"
-                pos = gear_pos if gear_pos is not None else coin_pos
-                logger.info(
-                    f"🎥 РЕКЛАМА: обнаружен главный индикатор {which} at {pos} "
-                    f"после {close_clicks} кликов — возвращаемся в игру и завершаем цикл рекламы"
-                )
-                return True
-
             # Если крестиков больше не видно, но шестерёнка ещё не появилась,
-            # это может быть пауза/таймер в рекламе — НЕ выходим, просто ждём дальше
-            # до появления icon_gear или до общего таймаута AD_MAX_DURATION.
-
-            # Иначе ждём и продолжаем цикл
-            time.sleep(poll_interval)
+            # это может быть пауза/таймер в рекламе — НЕ выходим, ждём дальше
+            # до icon_gear/icon_coin или до общего таймаута AD_MAX_DURATION.
 
         logger.warning(
             f"🎥 РЕКЛАМА: превышен лимит ожидания {max_duration:.0f}с, реклама не закрылась до конца"
@@ -629,45 +789,46 @@ class GameLogic:
             tx = max(3, min(self.input.game_w - 3, bx + dx))
             ty = max(3, min(self.input.game_h - 3, by + dy))
             logger.info(f"{attempts_log_prefix}: пробуем клик #{i} (смещение {dx:+},{dy:+})")
+            before = self.vision.settle_reference()
             self.input.human_click(tx, ty)
-            time.sleep(confirm_wait)
+            self._settle("confirm_popup", confirm_wait, require_change=True, reference=before)
             confirm_pos = self.vision.find_template(confirm_template)
             if confirm_pos:
                 return confirm_pos
         return None
     
-    def _wait_and_click_open(self, wait_max: float, poll_interval: float) -> bool:
-        """
-        Ждём кнопку OPEN до wait_max секунд, опрашивая каждые poll_interval с.
-        Как только увидели кнопку — даём ей «устояться» и пробуем кликнуть несколько раз,
-        каждый раз проверяя, исчезла ли кнопка (чтобы не кликать «в воздух» при анимации).
-        """
-        deadline = time.monotonic() + wait_max
-        while time.monotonic() < deadline:
-            open_pos = self.vision.find_template("btn_open")
-            if open_pos:
-                logger.info("🏗️  Найдена кнопка OPEN — ждём стабилизации и нажимаем...")
-                # Небольшая задержка, чтобы закончилась анимация появления
-                time.sleep(0.3)
-
-                # До 3 попыток клика, каждый раз проверяем, пропала ли кнопка
-                for attempt in range(1, 4):
-                    logger.info(f"🏗️  OPEN: клик по кнопке (попытка {attempt}/3)")
-                    self.input.human_click(open_pos[0], open_pos[1])
-                    time.sleep(0.5)
-                    still_there = self.vision.find_template("btn_open")
-                    if not still_there:
-                        logger.info("🏗️  OPEN: кнопка исчезла — считаем, что клик сработал")
-                        return True
-                    else:
-                        logger.debug("🏗️  OPEN: кнопка всё ещё на экране, пробуем ещё раз")
-
-                logger.warning("🏗️  OPEN: после 3 кликов кнопка OPEN всё ещё видна")
-                return False
-            time.sleep(poll_interval)
+    def _wait_and_click_open(self, wait_max: float) -> bool:
+        """
+        Ждём кнопку OPEN до wait_max секунд (vision.wait_for_any: каждый новый кадр, матчинг
+        только при изменениях). Как только увидели кнопку — даём ей «устояться» и пробуем
+        кликнуть несколько раз, каждый раз проверяя, исчезла ли кнопка (чтобы не кликать
+        «в воздух» при анимации).
+        """
+        hit = self.vision.wait_for_any({"btn_open": None}, wait_max, label="btn_open")
+        if hit is None:
+            return False
+        open_pos = (hit.x, hit.y)
+        logger.info(f"🏗️  Найдена кнопка OPEN через {hit.latency:.1f}с — ждём стабилизации и нажимаем...")
+        # Ждём, чтобы закончилась анимация появления
+        self._settle("open_appear", 0.3)
+
+        # До 3 попыток клика, каждый раз проверяем, пропала ли кнопка
+        for attempt in range(1, 4):
+            logger.info(f"🏗️  OPEN: клик по кнопке (попытка {attempt}/3)")
+            before = self.vision.settle_reference()
+            self.input.human_click(open_pos[0], open_pos[1])
+            self._settle("open_click", 0.5, require_change=True, reference=before)
+            still_there = self.vision.find_template("btn_open")
+            if not still_there:
+                logger.info("🏗️  OPEN: кнопка исчезла — считаем, что клик сработал")
+                return True
+            else:
+                logger.debug("🏗️  OPEN: кнопка всё ещё на экране, пробуем ещё раз")
+
+        logger.warning("🏗️  OPEN: после 3 кликов кнопка OPEN всё ещё видна")
         return False
     
-    def check_level_progression(self) -> bool:
+    def check_level_progression(self, detections: Optional[FrameDetections] = None) -> bool:
         """
         Check for and handle level progression (Renovate, Fly, Open).
         
@@ -684,19 +845,20 @@ class GameLogic:
         
         Returns True if progression was handled.
         """
-        screenshot = self.vision.capture_screen()
+        if detections is None:
+            detections = self._detect(self._progression_specs())
         
         # DEBUG: Check what buttons we're looking for
         logger.debug("🔍 Level Progression: Checking for btn_renovate, btn_fly, btn_open...")
         
         # STEP 1: Renovate — шаблон с красным знаком. Кнопка снизу слева (в зоне исключения),
         # но когда появилась — кликаем первым делом, без проверки no_click.
-        renovate_pos = self.vision.find_template("btn_renovate", screenshot=screenshot)
+        renovate_pos = detections.get("btn_renovate")
         if not renovate_pos:
             # В лог-файл (DEBUG) — для отладки; в терминал не пишем «не найдена»
             now = time.time()
             if now - self.state.last_renovate_debug_log_time >= 15.0:
-                best = self.vision.get_template_max_confidence("btn_renovate", screenshot)
+                best = detections.best_score("btn_renovate")
                 if best is not None:
                     thr = THRESHOLDS.get("btn_renovate", 0.70)
                     logger.debug(
@@ -721,47 +883,31 @@ class GameLogic:
                 attempts_log_prefix="🏗️  РЕНОВАЦИЯ",
             )
             if confirm_pos:
-                logger.info("🏗️  РЕНОВАЦИЯ: Подтверждаем (монетка Apply)")
-                self.input.human_click(confirm_pos[0], confirm_pos[1])
-                
-                # STEP 3: Ждём анимацию, затем кнопку OPEN до 10 секунд
-                time.sleep(1.0)
-                wait_max = float(TIMERS.get("RENOVATE_OPEN_WAIT_MAX", 10.0))
-                poll = float(TIMERS.get("RENOVATE_OPEN_POLL_INTERVAL", 0.4))
-                logger.info(f"🏗️  РЕНОВАЦИЯ: ⏳ Ждем кнопку OPEN (до {wait_max:.0f} с)...")
-                if self._wait_and_click_open(wait_max, poll):
-                    logger.info("🏗️  РЕНОВАЦИЯ: ✅ Новый уровень открыт! Ждем первого покупателя...")
-                    time.sleep(2.0)
-                else:
-                    logger.warning("🏗️  РЕНОВАЦИЯ: ⚠️  Кнопка OPEN не найдена за отведённое время")
-                
-                self.state.on_level_change()
-                self.state.total_renovations += 1
-                logger.info("🏗️  РЕНОВАЦИЯ: ✅ Полный цикл реновации завершен!")
-                return True
+                return self._confirm_renovation(confirm_pos)
             else:
                 logger.warning("🏗️  РЕНОВАЦИЯ: ⚠️  Кнопка подтверждения не найдена — закрываем меню")
                 self.input.click_safe_spot()
                 return False
         
         # SPECIAL: Check for Open button STANDALONE (может появиться без Renovate!)
-        open_pos = self.vision.find_template("btn_open", screenshot=screenshot)
+        open_pos = detections.get("btn_open")
         if open_pos:
             logger.info("🏗️  OPEN: Найдена кнопка OPEN (standalone)!")
             logger.info(f"🏗️  OPEN: Позиция кнопки: {open_pos}")
+            before = self.vision.settle_reference()
             self.input.human_click(open_pos[0], open_pos[1])
-            time.sleep(1.0)
+            self._settle("open_click", 1.0, require_change=True, reference=before)
             
             logger.info("🏗️  OPEN: ✅ Новый уровень открыт! Ждем первого покупателя...")
             time.sleep(2.0)
             
-            self.state.on_level_change()
+            self._level_changed()
             self.state.total_renovations += 1
             logger.info("🏗️  OPEN: ✅ Открытие завершено!")
             return True
         
         # FLY: перелёт — тоже снизу; клик со смещением вниз, чтобы попасть в кнопку
-        fly_pos = self.vision.find_template("btn_fly", screenshot=screenshot)
+        fly_pos = detections.get("btn_fly")
         if fly_pos:
             logger.info("✈️  FLY: Найдена кнопка перелёта!")
             confirm_pos = self._click_with_confirmation(
@@ -779,32 +925,75 @@ class GameLogic:
                 attempts_log_prefix="✈️  FLY",
             )
             if confirm_pos:
-                logger.info("✈️  FLY: Подтверждаем перелёт (Fly_confirm)")
-                self.input.human_click(confirm_pos[0], confirm_pos[1])
-                fly_wait = float(TIMERS.get("FLY_ANIMATION_WAIT", 5.0))
-                logger.info(f"✈️  FLY: ⏳ Ждем переход ({fly_wait:.0f} с)...")
-                time.sleep(fly_wait)
-                wait_max = float(TIMERS.get("RENOVATE_OPEN_WAIT_MAX", 10.0))
-                poll = float(TIMERS.get("RENOVATE_OPEN_POLL_INTERVAL", 0.4))
-                logger.info(f"✈️  FLY: Ждем кнопку OPEN (до {wait_max:.0f} с)...")
-                if self._wait_and_click_open(wait_max, poll):
-                    time.sleep(float(TIMERS.get("FLY_OPEN_WAIT_AFTER", 2.0)))
-                    logger.info("✈️  FLY: ✅ Новый уровень открыт!")
-                else:
-                    logger.warning("✈️  FLY: Кнопка OPEN не найдена за отведённое время")
-                self.state.on_level_change()
-                self.state.total_renovations += 1
-                logger.info("✈️  FLY: ✅ Перелёт завершён!")
-                return True
+                return self._confirm_fly(confirm_pos)
             else:
                 logger.warning("✈️  FLY: ⚠️  Кнопка подтверждения не найдена — закрываем меню")
                 self.input.click_safe_spot()
         
         return False
     
+    def _confirm_renovation(self, confirm_pos: Tuple[int, int]) -> bool:
+        """Окно реновации открыто: Apply → анимация → OPEN (шаги 2-3 check_level_progression)."""
+        logger.info("🏗️  РЕНОВАЦИЯ: Подтверждаем (монетка Apply)")
+        before = self.vision.settle_reference()
+        self.input.human_click(confirm_pos[0], confirm_pos[1])
+        
+        # STEP 3: Ждём анимацию, затем кнопку OPEN до 10 секунд
+        self._settle("renovate_confirm", 1.0, require_change=True, reference=before)
+        wait_max = float(TIMERS.get("RENOVATE_OPEN_WAIT_MAX", 10.0))
+        logger.info(f"🏗️  РЕНОВАЦИЯ: ⏳ Ждем кнопку OPEN (до {wait_max:.0f} с)...")
+        if self._wait_and_click_open(wait_max):
+            logger.info("🏗️  РЕНОВАЦИЯ: ✅ Новый уровень открыт! Ждем первого покупателя...")
+            time.sleep(2.0)
+        else:
+            logger.warning("🏗️  РЕНОВАЦИЯ: ⚠️  Кнопка OPEN не найдена за отведённое время")
+        
+        self._level_changed()
+        self.state.total_renovations += 1
+        logger.info("🏗️  РЕНОВАЦИЯ: ✅ Полный цикл реновации завершен!")
+        return True
+    
+    def _confirm_fly(self, confirm_pos: Tuple[int, int]) -> bool:
+        """Окно перелёта открыто: Fly_confirm → переход → OPEN (шаги 2-4 check_level_progression)."""
+        logger.info("✈️  FLY: Подтверждаем перелёт (Fly_confirm)")
+        before = self.vision.settle_reference()
+        self.input.human_click(confirm_pos[0], confirm_pos[1])
+        fly_wait = float(TIMERS.get("FLY_ANIMATION_WAIT", 5.0))
+        logger.info(f"✈️  FLY: ⏳ Ждем переход ({fly_wait:.0f} с)...")
+        self._settle("fly_animation", fly_wait, require_change=True, reference=before)
+        wait_max = float(TIMERS.get("RENOVATE_OPEN_WAIT_MAX", 10.0))
+        logger.info(f"✈️  FLY: Ждем кнопку OPEN (до {wait_max:.0f} с)...")
+        if self._wait_and_click_open(wait_max):
+            time.sleep(float(TIMERS.get("FLY_OPEN_WAIT_AFTER", 2.0)))
+            logger.info("✈️  FLY: ✅ Новый уровень открыт!")
+        else:
+            logger.warning("✈️  FLY: Кнопка OPEN не найдена за отведённое время")
+        self._level_changed()
+        self.state.total_renovations += 1
+        logger.info("✈️  FLY: ✅ Перелёт завершён!")
+        return True
+    
+    def confirm_progression(self, detections: Optional[FrameDetections] = None) -> bool:
+        """
+        Окно подтверждения реновации/перелёта открыто само по себе (цепочка
+        check_level_progression прервалась, бот перезапущен) — подтверждаем и
+        доводим до OPEN. Returns True, если подтвердили.
+        """
+        if detections is None:
+            detections = self._detect(self._confirm_specs())
+        confirm_pos = detections.get("btn_confirm_renovate")
+        if confirm_pos:
+            logger.info("🏗️  РЕНОВАЦИЯ: окно подтверждения уже открыто")
+            return self._confirm_renovation(confirm_pos)
+        confirm_pos = detections.get("btn_fly_confirm")
+        if confirm_pos:
+            logger.info("✈️  FLY: окно подтверждения уже открыто")
+            return self._confirm_fly(confirm_pos)
+        return False
+    
     # ===== STATION UPGRADER =====
     
-    def upgrade_stations(self) -> int:
+    def upgrade_stations(self, detections: Optional[FrameDetections] = None) -> int:
         """
         Find and upgrade all visible stations.
         Uses zone-aware detection to avoid UI areas.
@@ -819,18 +1008,20 @@ class GameLogic:
         """
         logger.debug("🔍 Ищем стрелки улучшений станций...")
         
-        screenshot = self.vision.capture_screen()
+        if detections is None:
+            detections = self._detect(self._station_specs())
         
-        # STEP 1: Crop screenshot to STATION_SEARCH_REGION (Kitchen Floor)
+        # STEP 1: Стрелки ищутся только в STATION_SEARCH_REGION (Kitchen Floor), см. _station_specs()
         # This optimizes performance and ignores UI elements
+        arrows = detections.get_all("upgrade_arrow")
+        # Индекс панорамы: стрелки ищутся только в зоне станций — её и обновляем
+        if self.vision.zones_enabled and self.vision.station_search_region_relative:
+            _, zone_y, _, zone_h = self.vision.station_search_region_relative
+            self._observe("arrow", arrows, band=(zone_y, zone_y + zone_h))
+        else:
+            self._observe("arrow", arrows)
         if self.vision.zones_enabled:
-            # Crop first, then detect in the Kitchen Floor only
             logger.debug(f"Зоны включены, ищем в безопасной зоне станций")
-            arrows = self.vision.find_in_station_zone(
-                "upgrade_arrow",
-                screenshot=screenshot,
-                find_all=True
-            )
             thr = THRESHOLDS.get("upgrade_arrow", 0.78)
             logger.info(
                 f"✓ Найдено {len(arrows)} стрелок улучшений в зоне Kitchen Floor (порог: {thr})"
@@ -838,11 +1029,6 @@ class GameLogic:
         else:
             # Fallback to full screenshot detection (not recommended)
             logger.warning("⚠️  Зоны НЕ настроены! Ищем по всему экрану (не рекомендуется)")
-            arrows = self.vision.find_template(
-                "upgrade_arrow",
-                screenshot=screenshot,
-                find_all=True
-            )
             thr = THRESHOLDS.get("upgrade_arrow", 0.78)
             logger.info(
                 f"✓ Найдено {len(arrows)} стрелок улучшений (без зон, порог: {thr})"
@@ -852,9 +1038,7 @@ class GameLogic:
             # Логируем точность при ненаходке (раз в 15 с), чтобы понять порог
             now = time.time()
             if now - self.state.last_upgrade_arrow_debug_time >= 15.0:
-                best = self.vision.get_template_max_confidence_in_station_zone(
-                    "upgrade_arrow", screenshot=screenshot
-                )
+                best = detections.best_score("upgrade_arrow")
                 if best is not None:
                     thr = THRESHOLDS.get("upgrade_arrow", 0.78)
                     logger.info(
@@ -912,93 +1096,126 @@ class GameLogic:
                 f"✓ Opening station at ({arrow_x}, {arrow_y}) → "
                 f"Clicking target ({target_x}, {target_y})"
             )
+            before = self.vision.settle_reference()
             self.input.human_click(target_x, target_y)
-            time.sleep(TIMERS["MENU_OPEN_WAIT"])
+            self._settle("station_menu_open", TIMERS["MENU_OPEN_WAIT"], require_change=True, reference=before)
             
             # Remember this click (successful attempt)
             self.state.spatial_memory.remember_click(arrow_x, arrow_y)
             
-            # STEP 6: КРИТИЧНО! Проверяем unlock_btn ПЕРВЫМ (станция может быть заблокирована!)
-            unlock_pos = self.vision.find_template("unlock_btn")
-            if unlock_pos:
-                unlock_x, unlock_y = unlock_pos
-                logger.info(f"🔓 UNLOCK: Станция заблокирована! Найдена кнопка разблокировки at ({unlock_x}, {unlock_y})")
-                
-                # КРИТИЧНО: Кликаем на 30 пикселей НИЖЕ unlock_btn (на синюю кнопку с ценой!)
-                unlock_click_y = unlock_y + 30
-                logger.info(f"🔓 UNLOCK: Кликаем на 30px НИЖЕ unlock_btn → ({unlock_x}, {unlock_click_y})")
-                self.input.human_click(unlock_x, unlock_click_y)
-                time.sleep(1.0)  # Ждем обработки покупки
-                
-                # Закрываем меню - кликаем на станцию
-                logger.info(f"🔓 UNLOCK: Закрываем меню (станция разблокирована) - клик на станцию at ({station_click_x}, {station_click_y})")
-                self.input.human_click(station_click_x, station_click_y)
-                time.sleep(TIMERS["MENU_CLOSE_WAIT"])
-                
-                logger.info(f"✓ Станция разблокирована!")
-                upgraded_count += 1
-                self.state.total_upgrades += 1
+            self.last_station_click = (station_click_x, station_click_y)
+            upgraded, unlocked = self._handle_station_popup(station_click_x, station_click_y)
+            upgraded_count += upgraded
+            if unlocked:
                 continue  # Переходим к следующей станции
             
-            # STEP 7: Кнопка покупки в попапе станции — КАК БЫЛО: один шаблон btn_buy
-            thr_buy = THRESHOLDS.get("btn_buy", 0.93)
-            buy_pos = self.vision.find_template("btn_buy", threshold=thr_buy)
+            # Safety check between stations
+            self.check_and_close_ads()
+        
+        return upgraded_count
+
+    def _handle_station_popup(self, station_click_x: int, station_click_y: int) -> Tuple[int, bool]:
+        """
+        Открытый попап станции: разблокировать (unlock_btn) или купить (btn_buy, зажатие),
+        затем закрыть кликом по станции. Returns (улучшений 0/1, была ли разблокировка).
+        """
+        # STEP 6: КРИТИЧНО! Проверяем unlock_btn ПЕРВЫМ (станция может быть заблокирована!)
+        unlock_pos = self.vision.find_template("unlock_btn")
+        if unlock_pos:
+            unlock_x, unlock_y = unlock_pos
+            logger.info(f"🔓 UNLOCK: Станция заблокирована! Найдена кнопка разблокировки at ({unlock_x}, {unlock_y})")
             
-            if buy_pos:
-                buy_x, buy_y = buy_pos
+            # КРИТИЧНО: Кликаем на 30 пикселей НИЖЕ unlock_btn (на синюю кнопку с ценой!)
+            unlock_click_y = unlock_y + 30
+            logger.info(f"🔓 UNLOCK: Кликаем на 30px НИЖЕ unlock_btn → ({unlock_x}, {unlock_click_y})")
+            before = self.vision.settle_reference()
+            self.input.human_click(unlock_x, unlock_click_y)
+            self._settle("unlock_buy", 1.0, require_change=True, reference=before)  # Ждем обработки покупки
+            
+            # Закрываем меню - кликаем на станцию
+            logger.info(f"🔓 UNLOCK: Закрываем меню (станция разблокирована) - клик на станцию at ({station_click_x}, {station_click_y})")
+            before = self.vision.settle_reference()
+            self.input.human_click(station_click_x, station_click_y)
+            self._settle("station_menu_close", TIMERS["MENU_CLOSE_WAIT"], require_change=True, reference=before)
+            
+            logger.info(f"✓ Станция разблокирована!")
+            self.state.total_upgrades += 1
+            return 1, True
+        
+        upgraded = 0
+        # STEP 7: Кнопка покупки в попапе станции — КАК БЫЛО: один шаблон btn_buy
+        thr_buy = THRESHOLDS.get("btn_buy", 0.93)
+        buy_pos = self.vision.find_template("btn_buy", threshold=thr_buy)
+        
+        if buy_pos:
+            buy_x, buy_y = buy_pos
+            
+            if self.is_ad_trigger():
+                logger.warning("⚠️  Ad trigger detected near buy button - ABORT")
+            else:
+                is_safe, distance = self.is_safe_click(buy_x, buy_y, log_prefix="Buy button")
                 
-                if self.is_ad_trigger():
-                    logger.warning("⚠️  Ad trigger detected near buy button - ABORT")
+                if not is_safe:
+                    logger.warning(
+                        f"⚠️  Buy button at ({buy_x}, {buy_y}) is in danger zone "
+                        f"({distance:.1f}px from danger) - ABORT"
+                    )
                 else:
-                    is_safe, distance = self.is_safe_click(buy_x, buy_y, log_prefix="Buy button")
+                    logger.info(
+                        f"✓ Кнопка улучшения станции at ({buy_x}, {buy_y}) "
+                        f"[{distance:.1f}px from danger] - УМНОЕ ЗАЖАТИЕ"
+                    )
                     
-                    if not is_safe:
-                        logger.warning(
-                            f"⚠️  Buy button at ({buy_x}, {buy_y}) is in danger zone "
-                            f"({distance:.1f}px from danger) - ABORT"
-                        )
-                    else:
-                        logger.info(
-                            f"✓ Кнопка улучшения станции at ({buy_x}, {buy_y}) "
-                            f"[{distance:.1f}px from danger] - УМНОЕ ЗАЖАТИЕ"
+                    # КАК БЫЛО: одна кнопка покупки, длительность зажатия управляется BUY_LONG_PRESS
+                    def is_buy_button_active():
+                        """Проверяет наличие кнопки покупки в попапе станции."""
+                        # Всегда свежий кадр: кэш (FRAME_MAX_AGE_MS) запоздал бы с отпусканием
+                        pos = self.vision.find_template(
+                            "btn_buy", screenshot=self.vision.capture_screen(), threshold=thr_buy - 0.05
                         )
-                        
-                        # КАК БЫЛО: одна кнопка покупки, длительность зажатия управляется BUY_LONG_PRESS
-                        def is_buy_button_active():
-                            """Проверяет наличие кнопки покупки в попапе станции."""
-                            pos = self.vision.find_template("btn_buy", threshold=thr_buy - 0.05)
-                            is_active = pos is not None
-                            logger.debug(f"    🔍 is_buy_button_active: {is_active}")
-                            return is_active
-                        
-                        press_duration = self.input.smart_long_press(
-                            buy_x, buy_y,
-                            check_callback=is_buy_button_active,
-                            max_duration=TIMERS.get("BUY_LONG_PRESS", 3.0)
-                        )
-                        
-                        if press_duration > 0.5:
-                            upgraded_count += 1
-                            self.state.total_upgrades += 1
-                            logger.info(f"✓ Станция улучшена (зажимали {press_duration:.1f}s)")
-                        
-                        time.sleep(0.3)
-            else:
-                logger.info("❌ Кнопка улучшения станции не найдена (макс улучшена или unlock тоже не найден)")
-            
-            # Close the menu - кликаем на ТО ЖЕ место (станцию)
-            logger.info(f"Закрываем меню: клик на станцию ({station_click_x}, {station_click_y})")
-            self.input.human_click(station_click_x, station_click_y)
-            time.sleep(TIMERS["MENU_CLOSE_WAIT"])
-            
-            # Safety check between stations
-            self.check_and_close_ads()
+                        is_active = pos is not None
+                        logger.debug(f"    🔍 is_buy_button_active: {is_active}")
+                        return is_active
+                    
+                    press_duration = self.input.smart_long_press(
+                        buy_x, buy_y,
+                        check_callback=is_buy_button_active,
+                        max_duration=TIMERS.get("BUY_LONG_PRESS", 3.0)
+                    )
+                    
+                    if press_duration > 0.5:
+                        upgraded = 1
+                        self.state.total_upgrades += 1
+                        logger.info(f"✓ Станция улучшена (зажимали {press_duration:.1f}s)")
+                    
+                    self._settle("station_buy", 0.3)
+        else:
+            logger.info("❌ Кнопка улучшения станции не найдена (макс улучшена или unlock тоже не найден)")
         
-        return upgraded_count
+        # Close the menu - кликаем на ТО ЖЕ место (станцию)
+        logger.info(f"Закрываем меню: клик на станцию ({station_click_x}, {station_click_y})")
+        before = self.vision.settle_reference()
+        self.input.human_click(station_click_x, station_click_y)
+        self._settle("station_menu_close", TIMERS["MENU_CLOSE_WAIT"], require_change=True, reference=before)
+        return upgraded, False
+
+    def handle_station_popup(self) -> int:
+        """
+        Попап станции остался открытым (ScreenState в главном цикле): то же, что после
+        открытия в upgrade_stations. Станция неизвестна — закрываем крестиком.
+        """
+        if self.last_station_click is None:
+            return int(self.check_and_close_x())
+        upgraded, _ = self._handle_station_popup(*self.last_station_click)
+        return upgraded
     
     # ===== GENERAL UPGRADER =====
     
-    def upgrade_general(self, max_clicks: int = 15) -> int:
+    def upgrade_general(
+        self,
+        max_clicks: int = 15,
+        detections: Optional[FrameDetections] = None,
+    ) -> int:
         """
         Open general upgrades menu and spam blue buttons.
         ПРИОРИТЕТНАЯ функция - дает больше всего улучшений!
@@ -1008,19 +1225,21 @@ class GameLogic:
         # В терминал не спамим "проверяем" каждый цикл — пишем INFO только когда реально нашли/купили.
         logger.debug("💎 Проверяем общие улучшения (icon_upgrades)...")
         
-        screenshot = self.vision.capture_screen()
+        if detections is None:
+            detections = self._detect(self._general_specs())
         
         # Find and click the upgrades icon
-        icon_pos = self.vision.find_template("icon_upgrades", screenshot=screenshot)
+        icon_pos = detections.get("icon_upgrades")
         if not icon_pos:
             logger.debug("❌ Иконка общих улучшений не найдена")
             return 0
         
         logger.info(f"💎 Общие улучшения: иконка найдена ({icon_pos}) — открываем меню")
+        before = self.vision.settle_reference()
         self.input.human_click(icon_pos[0], icon_pos[1])
         # Ждём, пока меню и кнопки внутри полностью отрисуются (иначе не видит кнопки)
         general_wait = float(TIMERS.get("GENERAL_MENU_OPEN_WAIT", 1.0))
-        time.sleep(general_wait)
+        self._settle("general_menu_open", general_wait, require_change=True, reference=before)
         
         upgrade_count = 0
         no_button_count = 0
@@ -1034,7 +1253,7 @@ class GameLogic:
                 no_button_count = 0
                 logger.info(f"🔵 Общие улучшения #{upgrade_count+1}: кликаем СИНЮЮ кнопку at {blue_btn}")
                 self.input.human_click(blue_btn[0], blue_btn[1])
-                time.sleep(0.3)
+                self._settle("general_buy", 0.3)
                 upgrade_count += 1
                 self.state.total_upgrades += 1
             else:
@@ -1049,13 +1268,14 @@ class GameLogic:
         # Close menu
         logger.debug("Закрываем меню общих улучшений...")
         close_pos = self.vision.find_template("btn_close_x")
+        before = self.vision.settle_reference()
         if close_pos:
             self.input.human_click(close_pos[0], close_pos[1])
         else:
             logger.debug("Кнопка закрытия не найдена, кликаем в безопасную зону")
             self.input.click_safe_spot()
         
-        time.sleep(TIMERS["MENU_CLOSE_WAIT"])
+        self._settle("general_menu_close", TIMERS["MENU_CLOSE_WAIT"], require_change=True, reference=before)
         
         if upgrade_count > 0:
             logger.info(f"✓ Выполнено {upgrade_count} общих улучшений (монетки)!")
@@ -1064,7 +1284,18 @@ class GameLogic:
     
     # ===== COLLECTOR =====
     
-    def collect_items(self) -> int:
+    def _box_thresholds(self) -> Tuple[float, float]:
+        """(основной, запасной) порог для боксов: коробки динамические, confidence плавает."""
+        thr_main = float(THRESHOLDS.get("box_floor", 0.68))
+        thr_fallback = max(0.55, thr_main - 0.08)
+        return thr_main, thr_fallback
+
+    def _tips_due(self) -> bool:
+        """Чаевые — 1 раз за цикл (PEEK_INTERVAL)."""
+        tips_interval = float(TIMERS.get("PEEK_INTERVAL", 40.0))
+        return time.time() - self.state.last_tips_collect_time >= tips_interval
+
+    def collect_items(self, detections: Optional[FrameDetections] = None) -> int:
         """
         Collect boxes and tips.
         
@@ -1075,36 +1306,41 @@ class GameLogic:
         
         Returns number of items collected.
         """
-        screenshot = self.vision.capture_screen()
+        if detections is None:
+            detections = self._detect(self._collect_specs())
         collected = 0
         
         # Collect boxes - ПРИОРИТЕТ! (открывают новые столы/поваров)
         logger.debug("🎁 Ищем боксы (box_floor)...")
-        # 2-проходный поиск: сначала по основному порогу, затем чуть ниже (коробки динамические, confidence плавает)
-        thr_main = float(THRESHOLDS.get("box_floor", 0.68))
-        thr_fallback = max(0.55, thr_main - 0.08)
-        boxes = self.vision.find_template(
-            "box_floor", screenshot=screenshot, threshold=thr_main, find_all=True
-        )
+        # Сначала по основному порогу, затем чуть ниже (коробки динамические, confidence плавает).
+        # Оба порога применяются к одному результату матчинга (детектор снят по запасному порогу).
+        thr_main, thr_fallback = self._box_thresholds()
+        used_thr = thr_main
+        boxes = detections.get_all("box_floor", threshold=thr_main)
         if not boxes:
-            boxes = self.vision.find_template(
-                "box_floor", screenshot=screenshot, threshold=thr_fallback, find_all=True
-            )
+            used_thr = thr_fallback
+            boxes = detections.get_all("box_floor", threshold=thr_fallback)
         
         if not boxes:
             # Логируем точность при ненаходке (раз в 15 с)
             now = time.time()
             if now - self.state.last_box_floor_debug_time >= 15.0:
-                best = self.vision.get_template_max_confidence("box_floor", screenshot=screenshot)
+                best = detections.best_score("box_floor")
                 if best is not None:
                     thr = THRESHOLDS.get("box_floor", 0.68)
                     logger.info(
                         f"📐 Боксы: не найдено (лучшая точность: {best:.2f}, порог: {thr})"
                     )
                 self.state.last_box_floor_debug_time = now
-        if boxes:
+        self._observe("box", boxes)
+        tips_due = self._tips_due() and "tip_coin" in detections
+        if PIPELINE.get("ENABLED", False):
+            if boxes:
+                logger.info(f"🎁 Найдено {len(boxes)} боксов! (порог: {used_thr:.2f}) — собираем конвейером")
+            if boxes or (tips_due and detections.get_all("tip_coin")):
+                collected = self._collect_pipelined(detections, bool(boxes), tips_due)
+        elif boxes:
             # Печатаем реальный использованный порог
-            used_thr = thr_main if boxes else thr_fallback
             logger.info(f"🎁 Найдено {len(boxes)} боксов! (порог: {used_thr:.2f})")
             
             # КРИТИЧНО: Боксы динамические (мигают 1-2 сек)!
@@ -1119,12 +1355,13 @@ class GameLogic:
                 self.input.human_click(box_x, box_y)
                 collected += 1
                 time.sleep(0.15)  # Минимальная задержка между кликами
+            self.state.panorama.forget("box", box_coords[:6])
         
-        # Чаевые — 1 раз за цикл (PEEK_INTERVAL), не так важны, чтобы не застопориваться
-        tips_interval = float(TIMERS.get("PEEK_INTERVAL", 40.0))
-        if time.time() - self.state.last_tips_collect_time >= tips_interval:
+        # Чаевые — 1 раз за цикл (PEEK_INTERVAL), не так важны, чтобы не застопориваться.
+        # Детектор tip_coin есть в кадре только если на момент детекции чаевые уже «созрели».
+        if tips_due and not PIPELINE.get("ENABLED", False):
             logger.debug("🪙 Ищем чаевые (tip_coin) — раз за цикл...")
-            tips = self.vision.find_template("tip_coin", screenshot=screenshot, find_all=True)
+            tips = detections.get_all("tip_coin")
             if tips:
                 # Ограничиваем: не более 3 чаевых за раз, чтобы не зацикливаться
                 for i, tip_pos in enumerate(tips[:3], 1):
@@ -1139,6 +1376,76 @@ class GameLogic:
         
         return collected
     
+    def _collect_pipelined(self, detections: FrameDetections, boxes: bool, tips: bool) -> int:
+        """
+        Боксы и чаевые через конвейер (core/pipeline.py): пока актуатор кликает и выжидает
+        паузу после клика, поток восприятия уже ищет цели на свежем кадре — боксы/чаевые,
+        появившиеся за время сбора, собираются в том же проходе, а кликнутые (ещё гаснущие)
+        не кликаются повторно. Лимиты и паузы — как у последовательного сбора.
+        """
+        thr_main, thr_fallback = self._box_thresholds()
+        specs = self._collect_specs()
+        radius = float(PIPELINE.get("SAME_TARGET_PX", 25))
+        timeout = float(PIPELINE.get("IDLE_TIMEOUT", 0.5))
+        
+        def perceive():
+            frame = self.vision.capture_screen()
+            return frame.frame_id, self.vision.detect_all(frame, specs)
+        
+        def box_targets(result: FrameDetections) -> List[Tuple[int, int]]:
+            return (
+                result.get_all("box_floor", threshold=thr_main)
+                or result.get_all("box_floor", threshold=thr_fallback)
+            )
+        
+        def click_box(point: Tuple[int, int]) -> None:
+            logger.info(f"🎁 Собираем бокс at {point}")
+            self.input.human_click(point[0], point[1])
+        
+        def click_tip(point: Tuple[int, int]) -> None:
+            logger.debug(f"  🪙 Чаевые at {point}")
+            self.input.human_click(point[0], point[1])
+        
+        collected = 0
+        with Pipeline(
+            perceive,
+            interval=float(PIPELINE.get("PERCEPTION_INTERVAL", 0.0)),
+            max_queue=int(PIPELINE.get("MAX_QUEUE", 8)),
+            session=self.vision.capture_session,
+        ) as pipe:
+            # Детекция тика — первая: по ней клики начинаются сразу, без нового захвата.
+            # Время — момент захвата её кадра (по нему актуатор решает, устарела ли она)
+            captured_at = detections.captured_at
+            if captured_at is None:
+                captured_at = time.monotonic() - detections.elapsed_ms / 1000.0
+            first = pipe.perception.publish(
+                detections.frame_id,
+                captured_at,
+                detections,
+                detections.elapsed_ms,
+            )
+            if boxes:
+                clicked = harvest(
+                    pipe, first, box_targets, click_box, "🎁 бокс",
+                    limit=6, settle=0.15, radius=radius, timeout=timeout,
+                )
+                self.state.panorama.forget("box", clicked)
+                collected += len(clicked)
+            if tips:
+                clicked = harvest(
+                    pipe, pipe.perception.latest() or first, lambda result: result.get_all("tip_coin"),
+                    click_tip, "🪙 чаевые", limit=3, settle=0.1, radius=radius, timeout=timeout,
+                )
+                collected += len(clicked)
+                self.state.last_tips_collect_time = time.time()
+        
+        stats = pipe.actuator.stats
+        logger.debug(
+            f"⚙️  Конвейер сбора: кликов {stats['executed']:.0f}, отброшено {stats['dropped']:.0f}, "
+            f"перепланировано {stats['replanned']:.0f}, детекций {pipe.perception.stats['runs']:.0f}"
+        )
+        return collected
+    
     # ===== NAVIGATOR (Camp & Creep Strategy) =====
     
     def navigate_camp_and_creep(self) -> None:
@@ -1160,6 +1467,7 @@ class GameLogic:
             
             # Scroll up 30%
             creep_distance = int(self.input.game_h * TIMERS["CREEP_DISTANCE"])
+            self._unmeasured_scroll()
             self.input.scroll_up(pixels=creep_distance)
             
             # Scan for upgrades
@@ -1178,6 +1486,7 @@ class GameLogic:
         Legacy method - use fly_to_bottom() for more thorough approach.
         """
         logger.info("Scrolling to bottom (initial position)")
+        self._unmeasured_scroll()
         for _ in range(3):
             self.input.scroll_down(pixels=500)
             time.sleep(0.2)
@@ -1203,39 +1512,38 @@ class GameLogic:
         # Берем начальный скриншот
         prev_screenshot = self.vision.capture_screen()
         
-        import cv2
-        import numpy as np
-        
         for i in range(max_swipes):
             # Свайп вверх (контент идет вниз) - 150px
             self.input.drag_screen("up", distance=150)
-            time.sleep(0.5)  # Ждем остановки инерции
+            self._settle("drag", 0.5)  # Ждем остановки инерции
             
             # Новый скриншот ПОСЛЕ остановки
             new_screenshot = self.vision.capture_screen()
             
-            # Сравниваем скриншоты - считаем ПРОЦЕНТ изменений
-            diff = cv2.absdiff(prev_screenshot, new_screenshot)
-            
-            # Общее количество пикселей
-            total_pixels = diff.shape[0] * diff.shape[1] * diff.shape[2]
-            
-            # Количество изменившихся пикселей (порог > 30 чтобы игнорировать мелкие шумы)
-            changed_pixels = np.count_nonzero(diff > 30)
+            # Контент не сдвинулся (phaseCorrelate) = упёрлись, сразу
+            edge = self._tracked_edge(prev_screenshot, new_screenshot, 150, direction=+1)
+            if edge:
+                logger.info(f"✓ УПЁРЛИСЬ В ВЕРХ после {i+1} свайпов (сдвиг контента ~0px)")
+                top_reached = True
+                break
+            if edge is False:
+                stuck_count = 0
+                prev_screenshot = new_screenshot
+                swipe_count += 1
+                continue
             
-            # Процент изменений
-            change_percent = (changed_pixels / total_pixels) * 100
+            # Сдвиг не измерен — ПРОЦЕНТ изменений (статичных пикселей, если маска анимаций готова;
+            # иначе всех: меньше 15% два свайпа подряд = упёрлись, учитываем 20-30% динамики)
+            change_percent, threshold, required = self._scroll_change(prev_screenshot, new_screenshot, 15.0, 2)
             
             # Детальный лог
-            logger.debug(f"Свайп {i+1}/{max_swipes}: изменилось {change_percent:.2f}% экрана")
+            logger.debug(f"Свайп {i+1}/{max_swipes}: изменилось {change_percent:.2f}% экрана (порог {threshold:.0f}%)")
             
-            # Если изменилось меньше 15% = упёрлись (учитываем 20-30% динамики)
-            if change_percent < 15.0:
+            if change_percent < threshold:
                 stuck_count += 1
                 logger.debug(f"  ⚠️  Мало изменений ({change_percent:.2f}%), stuck_count={stuck_count}")
                 
-                # Если 2 свайпа подряд показывают мало изменений = точно упёрлись
-                if stuck_count >= 2:
+                if stuck_count >= required:
                     logger.info(f"✓ УПЁРЛИСЬ В ВЕРХ после {i+1} свайпов (изменений: {change_percent:.2f}%)")
                     top_reached = True
                     break
@@ -1249,6 +1557,8 @@ class GameLogic:
         
         if not top_reached:
             logger.info(f"✓ Достигли лимита ({max_swipes} свайпов), считаем что наверху")
+        elif self._panorama() is not None:
+            self.state.panorama.anchor_top(new_screenshot)
         
         logger.info(f"✓ Наверху (свайпов: {swipe_count+1})")
     
@@ -1273,9 +1583,6 @@ class GameLogic:
         upgrades_found = 0
         stuck_count = 0  # Счетчик "застряли"
         
-        import cv2
-        import numpy as np
-        
         for step in range(max_steps):
             logger.debug(f"Шаг {step+1}/{max_steps}: проверяем улучшения...")
             
@@ -1290,34 +1597,35 @@ class GameLogic:
             
             # Свайп вниз (120px)
             self.input.drag_screen("down", distance=120)
-            time.sleep(0.5)  # Ждем остановки инерции
+            self._settle("drag", 0.5)  # Ждем остановки инерции
             
             # Скриншот ПОСЛЕ остановки
             new_screenshot = self.vision.capture_screen()
             
-            # Сравниваем - считаем ПРОЦЕНТ изменений
-            diff = cv2.absdiff(prev_screenshot, new_screenshot)
-            
-            # Общее количество пикселей
-            total_pixels = diff.shape[0] * diff.shape[1] * diff.shape[2]
-            
-            # Количество изменившихся пикселей
-            changed_pixels = np.count_nonzero(diff > 30)
+            # Контент не сдвинулся (phaseCorrelate) = упёрлись, сразу
+            edge = self._tracked_edge(prev_screenshot, new_screenshot, 120, direction=-1)
+            if edge:
+                logger.info(f"✓ УПЁРЛИСЬ В НИЗ на шаге {step+1} (сдвиг контента ~0px)")
+                self._anchor_bottom(new_screenshot)
+                break
+            if edge is False:
+                stuck_count = 0
+                continue
             
-            # Процент изменений
-            change_percent = (changed_pixels / total_pixels) * 100
+            # Сдвиг не измерен — ПРОЦЕНТ изменений (меньше 15% два шага подряд = упёрлись;
+            # с маской анимаций — статичные пиксели и один шаг)
+            change_percent, threshold, required = self._scroll_change(prev_screenshot, new_screenshot, 15.0, 2)
             
             # Детальный лог
-            logger.debug(f"Шаг {step+1}/{max_steps}: изменилось {change_percent:.2f}% экрана")
+            logger.debug(f"Шаг {step+1}/{max_steps}: изменилось {change_percent:.2f}% экрана (порог {threshold:.0f}%)")
             
-            # Если изменилось меньше 15% = упёрлись
-            if change_percent < 15.0:
+            if change_percent < threshold:
                 stuck_count += 1
                 logger.debug(f"  ⚠️  Мало изменений ({change_percent:.2f}%), stuck_count={stuck_count}")
                 
-                # Если 2 шага подряд показывают мало изменений = точно упёрлись
-                if stuck_count >= 2:
+                if stuck_count >= required:
                     logger.info(f"✓ УПЁРЛИСЬ В НИЗ на шаге {step+1} (изменений: {change_percent:.2f}%)")
+                    self._anchor_bottom(new_screenshot)
                     break
             else:
                 # Экран изменился = двигаемся дальше
@@ -1325,6 +1633,8 @@ class GameLogic:
                 logger.debug(f"  ✓ Двигаемся ({change_percent:.2f}% изменений)")
         
         logger.info(f"✓ Сканирование завершено: найдено {upgrades_found} улучшений")
+        self._finish_sweep()
+        self._log_scroll_summary()
         return upgrades_found
     
     def fly_to_bottom(self) -> None:
@@ -1342,18 +1652,20 @@ class GameLogic:
         for i in range(max_swipes):
             # Свайп вниз - УМЕНЬШЕННАЯ дистанция 200px
             self.input.drag_screen("down", distance=200)
-            time.sleep(0.4)
+            self._settle("drag", 0.4)
             
             new_screenshot = self.vision.capture_screen()
             
-            import cv2
-            import numpy as np
-            
-            diff = cv2.absdiff(prev_screenshot, new_screenshot)
-            diff_sum = np.sum(diff)
+            edge = self._tracked_edge(prev_screenshot, new_screenshot, 200, direction=-1)
+            if edge is None:
+                change_pct, threshold, _ = self._scroll_change(
+                    prev_screenshot, new_screenshot, float(TIMERS.get("SCROLL_CHANGE_THRESHOLD_PCT", 8.0)), 1
+                )
+                edge = change_pct < threshold
             
-            if diff_sum < 500000:
+            if edge:
                 logger.info(f"✓ Достигли низа после {i+1} свайпов")
+                self._anchor_bottom(new_screenshot)
                 break
             
             prev_screenshot = new_screenshot
@@ -1363,14 +1675,192 @@ class GameLogic:
         # После явного определения низа можно снова разрешить скролл при простое
         self.idle_scroll_stuck_count = 0
     
-    def _screenshot_change_percent(self, prev, new, pixel_threshold: int = 30) -> float:
-        """Процент изменившихся пикселей между двумя скриншотами (для детекции края)."""
-        import cv2
-        import numpy as np
-        diff = cv2.absdiff(prev, new)
-        total_pixels = diff.shape[0] * diff.shape[1] * diff.shape[2]
-        changed = np.count_nonzero(diff > pixel_threshold)
-        return (changed / total_pixels) * 100.0
+    def _screenshot_change_percent(self, prev, new) -> float:
+        """Процент изменившихся пикселей между двумя скриншотами (для детекции края), по миниатюрам FrameDiff."""
+        return 100.0 * self.vision.frame_diff.changed_fraction(prev, new)
+
+    def _scroll_change(self, prev, new, threshold: float, required: int) -> Tuple[float, float, int]:
+        """
+        Изменение экрана после драга, когда сдвиг контента не измерен.
+        С готовой маской анимаций — % изменившихся СТАТИЧНЫХ пикселей, фиксированный порог
+        ANIMATION_MASK["EDGE_CHANGE_PCT"] и одного свайпа достаточно; иначе — % всех пикселей
+        и переданные порог / число свайпов подряд.
+        Returns (изменение %, порог, сколько раз подряд ниже порога = край).
+        """
+        mask = self.vision.animation_mask
+        masked = mask.changed_percent(prev, new) if mask is not None else None
+        if masked is not None:
+            change, threshold, required = masked, float(ANIMATION_MASK.get("EDGE_CHANGE_PCT", 8.0)), 1
+        else:
+            change = self._screenshot_change_percent(prev, new)
+        if mask is not None and change >= threshold:
+            mask.camera_moved(None)  # камера сдвинулась на неизвестное расстояние — маска заново
+        return change, threshold, required
+
+    def _tracked_edge(self, prev, new, requested_px: int, direction: int) -> Optional[bool]:
+        """
+        Край по реальному сдвигу контента (ScrollTracker).
+        direction: +1 — тянули к верху уровня, -1 — к низу.
+        Returns True — контент не сдвинулся (край), False — сдвинулся,
+        None — трекер выключен/не уверен (вызывающий проверяет по % изменений, _scroll_change).
+        """
+        panorama = self._panorama()
+        if self.scroll_tracker is None:
+            self.state.panorama.lose_camera()
+            return None
+        self.scroll_tracker.frame_scale = self.vision.scale_y
+        shift = self.scroll_tracker.measure(prev, new)
+        if not shift.reliable:
+            logger.debug(f"  Сдвиг контента не определён (отклик {shift.response:.2f}) — проверка по % изменений")
+            if panorama is not None:
+                panorama.localize(new)
+            return None
+        self.scroll_tracker.record_drag(requested_px, shift, direction)
+        logger.debug(f"  Сдвиг контента {shift.dy:+.0f}px (драг {requested_px}px, отклик {shift.response:.2f})")
+        if panorama is not None:
+            panorama.follow(shift.dy, new)
+        edge = self.scroll_tracker.is_edge(shift)
+        if not edge and self.vision.animation_mask is not None:
+            self.vision.animation_mask.camera_moved(shift.dy * self.vision.scale_y)  # маска едет с контентом
+        return edge
+
+    def _unmeasured_scroll(self) -> None:
+        """Скролл без замера сдвига: ни панорама, ни маска анимаций не знают, где камера."""
+        self.state.panorama.lose_camera()
+        if self.vision.animation_mask is not None:
+            self.vision.animation_mask.camera_moved(None)
+
+    def _level_changed(self) -> None:
+        """Новый уровень: состояние уровня (панорама, счётчики) и маска анимаций — заново."""
+        self.state.on_level_change()
+        if self.vision.animation_mask is not None:
+            self.vision.animation_mask.reset()
+
+    # ===== LEVEL PANORAMA =====
+
+    def _panorama(self) -> Optional[LevelPanorama]:
+        """Панорама уровня, если включена (без ScrollTracker камеру не отследить)."""
+        if not PANORAMA.get("ENABLED", True) or self.scroll_tracker is None:
+            return None
+        panorama = self.state.panorama
+        panorama.frame_scale = self.vision.scale_y
+        return panorama
+
+    def _anchor_bottom(self, frame) -> None:
+        """Упёрлись в низ уровня — высота уровня в панораме известна."""
+        panorama = self._panorama()
+        if panorama is not None:
+            panorama.anchor_bottom(frame)
+
+    def _observe(self, kind: str, points: List[Tuple[int, int]], band: Optional[Tuple[int, int]] = None) -> None:
+        """Что видно на экране сейчас (стрелки/боксы) — в индекс панорамы по мировому Y."""
+        panorama = self._panorama()
+        if panorama is not None and panorama.camera_known:
+            panorama.observe(kind, points, self.input.game_h, band=band)
+
+    def _finish_sweep(self) -> None:
+        """Проход сверху донизу завершён: панорама полная, можно ездить к целям."""
+        panorama = self._panorama()
+        if panorama is None or not panorama.complete:
+            return
+        panorama.swept_at = time.time()
+        logger.info(f"🗺️  Панорама уровня {self.state.current_level}: {panorama.summary()}")
+        if PANORAMA.get("SAVE_DEBUG", False):
+            image = panorama.render()
+            if image is not None:
+                import cv2
+                os.makedirs(os.path.join("tools", "output"), exist_ok=True)
+                path = os.path.join("tools", "output", f"panorama_level{self.state.current_level}.png")
+                cv2.imwrite(path, image)
+                logger.debug(f"🗺️  Панорама сохранена: {path}")
+
+    def _scroll_camera_to(self, scroller: GameScroller, camera_y: int) -> bool:
+        """
+        Драгами (с замером сдвига) ставит камеру на camera_y (мировой Y верха экрана).
+        Returns False — камера потеряна по дороге.
+        """
+        panorama = self.state.panorama
+        max_drag = int(PANORAMA.get("MAX_DRAG", 250))
+        tolerance = int(PANORAMA.get("CAMERA_TOLERANCE", 40))
+        ratio = max(0.2, self.scroll_tracker.scroll_ratio())
+        for _ in range(8):
+            if not panorama.camera_known:
+                return False
+            delta = camera_y - panorama.camera_y
+            if abs(delta) <= tolerance:
+                return True
+            distance = int(min(max_drag, abs(delta) / ratio))
+            prev = self.vision.capture_screen()
+            if delta > 0:
+                scroller.drag_up(distance, fast=False, settle=0.5)  # палец вверх = видим ниже
+                direction = -1
+            else:
+                scroller.drag_down(distance, smooth=True, settle=0.5)  # палец вниз = видим выше
+                direction = +1
+            if self._tracked_edge(prev, self.vision.capture_screen(), distance, direction):
+                break  # край уровня — ближе не подъехать
+        return panorama.camera_known
+
+    def _visit_targets(self, scroller: GameScroller) -> bool:
+        """
+        Цикл 40с по панораме: вместо прохода всего уровня едем к местам, где недавно
+        были стрелки или остались боксы, и возвращаемся на прежнее место.
+        Returns False — нужен полный проход (панорамы нет/неполная, пора обновить, камера потеряна).
+        """
+        panorama = self._panorama()
+        if panorama is None or not panorama.complete:
+            return False
+        if time.time() - panorama.swept_at > float(PANORAMA.get("FULL_SWEEP_INTERVAL", 240.0)):
+            logger.info("🗺️  Панорама: пора полного прохода")
+            return False
+        if not panorama.camera_known and panorama.localize(self.vision.capture_screen()) is None:
+            logger.info("🗺️  Панорама: камера потеряна — полный проход")
+            return False
+
+        targets = panorama.targets(float(PANORAMA.get("ARROW_RECENT_SECONDS", 120.0)))
+        if not targets:
+            logger.info(f"🗺️  Цикл 40с: вне экрана нет недавних стрелок/боксов — проход не нужен ({panorama.summary()})")
+            return True
+
+        rest_camera = panorama.camera_y
+        views = panorama.plan_views(targets)
+        # Один проход в одну сторону: сначала к ближнему концу маршрута
+        if abs(views[-1] - rest_camera) < abs(views[0] - rest_camera):
+            views.reverse()
+        logger.info(
+            f"🗺️  Цикл 40с по панораме: {len(targets)} целей, {len(views)} остановок (мировой Y камеры: {views})"
+        )
+        for camera_y in views:
+            if self.check_level_progression():
+                logger.info("🔄 Цикл 40с: прерван — найдена реновация/Fly/OPEN, обрабатываем")
+                return True
+            if not self._scroll_camera_to(scroller, camera_y):
+                logger.info("🗺️  Камера потеряна по дороге — полный проход")
+                return False
+            self._check_here()
+
+        self._scroll_camera_to(scroller, rest_camera)
+        logger.info("✓ Цикл 40с (по панораме) завершён, таймер сброшен")
+        return True
+
+    def _log_scroll_summary(self) -> None:
+        """Сколько реально прокручивает драг каждой дистанции (для подбора SCROLL_STEP_DOWN_DISTANCE)."""
+        if self.scroll_tracker is None:
+            return
+        summary = self.scroll_tracker.drag_summary()
+        if summary:
+            parts = ", ".join(f"{req}px→{px:.0f}px (x{n})" for req, (n, px) in summary.items())
+            logger.info(f"📏 Драг → сдвиг контента (медиана): {parts}")
+
+    def _check_here(self) -> None:
+        """
+        Общие улучшения, боксы/чаевые, станции на текущем экране (шаг прохода / остановка у цели).
+        Каждый обработчик сам ждёт, пока экран устоится после своих кликов — без пауз между ними.
+        """
+        self.upgrade_general()
+        if self.collect_items():
+            self._settle("collect", 0.2)
+        self.upgrade_stations()
 
     def run_40s_scroll_cycle(self) -> None:
         """
@@ -1392,14 +1882,14 @@ class GameLogic:
         stuck_required = int(TIMERS.get("SCROLL_STUCK_STEPS_REQUIRED", 3))
         max_steps = int(TIMERS.get("SCROLL_MAX_STEPS_DOWN", 28))
 
-        scroller = GameScroller(
-            self.input.game_x,
-            self.input.game_y,
-            self.input.game_w,
-            self.input.game_h,
-        )
+        scroller = self._scroller()
+
+        # Панорама уровня уже есть — только к недавним стрелкам/боксам, без слепого прохода
+        if self._visit_targets(scroller):
+            return
 
         logger.info("🔄 Цикл 40с: летим наверх (Quartz), затем шагами вниз с улучшениями...")
+        panorama = self._panorama()
 
         # 1. Летим наверх быстро до подтверждения (diff < threshold дважды)
         max_swipes = 15
@@ -1410,22 +1900,32 @@ class GameLogic:
             if self.check_level_progression():
                 logger.info("🔄 Цикл 40с: прерван — найдена реновация/Fly/OPEN, обрабатываем")
                 return
-            scroller.drag_down(top_dist, smooth=False)  # палец вниз = контент вверх = видим верх списка (быстро)
-            time.sleep(0.5)
+            scroller.drag_down(top_dist, smooth=False, settle=0.5)  # палец вниз = контент вверх = видим верх списка (быстро)
             new_screenshot = self.vision.capture_screen()
-            change_pct = self._screenshot_change_percent(prev_screenshot, new_screenshot)
-            logger.debug(f"К верху свайп {i+1}/{max_swipes}: изменений {change_pct:.2f}%")
-            if change_pct < change_threshold:
+            edge = self._tracked_edge(prev_screenshot, new_screenshot, top_dist, direction=+1)
+            if edge:
+                logger.info(f"✓ Упёрлись в верх после {i+1} свайпов (сдвиг контента ~0px)")
+                if panorama is not None:
+                    panorama.anchor_top(new_screenshot)
+                break
+            if edge is None:
+                change_pct, threshold, required = self._scroll_change(
+                    prev_screenshot, new_screenshot, change_threshold, stuck_required
+                )
+                logger.debug(f"К верху свайп {i+1}/{max_swipes}: изменений {change_pct:.2f}% (порог {threshold:.0f}%)")
+            if edge is None and change_pct < threshold:
                 stuck_count += 1
-                if stuck_count >= stuck_required:
+                if stuck_count >= required:
                     logger.info(f"✓ Упёрлись в верх после {i+1} свайпов")
+                    if panorama is not None:
+                        panorama.anchor_top(new_screenshot)
                     break
             else:
                 stuck_count = 0
             prev_screenshot = new_screenshot
         else:
             logger.info(f"Достигнут лимит {max_swipes} свайпов вверх")
-        time.sleep(0.5)
+        self._settle("top_reached", 0.5)
 
         # 2. Малыми шагами вниз: на каждом свайпе ОСТАНАВЛИВАЕМСЯ и проверяем все кнопки (общие улучшения, станции, сбор)
         stuck_count = 0
@@ -1438,44 +1938,51 @@ class GameLogic:
 
             # Даём экрану устояться после предыдущего свайпа (кроме самого первого шага)
             if step > 0:
-                time.sleep(0.4)
+                self._settle("step_settle", 0.4)
 
             # Два цикла проверки на текущем кадре (остановились — проверяем всё)
             for _ in range(2):
-                self.upgrade_general()
-                time.sleep(0.2)
-                self.collect_items()
-                time.sleep(0.2)
-                self.upgrade_stations()
-                time.sleep(0.2)
+                self._check_here()
 
             # Свайп вниз (подтягиваем следующий кусок карты)
             prev_screenshot = self.vision.capture_screen()
-            scroller.drag_up(step_dist, fast=False)  # палец вверх = контент вниз
-            time.sleep(0.5)
+            scroller.drag_up(step_dist, fast=False, settle=0.5)  # палец вверх = контент вниз
+            # Сдвиг меряем до кликов: открытая панель/собранный бокс исказили бы сравнение
+            moved_screenshot = self.vision.capture_screen()
+            edge = self._tracked_edge(prev_screenshot, moved_screenshot, step_dist, direction=-1)
             # Сразу после свайпа проверяем только что появившийся контент (не пропускаем улучшения)
-            self.upgrade_general()
-            time.sleep(0.2)
-            self.collect_items()
-            time.sleep(0.2)
-            self.upgrade_stations()
-            time.sleep(0.2)
+            self._check_here()
 
+            if edge:
+                logger.info(f"✓ Упёрлись в низ на шаге {step+1} (сдвиг контента ~0px)")
+                if panorama is not None:
+                    panorama.anchor_bottom(moved_screenshot)
+                break
             new_screenshot = self.vision.capture_screen()
-            change_pct = self._screenshot_change_percent(prev_screenshot, new_screenshot)
-            logger.debug(f"Шаг вниз {step+1}/{max_steps}: изменений {change_pct:.2f}%")
-            if change_pct < change_threshold:
+            if edge is None:
+                # Сдвиг сравниваем по кадру сразу после драга (клики _check_here не в счёт)
+                change_pct, threshold, required = self._scroll_change(
+                    prev_screenshot, moved_screenshot, change_threshold, stuck_required
+                )
+                logger.debug(f"Шаг вниз {step+1}/{max_steps}: изменений {change_pct:.2f}% (порог {threshold:.0f}%)")
+            if edge is None and change_pct < threshold:
                 stuck_count += 1
-                if stuck_count >= stuck_required:
+                if stuck_count >= required:
                     logger.info(f"✓ Упёрлись в низ на шаге {step+1}")
+                    if panorama is not None:
+                        panorama.anchor_bottom(moved_screenshot)
                     break
             else:
                 stuck_count = 0
             prev_screenshot = new_screenshot
 
+        self._finish_sweep()
+
         # 3. Небольшой свайп вверх у низа (палец вниз = контент чуть вверх)
-        scroller.drag_down(swipe_up_at_bottom, smooth=False)
-        time.sleep(0.3)
+        prev_screenshot = self.vision.capture_screen()
+        scroller.drag_down(swipe_up_at_bottom, smooth=False, settle=0.3)
+        self._tracked_edge(prev_screenshot, self.vision.capture_screen(), swipe_up_at_bottom, direction=+1)
+        self._log_scroll_summary()
         logger.info("✓ Цикл 40с завершён, таймер сброшен")
 
     def peek_up_and_scan_legacy(self) -> None:
@@ -1496,24 +2003,27 @@ class GameLogic:
         if not GameScroller.is_available():
             return False
         distance = int(TIMERS.get("IDLE_SCROLL_DISTANCE", 80))
-        scroller = GameScroller(
-            self.input.game_x,
-            self.input.game_y,
-            self.input.game_w,
-            self.input.game_h,
-        )
+        scroller = self._scroller()
         # Сравниваем скриншоты до/после, чтобы не скроллить "в никуда", когда уже внизу.
         prev = self.vision.capture_screen()
-        scroller.drag_up(distance, fast=False)  # палец вверх = контент вниз = видим ниже
-        time.sleep(0.4)
+        scroller.drag_up(distance, fast=False, settle=0.4)  # палец вверх = контент вниз = видим ниже
         new = self.vision.capture_screen()
-        change_pct = self._screenshot_change_percent(prev, new)
-        threshold = float(TIMERS.get("SCROLL_CHANGE_THRESHOLD_PCT", 8.0))
-        logger.debug(f"⏱️  Простой: изменение экрана после скролла {change_pct:.2f}%")
+        edge = self._tracked_edge(prev, new, distance, direction=-1)
+        if edge:
+            # Контент не сдвинулся — точно внизу, второй свайп не нужен
+            self.idle_scroll_stuck_count = 2
+            self._anchor_bottom(new)
+            logger.info("⏱️  Уже внизу — скролл при простое временно отключён")
+            return False
+        if edge is None:
+            change_pct, threshold, required = self._scroll_change(
+                prev, new, float(TIMERS.get("SCROLL_CHANGE_THRESHOLD_PCT", 8.0)), 2
+            )
+            logger.debug(f"⏱️  Простой: изменение экрана после скролла {change_pct:.2f}% (порог {threshold:.0f}%)")
 
-        if change_pct < threshold:
-            # Почти ничего не изменилось — похоже, что уже внизу.
-            self.idle_scroll_stuck_count += 1
+        if edge is None and change_pct < threshold:
+            # Почти ничего не изменилось — похоже, что уже внизу (с маской анимаций — точно).
+            self.idle_scroll_stuck_count += 1 if required > 1 else 2
             if self.idle_scroll_stuck_count >= 2:
                 logger.info("⏱️  Уже внизу — скролл при простое временно отключён")
                 return False
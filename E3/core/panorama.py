@@ -0,0 +1,285 @@
+"""
+EatventureBot V3 - Level Panorama
+Frames of a sweep stitched into one vertical picture of the level, plus an index
+of what was seen where, in WORLD coordinates.
+
+    world_y = camera_y + screen_y      (camera_y = 0: view at the very top of the level)
+
+World coordinates are game px (as click coordinates); frames may be larger
+(Retina) — frame_scale = frame px per game px.
+
+The camera offset follows the measured content shifts (core/scroll_tracker.py):
+content moved up by |dy| = camera went down by |dy|. When a shift can't be
+measured the camera is re-found by matching the frame against the panorama.
+
+Index (per level, reset by BotState.on_level_change):
+    stations — every place an upgrade arrow was ever seen (merged within merge_px)
+    arrows   — arrows of the last observation of that part of the level, with time
+    boxes    — boxes seen but not clicked
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Sighting:
+    """One object in world coordinates (game-relative x, world y)."""
+    x: int
+    world_y: int
+    seen_at: float
+
+
+class LevelPanorama:
+    """
+    Args:
+        scale: Canvas resolution relative to the frame
+        ui_top, ui_bottom: Static UI bands (fraction of height), not stitched / not indexed
+        merge_px: Sightings closer than this are the same object
+        min_localize_score: TM_CCOEFF_NORMED needed to re-find the camera on the canvas
+        max_height: Canvas limit in world px (protects against a runaway camera)
+    """
+
+    KINDS = ("arrow", "box")
+
+    def __init__(
+        self,
+        scale: float = 0.25,
+        ui_top: float = 0.12,
+        ui_bottom: float = 0.15,
+        merge_px: int = 50,
+        min_localize_score: float = 0.6,
+        max_height: int = 20000,
+    ):
+        self.scale = scale
+        self.ui_top = ui_top
+        self.ui_bottom = ui_bottom
+        self.merge_px = merge_px
+        self.min_localize_score = min_localize_score
+        self.max_height = max_height
+        self.frame_scale = 1.0  # VisionSystem.scale_y
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the level (new level after renovation / fly)."""
+        self.canvas: Optional[np.ndarray] = None  # gray, scale × world
+        self.camera_y: Optional[int] = None
+        self.view_h: Optional[int] = None
+        self.top_anchored = False
+        self.max_camera_y: Optional[int] = None  # camera at the bottom of the level
+        self.swept_at = 0.0  # время последнего полного прохода сверху донизу
+        self.stations: List[Sighting] = []
+        self.sightings: Dict[str, List[Sighting]] = {kind: [] for kind in self.KINDS}
+
+    # ===== CAMERA =====
+
+    @property
+    def complete(self) -> bool:
+        """The whole level was swept: top and bottom are known."""
+        return self.top_anchored and self.max_camera_y is not None
+
+    @property
+    def camera_known(self) -> bool:
+        return self.camera_y is not None
+
+    def _content_rows(self, frame_h: int) -> Tuple[int, int]:
+        return int(frame_h * self.ui_top), int(frame_h * (1.0 - self.ui_bottom))
+
+    def _view_h(self, frame: np.ndarray) -> int:
+        return int(round(frame.shape[0] / self.frame_scale))
+
+    def _thumb(self, frame: np.ndarray) -> np.ndarray:
+        """Content rows of the frame, gray, at canvas scale."""
+        y1, y2 = self._content_rows(frame.shape[0])
+        crop = frame[y1:y2]
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        factor = self.scale / self.frame_scale
+        size = (max(1, int(round(crop.shape[1] * factor))), max(1, int(round(crop.shape[0] * factor))))
+        return cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+
+    def _stitch(self, frame: np.ndarray) -> None:
+        """Paste the frame at the current camera (newer pixels win)."""
+        if self.camera_y is None:
+            return
+        self.view_h = self._view_h(frame)
+        thumb = self._thumb(frame)
+        y1, _ = self._content_rows(self.view_h)
+        row = int(round((self.camera_y + y1) * self.scale))
+        if self.canvas is None or self.canvas.shape[1] != thumb.shape[1]:
+            self.canvas = np.zeros((0, thumb.shape[1]), np.uint8)
+        need = row + thumb.shape[0]
+        if need > self.canvas.shape[0]:
+            grown = np.zeros((need, self.canvas.shape[1]), np.uint8)
+            grown[:self.canvas.shape[0]] = self.canvas
+            self.canvas = grown
+        self.canvas[row:need] = thumb
+
+    def anchor_top(self, frame: np.ndarray) -> None:
+        """View is at the very top of the level: camera_y = 0 by definition."""
+        self.camera_y = 0
+        self.top_anchored = True
+        self._stitch(frame)
+        logger.debug("🗺️  Панорама: камера у верха уровня (y=0)")
+
+    def anchor_bottom(self, frame: np.ndarray) -> None:
+        """View is at the very bottom: the level height is known from here."""
+        if self.camera_y is None:
+            return
+        self.max_camera_y = self.camera_y
+        self._stitch(frame)
+        logger.debug(f"🗺️  Панорама: низ уровня, камера y={self.camera_y}")
+
+    def follow(self, content_dy: float, frame: np.ndarray) -> None:
+        """Content moved by content_dy game px (measured) — move the camera the other way."""
+        if self.camera_y is None:
+            return
+        camera_y = int(round(self.camera_y - content_dy))
+        if camera_y < 0 or camera_y > self.max_height:
+            logger.debug(f"🗺️  Панорама: камера вне уровня ({camera_y}) — потеряна")
+            self.camera_y = None
+            return
+        self.camera_y = camera_y
+        self._stitch(frame)
+
+    def lose_camera(self) -> None:
+        """A scroll happened that was not measured."""
+        self.camera_y = None
+
+    def localize(self, frame: np.ndarray) -> Optional[int]:
+        """Find the camera by matching the frame against the panorama. Returns camera_y or None."""
+        if self.canvas is None or self.canvas.shape[0] == 0:
+            self.camera_y = None
+            return None
+        thumb = self._thumb(frame)
+        if thumb.shape[1] != self.canvas.shape[1] or thumb.shape[0] > self.canvas.shape[0]:
+            self.camera_y = None
+            return None
+        result = cv2.matchTemplate(self.canvas, thumb, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (_, row) = cv2.minMaxLoc(result)
+        if score < self.min_localize_score:
+            logger.debug(f"🗺️  Панорама: кадр не найден (score {score:.2f}) — камера потеряна")
+            self.camera_y = None
+            return None
+        y1, _ = self._content_rows(self._view_h(frame))
+        self.camera_y = max(0, int(round(row / self.scale)) - y1)
+        self._stitch(frame)
+        logger.debug(f"🗺️  Панорама: камера найдена y={self.camera_y} (score {score:.2f})")
+        return self.camera_y
+
+    def camera_for(self, world_y: int) -> int:
+        """Camera offset that puts world_y in the middle of the content band."""
+        view_h = self.view_h or 0
+        y1, y2 = self._content_rows(view_h)
+        camera_y = int(world_y - (y1 + y2) // 2)
+        upper = self.max_camera_y if self.max_camera_y is not None else camera_y
+        return max(0, min(camera_y, upper))
+
+    # ===== INDEX =====
+
+    def in_view(self, world_y: int, margin: int = 0) -> bool:
+        """world_y is inside the content band of the current view."""
+        if self.camera_y is None or self.view_h is None:
+            return False
+        y1, y2 = self._content_rows(self.view_h)
+        return self.camera_y + y1 + margin <= world_y <= self.camera_y + y2 - margin
+
+    def observe(
+        self,
+        kind: str,
+        points: Sequence[Tuple[int, int]],
+        view_h: int,
+        band: Optional[Tuple[int, int]] = None,
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        What the current view shows of `kind` (game-relative points): replaces the
+        older sightings inside the searched band (screen y1, y2; default — content band).
+        Arrows also register stations.
+        """
+        if self.camera_y is None:
+            return
+        now = time.time() if now is None else now
+        self.view_h = view_h
+        y1, y2 = band if band is not None else self._content_rows(view_h)
+        top, bottom = self.camera_y + y1, self.camera_y + y2
+        kept = [s for s in self.sightings[kind] if not (top <= s.world_y <= bottom)]
+        for x, y in points:
+            if not (y1 <= y <= y2):
+                continue
+            sighting = Sighting(int(x), int(self.camera_y + y), now)
+            kept.append(sighting)
+            if kind == "arrow" and self._nearest(self.stations, sighting.x, sighting.world_y) is None:
+                self.stations.append(Sighting(sighting.x, sighting.world_y, now))
+        self.sightings[kind] = kept
+
+    def forget(self, kind: str, points: Sequence[Tuple[int, int]]) -> None:
+        """Objects handled in the current view (clicked box)."""
+        if self.camera_y is None:
+            return
+        for x, y in points:
+            nearest = self._nearest(self.sightings[kind], x, self.camera_y + y)
+            if nearest is not None:
+                self.sightings[kind].remove(nearest)
+
+    def _nearest(self, sightings: List[Sighting], x: int, world_y: int) -> Optional[Sighting]:
+        for s in sightings:
+            if abs(s.x - x) < self.merge_px and abs(s.world_y - world_y) < self.merge_px:
+                return s
+        return None
+
+    def targets(self, arrow_max_age: float, now: Optional[float] = None) -> List[int]:
+        """World Y of recent arrows and known boxes outside the current view, sorted."""
+        now = time.time() if now is None else now
+        ys = [s.world_y for s in self.sightings["arrow"] if now - s.seen_at <= arrow_max_age]
+        ys += [s.world_y for s in self.sightings["box"]]
+        return sorted(y for y in ys if not self.in_view(y, margin=self.merge_px))
+
+    def plan_views(self, targets: Sequence[int]) -> List[int]:
+        """Camera offsets that cover all targets (several targets per view when they fit)."""
+        if not targets or not self.view_h:
+            return []
+        y1, y2 = self._content_rows(self.view_h)
+        band = max(1, (y2 - y1) - 2 * self.merge_px)
+        groups: List[List[int]] = []
+        for y in sorted(targets):
+            if groups and y - groups[-1][0] <= band:
+                groups[-1].append(y)
+            else:
+                groups.append([y])
+        views: List[int] = []
+        for group in groups:
+            camera_y = self.camera_for((group[0] + group[-1]) // 2)
+            if not views or views[-1] != camera_y:  # у краёв уровня группы сходятся в одну камеру
+                views.append(camera_y)
+        return views
+
+    def summary(self) -> str:
+        height = (self.max_camera_y + self.view_h) if self.complete and self.view_h else None
+        return (
+            f"высота {height if height is not None else '?'}px, камера {self.camera_y if self.camera_known else '?'}, "
+            f"станций {len(self.stations)}, стрелок {len(self.sightings['arrow'])}, боксов {len(self.sightings['box'])}"
+        )
+
+    def render(self) -> Optional[np.ndarray]:
+        """Panorama with stations (green), arrows (yellow), boxes (magenta), view (blue) — for debugging."""
+        if self.canvas is None or self.canvas.shape[0] == 0:
+            return None
+        image = cv2.cvtColor(self.canvas, cv2.COLOR_GRAY2BGR)
+        s = self.scale
+        for sighting in self.stations:
+            cv2.circle(image, (int(sighting.x * s), int(sighting.world_y * s)), 6, (0, 200, 0), 1)
+        for kind, color in (("arrow", (0, 220, 255)), ("box", (255, 0, 255))):
+            for sighting in self.sightings[kind]:
+                cv2.circle(image, (int(sighting.x * s), int(sighting.world_y * s)), 3, color, -1)
+        if self.camera_known and self.view_h:
+            top = int(self.camera_y * s)
+            cv2.rectangle(image, (0, top), (image.shape[1] - 1, top + int(self.view_h * s)), (255, 120, 0), 1)
+        return image
@@ -0,0 +1,83 @@
+"""
+EatventureBot V3 - Parallel Matching
+Shared thread pool for independent template/ROI jobs.
+
+cv2.matchTemplate releases the GIL, so several templates on one frame can be
+matched at the same time. Results are always returned in job order — never in
+completion order — so detections do not depend on thread timing.
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MatchExecutor:
+    """
+    Thread pool sized to the CPU cores.
+
+    With more than one worker OpenCV's own threading is limited (cv2.setNumThreads),
+    otherwise every matchTemplate would also try to spread over all cores and the
+    pool threads would compete with OpenCV's threads.
+    """
+
+    def __init__(self, workers: Optional[int] = None, cv_threads: Optional[int] = None, min_jobs: int = 2):
+        cores = os.cpu_count() or 1
+        self.workers = max(1, int(workers) if workers else cores)
+        # Меньше задач — выполняем в текущем потоке (пул не окупается)
+        self.min_jobs = max(2, min_jobs)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self.stats = {"batches": 0, "parallel_batches": 0, "jobs": 0}
+
+        if self.workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="match")
+            if cv_threads is None:
+                cv_threads = max(1, cores // self.workers)
+        if cv_threads is not None:
+            cv2.setNumThreads(int(cv_threads))
+        logger.debug(
+            f"MatchExecutor: {self.workers} потоков, OpenCV threads={cv2.getNumThreads()}"
+        )
+
+    @property
+    def parallel(self) -> bool:
+        return self._pool is not None
+
+    def _in_worker(self) -> bool:
+        return getattr(self._local, "active", False)
+
+    def _run(self, fn: Callable[[T], R], job: T) -> R:
+        self._local.active = True
+        try:
+            return fn(job)
+        finally:
+            self._local.active = False
+
+    def map(self, fn: Callable[[T], R], jobs: Sequence[T]) -> List[R]:
+        """
+        fn(job) for every job; results in the same order as jobs.
+        Exceptions propagate to the caller (first failing job in job order).
+        Calls from inside a pool thread run inline (no nested waits on the pool).
+        """
+        self.stats["batches"] += 1
+        self.stats["jobs"] += len(jobs)
+        if self._pool is None or len(jobs) < self.min_jobs or self._in_worker():
+            return [fn(job) for job in jobs]
+        self.stats["parallel_batches"] += 1
+        futures = [self._pool.submit(self._run, fn, job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,424 @@
+"""
+Perception / Actuation Pipeline
+Detection keeps running while the mouse clicks and waits, instead of
+capture → match → click → sleep → capture → ... in one thread.
+
+    PerceptionWorker - thread: grab the newest frame + detect, again and again;
+                       publishes Perception(frame_id, captured_at, result).
+    Actuator         - thread: runs a queue of PlannedAction (a click and the pause
+                       after it), each tagged with the Perception it was planned from.
+                       An action planned from a frame captured before the last
+                       screen-changing action finished is stale: it is re-planned
+                       against the newest fresh perception (replan) or dropped.
+    Pipeline         - both threads for one session (with-block); on exit the queue
+                       is drained and the threads stopped, so no input of the session
+                       overlaps input of the caller.
+    harvest()        - click every target once (tips, boxes) while perception keeps
+                       looking for new ones: the ~0.1-0.7 s of each click overlaps the
+                       detection for the next one.
+
+Frames are ordered by capture time (time.monotonic()), so frame ids of different
+sources (capture service, synchronous grabs) need not be comparable.
+Only the perceive() callback may touch vision and only actions may touch input
+while a session runs — the planner in between just reads perceptions.
+perceive() runs in the worker thread: per-thread resources (mss handles are bound
+to the thread that opened them) come from the `session` context, entered there.
+"""
+
+import logging
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[int, int]
+
+
+class Perception(NamedTuple):
+    """Detection result of one frame."""
+    frame_id: Optional[int]
+    captured_at: float  # time.monotonic() перед захватом
+    result: Any
+    elapsed_ms: float
+
+
+@dataclass
+class PlannedAction:
+    """
+    One queued input action.
+
+    Args:
+        label: For logs
+        run: The action itself (click, ...)
+        based_on: Perception the action was planned from
+        changes_screen: After it, older perceptions are stale (popup, scroll, new level)
+        settle: Seconds to wait after run (counted as part of the action)
+        replan: Stale action → new action from the newest fresh perception, or None (drop)
+    """
+    label: str
+    run: Callable[[], Any]
+    based_on: Perception
+    changes_screen: bool = False
+    settle: float = 0.0
+    replan: Optional[Callable[[Perception], Optional["PlannedAction"]]] = None
+
+
+class PerceptionWorker:
+    """
+    Args:
+        perceive: () -> (frame_id or None, result): grab the newest frame and detect
+        interval: Pause between perceptions (0 = back to back)
+        session: () -> context manager entered in the worker thread around all
+            perceptions (e.g. its own mss instance)
+    """
+
+    def __init__(
+        self,
+        perceive: Callable[[], Tuple[Optional[int], Any]],
+        interval: float = 0.0,
+        session: Optional[Callable[[], ContextManager]] = None,
+    ):
+        self.perceive = perceive
+        self.interval = interval
+        self.session = session
+        self._latest: Optional[Perception] = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, float] = {"runs": 0, "errors": 0, "total_ms": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="perception", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def publish(self, frame_id: Optional[int], captured_at: float, result: Any, elapsed_ms: float = 0.0) -> Perception:
+        """Make a perception available (the worker's own, or one the caller already had)."""
+        perception = Perception(frame_id, captured_at, result, elapsed_ms)
+        with self._cond:
+            if self._latest is None or captured_at >= self._latest.captured_at:
+                self._latest = perception
+            self._cond.notify_all()
+        return perception
+
+    def _run(self) -> None:
+        if self.session is None:
+            self._loop()
+            return
+        try:
+            with self.session():
+                self._loop()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Perception session: {e}")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            captured_at = time.monotonic()
+            try:
+                frame_id, result = self.perceive()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.debug(f"Perception: {e}")
+                self._stop.wait(max(self.interval, 0.05))
+                continue
+            elapsed_ms = (time.monotonic() - captured_at) * 1000.0
+            self.stats["runs"] += 1
+            self.stats["total_ms"] += elapsed_ms
+            self.publish(frame_id, captured_at, result, elapsed_ms)
+            if self.interval > 0:
+                self._stop.wait(self.interval)
+
+    def latest(self) -> Optional[Perception]:
+        with self._cond:
+            return self._latest
+
+    def wait_for(self, captured_after: float, timeout: float) -> Optional[Perception]:
+        """First perception of a frame captured after `captured_after` (monotonic), or None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._latest is None or self._latest.captured_at <= captured_after:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    return None
+                self._cond.wait(remaining)
+            return self._latest
+
+
+class Actuator:
+    """
+    Args:
+        perception: Worker whose newest perception stale actions are re-planned against
+        max_queue: Planned actions waiting at most (submit() refuses more)
+        replan_timeout: Seconds a stale action with replan waits for a fresh perception
+    """
+
+    def __init__(self, perception: Optional[PerceptionWorker] = None, max_queue: int = 16, replan_timeout: float = 0.5):
+        self.perception = perception
+        self.replan_timeout = replan_timeout
+        self._queue: "queue.Queue[Optional[PlannedAction]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._pending = 0
+        self._idle = threading.Condition()
+        # Когда закончилось последнее действие, меняющее экран (кадры до него устарели)
+        self.last_change_at = 0.0
+        # Когда закончилось последнее действие вообще
+        self.last_done_at = 0.0
+        self.stats: Dict[str, float] = {"executed": 0, "dropped": 0, "replanned": 0, "errors": 0, "busy_ms": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def idle(self) -> bool:
+        with self._idle:
+            return self._pending == 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="actuator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        if self._thread is None:
+            return
+        self.clear()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def is_stale(self, perception: Perception) -> bool:
+        """True if a screen-changing action finished after the perception's frame was captured."""
+        return perception.captured_at < self.last_change_at
+
+    def submit(self, action: PlannedAction) -> bool:
+        """Queue an action. False if the queue is full (plan it again later)."""
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(action)
+            return True
+        except queue.Full:
+            self._done()
+            return False
+
+    def clear(self) -> int:
+        """Drop every queued action that has not started. Returns how many."""
+        dropped = 0
+        while True:
+            try:
+                action = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if action is None:
+                self._queue.put(None)
+                break
+            dropped += 1
+            self._done()
+        self.stats["dropped"] += dropped
+        return dropped
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the queue is empty and no action runs. False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def _done(self) -> None:
+        with self._idle:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self._idle.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            action = self._queue.get()
+            if action is None:
+                return
+            try:
+                action = self._fresh(action)
+                if action is not None:
+                    self._execute(action)
+            finally:
+                self._done()
+
+    def _fresh(self, action: PlannedAction) -> Optional[PlannedAction]:
+        """The action itself, its re-plan against the newest fresh perception, or None (dropped)."""
+        if not self.is_stale(action.based_on):
+            return action
+        latest = None
+        if action.replan is not None and self.perception is not None:
+            # Кадр после смены экрана — ждём, поток восприятия его вот-вот выдаст
+            latest = self.perception.wait_for(self.last_change_at, self.replan_timeout)
+        if latest is not None:
+            replanned = action.replan(latest)
+            if replanned is not None:
+                self.stats["replanned"] += 1
+                logger.debug(f"🔁 {action.label}: кадр #{action.based_on.frame_id} устарел → #{latest.frame_id}")
+                return replanned
+        self.stats["dropped"] += 1
+        logger.debug(f"🗑️  {action.label}: кадр #{action.based_on.frame_id} устарел - пропускаем")
+        return None
+
+    def _execute(self, action: PlannedAction) -> None:
+        started = time.monotonic()
+        try:
+            action.run()
+            self.stats["executed"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Action {action.label} failed: {e}")
+        if action.settle > 0:
+            time.sleep(action.settle)
+        now = time.monotonic()
+        if action.changes_screen:
+            self.last_change_at = now
+        self.last_done_at = now
+        self.stats["busy_ms"] += (now - started) * 1000.0
+
+
+class Pipeline:
+    """
+    PerceptionWorker + Actuator for one session:
+
+        with Pipeline(perceive) as pipe:
+            first = pipe.perception.publish(frame_id, captured_at, result)
+            pipe.actuator.submit(PlannedAction(...))
+    """
+
+    def __init__(
+        self,
+        perceive: Callable[[], Tuple[Optional[int], Any]],
+        interval: float = 0.0,
+        max_queue: int = 16,
+        replan_timeout: float = 0.5,
+        session: Optional[Callable[[], ContextManager]] = None,
+    ):
+        self.perception = PerceptionWorker(perceive, interval, session)
+        self.actuator = Actuator(self.perception, max_queue, replan_timeout)
+
+    def __enter__(self) -> "Pipeline":
+        self.actuator.start()
+        self.perception.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.actuator.wait_idle()
+        self.perception.stop()
+        self.actuator.stop()
+
+    def fresh(self, after: Optional[Perception] = None, timeout: float = 0.5) -> Optional[Perception]:
+        """Next perception newer than `after` and not stale (frame after the last screen change)."""
+        since = self.actuator.last_change_at
+        if after is not None:
+            since = max(since, after.captured_at)
+        return self.perception.wait_for(since, timeout)
+
+
+def _near(point: Point, others: List[Point], radius: float) -> bool:
+    return any(math.hypot(point[0] - x, point[1] - y) <= radius for x, y in others)
+
+
+def harvest(
+    pipeline: Pipeline,
+    first: Perception,
+    targets: Callable[[Any], List[Point]],
+    click: Callable[[Point], Any],
+    label: str,
+    limit: int,
+    settle: float = 0.0,
+    radius: float = 25.0,
+    timeout: float = 0.5,
+    changes_screen: bool = False,
+) -> List[Point]:
+    """
+    Click every target once while perception keeps looking for more.
+
+    Args:
+        pipeline: Running session (with Pipeline(...) as pipe)
+        first: Perception to start from (usually the caller's own detection)
+        targets: perception.result -> [(x, y)] click points
+        click: Clicks one point (runs on the actuator thread)
+        label: For logs
+        limit: Clicks at most
+        settle: Pause after each click (the old per-click sleep)
+        radius: Px: a target this close to a clicked one is the same object
+            (a coin still fading out)
+        timeout: Seconds to wait for a newer perception before giving up
+        changes_screen: Each click changes the screen (older plans get re-planned)
+
+    Returns:
+        Points actually clicked (planned minus dropped, re-planned ones at their new position)
+    """
+    actuator = pipeline.actuator
+    planned: List[Point] = []
+    clicked: List[Point] = []
+
+    def run_click(point: Point) -> None:
+        click(point)
+        clicked.append(point)
+
+    def replan_for(point: Point) -> Callable[[Perception], Optional[PlannedAction]]:
+        def replan(latest: Perception) -> Optional[PlannedAction]:
+            # Та же цель в свежем кадре (ближайшая в радиусе) — кликаем по новым координатам
+            near = [p for p in targets(latest.result) if _near(p, [point], radius)]
+            if not near:
+                return None
+            moved = min(near, key=lambda p: math.hypot(p[0] - point[0], p[1] - point[1]))
+            return make_action(moved, latest)
+        return replan
+
+    def make_action(point: Point, perception: Perception) -> PlannedAction:
+        return PlannedAction(
+            label=f"{label} {point}",
+            run=lambda: run_click(point),
+            based_on=perception,
+            changes_screen=changes_screen,
+            settle=settle,
+            replan=replan_for(point),
+        )
+
+    perception = first
+    while len(planned) < limit:
+        new = [p for p in targets(perception.result) if not _near(p, planned, radius)]
+        for point in new[:limit - len(planned)]:
+            if not actuator.submit(make_action(point, perception)):
+                break
+            planned.append(point)
+        if len(planned) >= limit:
+            break
+        if not new and actuator.idle and perception.captured_at >= actuator.last_done_at:
+            break  # кадр после последнего клика — новых целей нет
+        perception = pipeline.fresh(after=perception, timeout=timeout)
+        if perception is None:
+            break
+
+    actuator.wait_idle()
+    return clicked
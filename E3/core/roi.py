@@ -0,0 +1,185 @@
+"""
+EatventureBot V3 - Learned Search Regions (ROI)
+Remembers where each template has been found and searches that area first.
+
+UI buttons (btn_renovate, btn_open, icon_upgrades, btn_buy, ...) always appear
+in the same place of the game window, so after a few hits the full-frame search
+shrinks to a small padded box. The box covers the last HISTORY hits with the
+OUTLIER_FRACTION most extreme edges trimmed, so one stray detection neither widens
+it for good nor outlives the window. Regions are kept per frame size (349x748 and
+Retina 698x1496 learn separately) and saved to learned_rois.json next to config.py.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from config import LEARNED_ROI
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROI_FILE = os.path.join(PROJECT_ROOT, "learned_rois.json")
+
+
+class ROILearner:
+    """
+    Per-template bounding boxes of past detections.
+
+    Stored box: [x1, y1, x2, y2, hits] — trimmed bounds of the recent matched
+    template rectangles (frame coordinates, see module docstring), hits = all
+    detections so far. region_for() returns it padded by LEARNED_ROI["PADDING"].
+    """
+
+    def __init__(self, path: str = ROI_FILE):
+        self.path = path
+        self.enabled: bool = bool(LEARNED_ROI.get("ENABLED", True))
+        self.templates = set(LEARNED_ROI.get("TEMPLATES", []))
+        self.padding = int(LEARNED_ROI.get("PADDING", 24))
+        self.min_hits = int(LEARNED_ROI.get("MIN_HITS", 3))
+        rate = float(LEARNED_ROI.get("MISS_FALLBACK_RATE", 0.25))
+        # Каждый N-й промах в ROI — полный кадр (rate 1.0 = всегда)
+        self.fallback_every = max(1, int(round(1.0 / rate))) if rate > 0 else 0
+        self.save_interval = float(LEARNED_ROI.get("SAVE_INTERVAL", 30.0))
+        self.history_size = max(1, int(LEARNED_ROI.get("HISTORY", 40)))
+        self.outlier_fraction = min(0.45, max(0.0, float(LEARNED_ROI.get("OUTLIER_FRACTION", 0.1))))
+
+        # {"349x748": {"btn_renovate": [x1, y1, x2, y2, hits]}}
+        self.boxes: Dict[str, Dict[str, List[int]]] = {}
+        # Последние находки: {"349x748": {"btn_renovate": deque([(x1, y1, x2, y2), ...])}}
+        self.history: Dict[str, Dict[str, deque]] = {}
+        self._misses: Dict[str, int] = {}
+        self._dirty = False
+        self._last_save = time.time()
+        self.stats = {"roi_hits": 0, "roi_misses": 0, "full_frame": 0}
+        # detect_all матчит спеки в пуле потоков (core/parallel.py)
+        self._lock = threading.RLock()
+        self.load()
+
+    @staticmethod
+    def _size_key(frame_shape: Tuple[int, ...]) -> str:
+        return f"{frame_shape[1]}x{frame_shape[0]}"
+
+    def handles(self, name: str) -> bool:
+        """True if this template is searched through a learned region."""
+        return self.enabled and name in self.templates
+
+    def region_for(self, name: str, frame_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Padded learned region (x, y, w, h) for template on a frame of this size,
+        or None if not learned yet (search the full frame).
+        """
+        if not self.handles(name):
+            return None
+        box = self.boxes.get(self._size_key(frame_shape), {}).get(name)
+        if box is None or box[4] < self.min_hits:
+            return None
+        fh, fw = frame_shape[:2]
+        x1 = max(0, box[0] - self.padding)
+        y1 = max(0, box[1] - self.padding)
+        x2 = min(fw, box[2] + self.padding)
+        y2 = min(fh, box[3] + self.padding)
+        return (x1, y1, x2 - x1, y2 - y1)
+
+    def note_miss(self, name: str) -> bool:
+        """
+        Template not found inside its learned region.
+        Returns True if the caller should fall back to a full-frame search now.
+        """
+        with self._lock:
+            self.stats["roi_misses"] += 1
+            if not self.fallback_every:
+                return False
+            self._misses[name] = self._misses.get(name, 0) + 1
+            if self._misses[name] >= self.fallback_every:
+                self._misses[name] = 0
+                self.stats["full_frame"] += 1
+                return True
+            return False
+
+    def record(self, name: str, frame_shape: Tuple[int, ...], x: int, y: int, w: int, h: int, in_roi: bool = False) -> None:
+        """Remember a detection: template rectangle (x, y, w, h) in frame coordinates."""
+        if not self.handles(name):
+            return
+        with self._lock:
+            if in_roi:
+                self.stats["roi_hits"] += 1
+                self._misses[name] = 0
+            size = self._size_key(frame_shape)
+            recent = self.history.setdefault(size, {}).setdefault(name, deque(maxlen=self.history_size))
+            recent.append((x, y, x + w, y + h))
+            per_size = self.boxes.setdefault(size, {})
+            box = per_size.get(name)
+            bounds = self._trimmed_bounds(recent)
+            if box is None:
+                per_size[name] = bounds + [1]
+                logger.debug(f"ROI {name}: первая находка ({x}, {y}, {w}, {h})")
+            else:
+                if bounds != box[:4]:
+                    logger.debug(f"ROI {name}: область {box[:4]} → {bounds}")
+                box[:4] = bounds
+                box[4] += 1
+            self._dirty = True
+            if time.time() - self._last_save >= self.save_interval:
+                self.save()
+
+    def _trimmed_bounds(self, rects) -> List[int]:
+        """[x1, y1, x2, y2] of the rectangles without the k most extreme values of each edge."""
+        n = len(rects)
+        k = int(n * self.outlier_fraction)
+        return [
+            sorted(r[0] for r in rects)[k],
+            sorted(r[1] for r in rects)[k],
+            sorted(r[2] for r in rects)[n - 1 - k],
+            sorted(r[3] for r in rects)[n - 1 - k],
+        ]
+
+    def load(self) -> None:
+        if not self.enabled or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.boxes = {
+                size: {name: [int(v) for v in box] for name, box in per_size.items()}
+                for size, per_size in data.get("rois", {}).items()
+            }
+            history = data.get("history", {})
+            for size, per_size in self.boxes.items():
+                for name, box in per_size.items():
+                    rects = history.get(size, {}).get(name)
+                    if not rects:
+                        # Старый файл без истории: область целиком как MIN_HITS находок
+                        rects = [box[:4]] * min(box[4], self.min_hits)
+                    self.history.setdefault(size, {})[name] = deque(
+                        (tuple(int(v) for v in r) for r in rects), maxlen=self.history_size
+                    )
+            count = sum(len(per_size) for per_size in self.boxes.values())
+            logger.info(f"✓ Загружено {count} обученных областей поиска ({os.path.basename(self.path)})")
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить {self.path}: {e}")
+            self.boxes = {}
+
+    def save(self) -> None:
+        """Write learned regions if anything changed since the last save."""
+        with self._lock:
+            self._last_save = time.time()
+            if not self._dirty:
+                return
+            try:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    history = {
+                        size: {name: [list(r) for r in rects] for name, rects in per_size.items()}
+                        for size, per_size in self.history.items()
+                    }
+                    json.dump({"rois": self.boxes, "history": history}, f, indent=2)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+                logger.debug(f"ROI сохранены в {self.path}")
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить {self.path}: {e}")
@@ -0,0 +1,195 @@
+"""
+Screen Signatures
+Which screen is this (main view, station popup, general upgrades, ad, renovate /
+fly dialog) from a few 64-bit perceptual hashes — instead of template matches.
+
+Each known screen is described by stable regions (fractions of the frame, so one
+index serves 1x and Retina) and samples recorded from real frames by
+tools/capture_signatures.py (screen_signatures.json next to config.py).
+A region's signature is a 64-bit dHash (or pHash) of the gray FrameDiff thumbnail
+crop plus its mean brightness: gradients alone survive the dimming of a popup
+overlay, the mean does not.
+
+A frame matches a sample when EVERY region is within max_distance bits and
+max_mean_diff brightness; the closest matching screen wins. No match = unknown
+screen (callers run all detectors, as without the index).
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from core.frame_diff import FrameDiff
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIGNATURES_FILE = os.path.join(PROJECT_ROOT, "screen_signatures.json")
+
+Region = Tuple[float, float, float, float]  # x, y, w, h — доли кадра
+
+
+def dhash(gray: np.ndarray) -> int:
+    """64-bit difference hash: is each pixel of a 9x8 thumbnail brighter than its left neighbour."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash(gray: np.ndarray) -> int:
+    """64-bit perceptual hash: low 8x8 DCT frequencies of a 32x32 thumbnail above their median."""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    bits = low > np.median(low.flat[1:])  # без DC — он лишь средняя яркость
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+HASHES = {"dhash": dhash, "phash": phash}
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class ScreenMatch(NamedTuple):
+    """Recognized screen and how far the closest sample was (sum of bits over its regions)."""
+    name: str
+    distance: int
+
+
+@dataclass
+class ScreenSignature:
+    """One screen type: stable regions + recorded samples (per sample: hash and mean per region)."""
+    name: str
+    regions: List[Region]
+    hashes: List[List[int]] = field(default_factory=list)
+    means: List[List[float]] = field(default_factory=list)
+
+
+class ScreenIndex:
+    """
+    Args:
+        path: JSON file with the signatures (missing file = empty index)
+        thumbs: FrameDiff whose cached gray thumbnails are hashed
+        hash_kind: "dhash" (gradients, fastest) or "phash" (DCT, more robust to small shifts)
+        max_distance: Bits (of 64) a region may differ and still match
+        max_mean_diff: Brightness (0-255) a region's mean may differ
+    """
+
+    def __init__(
+        self,
+        path: str = SIGNATURES_FILE,
+        thumbs: Optional[FrameDiff] = None,
+        hash_kind: str = "dhash",
+        max_distance: int = 10,
+        max_mean_diff: float = 25.0,
+    ):
+        self.path = path
+        self.thumbs = thumbs if thumbs is not None else FrameDiff()
+        self.hash_kind = hash_kind if hash_kind in HASHES else "dhash"
+        self.max_distance = max_distance
+        self.max_mean_diff = max_mean_diff
+        self.screens: Dict[str, ScreenSignature] = {}
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.screens)
+
+    # ===== FILE =====
+
+    def load(self) -> None:
+        self.screens = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Сигнатуры экранов не прочитаны ({self.path}): {e}")
+            return
+        if data.get("hash", "dhash") != self.hash_kind:
+            logger.warning(
+                f"⚠️  Сигнатуры экранов сняты с {data.get('hash')}, а настроен {self.hash_kind} — "
+                f"переснимите: python tools/capture_signatures.py"
+            )
+            return
+        for name, entry in data.get("screens", {}).items():
+            self.screens[name] = ScreenSignature(
+                name=name,
+                regions=[tuple(r) for r in entry.get("regions", [])],
+                hashes=[[int(h, 16) for h in sample] for sample in entry.get("hashes", [])],
+                means=[list(sample) for sample in entry.get("means", [])],
+            )
+        logger.debug(f"Сигнатуры экранов: {', '.join(self.screens) or 'нет'} ({self.path})")
+
+    def save(self) -> None:
+        data = {
+            "hash": self.hash_kind,
+            "screens": {
+                s.name: {
+                    "regions": [list(r) for r in s.regions],
+                    "hashes": [[f"{h:016x}" for h in sample] for sample in s.hashes],
+                    "means": [[round(m, 1) for m in sample] for sample in s.means],
+                }
+                for s in self.screens.values()
+            },
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    # ===== SIGNATURES =====
+
+    def _region_px(self, frame: np.ndarray, region: Region) -> Tuple[int, int, int, int]:
+        h, w = frame.shape[:2]
+        x, y, rw, rh = region
+        return int(x * w), int(y * h), max(1, int(rw * w)), max(1, int(rh * h))
+
+    def signature(self, frame: np.ndarray, region: Region) -> Tuple[int, float]:
+        """(hash, mean brightness) of one region of the frame."""
+        crop = self.thumbs.thumb(frame, self._region_px(frame, region))
+        return HASHES[self.hash_kind](crop), float(cv2.mean(crop)[0])
+
+    def add_sample(self, name: str, frame: np.ndarray, regions: Optional[Sequence[Region]] = None) -> ScreenSignature:
+        """Record the frame as a sample of screen `name` (regions: new screen or replace them)."""
+        screen = self.screens.get(name)
+        if screen is None or (regions is not None and [tuple(r) for r in regions] != screen.regions):
+            if not regions:
+                raise ValueError(f"screen '{name}' has no regions")
+            screen = ScreenSignature(name, [tuple(r) for r in regions])
+            self.screens[name] = screen
+        signatures = [self.signature(frame, region) for region in screen.regions]
+        screen.hashes.append([h for h, _ in signatures])
+        screen.means.append([m for _, m in signatures])
+        return screen
+
+    def remove(self, name: str) -> bool:
+        return self.screens.pop(name, None) is not None
+
+    # ===== CLASSIFY =====
+
+    def classify(self, frame: np.ndarray) -> Optional[ScreenMatch]:
+        """Closest known screen whose every region matches, or None (unknown)."""
+        cache: Dict[Region, Tuple[int, float]] = {}  # одинаковые области разных экранов хэшируем раз
+        best: Optional[ScreenMatch] = None
+        for screen in self.screens.values():
+            current = []
+            for region in screen.regions:
+                if region not in cache:
+                    cache[region] = self.signature(frame, region)
+                current.append(cache[region])
+            for hashes, means in zip(screen.hashes, screen.means):
+                total = 0
+                for (h, m), sample_h, sample_m in zip(current, hashes, means):
+                    bits = hamming(h, sample_h)
+                    if bits > self.max_distance or abs(m - sample_m) > self.max_mean_diff:
+                        break
+                    total += bits
+                else:
+                    if best is None or total < best.distance:
+                        best = ScreenMatch(screen.name, total)
+        return best
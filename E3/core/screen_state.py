@@ -0,0 +1,116 @@
+"""
+EatventureBot V3 - Screen State
+What is on screen right now, from a few cheap cues, so the main loop runs only
+the handlers that apply (dispatch table in run.py):
+
+    1. Screen signature (core/screen_signature.py) — 64-bit hashes of stable regions:
+       main floor, station popup, general menu, ad, renovate / fly / open-level dialog.
+    2. Station popup only: which button the popup shows — unlock_btn (locked),
+       btn_buy (buyable) or neither (maxed). One detect_all on learned ROIs.
+
+No signature match = UNKNOWN: run.py falls back to the full waterfall.
+"""
+
+import logging
+import time
+from enum import Enum
+from typing import Dict, NamedTuple, Optional
+
+from config import THRESHOLDS
+from core.vision import DetectionSpec, Frame, VisionSystem
+
+logger = logging.getLogger(__name__)
+
+
+class ScreenState(str, Enum):
+    MAIN = "main_floor"
+    STATION_LOCKED = "station_popup_locked"
+    STATION_BUYABLE = "station_popup_buyable"
+    STATION_MAXED = "station_popup_maxed"
+    GENERAL_MENU = "general_menu"
+    AD = "ad"
+    RENOVATE = "renovate_dialog"
+    FLY = "fly_dialog"
+    OPEN_LEVEL = "open_level"
+    UNKNOWN = "unknown"
+
+
+# Имя экрана в screen_signatures.json → состояние (station_popup уточняется по кнопке)
+SIGNATURE_STATES: Dict[str, ScreenState] = {
+    "main": ScreenState.MAIN,
+    "general_upgrades": ScreenState.GENERAL_MENU,
+    "ad": ScreenState.AD,
+    "renovate": ScreenState.RENOVATE,
+    "fly": ScreenState.FLY,
+    "open_level": ScreenState.OPEN_LEVEL,
+}
+
+
+class ScreenLabel(NamedTuple):
+    state: ScreenState
+    signature: Optional[str]  # распознанная сигнатура (None — не распознан)
+    elapsed_ms: float
+
+
+class ScreenStateClassifier:
+    """Labels frames with a ScreenState (see module docstring)."""
+
+    def __init__(self, vision: VisionSystem):
+        self.vision = vision
+        self.buy_threshold = THRESHOLDS.get("btn_buy", 0.93)
+
+    def classify(self, frame: Frame) -> ScreenLabel:
+        started = time.perf_counter()
+        screen = self.vision.classify_screen(frame)
+        if screen is None:
+            state = ScreenState.UNKNOWN
+        elif screen.name == "station_popup":
+            state = self._station_popup_state(frame)
+        else:
+            state = SIGNATURE_STATES.get(screen.name, ScreenState.UNKNOWN)
+        return ScreenLabel(state, screen.name if screen else None, (time.perf_counter() - started) * 1000.0)
+
+    def _station_popup_state(self, frame: Frame) -> ScreenState:
+        detections = self.vision.detect_all(frame, [
+            DetectionSpec("unlock_btn"),
+            DetectionSpec("btn_buy", threshold=self.buy_threshold),
+        ])
+        if detections.get("unlock_btn"):
+            return ScreenState.STATION_LOCKED
+        if detections.get("btn_buy"):
+            return ScreenState.STATION_BUYABLE
+        return ScreenState.STATION_MAXED
+
+
+class DispatchStats:
+    """Per-state tick counts and per-handler latency of the main loop (logged with Stats)."""
+
+    def __init__(self):
+        self.states: Dict[str, int] = {}
+        self.classify_ms = 0.0
+        # {handler: [calls, total ms, max ms]}
+        self.handlers: Dict[str, list] = {}
+
+    def record_state(self, label: ScreenLabel) -> None:
+        self.states[label.state.value] = self.states.get(label.state.value, 0) + 1
+        self.classify_ms += label.elapsed_ms
+
+    def record_handler(self, name: str, elapsed_ms: float) -> None:
+        stats = self.handlers.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed_ms
+        stats[2] = max(stats[2], elapsed_ms)
+
+    def report(self) -> str:
+        ticks = sum(self.states.values())
+        if not ticks:
+            return "нет тиков"
+        states = ", ".join(f"{name} {count}" for name, count in sorted(self.states.items(), key=lambda item: -item[1]))
+        handlers = ", ".join(
+            f"{name} x{calls} {total / calls:.0f}/{peak:.0f}ms"
+            for name, (calls, total, peak) in sorted(self.handlers.items(), key=lambda item: -item[1][1])
+        )
+        return (
+            f"экраны: {states} (классификация {self.classify_ms / ticks:.2f}ms); "
+            f"обработчики (ср/макс): {handlers or 'нет'}"
+        )
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import time
 import logging
-from typing import Tuple
+from typing import Callable, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +80,8 @@ class GameScroller:
         step_delay_fast: float = 0.008,
         step_delay_smooth: float = 0.014,
         steps_smooth: int = 50,
+        on_action: Optional[Callable[[], None]] = None,
+        settle: Optional[Callable[[str, float], float]] = None,
     ):
         self.game_x = game_x
         self.game_y = game_y
@@ -89,14 +91,29 @@ class GameScroller:
         self.step_delay_smooth = step_delay_smooth
         self.steps_smooth = max(10, steps_smooth)
         self._center_x = game_x + game_w // 2
+        # Вызывается после каждого драга (InputController.note_action → кэш кадров устарел)
+        self.on_action = on_action
+        # settle(label, max_wait) → сколько ждали: пока контент не остановится (VisionSystem.wait_until_stable)
+        self.settle = settle
+
+    def _after_drag(self, label: str, settle: Optional[float]) -> None:
+        if self.on_action:
+            self.on_action()
+        if not settle:
+            return
+        if self.settle is not None:
+            self.settle(label, settle)
+        else:
+            time.sleep(settle)
 
     def _clamp_y(self, y: int) -> int:
         return max(self.game_y, min(y, self.game_y + self.game_h - 1))
 
-    def drag_up(self, distance: int, fast: bool = True) -> None:
+    def drag_up(self, distance: int, fast: bool = True, settle: Optional[float] = None) -> None:
         """
         Палец ВВЕРХ: контент уезжает вниз → видим НИЖНЮЮ часть списка (скролл вниз).
         Used for: step-down scan, idle scroll down.
+        settle: после драга ждать остановки контента, не дольше ~settle сек (без settle-колбэка — sleep).
         """
         if not QUARTZ_AVAILABLE:
             logger.warning("Quartz not available, drag_up skipped")
@@ -112,11 +129,13 @@ class GameScroller:
         ))
         _post_drag_segment(points, delay)
         logger.debug(f"Quartz drag_up {distance}px (fast={fast})")
+        self._after_drag("drag_up", settle)
 
-    def drag_down(self, distance: int, smooth: bool = True) -> None:
+    def drag_down(self, distance: int, smooth: bool = True, settle: Optional[float] = None) -> None:
         """
         Палец ВНИЗ: контент уезжает вверх → видим ВЕРХНЮЮ часть списка (скролл вверх).
         Used for: fly to top, small swipe up at bottom.
+        settle: как в drag_up.
         """
         if not QUARTZ_AVAILABLE:
             logger.warning("Quartz not available, drag_down skipped")
@@ -131,6 +150,7 @@ class GameScroller:
         ))
         _post_drag_segment(points, delay)
         logger.debug(f"Quartz drag_down {distance}px (smooth={smooth})")
+        self._after_drag("drag_down", settle)
 
     @staticmethod
     def is_available() -> bool:
@@ -0,0 +1,118 @@
+"""
+EatventureBot V3 - Scroll Tracker
+Actual vertical content shift between two frames (cv2.phaseCorrelate).
+
+"% changed pixels" can't tell a scroll from walking customers: at the edge
+the level does not move but animations still change 5-15% of the screen.
+Phase correlation on a downsampled gray strip (static UI bands cut off)
+measures the global shift itself: a drag that moved the content by ~0 px
+means the edge is reached, no confirmation swipes needed.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ScrollShift:
+    """
+    Content shift between two frames, game px (frame px / frame_scale).
+    dy > 0: content moved DOWN on screen (view went towards the top of the level),
+    dy < 0: content moved UP (view went towards the bottom).
+    """
+    dx: float
+    dy: float
+    response: float  # пик фазовой корреляции 0..1 (ниже min_response — кадры не сопоставимы)
+    reliable: bool
+
+
+class ScrollTracker:
+    """
+    Args:
+        scale: Downsampling of the strip (0.25 = 1/4 resolution)
+        ui_top, ui_bottom: Static UI bands (fraction of height) excluded from the strip
+        margin_x: Side margins excluded (fraction of width)
+        min_response: Below this correlation peak the shift is not trusted
+        edge_px: |dy| below this (game px) = content did not move
+    """
+
+    def __init__(
+        self,
+        scale: float = 0.25,
+        ui_top: float = 0.12,
+        ui_bottom: float = 0.15,
+        margin_x: float = 0.05,
+        min_response: float = 0.05,
+        edge_px: float = 4.0,
+    ):
+        self.scale = scale
+        self.ui_top = ui_top
+        self.ui_bottom = ui_bottom
+        self.margin_x = margin_x
+        self.min_response = min_response
+        self.edge_px = edge_px
+        self.frame_scale = 1.0  # frame px per game px (VisionSystem.scale_y, Retina = 2)
+        self._window: Optional[np.ndarray] = None
+        # Запрошенная дистанция драга → измеренные сдвиги (для логов и подбора SCROLL_STEP_DOWN_DISTANCE)
+        self.drag_history: Dict[int, List[float]] = {}
+
+    def _strip(self, frame: np.ndarray) -> np.ndarray:
+        """Gray, downsampled content strip as float32."""
+        h, w = frame.shape[:2]
+        y1, y2 = int(h * self.ui_top), int(h * (1.0 - self.ui_bottom))
+        x1, x2 = int(w * self.margin_x), int(w * (1.0 - self.margin_x))
+        crop = frame[y1:y2, x1:x2]
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        size = (max(8, int(crop.shape[1] * self.scale)), max(8, int(crop.shape[0] * self.scale)))
+        small = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        return small.astype(np.float32)
+
+    def _hanning(self, shape: Tuple[int, int]) -> np.ndarray:
+        if self._window is None or self._window.shape != shape:
+            self._window = cv2.createHanningWindow((shape[1], shape[0]), cv2.CV_32F)
+        return self._window
+
+    def measure(self, prev: np.ndarray, new: np.ndarray) -> ScrollShift:
+        """Shift of the content from `prev` to `new` (frames of the same size)."""
+        if prev.shape != new.shape:
+            return ScrollShift(0.0, 0.0, 0.0, False)
+        a, b = self._strip(prev), self._strip(new)
+        (dx, dy), response = cv2.phaseCorrelate(a, b, self._hanning(a.shape))
+        factor = self.scale * self.frame_scale
+        return ScrollShift(
+            dx=float(dx) / factor,
+            dy=float(dy) / factor,
+            response=float(response),
+            reliable=response >= self.min_response,
+        )
+
+    def is_edge(self, shift: ScrollShift) -> bool:
+        """The drag did not move the content (top/bottom of the level reached)."""
+        return shift.reliable and abs(shift.dy) < self.edge_px
+
+    def record_drag(self, requested_px: int, shift: ScrollShift, direction: int) -> None:
+        """
+        Remember how far a drag of `requested_px` actually scrolled (edges excluded).
+        direction: +1 drag towards the top of the level (content moves down), -1 towards the bottom.
+        """
+        if shift.reliable and not self.is_edge(shift) and shift.dy * direction > 0:
+            history = self.drag_history.setdefault(int(requested_px), [])
+            history.append(abs(shift.dy))
+            del history[:-50]
+
+    def drag_summary(self) -> Dict[int, Tuple[int, float]]:
+        """{requested px: (drags, median scrolled px)}."""
+        return {
+            requested: (len(values), float(np.median(values)))
+            for requested, values in sorted(self.drag_history.items())
+            if values
+        }
+
+    def scroll_ratio(self) -> float:
+        """Median scrolled px per requested drag px (1.0 until there is data)."""
+        ratios = [v / requested for requested, values in self.drag_history.items() if requested > 0 for v in values]
+        return float(np.median(ratios)) if ratios else 1.0
@@ -8,7 +8,8 @@ import logging
 from typing import List, Tuple
 import math
 
-from config import TIMERS
+from config import TIMERS, PANORAMA, SCROLL_TRACKER
+from core.panorama import LevelPanorama
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +96,14 @@ class BotState:
     def __init__(self):
         self.running = True
         self.spatial_memory = SpatialMemory()
+        # Панорама текущего уровня: станции/стрелки/боксы в мировых координатах
+        self.panorama = LevelPanorama(
+            scale=float(PANORAMA.get("SCALE", 0.25)),
+            ui_top=float(SCROLL_TRACKER.get("UI_TOP", 0.12)),
+            ui_bottom=float(SCROLL_TRACKER.get("UI_BOTTOM", 0.15)),
+            merge_px=int(PANORAMA.get("MERGE_PX", 50)),
+            min_localize_score=float(PANORAMA.get("MIN_LOCALIZE_SCORE", 0.6)),
+        )
         self.current_level = 1
         self.camp_loop_count = 0
         self.total_upgrades = 0
@@ -116,6 +125,7 @@ class BotState:
         """Handle level change event."""
         self.current_level += 1
         self.spatial_memory.clear()
+        self.panorama.reset()  # новый уровень — панорама строится заново при следующем проходе
         self.camp_loop_count = 0
         logger.info(f"Level changed to {self.current_level}")
     
@@ -0,0 +1,209 @@
+"""
+EatventureBot V3 - Template Pack
+All images under assets/ (including ads/ and No/) decoded once into one
+memory-mapped array file.
+
+Layout (assets/.pack/, rebuilt automatically, not committed):
+    templates.npy  — flat uint8 blob with every decoded array (np.load(mmap_mode="r"))
+    index.json     — per image: source size/mtime, sha1 of the file, and
+                     {variant: [offset, shape]} for "bgr", "gray" and "bgr@0.5"
+
+.npz is a zip and can't be memory-mapped, so arrays live in one .npy blob and
+are returned as read-only views into it. At startup only index.json is parsed
+and the source files are stat()-ed; PNG decoding happens only when a source
+file was added, removed or its content (sha1) changed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PACK_VERSION = 1
+PACK_DIR_NAME = ".pack"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+# Выравнивание массивов в блобе (SIMD-загрузки OpenCV)
+ALIGN = 64
+
+
+def _file_sha1(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _variants(image: np.ndarray) -> Dict[str, np.ndarray]:
+    """Decoded forms stored for one image."""
+    h, w = image.shape[:2]
+    variants = {
+        "bgr": image,
+        "gray": cv2.cvtColor(image, cv2.COLOR_BGR2GRAY),
+    }
+    if h >= 2 and w >= 2:
+        variants["bgr@0.5"] = cv2.resize(image, (w // 2, h // 2), interpolation=cv2.INTER_AREA)
+    return variants
+
+
+class TemplatePack:
+    """
+    Decoded images of an assets directory, keyed by path relative to it
+    ("btn_buy.png", "ads/ad1.png", "No/Burger.png").
+    """
+
+    def __init__(self, assets_dir: str, pack_dir: Optional[str] = None):
+        self.assets_dir = os.path.abspath(assets_dir)
+        self.pack_dir = pack_dir or os.path.join(self.assets_dir, PACK_DIR_NAME)
+        self.blob_path = os.path.join(self.pack_dir, "templates.npy")
+        self.index_path = os.path.join(self.pack_dir, "index.json")
+        self.entries: Dict[str, dict] = {}
+        self._blob: Optional[np.ndarray] = None
+        self.stats = {"built": 0, "rehashed": 0, "load_ms": 0.0}
+
+    # ----- sources -----
+
+    def _scan_sources(self) -> Dict[str, Tuple[int, int]]:
+        """{relpath: (size, mtime_ns)} for every image under assets_dir (pack dir skipped)."""
+        sources = {}
+        for root, dirs, files in os.walk(self.assets_dir):
+            dirs[:] = sorted(d for d in dirs if d != PACK_DIR_NAME and not d.startswith("."))
+            for fn in sorted(files):
+                if not fn.lower().endswith(IMAGE_EXTS):
+                    continue
+                path = os.path.join(root, fn)
+                rel = os.path.relpath(path, self.assets_dir).replace(os.sep, "/")
+                st = os.stat(path)
+                sources[rel] = (st.st_size, st.st_mtime_ns)
+        return sources
+
+    # ----- load / build -----
+
+    def load(self, rebuild: bool = False) -> "TemplatePack":
+        """Map the pack, rebuilding it first if any source image changed."""
+        started = time.perf_counter()
+        sources = self._scan_sources()
+        index = None if rebuild else self._read_index()
+        if index is None or not self._up_to_date(index, sources):
+            index = self.build(sources)
+        self.entries = index["entries"]
+        self._blob = np.load(self.blob_path, mmap_mode="r") if self.entries else np.empty(0, np.uint8)
+        self.stats["load_ms"] = (time.perf_counter() - started) * 1000.0
+        logger.debug(f"Template pack: {len(self.entries)} images, {self.stats['load_ms']:.1f}ms")
+        return self
+
+    def _read_index(self) -> Optional[dict]:
+        if not (os.path.isfile(self.index_path) and os.path.isfile(self.blob_path)):
+            return None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except Exception as e:
+            logger.warning(f"Template pack: не удалось прочитать {self.index_path}: {e}")
+            return None
+        if index.get("version") != PACK_VERSION:
+            return None
+        return index
+
+    def _up_to_date(self, index: dict, sources: Dict[str, Tuple[int, int]]) -> bool:
+        """
+        True if the pack matches the sources. A file with a new mtime but the same
+        sha1 (git checkout, touch) only refreshes the stored mtime, no rebuild.
+        """
+        entries = index.get("entries", {})
+        if set(entries) != set(sources):
+            return False
+        touched = False
+        for rel, (size, mtime_ns) in sources.items():
+            entry = entries[rel]
+            if entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+                continue
+            if _file_sha1(os.path.join(self.assets_dir, rel)) != entry["sha1"]:
+                return False
+            entry["size"], entry["mtime_ns"] = size, mtime_ns
+            touched = True
+            self.stats["rehashed"] += 1
+        if touched:
+            self._write_index(index)
+        return True
+
+    def build(self, sources: Optional[Dict[str, Tuple[int, int]]] = None) -> dict:
+        """Decode every source image and write templates.npy + index.json."""
+        if sources is None:
+            sources = self._scan_sources()
+        entries: Dict[str, dict] = {}
+        chunks: List[np.ndarray] = []
+        offset = 0
+        for rel, (size, mtime_ns) in sources.items():
+            path = os.path.join(self.assets_dir, rel)
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is None:
+                logger.warning(f"Template pack: не удалось декодировать {rel}")
+                continue
+            layout = {}
+            for variant, array in _variants(image).items():
+                pad = (-offset) % ALIGN
+                if pad:
+                    chunks.append(np.zeros(pad, np.uint8))
+                    offset += pad
+                data = np.ascontiguousarray(array).reshape(-1)
+                chunks.append(data)
+                layout[variant] = [offset, list(array.shape)]
+                offset += data.size
+            entries[rel] = {
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "sha1": _file_sha1(path),
+                "shape": list(image.shape),
+                "variants": layout,
+            }
+
+        os.makedirs(self.pack_dir, exist_ok=True)
+        blob = np.concatenate(chunks) if chunks else np.empty(0, np.uint8)
+        # Атомарная замена: бот, уже отобразивший старый блоб, продолжает его читать
+        tmp_blob = self.blob_path + ".tmp.npy"
+        np.save(tmp_blob, blob)
+        os.replace(tmp_blob, self.blob_path)
+        index = {"version": PACK_VERSION, "entries": entries}
+        self._write_index(index)
+        self.stats["built"] += 1
+        logger.info(f"✓ Template pack собран: {len(entries)} картинок, {blob.nbytes / 1024:.0f} KB ({self.pack_dir})")
+        return index
+
+    def _write_index(self, index: dict) -> None:
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    # ----- access -----
+
+    def relpath(self, path: str) -> Optional[str]:
+        """Key for a file path (absolute or relative to cwd), or None if outside assets_dir."""
+        rel = os.path.relpath(os.path.abspath(path), self.assets_dir)
+        if rel.startswith(".."):
+            return None
+        return rel.replace(os.sep, "/")
+
+    def __contains__(self, rel: str) -> bool:
+        return rel in self.entries
+
+    def get(self, rel: str, variant: str = "bgr") -> Optional[np.ndarray]:
+        """Read-only view of a decoded image, or None if not in the pack."""
+        entry = self.entries.get(rel)
+        if entry is None or self._blob is None:
+            return None
+        layout = entry["variants"].get(variant)
+        if layout is None:
+            return None
+        offset, shape = layout
+        count = int(np.prod(shape))
+        return np.asarray(self._blob[offset:offset + count]).reshape(shape)
+
+    def get_path(self, path: str, variant: str = "bgr") -> Optional[np.ndarray]:
+        rel = self.relpath(path)
+        return self.get(rel, variant) if rel is not None else None
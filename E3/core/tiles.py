@@ -0,0 +1,140 @@
+"""
+EatventureBot V3 - Tile Change Gating
+Tracks which parts of the game screen changed, so detect_all() re-matches only there.
+
+The frame is split into TILE x TILE tiles. Each tile is compared through a 1/8
+thumbnail (mean of 8x8 blocks) with the reference from the last time it changed.
+Every change gets a serial; a cached detection computed at serial S is still
+valid for every tile whose last change is <= S.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Пикселей кадра на пиксель миниатюры (блок усреднения)
+THUMB_BLOCK = 8
+
+
+class TileChangeGate:
+    """
+    Per-tile change serials for consecutive frames.
+
+    Call update(frame) once per frame, then dirty_rects(serial, area, template_wh)
+    for each cached detection. reset() after any click/drag: the camera or UI may
+    have moved, nothing cached can be trusted.
+    """
+
+    def __init__(self, tile: int = 32, diff_threshold: float = 6.0):
+        # Тайл кратен блоку миниатюры, чтобы границы совпадали точно
+        self.tile = max(THUMB_BLOCK, (tile // THUMB_BLOCK) * THUMB_BLOCK)
+        self.diff_threshold = diff_threshold
+        self.serial = 0
+        self._reference: Optional[np.ndarray] = None  # миниатюра (последние изменения по тайлам)
+        self._changed_at: Optional[np.ndarray] = None  # serial последнего изменения тайла
+        self._shape: Optional[Tuple[int, ...]] = None
+        self.last_dirty_tiles = 0
+
+    def reset(self) -> None:
+        self._reference = None
+        self._changed_at = None
+        self._shape = None
+
+    @property
+    def ready(self) -> bool:
+        return self._reference is not None
+
+    @property
+    def shape(self) -> Optional[Tuple[int, ...]]:
+        """Shape of the frames the reference was built from."""
+        return self._shape
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        """Frame padded to whole tiles and averaged over THUMB_BLOCK x THUMB_BLOCK blocks."""
+        h, w = frame.shape[:2]
+        pad_y = (-h) % self.tile
+        pad_x = (-w) % self.tile
+        if pad_y or pad_x:
+            frame = cv2.copyMakeBorder(frame, 0, pad_y, 0, pad_x, cv2.BORDER_REPLICATE)
+        ph, pw = frame.shape[:2]
+        # Целый коэффициент: INTER_AREA = точное среднее по блоку
+        return cv2.resize(frame, (pw // THUMB_BLOCK, ph // THUMB_BLOCK), interpolation=cv2.INTER_AREA)
+
+    def update(self, frame: np.ndarray) -> int:
+        """
+        Compare frame with the reference; tiles that changed get a new serial.
+        Returns the serial of this frame (cached results computed now carry it).
+        """
+        thumb = self._thumbnail(frame)
+        self.serial += 1
+        per_tile = self.tile // THUMB_BLOCK
+        tiles_y, tiles_x = thumb.shape[0] // per_tile, thumb.shape[1] // per_tile
+
+        if self._reference is None or self._shape != frame.shape:
+            # Первый кадр (или после сброса): всё "изменилось"
+            self._reference = thumb
+            self._changed_at = np.full((tiles_y, tiles_x), self.serial, dtype=np.int64)
+            self._shape = frame.shape
+            self.last_dirty_tiles = tiles_y * tiles_x
+            return self.serial
+
+        diff = cv2.absdiff(thumb, self._reference)
+        if diff.ndim == 3:
+            diff = diff.max(axis=2)
+        tile_diff = diff.reshape(tiles_y, per_tile, tiles_x, per_tile).max(axis=(1, 3))
+        dirty = tile_diff > self.diff_threshold
+        self.last_dirty_tiles = int(dirty.sum())
+        if self.last_dirty_tiles:
+            self._changed_at[dirty] = self.serial
+            # Эталон обновляем только в изменившихся тайлах: медленный дрейф накопится и сработает
+            mask = np.repeat(np.repeat(dirty, per_tile, axis=0), per_tile, axis=1)
+            self._reference[mask] = thumb[mask]
+        return self.serial
+
+    def dirty_rects(
+        self,
+        since_serial: int,
+        area: Tuple[int, int, int, int],
+        template_wh: Tuple[int, int],
+    ) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Regions to re-match for a detection cached at `since_serial`.
+
+        Args:
+            since_serial: Serial stored with the cached detection
+            area: Search area (x, y, w, h) in frame coordinates
+            template_wh: Template (width, height)
+
+        Returns:
+            [] if nothing changed inside the area (reuse the cache), otherwise
+            rectangles (x, y, w, h) in frame coordinates: changed tiles grown by the
+            template size on every side and clipped to the area. Any placement of the
+            template that touches a changed tile lies fully inside one of them.
+            None if the gate has no reference (cache can't be used).
+        """
+        if self._changed_at is None:
+            return None
+        ax, ay, aw, ah = area
+        tw, th = template_wh
+        t = self.tile
+        ty1, tx1 = ay // t, ax // t
+        ty2, tx2 = (ay + ah - 1) // t + 1, (ax + aw - 1) // t + 1
+        changed = self._changed_at[ty1:ty2, tx1:tx2] > since_serial
+        if not changed.any():
+            return []
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(changed.astype(np.uint8), connectivity=8)
+        rects = []
+        for i in range(1, count):
+            cx, cy, cw, ch = stats[i, :4]
+            x1 = max(ax, (tx1 + cx) * t - tw)
+            y1 = max(ay, (ty1 + cy) * t - th)
+            x2 = min(ax + aw, (tx1 + cx + cw) * t + tw)
+            y2 = min(ay + ah, (ty1 + cy + ch) * t + th)
+            if x2 - x1 >= tw and y2 - y1 >= th:
+                rects.append((x1, y1, x2 - x1, y2 - y1))
+        return rects
@@ -6,11 +6,21 @@ Template matching using OpenCV with native resolution (no scaling).
 import cv2
 import numpy as np
 import mss
-from typing import Optional, Tuple, List
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, Optional, Tuple, List, Mapping, NamedTuple, Sequence
 import os
+import time
 import logging
+import threading
+import itertools
 
-from config import GAME_REGION, THRESHOLDS, ASSETS_DIR, ASSETS
+from config import (
+    GAME_REGION, THRESHOLDS, ASSETS_DIR, ASSETS, TIMERS, PYRAMID_MATCHING, GRAY_MATCHING,
+    CAPTURE_SERVICE, TILE_GATING, MATCH_EXECUTOR, FFT_MATCHING, SETTLE, WAIT_FOR_ANY,
+    ANIMATION_MASK, FRAME_DIFF, SCREEN_SIGNATURES,
+)
 
 # Try to import zone configuration (optional, for backwards compatibility)
 try:
@@ -31,17 +41,175 @@ except ImportError:
         DANGER_RADIUS = 60
         ZONES_ENABLED = False
 
+from core.animation_mask import AnimationMask
+from core.frame_diff import FrameDiff
+from core.screen_signature import ScreenIndex, ScreenMatch
+from core.capture import CaptureService, Frame, FrameBufferPool, bgra_to_bgr
+from core.fft_match import MatchCostModel, SharedSpectrumMatcher
+from core.parallel import MatchExecutor
+from core.roi import ROILearner
+from core.template_pack import TemplatePack
+from core.tiles import TileChangeGate
+
 logger = logging.getLogger(__name__)
 
 
+class Match(NamedTuple):
+    """Single template hit: center (x, y) relative to GAME_REGION and its confidence."""
+    x: int
+    y: int
+    score: float
+
+
+@dataclass(frozen=True)
+class DetectionSpec:
+    """
+    One detector evaluated by VisionSystem.detect_all().
+
+    Attributes:
+        template: Name of the template (key in ASSETS)
+        name: Key under which results are stored (defaults to template)
+        region: (x, y, width, height) relative to game screenshot, or None for full frame
+        threshold: Confidence threshold (or None to use config default)
+        find_all: If True, keep all matches above threshold, otherwise only the best one
+        station_zone: If True, search only inside the Kitchen Floor crop
+    """
+    template: str
+    name: Optional[str] = None
+    region: Optional[Tuple[int, int, int, int]] = None
+    threshold: Optional[float] = None
+    find_all: bool = False
+    station_zone: bool = False
+
+    @property
+    def key(self) -> str:
+        return self.name or self.template
+
+
+@dataclass(frozen=True)
+class FrameDetections:
+    """
+    Immutable result of evaluating a batch of DetectionSpec on one frame.
+    All coordinates are centers relative to GAME_REGION.
+    """
+    shape: Tuple[int, ...]
+    matches: Mapping[str, Tuple[Match, ...]]
+    scores: Mapping[str, float]
+    elapsed_ms: float
+    frame_id: Optional[int] = None
+    captured_at: Optional[float] = None  # Frame.timestamp: time.monotonic() перед захватом
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.matches
+
+    def get(self, key: str, threshold: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """Best (first) match for key as (x, y), or None."""
+        hits = self.get_all(key, threshold=threshold)
+        return (hits[0][0], hits[0][1]) if hits else None
+
+    def get_all(self, key: str, threshold: Optional[float] = None) -> List[Tuple[int, int]]:
+        """All matches for key as [(x, y), ...], optionally re-filtered by a stricter threshold."""
+        return [
+            (m.x, m.y) for m in self.matches.get(key, ())
+            if threshold is None or m.score >= threshold
+        ]
+
+    def best_score(self, key: str) -> Optional[float]:
+        """Best raw confidence for key (even if below threshold), or None if not evaluated."""
+        return self.scores.get(key)
+
+
+@dataclass(frozen=True)
+class MatchResult:
+    """
+    One VisionSystem.match() pass: best score, peaks and (optionally) the score map.
+    Callers apply every threshold they need and log the best score from the same
+    result instead of matching the same pixels again.
+
+    Attributes:
+        template: Template name
+        score: Best raw confidence (even if below threshold)
+        threshold: Threshold the peaks were collected at (the lowest one the caller needs)
+        peaks: Matches >= threshold as centers in screenshot coordinates, best first
+            (at most one unless find_all)
+        score_map: Raw TM_CCOEFF_NORMED map of the searched area (return_map=True only);
+            map[y, x] is the template's top-left at (offset_x + x, offset_y + y)
+        offset: (x, y) of the searched area in the screenshot
+    """
+    template: str
+    score: float
+    threshold: float
+    peaks: Tuple[Match, ...] = ()
+    score_map: Optional[np.ndarray] = None
+    offset: Tuple[int, int] = (0, 0)
+
+    @property
+    def location(self) -> Optional[Tuple[int, int]]:
+        """Center of the best peak, or None if nothing passed the threshold."""
+        return (self.peaks[0].x, self.peaks[0].y) if self.peaks else None
+
+    def found(self, threshold: Optional[float] = None) -> bool:
+        """True if the best peak passes threshold (default: the collection threshold)."""
+        return bool(self.peaks) and (threshold is None or self.peaks[0].score >= threshold)
+
+    def points(self, threshold: Optional[float] = None) -> List[Tuple[int, int]]:
+        """Peak centers [(x, y), ...], optionally re-filtered by a stricter threshold."""
+        return [
+            (m.x, m.y) for m in self.peaks
+            if threshold is None or m.score >= threshold
+        ]
+
+
+class SettleResult(NamedTuple):
+    """
+    How VisionSystem.wait_until_stable() ended.
+
+    Attributes:
+        stable: ROI stopped changing (False: max_wait reached first)
+        waited: Seconds actually spent waiting
+        frames: Frames captured while waiting
+        frame: Last captured frame (None if the wait was a plain sleep)
+    """
+    stable: bool
+    waited: float
+    frames: int
+    frame: Optional[Frame] = None
+
+
+class WaitHit(NamedTuple):
+    """
+    First template found by VisionSystem.wait_for_any().
+
+    Attributes:
+        name: Template name (key of the targets mapping)
+        x, y: Center relative to GAME_REGION (screenshot px)
+        score: Confidence
+        latency: Seconds from the call to the frame the template was found in
+        frame: That frame
+    """
+    name: str
+    x: int
+    y: int
+    score: float
+    latency: float
+    frame: Frame
+
+
 class VisionSystem:
     """
     Handles all computer vision operations.
     Uses native resolution - no coordinate scaling.
     """
     
+    # _find_peaks: above this many candidates, prefilter with dilate (local maxima)
+    PEAK_DILATE_MIN_CANDIDATES = 64
+    
     def __init__(self):
-        self.sct = mss.mss()
+        # mss создаётся лениво при первом захвате: офлайн-инструменты (бенчмарки по
+        # сохранённым кадрам) могут использовать матчинг без доступа к дисплею.
+        # Свой инстанс на поток: X11/Windows-хэндлы mss привязаны к создавшему потоку
+        # (поток конвейера, core/pipeline.py, открывает его через capture_session()).
+        self._sct_local = threading.local()
         self.game_region = {
             "left": GAME_REGION[0],
             "top": GAME_REGION[1],
@@ -49,8 +217,126 @@ class VisionSystem:
             "height": GAME_REGION[3],
         }
         self.template_cache = {}
+        # name → путь в assets/ (ключ template pack)
+        self._template_files: Dict[str, str] = {}
+        self.template_pack: Optional[TemplatePack] = None
         self._load_templates()
 
+        # Coarse-to-fine: уменьшенные копии шаблонов {(name, factor): (template, phase score)}
+        self.pyramid_enabled: bool = bool(PYRAMID_MATCHING.get("ENABLED", False))
+        self._pyramid_cache: Dict[Tuple[str, int], Tuple[np.ndarray, float]] = {}
+
+        # Gray + color verify: одноканальные шаблоны, цветовые сигнатуры и
+        # одноканальные копии кадров/кропов текущего frame_id
+        self.gray_enabled: bool = bool(GRAY_MATCHING.get("ENABLED", False))
+        self._gray_templates: Dict[str, np.ndarray] = {}
+        self._color_signatures: Dict[str, Tuple[np.ndarray, bool]] = {}
+        self._gray_frames: Dict[Tuple[int, Tuple[int, ...]], np.ndarray] = {}
+        self._gray_frame_id: Optional[int] = None
+        # _gray_image зовут потоки пула detect_all (и поток конвейера)
+        self._gray_lock = threading.Lock()
+
+        # Обученные области поиска для UI-кнопок (learned_rois.json)
+        self.roi_learner = ROILearner()
+
+        # Tile gating: кэш результатов detect_all по спекам + серийники изменений тайлов.
+        # {(template, x1, y1, crop shape, threshold, find_all): (serial, best score, matches)}
+        self.tile_gating_enabled: bool = bool(TILE_GATING.get("ENABLED", True))
+        self.tile_gate = TileChangeGate(
+            tile=int(TILE_GATING.get("TILE", 32)),
+            diff_threshold=float(TILE_GATING.get("DIFF_THRESHOLD", 6.0)),
+        )
+        self.max_dirty_fraction: float = float(TILE_GATING.get("MAX_DIRTY_FRACTION", 0.6))
+        self._detection_cache: Dict[tuple, Tuple[int, float, List[Match]]] = {}
+        self._gated_frame_id: Optional[int] = None
+        self.tile_stats = {"reused": 0, "partial": 0, "full": 0}
+        self._stats_lock = threading.Lock()
+
+        # Общий пул потоков для независимых задач матчинга (detect_all)
+        self.executor = MatchExecutor(
+            workers=MATCH_EXECUTOR.get("WORKERS") if MATCH_EXECUTOR.get("ENABLED", True) else 1,
+            cv_threads=MATCH_EXECUTOR.get("CV_THREADS"),
+            min_jobs=int(MATCH_EXECUTOR.get("MIN_JOBS", 2)),
+        )
+
+        # Общий спектр картинки для нескольких шаблонов одного detect_all
+        self.fft_enabled: bool = bool(FFT_MATCHING.get("ENABLED", True))
+        self.fft = SharedSpectrumMatcher(
+            cost=MatchCostModel(
+                direct_base=float(FFT_MATCHING.get("COST_DIRECT_BASE_NS", 143.0)),
+                direct_per_side=float(FFT_MATCHING.get("COST_DIRECT_PER_SIDE_NS", 3.0)),
+                spectrum=float(FFT_MATCHING.get("COST_SPECTRUM_NS", 10.0)),
+                per_template=float(FFT_MATCHING.get("COST_PER_TEMPLATE_NS", 40.0)),
+            ),
+            max_cached_templates=int(FFT_MATCHING.get("MAX_CACHED_TEMPLATES", 256)),
+        )
+
+        # Кэш последнего кадра: вызовы с screenshot=None берут кадр не старше
+        # frame_max_age_ms, пока InputController не сообщил о клике/драге.
+        # Кадры с frame_id < _stale_before_id сняты ДО последнего действия мышью.
+        self.frame_max_age_ms: float = float(TIMERS.get("FRAME_MAX_AGE_MS", 150.0))
+        # frame_id выдаются под локом: кадры приходят и из фонового потока захвата
+        self._frame_id_lock = threading.Lock()
+        # detect_all из разных потоков (главный цикл, поток конвейера) — по очереди.
+        # Клики сбрасывают кэш детекций без этого лока: reset_tile_gate() только меняет
+        # поколение, а очистку делает следующий detect_all (_gate_frame)
+        self._detect_lock = threading.RLock()
+        self._generations = itertools.count(1)
+        self._gate_generation: int = 0
+        self._applied_generation: int = 0
+        # Пул буферов кадров, _last_frame, FrameDiff и маска анимаций — из главного
+        # потока и потока конвейера
+        self._capture_lock = threading.Lock()
+        self._next_frame_id: int = 1
+        self._stale_before_id: int = 1
+        self._last_frame: Optional[Frame] = None
+        self.frame_stats = {"grabs": 0, "reused": 0, "service": 0}
+
+        # Ожидание "экран устоялся" вместо фиксированных пауз + статистика по местам вызова
+        # {label: {"calls", "stable", "waited", "budget"}} (секунды суммарно)
+        self.settle_enabled: bool = bool(SETTLE.get("ENABLED", True))
+        self.settle_eps: float = float(SETTLE.get("EPS", 2.0))
+        self.settle_frames: int = max(1, int(SETTLE.get("STABLE_FRAMES", 2)))
+        self.settle_poll: float = float(SETTLE.get("POLL_INTERVAL", 0.03))
+        self.settle_min_wait: float = float(SETTLE.get("MIN_WAIT", 0.08))
+        self.settle_stats: Dict[str, Dict[str, float]] = {}
+        # Серая миниатюра каждого свежего кадра (кэш) — для всех сравнений кадров
+        self.frame_diff = FrameDiff(
+            scale=float(FRAME_DIFF.get("SCALE", 0.25)),
+            pixel_threshold=int(FRAME_DIFF.get("PIXEL_THRESHOLD", 30)),
+            cache_size=int(FRAME_DIFF.get("CACHE_SIZE", 8)),
+        )
+        # Маска анимированных пикселей: учится на каждом свежем кадре capture_screen()
+        self.animation_mask: Optional[AnimationMask] = None
+        if ANIMATION_MASK.get("ENABLED", True):
+            self.animation_mask = AnimationMask(
+                thumbs=self.frame_diff,
+                alpha=float(ANIMATION_MASK.get("ALPHA", 0.05)),
+                pixel_threshold=int(ANIMATION_MASK.get("PIXEL_THRESHOLD", 20)),
+                std_threshold=float(ANIMATION_MASK.get("STD_THRESHOLD", 6.0)),
+                min_frames=int(ANIMATION_MASK.get("MIN_FRAMES", 6)),
+                max_learn_change=float(ANIMATION_MASK.get("MAX_LEARN_CHANGE", 0.3)),
+            )
+        # Какой экран — по хэшам стабильных областей (screen_signatures.json рядом с config.py)
+        self.screen_index: Optional[ScreenIndex] = None
+        if SCREEN_SIGNATURES.get("ENABLED", True):
+            self.screen_index = ScreenIndex(
+                thumbs=self.frame_diff,
+                hash_kind=str(SCREEN_SIGNATURES.get("HASH", "dhash")),
+                max_distance=int(SCREEN_SIGNATURES.get("MAX_DISTANCE", 10)),
+                max_mean_diff=float(SCREEN_SIGNATURES.get("MAX_MEAN_DIFF", 25.0)),
+            )
+        self._screen: Tuple[Optional[int], Optional[ScreenMatch]] = (None, None)
+        self.screen_stats: Dict[str, int] = {}
+        # wait_for_any: кадры без изменений в областях шаблонов не матчим
+        self.wait_poll: float = float(WAIT_FOR_ANY.get("POLL_INTERVAL", 0.03))
+        self.wait_change_threshold: float = float(WAIT_FOR_ANY.get("CHANGE_THRESHOLD", 12))
+        self.wait_reevaluate: float = float(WAIT_FOR_ANY.get("REEVALUATE_EVERY", 1.0))
+        # Предвыделенные BGR-буферы для захвата (без np.array + новой BGR-копии на каждый grab)
+        self._capture_buffers = FrameBufferPool()
+        # Фоновый захват (CAPTURE_SERVICE), запускается из run.py
+        self.capture_service: Optional[CaptureService] = None
+
         # DPI scaling (Retina): по умолчанию считаем масштаб 1.0.
         # При первом захвате экрана автоматически определим масштаб по отношению
         # к GAME_REGION, чтобы можно было корректно переводить координаты в InputController.
@@ -70,18 +356,24 @@ class VisionSystem:
             logger.warning("   Run 'python tools/setup_zones.py' to configure safe zones")
     
     def _load_templates(self) -> None:
-        """Load all template images into memory."""
+        """Load all template images (memory-mapped from the template pack, see core/template_pack.py)."""
         missing_templates = []
+        try:
+            self.template_pack = TemplatePack(ASSETS_DIR).load()
+        except Exception as e:
+            # Нет прав на запись рядом с assets/ и т.п. — читаем PNG напрямую
+            logger.warning(f"Template pack недоступен ({e}) — загрузка через cv2.imread")
+            self.template_pack = None
         
         for name, filename in ASSETS.items():
             path = os.path.join(ASSETS_DIR, filename)
-            if os.path.exists(path):
-                template = cv2.imread(path, cv2.IMREAD_COLOR)
-                if template is not None:
-                    self.template_cache[name] = template
-                    logger.debug(f"Loaded template: {name} ({template.shape})")
-                else:
-                    missing_templates.append(f"{name} (failed to load)")
+            template = self.load_image(path)
+            if template is not None:
+                self.template_cache[name] = template
+                self._template_files[name] = filename
+                logger.debug(f"Loaded template: {name} ({template.shape})")
+            elif os.path.exists(path):
+                missing_templates.append(f"{name} (failed to load)")
             else:
                 missing_templates.append(f"{name} ({filename} not found)")
         
@@ -91,44 +383,454 @@ class VisionSystem:
         if missing_templates:
             logger.warning(f"⚠️  Missing templates (will be skipped): {', '.join(missing_templates)}")
     
-    def capture_screen(self) -> np.ndarray:
+    def load_image(self, path: str, variant: str = "bgr") -> Optional[np.ndarray]:
         """
-        Capture the game region of the screen.
-        Returns BGR image (OpenCV format).
+        Decoded image by file path: a read-only view into the template pack for files
+        under assets/ (no disk read), cv2.imread for anything else. None if unreadable.
+        """
+        if self.template_pack is not None:
+            image = self.template_pack.get_path(path, variant)
+            if image is not None:
+                return image
+        if not os.path.isfile(path):
+            return None
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None and variant == "gray":
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+    
+    def invalidate_frame_cache(self) -> None:
+        """
+        Mark every frame captured so far as stale (called after each input action).
+        The next capture_screen(max_age_ms=...) grabs a fresh frame.
+        """
+        with self._frame_id_lock:
+            self._stale_before_id = self._next_frame_id
+        # Камера/UI могли сдвинуться — кэш детекций и эталон тайлов больше не годятся
+        self.reset_tile_gate()
+    
+    def reset_tile_gate(self) -> None:
+        """
+        Drop cached detect_all results and the tile reference. Lock-free (called from
+        the input thread on every click): the next detect_all does the actual clearing.
         """
+        self._gate_generation = next(self._generations)
+
+    def _clear_tile_gate(self) -> None:
+        """Actually clear the tile gate and the detection cache (detect_all thread, under _detect_lock)."""
+        self._applied_generation = self._gate_generation
+        self.tile_gate.reset()
+        self._detection_cache.clear()
+        self._gated_frame_id = None
+
+    @contextmanager
+    def capture_session(self):
+        """
+        Own mss session for the current thread (worker threads: grab inside the with-block,
+        the session is closed when it ends). Nested / repeated use in one thread is fine.
+        """
+        if getattr(self._sct_local, "sct", None) is not None:
+            yield
+            return
+        self._sct_local.sct = mss.mss()
         try:
-            screenshot = self.sct.grab(self.game_region)
-            # Convert from BGRA to BGR
-            img = np.array(screenshot)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+            yield
+        finally:
+            sct, self._sct_local.sct = self._sct_local.sct, None
+            try:
+                sct.close()
+            except Exception as e:
+                logger.debug(f"mss close: {e}")
 
-            # Инициализируем масштаб DPI (Retina) один раз.
-            if not self._scale_initialized:
-                try:
-                    expected_w = GAME_REGION[2]
-                    expected_h = GAME_REGION[3]
-                    if expected_w > 0 and expected_h > 0:
-                        self.scale_x = img.shape[1] / float(expected_w)
-                        self.scale_y = img.shape[0] / float(expected_h)
-                        if (
-                            abs(self.scale_x - 1.0) > 0.01
-                            or abs(self.scale_y - 1.0) > 0.01
-                        ):
-                            logger.info(
-                                f"DPI scaling detected: scale_x={self.scale_x:.2f}, scale_y={self.scale_y:.2f}"
-                            )
-                        else:
-                            logger.debug("DPI scaling: scale_x≈1.0, scale_y≈1.0 (no scaling)")
-                    self._scale_initialized = True
-                except Exception as e:
-                    logger.debug(f"DPI scale init failed: {e}")
-                    self._scale_initialized = True
-
-            return img
+    def _grabber(self):
+        """mss instance of the current thread (created on first use)."""
+        sct = getattr(self._sct_local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._sct_local.sct = sct
+        return sct
+    
+    def _new_frame_id(self) -> int:
+        """Allocate the next frame id (thread-safe: main thread and capture service)."""
+        with self._frame_id_lock:
+            frame_id = self._next_frame_id
+            self._next_frame_id += 1
+            return frame_id
+    
+    def start_capture_service(self) -> bool:
+        """
+        Start the background capture thread (CAPTURE_SERVICE["ENABLED"]).
+        Afterwards capture_screen() reads frames from its ring buffer instead of
+        grabbing synchronously. Returns True if the service is running.
+        """
+        if not CAPTURE_SERVICE.get("ENABLED", False):
+            return False
+        if self.capture_service is None:
+            self.capture_service = CaptureService(
+                self.game_region,
+                self._new_frame_id,
+                fps=float(CAPTURE_SERVICE.get("FPS", 20.0)),
+                ring_size=int(CAPTURE_SERVICE.get("RING_SIZE", 4)),
+                on_frame=self._init_dpi_scale,
+            )
+        self.capture_service.start()
+        return True
+    
+    def stop_capture_service(self) -> None:
+        if self.capture_service is not None:
+            self.capture_service.stop()
+    
+    def _frame_from_service(self, max_age_ms: Optional[float]) -> Optional[Frame]:
+        """
+        Frame from the background capture service, or None (not running / timeout).
+        With max_age_ms: newest frame if it is young enough and not stale (no waiting).
+        Otherwise: wait for the first frame whose grab started after this call.
+        """
+        service = self.capture_service
+        if service is None or not service.running:
+            return None
+        if max_age_ms is not None:
+            frame = service.latest()
+            if frame is not None and not self.is_frame_stale(frame.frame_id) and frame.age_ms <= max_age_ms:
+                return frame
+        timeout = float(CAPTURE_SERVICE.get("WAIT_TIMEOUT", 0.5))
+        frame = service.wait_for_frame_after(time.monotonic(), timeout)
+        if frame is None:
+            logger.debug("Фоновый захват не дал кадр вовремя — синхронный grab")
+        return frame
+    
+    def capture_after(self, timestamp: float, timeout: Optional[float] = None) -> Frame:
+        """
+        First frame whose grab started after `timestamp` (time.monotonic()),
+        e.g. the first screen after a click. Without the capture service this is
+        a normal synchronous grab (which necessarily starts after `timestamp`).
+        """
+        service = self.capture_service
+        if service is not None and service.running:
+            if timeout is None:
+                timeout = float(CAPTURE_SERVICE.get("WAIT_TIMEOUT", 0.5))
+            frame = service.wait_for_frame_after(timestamp, timeout)
+            if frame is not None:
+                with self._capture_lock:
+                    self._last_frame = frame
+                self.frame_stats["service"] += 1
+                self._register_frame(frame)
+                return frame
+        return self.capture_screen()
+    
+    def _init_dpi_scale(self, img: np.ndarray) -> None:
+        """Инициализируем масштаб DPI (Retina) один раз — по первому снятому кадру."""
+        if self._scale_initialized:
+            return
+        try:
+            expected_w = GAME_REGION[2]
+            expected_h = GAME_REGION[3]
+            if expected_w > 0 and expected_h > 0:
+                self.scale_x = img.shape[1] / float(expected_w)
+                self.scale_y = img.shape[0] / float(expected_h)
+                if (
+                    abs(self.scale_x - 1.0) > 0.01
+                    or abs(self.scale_y - 1.0) > 0.01
+                ):
+                    logger.info(
+                        f"DPI scaling detected: scale_x={self.scale_x:.2f}, scale_y={self.scale_y:.2f}"
+                    )
+                else:
+                    logger.debug("DPI scaling: scale_x≈1.0, scale_y≈1.0 (no scaling)")
+            self._scale_initialized = True
+        except Exception as e:
+            logger.debug(f"DPI scale init failed: {e}")
+            self._scale_initialized = True
+    
+    def is_frame_stale(self, frame_id: Optional[int]) -> bool:
+        """True if an input action happened after the frame was captured."""
+        return frame_id is None or frame_id < self._stale_before_id
+    
+    def _cached_frame(self, max_age_ms: float) -> Optional[Frame]:
+        """Last frame if it is still valid and not older than max_age_ms."""
+        with self._capture_lock:
+            frame = self._last_frame
+        if frame is None or self.is_frame_stale(frame.frame_id):
+            return None
+        if frame.age_ms > max_age_ms:
+            return None
+        return frame
+    
+    def capture_screen(self, max_age_ms: Optional[float] = None) -> Frame:
+        """
+        Capture the game region of the screen.
+        Returns BGR image (OpenCV format) as a Frame with frame_id and timestamp.
+        
+        Args:
+            max_age_ms: If set, reuse the last frame when it is not older than this
+                and no input action happened since it was captured.
+                None = always grab a fresh frame.
+        
+        With the capture service running, frames come from its ring buffer
+        (a "fresh" frame = first one grabbed after this call); a synchronous
+        mss grab is the fallback.
+        """
+        if max_age_ms is not None:
+            cached = self._cached_frame(max_age_ms)
+            if cached is not None:
+                self.frame_stats["reused"] += 1
+                logger.debug(f"Reusing frame #{cached.frame_id} ({cached.age_ms:.0f}ms old)")
+                return cached
+        
+        frame = self._frame_from_service(max_age_ms)
+        if frame is not None:
+            with self._capture_lock:
+                self._last_frame = frame
+            self.frame_stats["service"] += 1
+            self._register_frame(frame)
+            return frame
+        
+        try:
+            started = time.monotonic()
+            frame_id = self._new_frame_id()
+            screenshot = self._grabber().grab(self.game_region)
+            # Convert from BGRA to BGR (zero-copy view of mss buffer → pooled BGR buffer).
+            # Под локом: пока Frame не создан, буфер пула выглядит свободным для другого потока
+            with self._capture_lock:
+                img = bgra_to_bgr(screenshot, self._capture_buffers)
+                frame = Frame(img, frame_id, started)
+                self._last_frame = frame
+            self._init_dpi_scale(img)
+            self.frame_stats["grabs"] += 1
+            self._register_frame(frame)
+            return frame
         except Exception as e:
             logger.error(f"Screen capture failed: {e}")
             raise
     
+    def _register_frame(self, frame: np.ndarray) -> None:
+        """Fresh frame → FrameDiff thumbnail, animation mask (learns only while the camera looks still)."""
+        with self._capture_lock:
+            self.frame_diff.refresh(frame)
+            if self.animation_mask is not None:
+                try:
+                    self.animation_mask.observe(frame)
+                except cv2.error as e:
+                    logger.debug(f"Animation mask: {e}")
+
+    def classify_screen(self, frame: Frame) -> Optional[ScreenMatch]:
+        """
+        Known screen of the frame (ScreenIndex), or None: unknown screen, empty index
+        or signatures disabled. Cached per frame_id.
+        """
+        if self.screen_index is None or not len(self.screen_index):
+            return None
+        frame_id = getattr(frame, "frame_id", None)
+        cached_id, cached = self._screen
+        if frame_id is not None and frame_id == cached_id:
+            return cached
+        screen = self.screen_index.classify(frame)
+        self._screen = (frame_id, screen)
+        key = screen.name if screen is not None else "unknown"
+        self.screen_stats[key] = self.screen_stats.get(key, 0) + 1
+        return screen
+
+    def _settle_thumb(self, frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Gray, downsampled ROI (x, y, width, height in screenshot px) for frame-to-frame diffs."""
+        return self.frame_diff.thumb(frame, roi)
+
+    def wait_until_stable(
+        self,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        max_wait: float = 1.0,
+        eps: Optional[float] = None,
+        stable_frames: Optional[int] = None,
+        min_wait: Optional[float] = None,
+        require_change: bool = False,
+        label: str = "settle",
+        baseline: Optional[float] = None,
+        reference: Optional[np.ndarray] = None,
+    ) -> SettleResult:
+        """
+        Wait until the ROI stops changing (instead of a fixed sleep after an action).
+
+        Polls fresh frames every SETTLE["POLL_INTERVAL"]; the ROI is compared as a
+        gray 1/4-size thumbnail (mean |diff|; only static pixels once the animation
+        mask is ready, walking customers never count). Returns as soon as `stable_frames`
+        consecutive comparisons stay below `eps`, or when max_wait is reached.
+
+        Args:
+            roi: (x, y, width, height) in screenshot px, None = whole frame
+            max_wait: Upper bound in seconds (the old fixed sleep)
+            eps: Mean abs diff (0-255) that still counts as "no change"
+            stable_frames: Consecutive calm comparisons needed
+            min_wait: Sleep before the first frame (the game needs a moment to react)
+            require_change: Only settle after the ROI changed at least once
+                (e.g. waiting for a screen to appear and finish animating)
+            label: Call site name for settle_stats
+            baseline: The fixed sleep this wait replaces (for the savings in settle_stats;
+                default max_wait). With require_change, a ROI that never changes is given
+                up on after baseline, not max_wait.
+            reference: settle_reference() taken BEFORE the action: with require_change the
+                change is measured against it, so a reaction finished before the first
+                frame (or no reaction) is recognized
+
+        The last frame becomes the cached frame, so a following
+        find_template()/capture_screen(max_age_ms=...) reuses it.
+        """
+        started = time.monotonic()
+        baseline = max_wait if baseline is None else baseline
+        if not self.settle_enabled:
+            time.sleep(baseline)
+            return self._record_settle(label, SettleResult(False, baseline, 0), baseline)
+
+        eps = self.settle_eps if eps is None else eps
+        stable_frames = self.settle_frames if stable_frames is None else max(1, stable_frames)
+        min_wait = self.settle_min_wait if min_wait is None else min_wait
+        deadline = started + max_wait
+        # Экран так и не отреагировал — ждём не дольше старой фиксированной паузы
+        no_change_deadline = started + min(baseline, max_wait)
+        if min_wait > 0:
+            time.sleep(min(min_wait, max_wait))
+
+        prev: Optional[np.ndarray] = None
+        static: Optional[np.ndarray] = None  # статичные пиксели ROI (без анимаций), если маска готова
+        frame: Optional[Frame] = None
+        changed = not require_change
+        calm = 0
+        frames = 0
+        stable = False
+        while True:
+            grab_started = time.monotonic()
+            frame = self.capture_screen()
+            frames += 1
+            thumb = self._settle_thumb(frame, roi)
+            if static is None and self.animation_mask is not None:
+                static = self.animation_mask.static_region(frame.shape, roi, (thumb.shape[1], thumb.shape[0]))
+            if not changed and reference is not None and reference.shape == thumb.shape:
+                # Сравнение с кадром ДО действия: реакция могла закончиться до первого кадра
+                if FrameDiff.thumb_mean_diff(thumb, reference, static) >= eps:
+                    changed = True
+            if prev is not None and prev.shape == thumb.shape:
+                diff = FrameDiff.thumb_mean_diff(thumb, prev, static)
+                if diff >= eps:
+                    changed = True
+                    calm = 0
+                elif changed:
+                    calm += 1
+                if calm >= stable_frames:
+                    stable = True
+                    break
+            prev = thumb
+            now = time.monotonic()
+            if now >= deadline or (not changed and now >= no_change_deadline):
+                break
+            time.sleep(max(0.0, min(self.settle_poll - (now - grab_started), deadline - now)))
+
+        result = SettleResult(stable, time.monotonic() - started, frames, frame)
+        logger.debug(
+            f"⏳ {label}: {'устоялось' if stable else 'лимит'} за {result.waited * 1000:.0f}ms "
+            f"(лимит {max_wait * 1000:.0f}ms, кадров {frames})"
+        )
+        return self._record_settle(label, result, baseline)
+
+    def settle_reference(self, roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        Thumbnail of the ROI as it is now — take it BEFORE an action and pass it to
+        wait_until_stable(require_change=True, reference=...). Reuses a recent frame.
+        """
+        frame = self.capture_screen(max_age_ms=self.frame_max_age_ms)
+        return self._settle_thumb(frame, roi).copy()
+
+    def _record_settle(self, label: str, result: SettleResult, baseline: float) -> SettleResult:
+        stats = self.settle_stats.setdefault(label, {"calls": 0, "stable": 0, "waited": 0.0, "budget": 0.0})
+        stats["calls"] += 1
+        stats["stable"] += int(result.stable)
+        stats["waited"] += result.waited
+        stats["budget"] += baseline
+        return result
+
+    def settle_report(self) -> str:
+        """Per call site: calls, average wait vs. the replaced fixed sleep, total time saved."""
+        parts = []
+        for label, s in sorted(self.settle_stats.items(), key=lambda item: -item[1]["budget"]):
+            calls = max(1, int(s["calls"]))
+            parts.append(
+                f"{label} x{int(s['calls'])}: {s['waited'] / calls * 1000:.0f}/{s['budget'] / calls * 1000:.0f}ms, "
+                f"устоялось {int(s['stable'])}"
+            )
+        saved = sum(s["budget"] - s["waited"] for s in self.settle_stats.values())
+        return f"сэкономлено {saved:.1f}s — " + "; ".join(parts) if parts else "нет ожиданий"
+
+    def wait_for_any(
+        self,
+        targets: Mapping[str, Optional[Tuple[int, int, int, int]]],
+        timeout: float,
+        accept: Optional[Callable[[str, Match], bool]] = None,
+        label: str = "wait",
+    ) -> Optional[WaitHit]:
+        """
+        Wait until any of several templates appears (instead of find_template + sleep polls).
+
+        Every new frame (capture rate: the capture service's next frame, or a grab every
+        WAIT_FOR_ANY["POLL_INTERVAL"]) is compared with the last EVALUATED one as a gray
+        1/4-size thumbnail of the searched areas; all templates are matched together in
+        one detect_all only when that max |diff| reaches CHANGE_THRESHOLD (and at least
+        every REEVALUATE_EVERY seconds, for slow fade-ins).
+
+        Args:
+            targets: {template name: (x, y, width, height) in screenshot px, or None = whole frame};
+                on several hits in one frame the first in this order wins
+            timeout: Seconds to wait
+            accept: Optional filter (name, Match) -> bool, e.g. to skip already clicked spots
+            label: For the debug log
+
+        Returns:
+            WaitHit (latency = seconds from the call to the frame of the hit), or None on timeout.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        specs = [DetectionSpec(name, region=roi) for name, roi in targets.items()]
+        rois = [roi for roi in targets.values()]
+        watch = None if any(roi is None for roi in rois) else (
+            min(r[0] for r in rois),
+            min(r[1] for r in rois),
+            max(r[0] + r[2] for r in rois) - min(r[0] for r in rois),
+            max(r[1] + r[3] for r in rois) - min(r[1] for r in rois),
+        )
+
+        evaluated: Optional[np.ndarray] = None
+        evaluated_at = 0.0
+        frames = 0
+        matched = 0
+        while True:
+            grab_started = time.monotonic()
+            frame = self.capture_screen()
+            frames += 1
+            thumb = self._settle_thumb(frame, watch)
+            changed = (
+                evaluated is None
+                or evaluated.shape != thumb.shape
+                or grab_started - evaluated_at >= self.wait_reevaluate
+                or float(cv2.norm(thumb, evaluated, cv2.NORM_INF)) >= self.wait_change_threshold
+            )
+            if changed:
+                evaluated, evaluated_at = thumb, grab_started
+                matched += 1
+                detections = self.detect_all(frame, specs)
+                for spec in specs:
+                    for hit in detections.matches.get(spec.key, ()):
+                        if accept is None or accept(spec.key, hit):
+                            latency = max(0.0, frame.timestamp - started)
+                            logger.debug(
+                                f"👀 {label}: '{spec.key}' at ({hit.x}, {hit.y}) через {latency * 1000:.0f}ms "
+                                f"(кадров {frames}, матчинг {matched})"
+                            )
+                            return WaitHit(spec.key, hit.x, hit.y, hit.score, latency, frame)
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if self.capture_service is None or not self.capture_service.running:
+                time.sleep(max(0.0, min(self.wait_poll - (now - grab_started), deadline - now)))
+
+        logger.debug(f"👀 {label}: ничего за {timeout:.1f}s (кадров {frames}, матчинг {matched})")
+        return None
+
     def find_template(
         self,
         template_name: str,
@@ -141,7 +843,7 @@ class VisionSystem:
         
         Args:
             template_name: Name of the template (key in ASSETS)
-            screenshot: Pre-captured screenshot (or None to capture fresh)
+            screenshot: Pre-captured screenshot (or None: last frame if younger than FRAME_MAX_AGE_MS, else fresh)
             threshold: Confidence threshold (or None to use config default)
             find_all: If True, return all matches above threshold
         
@@ -149,69 +851,104 @@ class VisionSystem:
             (x, y) center coordinates relative to GAME_REGION, or None if not found.
             If find_all=True, returns list of coordinates.
         """
-        if template_name not in self.template_cache:
-            # НЕ спамим WARNING каждый цикл - уже вывели при инициализации
+        result = self.match(template_name, screenshot=screenshot, threshold=threshold, find_all=find_all)
+        if result is None:
+            # Нет шаблона (НЕ спамим WARNING каждый цикл - уже вывели при инициализации) или ошибка матчинга
             return [] if find_all else None
         
-        template = self.template_cache[template_name]
+        if find_all:
+            # Local maxima above threshold, best first (peaks within 20px suppressed)
+            matches = result.points()
+            logger.debug(f"Found {len(matches)} matches for {template_name}")
+            return matches
         
-        if screenshot is None:
-            screenshot = self.capture_screen()
+        if result.location is not None:
+            logger.debug(
+                f"Found {template_name} at {result.location} "
+                f"with confidence {result.score:.3f}"
+            )
+        else:
+            logger.debug(
+                f"{template_name} not found "
+                f"(max confidence: {result.score:.3f}, threshold: {result.threshold:.3f})"
+            )
+        return result.location
+    
+    def match(
+        self,
+        template_name: str,
+        screenshot: Optional[np.ndarray] = None,
+        threshold: Optional[float] = None,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        find_all: bool = False,
+        return_map: bool = False,
+    ) -> Optional[MatchResult]:
+        """
+        Match a template once and return everything about it.
+        
+        Args:
+            template_name: Name of the template (key in ASSETS)
+            screenshot: Pre-captured screenshot (or None: last frame if younger than FRAME_MAX_AGE_MS, else fresh)
+            threshold: Lowest threshold the caller will apply (or None for config default);
+                stricter ones are applied later via found(thr) / points(thr)
+            region: (x, y, width, height) to search in, relative to screenshot (None = whole screenshot)
+            find_all: Keep all peaks (NMS 20px), not only the best one
+            return_map: Also return the raw score map. Computed with plain full-resolution
+                BGR matching (pyramid/gray/learned ROI are skipped so the map is exact).
         
-        # Get threshold
+        Returns:
+            MatchResult (centers relative to screenshot), or None if the template is
+            missing, the region is empty or matching failed.
+        """
+        template = self.template_cache.get(template_name)
+        if template is None:
+            return None
+        if screenshot is None:
+            screenshot = self.capture_screen(max_age_ms=self.frame_max_age_ms)
         if threshold is None:
             threshold = THRESHOLDS.get(template_name, THRESHOLDS["default"])
         
-        # Template matching
+        x1 = y1 = 0
+        crop = screenshot
+        if region is not None:
+            x, y, w, h = region
+            sh, sw = screenshot.shape[:2]
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(sw, x + w), min(sh, y + h)
+            if x2 <= x1 or y2 <= y1:
+                return None
+            crop = screenshot[y1:y2, x1:x2]
+        th, tw = template.shape[:2]
+        if crop.shape[0] < th or crop.shape[1] < tw:
+            return None
+        
+        score_map = None
         try:
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            
-            if find_all:
-                # Find all matches above threshold
-                locations = np.where(result >= threshold)
-                matches = []
-                
-                # Get template dimensions
-                h, w = template.shape[:2]
-                
-                # Convert to center coordinates
-                for pt in zip(*locations[::-1]):
-                    center_x = pt[0] + w // 2
-                    center_y = pt[1] + h // 2
-                    matches.append((center_x, center_y))
-                
-                # Remove duplicates (matches within 20px of each other)
-                matches = self._remove_duplicate_matches(matches, min_distance=20)
-                
-                logger.debug(f"Found {len(matches)} matches for {template_name}")
-                return matches
-            else:
-                # Find single best match
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                
-                if max_val >= threshold:
-                    # Get template dimensions
-                    h, w = template.shape[:2]
-                    
-                    # Calculate center coordinates
-                    center_x = max_loc[0] + w // 2
-                    center_y = max_loc[1] + h // 2
-                    
-                    logger.debug(
-                        f"Found {template_name} at ({center_x}, {center_y}) "
-                        f"with confidence {max_val:.3f}"
-                    )
-                    return (center_x, center_y)
+            if return_map:
+                score_map = cv2.matchTemplate(crop, template, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(score_map)
+                if find_all:
+                    found = self._find_peaks(score_map, threshold, min_distance=20)
+                elif max_val >= threshold:
+                    found = [Match(max_loc[0], max_loc[1], float(max_val))]
                 else:
-                    logger.debug(
-                        f"{template_name} not found "
-                        f"(max confidence: {max_val:.3f}, threshold: {threshold:.3f})"
-                    )
-                    return None
-        
+                    found = []
+            elif region is None and not find_all:
+                max_val, found = self._match_roi(crop, template_name, template, threshold)
+            else:
+                max_val, found = self._match(crop, template_name, template, threshold, find_all)
         except Exception as e:
             logger.error(f"Template matching failed for {template_name}: {e}")
-            return [] if find_all else None
+            return None
+        
+        return MatchResult(
+            template=template_name,
+            score=float(max_val),
+            threshold=float(threshold),
+            peaks=tuple(Match(x1 + m.x + tw // 2, y1 + m.y + th // 2, m.score) for m in found),
+            score_map=score_map,
+            offset=(x1, y1),
+        )
     
     def get_template_max_confidence(
         self,
@@ -225,15 +962,236 @@ class VisionSystem:
         if template_name not in self.template_cache:
             return None
         if screenshot is None:
-            screenshot = self.capture_screen()
+            screenshot = self.capture_screen(max_age_ms=self.frame_max_age_ms)
         template = self.template_cache[template_name]
         try:
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, _, _ = cv2.minMaxLoc(result)
+            max_val, _ = self._match(screenshot, template_name, template, 1.0, False)
             return float(max_val)
         except Exception:
             return None
     
+    def detect_all(
+        self,
+        frame: np.ndarray,
+        specs: Sequence[DetectionSpec],
+    ) -> FrameDetections:
+        """
+        Evaluate a batch of detectors on ONE frame.
+        
+        Replaces the per-handler waterfall (capture + match in every handler):
+        the caller grabs a single frame per tick and makes every decision from
+        the returned FrameDetections.
+        
+        Args:
+            frame: Full game screenshot (BGR)
+            specs: Detectors to evaluate
+        
+        Returns:
+            FrameDetections with matches and best raw score for every spec key.
+            Specs whose template is missing are simply absent from the result.
+        """
+        with self._detect_lock:
+            return self._detect_all(frame, specs)
+
+    def _detect_all(self, frame: np.ndarray, specs: Sequence[DetectionSpec]) -> FrameDetections:
+        started = time.perf_counter()
+        matches = {}
+        scores = {}
+        station_crop = None
+        serial = self._gate_frame(frame)
+        
+        # 1) Кропы и пороги — последовательно; 2) матчинг — в пуле потоков;
+        # 3) сборка результата в порядке specs (от порядка завершения не зависит)
+        jobs = []
+        for spec in specs:
+            template = self.template_cache.get(spec.template)
+            if template is None:
+                continue
+            
+            if spec.station_zone:
+                if station_crop is None:
+                    station_crop = self.capture_station_region(frame)
+                crop, (x1, y1) = station_crop
+            elif spec.region is not None:
+                x, y, w, h = spec.region
+                sh, sw = frame.shape[:2]
+                x1, y1 = max(0, x), max(0, y)
+                x2, y2 = min(sw, x + w), min(sh, y + h)
+                if x2 <= x1 or y2 <= y1:
+                    continue
+                crop = frame[y1:y2, x1:x2]
+            else:
+                crop, x1, y1 = frame, 0, 0
+            
+            th, tw = template.shape[:2]
+            if crop.shape[0] < th or crop.shape[1] < tw:
+                continue
+            
+            threshold = spec.threshold
+            if threshold is None:
+                threshold = THRESHOLDS.get(spec.template, THRESHOLDS["default"])
+            jobs.append((spec, crop, x1, y1, template, threshold))
+        
+        def run(job):
+            spec, crop, x1, y1, template, threshold = job
+            try:
+                if serial is not None:
+                    return self._match_gated(
+                        serial, crop, x1, y1, spec.template, template, threshold, spec.find_all,
+                        use_roi=crop is frame,
+                    )
+                if crop is frame and not spec.find_all:
+                    return self._match_roi(crop, spec.template, template, threshold)
+                return self._match(crop, spec.template, template, threshold, spec.find_all)
+            except Exception as e:
+                return e
+        
+        # Общий спектр — картинкам, где по модели стоимости он дешевле k x matchTemplate
+        # (размер картинки, размеры и число шаблонов; core/fft_match.py)
+        batch = {}
+        if self.fft_enabled:
+            batch = self.fft.plan_batch([(job[1], job[4]) for job in jobs])
+            self.fft.begin_batch(batch)
+        try:
+            results = self.executor.map(run, jobs)
+        finally:
+            if batch:
+                self.fft.end_batch(batch)
+        
+        for (spec, _, x1, y1, template, _), result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error(f"Template matching failed for {spec.key}: {result}")
+                continue
+            max_val, found = result
+            th, tw = template.shape[:2]
+            scores[spec.key] = float(max_val)
+            matches[spec.key] = tuple(
+                Match(x1 + m.x + tw // 2, y1 + m.y + th // 2, m.score) for m in found
+            )
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        logger.debug(f"detect_all: {len(specs)} specs in {elapsed_ms:.1f}ms")
+        return FrameDetections(
+            shape=tuple(frame.shape),
+            matches=MappingProxyType(matches),
+            scores=MappingProxyType(scores),
+            elapsed_ms=elapsed_ms,
+            frame_id=getattr(frame, "frame_id", None),
+            captured_at=getattr(frame, "timestamp", None),
+        )
+
+    def _gate_frame(self, frame: np.ndarray) -> Optional[int]:
+        """
+        Feed a new frame to the tile gate (once per frame_id).
+        Returns the gate serial for this frame, or None if cached detections
+        must not be used (gating off, frame without id, stale or out-of-order frame).
+        """
+        if not self.tile_gating_enabled:
+            return None
+        if self._applied_generation != self._gate_generation:
+            self._clear_tile_gate()
+        frame_id = getattr(frame, "frame_id", None)
+        if self.is_frame_stale(frame_id):
+            return None
+        if frame_id == self._gated_frame_id:
+            return self.tile_gate.serial
+        if self._gated_frame_id is not None and frame_id < self._gated_frame_id:
+            # Более старый кадр, чем эталон тайлов (чужой поток / сохранённый кадр)
+            return None
+        if self.tile_gate.ready and self.tile_gate.shape != frame.shape:
+            # Другой размер кадра (монитор / Retina) — ключи кэша больше не совпадут
+            self._clear_tile_gate()
+        self._gated_frame_id = frame_id
+        return self.tile_gate.update(frame)
+
+    def _match_gated(
+        self,
+        serial: int,
+        crop: np.ndarray,
+        x1: int,
+        y1: int,
+        name: str,
+        template: np.ndarray,
+        threshold: float,
+        find_all: bool,
+        use_roi: bool = False,
+    ) -> Tuple[float, List[Match]]:
+        """
+        _match / _match_roi with the detect_all cache.
+
+        Nothing changed inside the area since the cached result: reuse it.
+        A few dirty tiles: re-match only the dirty rectangles and combine with the
+        cached peaks outside them (find_all: NMS over the union; single: the best
+        one — unless the cached best itself was in a dirty rectangle, then the
+        runner-up is unknown and the whole area is re-matched).
+        Otherwise: match the whole area and cache the result.
+
+        Coordinates are top-left in crop coordinates, like _match. For partial
+        re-matches the best score is the max of re-matched and kept peaks.
+        """
+        th, tw = template.shape[:2]
+        ch, cw = crop.shape[:2]
+        key = (name, x1, y1, (ch, cw), threshold, find_all)
+        cached = self._detection_cache.get(key)
+
+        partial = False
+        if cached is not None:
+            rects = self.tile_gate.dirty_rects(cached[0], (x1, y1, cw, ch), (tw, th))
+            if rects is not None and not rects:
+                self._count_tile("reused")
+                return cached[1], cached[2]
+            if rects:
+                # Прямоугольники в координатах кропа
+                rects = [(rx - x1, ry - y1, rw, rh) for rx, ry, rw, rh in rects]
+                kept = [
+                    m for m in cached[2]
+                    if not any(rx <= m.x <= rx + rw - tw and ry <= m.y <= ry + rh - th for rx, ry, rw, rh in rects)
+                ]
+                partial = (
+                    sum(rw * rh for _, _, rw, rh in rects) <= self.max_dirty_fraction * cw * ch
+                    and (find_all or len(kept) == len(cached[2]))
+                )
+
+        if partial:
+            max_val = -1.0
+            fresh: List[Match] = []
+            for rx, ry, rw, rh in rects:
+                val, found = self._match(crop[ry:ry + rh, rx:rx + rw], name, template, threshold, find_all)
+                max_val = max(max_val, val)
+                fresh.extend(Match(rx + m.x, ry + m.y, m.score) for m in found)
+            if find_all:
+                merged = self._suppress_matches(kept + fresh)
+            else:
+                merged = sorted(kept + fresh, key=lambda m: -m.score)[:1]
+            if merged:
+                max_val = max(max_val, merged[0].score)
+            if not kept:
+                # Лучший (ниже порога) отклик чистых тайлов известен только из кэша
+                max_val = max(max_val, cached[1])
+            self._count_tile("partial")
+        else:
+            searched_all = True
+            if use_roi and not find_all:
+                max_val, merged, searched_all = self._match_roi_scoped(crop, name, template, threshold)
+            else:
+                max_val, merged = self._match(crop, name, template, threshold, find_all)
+            self._count_tile("full")
+            if not merged and not searched_all:
+                # Промах только в обученной области: вне её кадр не смотрели — такой
+                # промах нельзя переиспользовать для чистых тайлов следующих кадров
+                self._detection_cache.pop(key, None)
+                return max_val, merged
+
+        if self._applied_generation == self._gate_generation:
+            # Клик во время матчинга — кадр уже устарел, в кэш не кладём
+            self._detection_cache[key] = (serial, float(max_val), merged)
+        return max_val, merged
+
+    def _count_tile(self, kind: str) -> None:
+        # detect_all вызывает _match_gated из потоков пула
+        with self._stats_lock:
+            self.tile_stats[kind] += 1
+
     def scale_point_for_input(self, x: int, y: int) -> Tuple[int, int]:
         """
         Преобразует координаты из пикселей скриншота в логические координаты игры
@@ -264,7 +1222,7 @@ class VisionSystem:
         if template_name not in self.template_cache:
             return None
         if screenshot is None:
-            screenshot = self.capture_screen()
+            screenshot = self.capture_screen(max_age_ms=self.frame_max_age_ms)
         cropped, _ = self.capture_station_region(screenshot)
         if cropped is None:
             return None
@@ -284,69 +1242,422 @@ class VisionSystem:
         Args:
             template_name: Name of the template (key in ASSETS)
             region_xywh: (x, y, width, height) relative to game screenshot
-            screenshot: Pre-captured screenshot (or None to capture fresh)
+            screenshot: Pre-captured screenshot (or None: last frame if younger than FRAME_MAX_AGE_MS, else fresh)
             threshold: Confidence threshold (or None for config default)
         
         Returns:
             (x, y) center in GAME-RELATIVE coordinates if found, else None.
         """
-        if template_name not in self.template_cache:
-            return None
-        if screenshot is None:
-            screenshot = self.capture_screen()
-        x, y, w, h = region_xywh
-        # Bounds check
-        sh, sw = screenshot.shape[:2]
-        x1 = max(0, x)
-        y1 = max(0, y)
-        x2 = min(sw, x + w)
-        y2 = min(sh, y + h)
-        if x2 <= x1 or y2 <= y1:
-            return None
-        crop = screenshot[y1:y2, x1:x2]
-        template = self.template_cache[template_name]
-        thr = threshold if threshold is not None else THRESHOLDS.get(template_name, THRESHOLDS["default"])
-        try:
-            result = cv2.matchTemplate(crop, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            if max_val >= thr:
-                tw, th = template.shape[1], template.shape[0]
-                cx_crop = max_loc[0] + tw // 2
-                cy_crop = max_loc[1] + th // 2
-                return (x1 + cx_crop, y1 + cy_crop)
-            return None
-        except Exception as e:
-            logger.debug(f"find_template_in_region failed for {template_name}: {e}")
-            return None
+        result = self.match(template_name, screenshot=screenshot, threshold=threshold, region=region_xywh)
+        return result.location if result is not None else None
+    
+    # ===== MATCHING CORE =====
+    
+    def _match(
+        self,
+        image: np.ndarray,
+        name: str,
+        template: np.ndarray,
+        threshold: float,
+        find_all: bool = False,
+        pyramid: Optional[bool] = None,
+        gray: Optional[bool] = None,
+    ) -> Tuple[float, List[Match]]:
+        """
+        Match one template on an image (full frame or crop).
+        
+        Args:
+            image: BGR image to search
+            name: Template name (key for the downscaled template cache)
+            template: BGR template
+            threshold: Confidence threshold for returned matches
+            find_all: All peaks (best first) instead of only the best one
+            pyramid: Force coarse-to-fine on/off (None = PYRAMID_MATCHING["ENABLED"])
+            gray: Force single-channel + color verification on/off (None = GRAY_MATCHING["ENABLED"])
+        
+        Returns:
+            (best raw score, matches >= threshold). Match x, y are the template's
+            top-left corner in image coordinates.
+        """
+        if gray is None:
+            gray = self.gray_enabled
+        if gray and image.ndim == 3 and threshold >= float(GRAY_MATCHING.get("MIN_THRESHOLD", 0.5)):
+            return self._match_gray(image, name, template, threshold, find_all, pyramid)
+        return self._match_image(image, name, template, threshold, find_all, pyramid)
+    
+    def _match_image(
+        self,
+        image: np.ndarray,
+        name: str,
+        template: np.ndarray,
+        threshold: float,
+        find_all: bool = False,
+        pyramid: Optional[bool] = None,
+    ) -> Tuple[float, List[Match]]:
+        """
+        Plain matching (any number of channels), optionally coarse-to-fine.
+        Images registered by detect_all for several templates use the shared FFT spectrum.
+        """
+        if pyramid is None:
+            pyramid = self.pyramid_enabled
+        if pyramid:
+            factor = self.pyramid_factor(name, template, image.shape)
+            if factor > 1:
+                return self._match_pyramid(image, name, template, factor, threshold, find_all)
+        
+        spectrum = self.fft.spectrum_for(image) if self.fft_enabled else None
+        if spectrum is not None and spectrum.channels == (template.shape[2] if template.ndim == 3 else 1):
+            result = self.fft.match(spectrum, name, template)
+        else:
+            result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if find_all:
+            return float(max_val), self._find_peaks(result, threshold, min_distance=20)
+        if max_val >= threshold:
+            return float(max_val), [Match(max_loc[0], max_loc[1], float(max_val))]
+        return float(max_val), []
+    
+    def _match_roi(
+        self,
+        image: np.ndarray,
+        name: str,
+        template: np.ndarray,
+        threshold: float,
+    ) -> Tuple[float, List[Match]]:
+        """
+        Single best match, searching the learned region first (core/roi.py).
+        On a miss inside the region, the full image is searched only every
+        N-th time (LEARNED_ROI["MISS_FALLBACK_RATE"]). Same return contract as _match().
+        """
+        best, found, _ = self._match_roi_scoped(image, name, template, threshold)
+        return best, found
     
-    def _remove_duplicate_matches(
+    def _match_roi_scoped(
         self,
-        matches: List[Tuple[int, int]],
+        image: np.ndarray,
+        name: str,
+        template: np.ndarray,
+        threshold: float,
+    ) -> Tuple[float, List[Match], bool]:
+        """_match_roi + whether the whole image was searched (False: only the learned region)."""
+        learner = self.roi_learner
+        if not learner.handles(name):
+            return (*self._match(image, name, template, threshold), True)
+        
+        th, tw = template.shape[:2]
+        roi = learner.region_for(name, image.shape)
+        if roi is not None:
+            x, y, w, h = roi
+            if w >= tw and h >= th:
+                best, found = self._match(image[y:y + h, x:x + w], name, template, threshold)
+                if found:
+                    m = Match(found[0].x + x, found[0].y + y, found[0].score)
+                    learner.record(name, image.shape, m.x, m.y, tw, th, in_roi=True)
+                    return best, [m], False
+                if not learner.note_miss(name):
+                    return best, [], False
+        
+        best, found = self._match(image, name, template, threshold)
+        if found:
+            learner.record(name, image.shape, found[0].x, found[0].y, tw, th)
+        return best, found, True
+    
+    # ----- Gray stage + color verification -----
+    
+    def _to_single_channel(self, image: np.ndarray) -> np.ndarray:
+        """BGR → GRAY_MATCHING["CHANNEL"] (gray or one of b/g/r)."""
+        channel = GRAY_MATCHING.get("CHANNEL", "gray")
+        if channel in ("b", "g", "r"):
+            return np.ascontiguousarray(image[:, :, "bgr".index(channel)])
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    def _gray_image(self, image: np.ndarray) -> np.ndarray:
+        """
+        Single-channel copy of a frame or crop, cached for the current frame_id
+        (detect_all and repeated find_* on one Frame convert each area once).
+        """
+        frame_id = getattr(image, "frame_id", None)
+        if frame_id is None:
+            return self._to_single_channel(image)
+        # Кроп одного кадра узнаём по адресу данных и размеру
+        key = (image.__array_interface__["data"][0], image.shape)
+        with self._gray_lock:
+            if frame_id != self._gray_frame_id:
+                self._gray_frames.clear()
+                self._gray_frame_id = frame_id
+            gray = self._gray_frames.get(key)
+        if gray is None:
+            # Конвертация вне лока: воркеры с разными кропами не ждут друг друга
+            gray = self._to_single_channel(image)
+            with self._gray_lock:
+                if frame_id == self._gray_frame_id:
+                    gray = self._gray_frames.setdefault(key, gray)
+        return gray
+    
+    def _color_signature(self, image: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """
+        Mean BGR of the central half of an image + whether it is grey
+        (all channels close, as in Eat's _is_button_active_red).
+        """
+        h, w = image.shape[:2]
+        center = image[h // 4:h - h // 4, w // 4:w - w // 4]
+        mean = center.reshape(-1, 3).mean(axis=0)
+        is_gray = float(mean.max() - mean.min()) < float(GRAY_MATCHING.get("GRAY_CHROMA", 40.0))
+        return mean, is_gray
+    
+    def _color_matches(self, name: str, template: np.ndarray, patch: np.ndarray) -> bool:
+        """Cheap per-template color test: grey/colored must agree and mean BGR be close."""
+        signature = self._color_signatures.get(name)
+        if signature is None:
+            signature = self._color_signature(template)
+            self._color_signatures[name] = signature
+        t_mean, t_gray = signature
+        p_mean, p_gray = self._color_signature(patch)
+        if t_gray != p_gray:
+            return False
+        return float(np.abs(p_mean - t_mean).max()) <= float(GRAY_MATCHING.get("COLOR_TOLERANCE", 45.0))
+    
+    def _match_gray(
+        self,
+        image: np.ndarray,
+        name: str,
+        template: np.ndarray,
+        threshold: float,
+        find_all: bool,
+        pyramid: Optional[bool] = None,
+    ) -> Tuple[float, List[Match]]:
+        """
+        Two-stage matching. Stage 1: single-channel image/template with a lowered
+        threshold. Stage 2: every candidate is re-scored in BGR within ±1px, so scores
+        and thresholds keep BGR semantics; templates in COLOR_VERIFY must also pass
+        the color signature test (grey/ad buttons that look alike in gray are rejected).
+        Same return contract as _match().
+        """
+        gray_template = self._gray_templates.get(name)
+        if gray_template is None:
+            if GRAY_MATCHING.get("CHANNEL", "gray") == "gray" and name in self._template_files:
+                gray_template = self.load_image(os.path.join(ASSETS_DIR, self._template_files[name]), "gray")
+            if gray_template is None:
+                gray_template = self._to_single_channel(template)
+            self._gray_templates[name] = gray_template
+        
+        slack = float(GRAY_MATCHING.get("SLACK", 0.10))
+        gray_best, candidates = self._match_image(
+            self._gray_image(image), f"{name}:gray", gray_template, threshold - slack, True, pyramid
+        )
+        if not candidates:
+            return gray_best, []
+        if not find_all:
+            # Лучший по gray может оказаться серой копией кнопки — проверяем несколько
+            candidates = candidates[:int(GRAY_MATCHING.get("TOP_K", 5))]
+        
+        ih, iw = image.shape[:2]
+        th, tw = template.shape[:2]
+        verify_color = name in GRAY_MATCHING.get("COLOR_VERIFY", ())
+        best = -1.0
+        found = []
+        for c in candidates:
+            x1, y1 = max(0, c.x - 1), max(0, c.y - 1)
+            x2, y2 = min(iw, c.x + tw + 1), min(ih, c.y + th + 1)
+            result = cv2.matchTemplate(image[y1:y2, x1:x2], template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, loc = cv2.minMaxLoc(result)
+            best = max(best, float(score))
+            x, y = x1 + loc[0], y1 + loc[1]
+            if score < threshold:
+                continue
+            if verify_color and not self._color_matches(name, template, image[y:y + th, x:x + tw]):
+                logger.debug(f"{name}: кандидат ({x}, {y}) отклонён по цвету (score {score:.3f})")
+                continue
+            found.append(Match(x, y, float(score)))
+        
+        found.sort(key=lambda m: m.score, reverse=True)
+        if not find_all:
+            found = found[:1]
+        return best, found
+    
+    # ----- Pyramid -----
+    
+    def pyramid_factor(self, name: str, template: np.ndarray, image_shape: Tuple[int, ...]) -> int:
+        """
+        Safe downscale factor for a template (1, 2 or 4).
+        
+        - the template's smaller side stays >= MIN_TEMPLATE_SIDE after downscaling;
+        - the downscaled image is still larger than the template;
+        - the downscaled template still matches itself at every sub-pixel phase
+          (score >= MIN_PHASE_SCORE), i.e. its detail survives the downscale.
+        """
+        min_side = int(PYRAMID_MATCHING.get("MIN_TEMPLATE_SIDE", 8))
+        min_phase = float(PYRAMID_MATCHING.get("MIN_PHASE_SCORE", 0.75))
+        factor = int(PYRAMID_MATCHING.get("MAX_FACTOR", 4))
+        th, tw = template.shape[:2]
+        ih, iw = image_shape[:2]
+        while factor > 1:
+            if (
+                min(th, tw) // factor >= min_side
+                and ih // factor > th // factor
+                and iw // factor > tw // factor
+                and self._pyramid_template(name, template, factor)[1] >= min_phase
+            ):
+                return factor
+            factor //= 2
+        return 1
+    
+    def _pyramid_template(self, name: str, template: np.ndarray, factor: int) -> Tuple[np.ndarray, float]:
+        """
+        Downscaled template and its worst self-match score over all factor x factor
+        sub-pixel phases (the frame's downscale grid does not line up with the object).
+        Cached per (name, factor).
+        """
+        key = (name, factor)
+        cached = self._pyramid_cache.get(key)
+        if cached is None:
+            th, tw = template.shape[:2]
+            small = None
+            if factor == 2 and name in self._template_files:
+                # 1/2 уже посчитан в template pack
+                small = self.load_image(os.path.join(ASSETS_DIR, self._template_files[name]), "bgr@0.5")
+            if small is None:
+                small = cv2.resize(template, (tw // factor, th // factor), interpolation=cv2.INTER_AREA)
+            worst = 1.0
+            for dy in range(factor):
+                for dx in range(factor):
+                    canvas = cv2.copyMakeBorder(
+                        template, dy, 2 * factor - dy, dx, 2 * factor - dx, cv2.BORDER_REPLICATE
+                    )
+                    canvas = cv2.resize(
+                        canvas,
+                        (canvas.shape[1] // factor, canvas.shape[0] // factor),
+                        interpolation=cv2.INTER_AREA,
+                    )
+                    score = cv2.minMaxLoc(cv2.matchTemplate(canvas, small, cv2.TM_CCOEFF_NORMED))[1]
+                    worst = min(worst, float(score))
+            cached = (small, worst)
+            self._pyramid_cache[key] = cached
+            logger.debug(f"Pyramid template {name} 1/{factor}: phase score {worst:.2f}")
+        return cached
+    
+    def _match_pyramid(
+        self,
+        image: np.ndarray,
+        name: str,
+        template: np.ndarray,
+        factor: int,
+        threshold: float,
+        find_all: bool,
+    ) -> Tuple[float, List[Match]]:
+        """
+        Coarse-to-fine matching: candidates on the 1/factor level, each refined
+        with a full-resolution match in a small window around it.
+        Same return contract as _match().
+        """
+        ih, iw = image.shape[:2]
+        th, tw = template.shape[:2]
+        small_image = cv2.resize(image, (iw // factor, ih // factor), interpolation=cv2.INTER_AREA)
+        small_template, phase_score = self._pyramid_template(name, template, factor)
+        coarse = cv2.matchTemplate(small_image, small_template, cv2.TM_CCOEFF_NORMED)
+        
+        # Грубый score ниже полного примерно на (1 - phase score) — порог кандидатов ниже на столько же
+        slack = max(float(PYRAMID_MATCHING.get("COARSE_SLACK", 0.15)), 1.0 - phase_score + 0.05)
+        candidates = self._find_peaks(coarse, threshold - slack, min_distance=max(2, 20 // factor))
+        if not find_all:
+            candidates = candidates[:int(PYRAMID_MATCHING.get("TOP_K", 3))]
+        if not candidates:
+            # Нет кандидатов — уточняем лучший грубый пик, чтобы вернуть честный best score
+            _, _, _, loc = cv2.minMaxLoc(coarse)
+            candidates = [Match(loc[0], loc[1], 0.0)]
+        
+        # Окно уточнения: ошибка грубого уровня до factor пикселей + запас
+        margin = factor + 2
+        refined = []
+        for c in candidates:
+            x1 = max(0, c.x * factor - margin)
+            y1 = max(0, c.y * factor - margin)
+            x2 = min(iw, c.x * factor + tw + margin)
+            y2 = min(ih, c.y * factor + th + margin)
+            result = cv2.matchTemplate(image[y1:y2, x1:x2], template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, loc = cv2.minMaxLoc(result)
+            refined.append(Match(x1 + loc[0], y1 + loc[1], float(score)))
+        
+        refined.sort(key=lambda m: m.score, reverse=True)
+        best = refined[0].score
+        found = []
+        for m in refined:
+            if m.score < threshold:
+                break
+            # Соседние кандидаты могли сойтись к одному и тому же пику
+            if all((m.x - k.x) ** 2 + (m.y - k.y) ** 2 >= 400 for k in found):
+                found.append(m)
+        if not find_all:
+            found = found[:1]
+        return best, found
+    
+    def _find_peaks(
+        self,
+        result: np.ndarray,
+        threshold: float,
         min_distance: int = 20
-    ) -> List[Tuple[int, int]]:
+    ) -> List[Match]:
         """
-        Remove duplicate matches that are too close to each other.
-        Keeps the first occurrence.
+        Non-maximum suppression on a matchTemplate result.
+        
+        1. Candidates >= threshold; if there are many of them, only local maxima
+           are kept (pixels equal to the dilated result, window ~min_distance).
+        2. Greedy suppression by score: the best peak wins, weaker peaks closer
+           than min_distance to an already kept peak are dropped.
+        
+        Returns Match records in result coordinates (top-left of the template),
+        sorted by score (best first).
         """
-        if not matches:
+        # Частый случай — ничего не найдено: одна проверка максимума без масок
+        if cv2.minMaxLoc(result)[1] < threshold:
             return []
+        mask = cv2.compare(result, threshold, cv2.CMP_GE)
+        if cv2.countNonZero(mask) > self.PEAK_DILATE_MIN_CANDIDATES:
+            # Много кандидатов (низкий порог) — сначала оставляем только локальные максимумы.
+            # Окно дилатации меньше min_distance: отсекает "плато" вокруг пика,
+            # но не съедает соседние объекты — окончательно разводит их шаг 2.
+            radius = max(1, min_distance // 2)
+            kernel = np.ones((2 * radius + 1, 2 * radius + 1), np.uint8)
+            local_max = cv2.dilate(result, kernel)
+            mask = cv2.bitwise_and(mask, cv2.compare(result, local_max, cv2.CMP_GE))
+        points = cv2.findNonZero(mask).reshape(-1, 2).astype(np.int64)
+        xs, ys = points[:, 0], points[:, 1]
+        return self._greedy_suppress(xs, ys, result[ys, xs], min_distance)
+
+    def _suppress_matches(self, matches: List[Match], min_distance: int = 20) -> List[Match]:
+        """Greedy suppression (as in _find_peaks) over an already collected list of peaks."""
+        if len(matches) < 2:
+            return list(matches)
+        xs = np.array([m.x for m in matches], dtype=np.int64)
+        ys = np.array([m.y for m in matches], dtype=np.int64)
+        scores = np.array([m.score for m in matches], dtype=np.float64)
+        return self._greedy_suppress(xs, ys, scores, min_distance)
+
+    @staticmethod
+    def _greedy_suppress(
+        xs: np.ndarray,
+        ys: np.ndarray,
+        scores: np.ndarray,
+        min_distance: int,
+    ) -> List[Match]:
+        """Best peak wins; weaker peaks closer than min_distance to a kept one are dropped."""
+        order = np.argsort(-scores, kind="stable")
+        xs, ys, scores = xs[order], ys[order], scores[order]
+
+        min_dist_sq = min_distance * min_distance
+        keep = np.ones(len(order), dtype=bool)
+        for i in range(len(order)):
+            if not keep[i]:
+                continue
+            # Всё, что слабее и ближе min_distance к этому пику, — дубликаты
+            dx = xs[i + 1:] - xs[i]
+            dy = ys[i + 1:] - ys[i]
+            keep[i + 1:] &= (dx * dx + dy * dy) >= min_dist_sq
         
-        filtered = []
-        for match in matches:
-            # Check if this match is far enough from all filtered matches
-            is_duplicate = False
-            for existing in filtered:
-                distance = np.sqrt(
-                    (match[0] - existing[0])**2 + (match[1] - existing[1])**2
-                )
-                if distance < min_distance:
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                filtered.append(match)
-        
-        return filtered
+        return [
+            Match(int(x), int(y), float(score))
+            for x, y, score in zip(xs[keep], ys[keep], scores[keep])
+        ]
 
     def find_template_by_path(
         self,
@@ -363,12 +1674,12 @@ class VisionSystem:
         if not os.path.isfile(path):
             logger.warning(f"find_template_by_path: file not found: {path}")
             return None
-        template = cv2.imread(path, cv2.IMREAD_COLOR)
+        template = self.load_image(path)
         if template is None:
             logger.warning(f"find_template_by_path: failed to load image: {path}")
             return None
         if screenshot is None:
-            screenshot = self.capture_screen()
+            screenshot = self.capture_screen(max_age_ms=self.frame_max_age_ms)
         try:
             result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
@@ -388,14 +1699,14 @@ class VisionSystem:
         Capture only the station safe zone.
         
         Args:
-            screenshot: Pre-captured full game screenshot (or None to capture fresh)
+            screenshot: Pre-captured full game screenshot (or None: last frame if younger than FRAME_MAX_AGE_MS, else fresh)
         
         Returns:
             Tuple of (cropped_image, offset) where offset is (x_offset, y_offset)
             to convert cropped coordinates back to game coordinates.
         """
         if screenshot is None:
-            screenshot = self.capture_screen()
+            screenshot = self.capture_screen(max_age_ms=self.frame_max_age_ms)
         
         if not self.zones_enabled or self.station_search_region_relative is None:
             # No zone config - return full screenshot
@@ -426,7 +1737,7 @@ class VisionSystem:
         # Capture and crop to station zone
         if screenshot is None:
             logger.debug("  📸 Захватываем новый скриншот...")
-            screenshot = self.capture_screen()
+            screenshot = self.capture_screen(max_age_ms=self.frame_max_age_ms)
         else:
             logger.debug("  📸 Используем предоставленный скриншот")
         
@@ -497,7 +1808,8 @@ class VisionSystem:
         Используется для отладки кликов по рекламным крестикам.
         """
         try:
-            img = self.capture_screen()
+            # Копия: кадр из capture_screen() живёт в кэше кадров, рисовать на нём нельзя
+            img = self.capture_screen().copy()
             h, w = img.shape[:2]
             cx, cy = center
             half = rect_size // 2
@@ -32,6 +32,49 @@ from core.vision import VisionSystem
 from core.input import InputController
 from core.state import BotState
 from core.logic import GameLogic
+from core.screen_state import DispatchStats, ScreenState, ScreenStateClassifier
+
+# ===== DISPATCH =====
+# Обработчики тика по экрану (ScreenStateClassifier, core/screen_state.py); порядок = приоритет.
+# Экран не распознан (UNKNOWN, нет screen_signatures.json) — весь WATERFALL, как раньше.
+# Распознанный экран (кроме главного), на котором STUCK_TICKS тиков подряд никто ничего
+# не сделал, — тоже WATERFALL: окно, которое обработчики экрана не умеют закрыть, не держит бота.
+# "confirm" (подтвердить открытую реновацию/перелёт) — только на распознанных RENOVATE/FLY,
+# в WATERFALL его нет: на неизвестном экране кнопки подтверждения не нажимаем.
+WATERFALL = ("progression", "close_x", "ads", "general", "collect", "stations", "navigation")
+STUCK_TICKS = 5
+STATE_HANDLERS = {
+    ScreenState.MAIN: ("progression", "general", "collect", "stations", "navigation"),
+    ScreenState.STATION_LOCKED: ("station_popup",),
+    ScreenState.STATION_BUYABLE: ("station_popup",),
+    ScreenState.STATION_MAXED: ("station_popup",),
+    ScreenState.GENERAL_MENU: ("close_x",),
+    ScreenState.AD: ("ads", "close_x"),
+    ScreenState.RENOVATE: ("progression", "confirm", "close_x"),
+    ScreenState.FLY: ("progression", "confirm", "close_x"),
+    ScreenState.OPEN_LEVEL: ("progression",),
+}
+# Группы детекторов тика (GameLogic.tick_specs), которые читает обработчик
+HANDLER_GROUPS = {
+    "progression": ("progression",),
+    "confirm": ("confirm",),
+    "close_x": ("close_x",),
+    "ads": ("ad_close",),
+    "general": ("general",),
+    "collect": ("collect",),
+    "stations": ("station",),
+    "station_popup": (),
+    "navigation": (),
+}
+
+
+def tick_groups(handlers) -> list:
+    """Группы детекторов для набора обработчиков (в порядке обработчиков, без повторов)."""
+    groups = []
+    for name in handlers:
+        groups += [g for g in HANDLER_GROUPS[name] if g not in groups]
+    return groups
+
 
 class ConsoleSummaryFilter(logging.Filter):
     """
@@ -195,8 +238,8 @@ def on_key_press(key):
             
             # Освобождаем мышь
             try:
-                import pyautogui
-                pyautogui.mouseUp()
+                from core.input_backends import release_all
+                release_all()
             except:
                 pass
             
@@ -248,6 +291,8 @@ def main():
     # Start ESC key listener
     listener = keyboard.Listener(on_press=on_key_press)
     listener.start()
+    vision = None
+    dispatch_stats = None
     
     try:
         # Проверка конфигурации
@@ -267,6 +312,7 @@ def main():
         input_ctrl = InputController()
         bot_state = BotState()
         logic = GameLogic(vision, input_ctrl, bot_state)
+        vision.start_capture_service()
         
         # Show loaded configuration
         logger.info(f"✓ Loaded {len(vision.template_cache)} templates")
@@ -336,76 +382,163 @@ def main():
         idle_scroll_suppress_until = 0.0  # после цикла 40с не скроллить вниз «при простое», пока не начнётся следующий цикл
         peek_interval = TIMERS.get("PEEK_INTERVAL", 40.0)
         idle_scroll_seconds = TIMERS.get("IDLE_SCROLL_SECONDS", 4.0)
-        
+
+        # ===== TICK HANDLERS =====
+        # Каждый: detections → (было действие, начать тик заново)
+
+        def handle_progression(detections):
+            # Реновация или Fly — САМОЕ ПЕРВОЕ: если появились, сразу переходим на новый уровень
+            if logic.check_level_progression(detections):
+                logger.info("🏗️  Level progression detected - handled!")
+                time.sleep(0.5)
+                return True, True
+            return False, False
+
+        def handle_confirm(detections):
+            # Окно подтверждения реновации/перелёта осталось открытым — подтвердить и дойти до OPEN
+            if logic.confirm_progression(detections):
+                time.sleep(0.5)
+                return True, True
+            return False, False
+
+        def handle_close_x(detections):
+            # Крестик: если открылось окно (бургер/клуб) — закрыть
+            if logic.check_and_close_x(detections):
+                time.sleep(0.3)
+                return True, True
+            return False, False
+
+        def handle_ads(detections):
+            # Реклама: закрыть, если появилась
+            if logic.check_and_close_ads(detections):
+                time.sleep(0.5)
+                return True, True
+            return False, False
+
+        def handle_general(detections):
+            # General Upgrades - ВЫСШИЙ ПРИОРИТЕТ! Общие улучшения дают БОЛЬШЕ БУСТА, чем улучшения станций!
+            logger.debug("💎 Проверяем ОБЩИЕ УЛУЧШЕНИЯ (ПРИОРИТЕТ!) - каждый цикл...")
+            upgrades = logic.upgrade_general(detections=detections)
+            if upgrades > 0:
+                logger.info(f"✓ Куплено {upgrades} общих улучшений - продолжаем!")
+            return upgrades > 0, False
+
+        def handle_collect(detections):
+            # Collect items (boxes/tips) — ПОСЛЕ общих улучшений и ДО стрелок станций
+            return logic.collect_items(detections) > 0, False
+
+        def handle_stations(detections):
+            # Station upgrades — ПОСЛЕДНИМИ (их больше всего)
+            logger.debug("Checking station upgrades...")
+            return logic.upgrade_stations(detections) > 0, False
+
+        def handle_station_popup(detections):
+            # Попап станции остался открытым — купить/разблокировать и закрыть
+            logic.handle_station_popup()
+            return True, True
+
+        def handle_navigation(detections):
+            nonlocal last_peek_time, last_activity_time, idle_scroll_suppress_until
+            acted = False
+            # Smart Navigation: каждые PEEK_INTERVAL сек — цикл: верх → шагами вниз + улучшения
+            elapsed = time.time() - last_peek_time
+            if elapsed >= peek_interval:
+                acted = True
+                logger.info(f"🔄 Цикл сканирования (каждые {peek_interval:.0f}с)...")
+                logic.peek_up_and_scan()
+                last_peek_time = time.time()
+                # После цикла мы внизу — не делать «скролл при простое» до следующего цикла
+                idle_scroll_suppress_until = time.time() + (peek_interval - 2.0)
+                last_activity_time = time.time()
+
+            # Если 4+ секунд ничего не было — один скролл вниз (подтянуть контент). Не делать сразу после цикла 40с (мы уже внизу).
+            if time.time() > idle_scroll_suppress_until and time.time() - last_activity_time >= idle_scroll_seconds:
+                if logic.scroll_down_if_idle():
+                    acted = True
+                time.sleep(0.5)
+            return acted, False
+
+        handlers = {
+            "progression": handle_progression,
+            "confirm": handle_confirm,
+            "close_x": handle_close_x,
+            "ads": handle_ads,
+            "general": handle_general,
+            "collect": handle_collect,
+            "stations": handle_stations,
+            "station_popup": handle_station_popup,
+            "navigation": handle_navigation,
+        }
+        classifier = ScreenStateClassifier(vision)
+        dispatch_stats = DispatchStats()
+        stuck_ticks = 0  # тиков подряд на распознанном экране (не главном) без действий
+
         # ===== MAIN LOOP =====
         while bot_state.running:
             loop_count += 1
             logger.debug(f"--- Loop {loop_count} ---")
             
             try:
-                # 1. Реновация или Fly — САМОЕ ПЕРВОЕ: если появились, сразу переходим на новый уровень
-                if logic.check_level_progression():
-                    last_activity_time = time.time()
-                    logger.info("🏗️  Level progression detected - handled!")
-                    time.sleep(0.5)
-                    continue
-
-                # 2. Крестик: если открылось окно (бургер/клуб) — закрыть
-                if logic.check_and_close_x():
-                    last_activity_time = time.time()
-                    time.sleep(0.3)
-                    continue
-
-                # 3. Реклама: закрыть, если появилась
-                if logic.check_and_close_ads():
-                    last_activity_time = time.time()
-                    time.sleep(0.5)
-                    continue
-                
-                # 4. General Upgrades - ВЫСШИЙ ПРИОРИТЕТ! (проверяем КАЖДЫЙ цикл!)
-                # Общие улучшения дают БОЛЬШЕ БУСТА, чем улучшения станций!
-                logger.debug("💎 Проверяем ОБЩИЕ УЛУЧШЕНИЯ (ПРИОРИТЕТ!) - каждый цикл...")
-                upgrades = logic.upgrade_general()
-                if upgrades > 0:
-                    last_activity_time = time.time()
-                    logger.info(f"✓ Куплено {upgrades} общих улучшений - продолжаем!")
-                
-                # 5. Collect items (boxes/tips) — ПОСЛЕ общих улучшений и ДО стрелок станций
-                collected = logic.collect_items()
-                if collected > 0:
-                    last_activity_time = time.time()
-
-                # 6. Station upgrades — ПОСЛЕДНИМИ (их больше всего)
-                logger.debug("Checking station upgrades...")
-                upgrades = logic.upgrade_stations()
-                if upgrades > 0:
-                    last_activity_time = time.time()
-                
-                # 7. Smart Navigation: каждые PEEK_INTERVAL сек — цикл: верх → шагами вниз + улучшения
-                elapsed = time.time() - last_peek_time
-                if elapsed >= peek_interval:
-                    last_activity_time = time.time()
-                    logger.info(f"🔄 Цикл сканирования (каждые {peek_interval:.0f}с)...")
-                    logic.peek_up_and_scan()
-                    last_peek_time = time.time()
-                    # После цикла мы внизу — не делать «скролл при простое» до следующего цикла
-                    idle_scroll_suppress_until = time.time() + (peek_interval - 2.0)
-                
-                # 7b. Если 4+ секунд ничего не было — один скролл вниз (подтянуть контент). Не делать сразу после цикла 40с (мы уже внизу).
-                if time.time() > idle_scroll_suppress_until and time.time() - last_activity_time >= idle_scroll_seconds:
-                    if logic.scroll_down_if_idle():
+                # 0. Один снимок экрана на тик: что за экран (ScreenState) и детекторы только
+                # его обработчиков (STATE_HANDLERS), всё по одному кадру. Если обработчик что-то
+                # нажал — кадр устарел, refresh_tick снимет новый.
+                frame = vision.capture_screen()
+                label = classifier.classify(frame)
+                dispatch_stats.record_state(label)
+                watched = label.state in STATE_HANDLERS and label.state is not ScreenState.MAIN
+                if label.state in STATE_HANDLERS and not (watched and stuck_ticks >= STUCK_TICKS):
+                    tick_handlers = STATE_HANDLERS[label.state]
+                    detections = logic.detect_tick(frame, groups=tick_groups(tick_handlers))
+                else:
+                    if watched:
+                        logger.info(
+                            f"🖼️  Экран {label.state.value}: {stuck_ticks} тиков без действий — весь водопад"
+                        )
+                    tick_handlers = WATERFALL
+                    detections = logic.detect_tick(frame)
+                logger.debug(f"🖼️  Экран: {label.state.value} → {', '.join(tick_handlers)}")
+
+                # 1. Обработчики экрана по приоритету; действие с переходом (реклама, реновация...) — тик заново
+                restart = False
+                tick_acted = False
+                for i, name in enumerate(tick_handlers):
+                    if i:
+                        detections = logic.refresh_tick(detections)
+                    started = time.perf_counter()
+                    acted, restart = handlers[name](detections)
+                    dispatch_stats.record_handler(name, (time.perf_counter() - started) * 1000.0)
+                    if acted:
+                        tick_acted = True
                         last_activity_time = time.time()
-                    time.sleep(0.5)
+                    if restart:
+                        break
+                stuck_ticks = stuck_ticks + 1 if watched and not tick_acted else 0
+                if restart:
+                    continue
                 
-                # 8. Print stats (every 50 loops)
+                # 2. Print stats (every 50 loops)
                 if loop_count % 50 == 0:
                     stats = bot_state.get_stats()
                     logger.info(
                         f"📊 Stats - Level: {stats['level']}, "
                         f"Upgrades: {stats['upgrades']}, "
                         f"Renovations: {stats['renovations']}, "
-                        f"Memory: {stats['memory_count']}"
+                        f"Memory: {stats['memory_count']}, "
+                        f"Frames: {vision.frame_stats['grabs']} grabbed / {vision.frame_stats['reused']} reused, "
+                        f"ROI: {vision.roi_learner.stats['roi_hits']} hits / {vision.roi_learner.stats['full_frame']} full-frame, "
+                        f"Tiles: {vision.tile_stats['reused']} reused / {vision.tile_stats['partial']} partial / {vision.tile_stats['full']} full"
                     )
+                    # Ожидания "экран устоялся" по местам вызова: ms факт / ms старой паузы
+                    logger.info(f"⏳ Settle: {vision.settle_report()}")
+                    # Тики по экранам и время обработчиков
+                    logger.info(f"🖼️  Screens: {dispatch_stats.report()}")
+                    if vision.capture_service is not None:
+                        cs = vision.capture_service.stats
+                        logger.info(
+                            f"📷 Capture: {cs['frames']} frames, grab {cs['grab_ms_avg']:.1f}ms avg / "
+                            f"{cs['grab_ms_max']:.1f}ms max, dropped {cs['dropped']}, "
+                            f"unread {cs['evicted_unread']}, errors {cs['errors']}"
+                        )
                 
                 # Loop delay
                 time.sleep(TIMERS["MAIN_LOOP_DELAY"])
@@ -422,6 +555,13 @@ def main():
     
     finally:
         listener.stop()
+        if vision:
+            vision.stop_capture_service()
+            vision.executor.shutdown()
+            vision.roi_learner.save()
+            logger.info(f"⏳ Settle: {vision.settle_report()}")
+        if dispatch_stats:
+            logger.info(f"🖼️  Screens: {dispatch_stats.report()}")
         if bot_state:
             stats = bot_state.get_stats()
             logger.info(
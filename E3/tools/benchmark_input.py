@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+EatventureBot V3 - Input Latency Benchmark
+
+Click-to-return latency per input backend (core/input_backends.py):
+    backend.click(hold=0)      — only the events (move + down + up)
+    InputController.human_click — what one bot click costs (CLICK_HOLD + TIMERS["CLICK_DELAY"])
+
+Clicks go to the CENTER of GAME_REGION. On Linux run it on a virtual display:
+    xvfb-run -s "-screen 0 1280x1024x24" python tools/benchmark_input.py --backend xtest null
+
+Usage:
+    python tools/benchmark_input.py                     # auto + null
+    python tools/benchmark_input.py --backend pyautogui quartz --count 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from config import GAME_REGION
+from core.input import InputController
+from core.input_backends import create_backend
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure(fn, count: int) -> list:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EatventureBot V3 input latency benchmark")
+    parser.add_argument("--backend", nargs="+", default=["auto", "null"],
+                        help="auto | quartz | xtest | pynput | pyautogui | null")
+    parser.add_argument("--count", type=int, default=100, help="clicks per backend")
+    args = parser.parse_args()
+
+    x, y, w, h = GAME_REGION
+    cx, cy = x + w // 2, y + h // 2
+    print(f"Клики в ({cx}, {cy}), по {args.count} на бэкенд")
+    print(f"\n{'бэкенд':<12} {'замер':<14} {'median ms':>10} {'p95 ms':>9} {'max ms':>9}")
+    for name in args.backend:
+        try:
+            backend = create_backend(name)
+        except Exception as e:
+            print(f"{name:<12} недоступен: {e}")
+            continue
+        controller = InputController(backend=backend)
+        rows = (
+            ("click(hold=0)", lambda: backend.click(cx, cy)),
+            ("human_click", lambda: controller.human_click(w // 2, h // 2)),
+        )
+        for label, fn in rows:
+            samples = measure(fn, args.count if label != "human_click" else max(1, args.count // 10))
+            print(f"{backend.name:<12} {label:<14} {statistics.median(samples):>10.3f} "
+                  f"{percentile(samples, 0.95):>9.3f} {max(samples):>9.3f}")
+            if label == "click(hold=0)":
+                # Курсор там, куда кликали (human_click добавляет jitter — его не проверяем)
+                px, py = backend.position()
+                if (px, py) != (cx, cy):
+                    print(f"{'':<12} курсор после клика ({px}, {py}) ≠ цели ({cx}, {cy})!")
+        backend.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""
+EatventureBot V3 - Vision Benchmark
+
+Measures the cost of the vision pipeline on recorded frames
+(tools/output/reference_screen_*.png from capture_tool.py).
+If no recorded frames are found, a synthetic frame is composed from assets/.
+
+Usage:
+    python tools/benchmark_vision.py tick
+    python tools/benchmark_vision.py tick --frames "tools/output/*.png" --grab
+    python tools/benchmark_vision.py nms --templates box_floor upgrade_arrow
+    python tools/benchmark_vision.py pyramid --retina
+    python tools/benchmark_vision.py gray
+    python tools/benchmark_vision.py capture --retina
+    python tools/benchmark_vision.py tiles --moving 3
+    python tools/benchmark_vision.py parallel --workers 1 2 4 8
+    python tools/benchmark_vision.py fft --counts 1 2 3 4 8 13
+    python tools/benchmark_vision.py diff --shifts 0 2 8 30 100
+
+Subcommands:
+    tick  - one main-loop tick: old per-handler waterfall vs detect_all()
+    nms   - find_all peak extraction per threshold: np.where + O(n²) dedup vs _find_peaks()
+    pyramid - per template: full-resolution matching vs coarse-to-fine (PYRAMID_MATCHING)
+    gray  - per template: BGR matching vs gray + color verification (GRAY_MATCHING)
+    capture - BGRA→BGR per grab: np.array + cvtColor vs frombuffer + pooled buffer (ms, bytes)
+    tiles - detect_all on a still camera with a few moving sprites: full re-match vs tile gating
+    parallel - detect_all (tick + ad close scan) per MatchExecutor size, results checked against 1 worker
+    fft   - k templates on one image: k x matchTemplate vs one shared spectrum; fits MatchCostModel
+            (FFT_MATCHING COST_*) and prints the crossover k per image and template size
+    diff  - frame pair comparison: old per-bot absdiff / float MSE vs FrameDiff on cached gray thumbnails
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)  # ASSETS_DIR is relative to project root
+
+import cv2
+import numpy as np
+
+from config import THRESHOLDS
+from core.capture import FrameBufferPool, bgra_to_bgr
+from core.fft_match import ImageSpectrum, MatchCostModel, SharedSpectrumMatcher
+from core.frame_diff import FrameDiff
+from core.parallel import MatchExecutor
+from core.vision import VisionSystem, DetectionSpec, Frame
+
+DEFAULT_FRAMES = os.path.join("tools", "output", "reference_screen_*.png")
+
+
+def make_vision() -> VisionSystem:
+    """VisionSystem for offline runs: learned ROIs off (no learned_rois.json from synthetic frames)."""
+    vision = VisionSystem()
+    vision.roi_learner.enabled = False
+    return vision
+
+
+# ===== FRAMES =====
+
+def synthetic_frame(vision: VisionSystem, scale: int = 1, seed: int = 0, copies: int = 1) -> np.ndarray:
+    """Noise background with every loaded template pasted `copies` times (no real screen needed)."""
+    rng = np.random.default_rng(seed)
+    h, w = vision.game_region["height"] * scale, vision.game_region["width"] * scale
+    frame = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (7, 7), 0)
+    for template in list(vision.template_cache.values()) * copies:
+        th, tw = template.shape[:2]
+        if th >= h or tw >= w:
+            continue
+        y = int(rng.integers(0, h - th))
+        x = int(rng.integers(0, w - tw))
+        frame[y:y + th, x:x + tw] = template
+    return frame
+
+
+def load_frames(vision: VisionSystem, pattern: str, retina: bool = False, copies: int = 1) -> list:
+    """Recorded frames matching pattern, or one synthetic frame."""
+    frames = [cv2.imread(p, cv2.IMREAD_COLOR) for p in sorted(glob.glob(pattern))]
+    frames = [f for f in frames if f is not None]
+    if frames:
+        print(f"Кадров загружено: {len(frames)} ({pattern})")
+        return frames
+    print(f"Нет записанных кадров ({pattern}) — используем синтетический кадр")
+    return [synthetic_frame(vision, scale=2 if retina else 1, copies=copies)]
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+# ===== TICK: waterfall vs detect_all =====
+
+def tick_regions(w: int, h: int) -> dict:
+    """Regions used by the main-loop handlers (mirrors GameLogic region helpers)."""
+    top_h = int(h * 0.15)
+    close_x = int(w * 0.55)
+    white_x = int(w * 0.60)
+    return {
+        "btn_close_x": (close_x, 0, w - close_x, int(h * 0.35)),
+        "btn_ad_close_x": (white_x, 0, w - white_x, top_h),
+        "ad_close_x_gray": (int(w * 0.02), 0, int(w * 0.35), top_h),
+        "ad_close_x1": (white_x, 0, w - white_x, top_h),
+    }
+
+
+def tick_specs(vision: VisionSystem, w: int, h: int) -> list:
+    """Detectors of one main-loop tick (mirrors GameLogic.tick_specs)."""
+    regions = tick_regions(w, h)
+    thr_box = max(0.55, float(THRESHOLDS.get("box_floor", 0.68)) - 0.08)
+    return [
+        DetectionSpec("btn_renovate"),
+        DetectionSpec("btn_open"),
+        DetectionSpec("btn_fly"),
+        DetectionSpec("btn_close_x", region=regions["btn_close_x"]),
+        DetectionSpec("btn_ad_close_x", region=regions["btn_ad_close_x"]),
+        DetectionSpec("ad_close_x_gray", region=regions["ad_close_x_gray"]),
+        DetectionSpec("ad_close_x1", region=regions["ad_close_x1"]),
+        DetectionSpec("icon_upgrades"),
+        DetectionSpec("box_floor", threshold=thr_box, find_all=True),
+        DetectionSpec("tip_coin", find_all=True),
+        DetectionSpec("upgrade_arrow", find_all=True, station_zone=vision.zones_enabled),
+    ]
+
+
+def waterfall_tick(vision: VisionSystem, bgra: np.ndarray, grab) -> None:
+    """Old main loop: every handler grabs + converts its own frame, then matches."""
+    w, h = vision.game_region["width"], vision.game_region["height"]
+    regions = tick_regions(w, h)
+
+    def frame():
+        raw = grab() if grab else bgra
+        return cv2.cvtColor(np.array(raw), cv2.COLOR_BGRA2BGR)
+
+    # check_level_progression (+ debug rematch when renovate is missing)
+    shot = frame()
+    if not vision.find_template("btn_renovate", screenshot=shot):
+        vision.get_template_max_confidence("btn_renovate", shot)
+    vision.find_template("btn_open", screenshot=shot)
+    vision.find_template("btn_fly", screenshot=shot)
+    # check_and_close_x
+    shot = frame()
+    vision.find_template_in_region("btn_close_x", regions["btn_close_x"], screenshot=shot)
+    # check_and_close_ads
+    shot = frame()
+    for name in ("btn_ad_close_x", "ad_close_x_gray", "ad_close_x1"):
+        vision.find_template_in_region(name, regions[name], screenshot=shot)
+    # upgrade_general
+    shot = frame()
+    vision.find_template("icon_upgrades", screenshot=shot)
+    # collect_items (two box thresholds + debug rematch + tips)
+    shot = frame()
+    thr_main = float(THRESHOLDS.get("box_floor", 0.68))
+    if not vision.find_template("box_floor", screenshot=shot, threshold=thr_main, find_all=True):
+        if not vision.find_template("box_floor", screenshot=shot, threshold=max(0.55, thr_main - 0.08), find_all=True):
+            vision.get_template_max_confidence("box_floor", screenshot=shot)
+    vision.find_template("tip_coin", screenshot=shot, find_all=True)
+    # upgrade_stations (+ debug rematch when no arrows)
+    shot = frame()
+    if not vision.find_in_station_zone("upgrade_arrow", screenshot=shot, find_all=True):
+        vision.get_template_max_confidence_in_station_zone("upgrade_arrow", screenshot=shot)
+
+
+def batched_tick(vision: VisionSystem, bgra: np.ndarray, grab) -> None:
+    """New main loop: one grab + conversion, then detect_all() over all tick detectors."""
+    raw = grab() if grab else bgra
+    shot = cv2.cvtColor(np.array(raw), cv2.COLOR_BGRA2BGR)
+    vision.detect_all(shot, tick_specs(vision, shot.shape[1], shot.shape[0]))
+
+
+def bench_tick(args) -> None:
+    vision = make_vision()
+    frames = load_frames(vision, args.frames, retina=args.retina)
+    grab = None
+    if args.grab:
+        import mss
+        sct = mss.mss()
+        grab = lambda: sct.grab(vision.game_region)  # noqa: E731
+
+    print(f"\n{'кадр':>6} {'waterfall, ms':>14} {'detect_all, ms':>15} {'экономия, ms':>13}")
+    savings = []
+    for i, frame in enumerate(frames, 1):
+        bgra = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+        old = timed(lambda: waterfall_tick(vision, bgra, grab), args.repeat)
+        new = timed(lambda: batched_tick(vision, bgra, grab), args.repeat)
+        savings.append(old - new)
+        print(f"{i:>6} {old:>14.2f} {new:>15.2f} {old - new:>13.2f}")
+    print(f"\nСредняя экономия на тик: {statistics.mean(savings):.2f} ms")
+    if not grab:
+        print("(без --grab захват mss не измеряется: каждый лишний grab добавляет к экономии)")
+
+
+# ===== NMS: O(n²) dedup vs _find_peaks =====
+
+def legacy_find_all(result: np.ndarray, threshold: float, min_distance: int = 20) -> list:
+    """Old find_all: every pixel >= threshold, pairwise distance dedup (first point wins)."""
+    filtered = []
+    for pt in zip(*np.where(result >= threshold)[::-1]):
+        is_duplicate = False
+        for existing in filtered:
+            if np.sqrt((pt[0] - existing[0]) ** 2 + (pt[1] - existing[1]) ** 2) < min_distance:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            filtered.append(pt)
+    return filtered
+
+
+def bench_nms(args) -> None:
+    vision = make_vision()
+    frames = load_frames(vision, args.frames, retina=args.retina, copies=args.copies)
+
+    print(f"\n{'шаблон':<14} {'порог':>6} {'пикселей':>9} {'old':>5} {'new':>5} "
+          f"{'old, ms':>9} {'new, ms':>9} {'x':>7}")
+    for name in args.templates:
+        template = vision.template_cache.get(name)
+        if template is None:
+            print(f"{name:<14} — шаблон не загружен")
+            continue
+        results = [cv2.matchTemplate(f, template, cv2.TM_CCOEFF_NORMED) for f in frames]
+        for thr in args.thresholds:
+            pixels = sum(int((r >= thr).sum()) for r in results)
+            old_n = sum(len(legacy_find_all(r, thr)) for r in results)
+            new_n = sum(len(vision._find_peaks(r, thr)) for r in results)
+            old = timed(lambda: [legacy_find_all(r, thr) for r in results], args.repeat)
+            new = timed(lambda: [vision._find_peaks(r, thr) for r in results], args.repeat)
+            ratio = old / new if new > 0 else float("inf")
+            print(f"{name:<14} {thr:>6.2f} {pixels:>9} {old_n:>5} {new_n:>5} "
+                  f"{old:>9.2f} {new:>9.2f} {ratio:>6.1f}x")
+    print("\n(пикселей — точки >= порога до дедупликации, old/new — найдено объектов)")
+
+
+# ===== MATCHING MODES: baseline vs pyramid / gray =====
+
+def compare_modes(vision: VisionSystem, frames: list, repeat: int, mode: dict, info) -> None:
+    """
+    Per template: baseline _match() (all modes off) vs _match(**mode).
+    info(name, template) -> short string for the 'режим' column.
+    """
+    base = {"pyramid": False, "gray": False}
+    new = {**base, **mode}
+    print(f"\n{'шаблон':<22} {'размер':>8} {'режим':>6} {'base, ms':>9} {'new, ms':>9} {'x':>6} {'Δ, px':>6}")
+    total_base = total_new = 0.0
+    for name, template in vision.template_cache.items():
+        thr = THRESHOLDS.get(name, THRESHOLDS["default"])
+        old = timed(lambda: [vision._match(f, name, template, thr, **base) for f in frames], repeat)
+        fast = timed(lambda: [vision._match(f, name, template, thr, **new) for f in frames], repeat)
+        total_base += old
+        total_new += fast
+        # Расхождение координат лучшего совпадения (только где оба нашли)
+        delta = 0
+        for f in frames:
+            a = vision._match(f, name, template, thr, **base)[1]
+            b = vision._match(f, name, template, thr, **new)[1]
+            if bool(a) != bool(b):
+                delta = float("inf")
+            elif a:
+                delta = max(delta, abs(a[0].x - b[0].x), abs(a[0].y - b[0].y))
+        size = f"{template.shape[1]}x{template.shape[0]}"
+        print(f"{name:<22} {size:>8} {info(name, template):>6} {old:>9.2f} {fast:>9.2f} {old / fast:>5.1f}x {delta:>6}")
+    print(f"\n{'всего':<22} {'':>8} {'':>6} {total_base:>9.2f} {total_new:>9.2f} {total_base / total_new:>5.1f}x")
+    print("(Δ — макс. расхождение координат с обычным матчингом, inf — один из режимов не нашёл)")
+
+
+def bench_pyramid(args) -> None:
+    vision = make_vision()
+    frames = load_frames(vision, args.frames, retina=args.retina, copies=args.copies)
+    compare_modes(
+        vision, frames, args.repeat, {"pyramid": True},
+        lambda name, template: f"1/{vision.pyramid_factor(name, template, frames[0].shape)}",
+    )
+
+
+def bench_gray(args) -> None:
+    from config import GRAY_MATCHING
+    vision = make_vision()
+    frames = load_frames(vision, args.frames, retina=args.retina, copies=args.copies)
+    min_thr = float(GRAY_MATCHING.get("MIN_THRESHOLD", 0.5))
+    verify = GRAY_MATCHING.get("COLOR_VERIFY", ())
+
+    def info(name, template):
+        if THRESHOLDS.get(name, THRESHOLDS["default"]) < min_thr:
+            return "bgr"
+        return "gray+c" if name in verify else "gray"
+
+    # Кадры как Frame: gray-копия кэшируется по frame_id, как в боте (один кадр — много шаблонов)
+    frames = [Frame(f, i, time.monotonic()) for i, f in enumerate(frames, 1)]
+    compare_modes(vision, frames, args.repeat, {"gray": True}, info)
+
+
+# ===== TILES: full re-match vs tile change gating =====
+
+def moving_sequence(base: np.ndarray, count: int, moving: int, seed: int = 1) -> list:
+    """Still camera: `moving` 24x24 sprites (customers, cooking animations) walk across base."""
+    rng = np.random.default_rng(seed)
+    h, w = base.shape[:2]
+    sprites = [rng.integers(0, 255, (24, 24, 3), dtype=np.uint8) for _ in range(moving)]
+    starts = [(int(rng.integers(0, w - 24)), int(rng.integers(0, h - 60))) for _ in range(moving)]
+    frames = []
+    for step in range(count):
+        frame = base.copy()
+        for sprite, (x, y) in zip(sprites, starts):
+            yy = y + (step * 3) % 36
+            frame[yy:yy + 24, x:x + 24] = sprite
+        frames.append(frame)
+    return frames
+
+
+def bench_tiles(args) -> None:
+    vision = make_vision()
+    base = load_frames(vision, args.frames, retina=args.retina)[0]
+    frames = moving_sequence(base, args.count, args.moving)
+    specs = tick_specs(vision, base.shape[1], base.shape[0])
+    next_id = [0]
+
+    def run(gated: bool) -> tuple:
+        vision.tile_gating_enabled = gated
+        vision.reset_tile_gate()
+        results, samples = [], []
+        for f in frames:
+            next_id[0] += 1
+            frame = Frame(f, next_id[0], time.monotonic())
+            started = time.perf_counter()
+            det = vision.detect_all(frame, specs)
+            samples.append((time.perf_counter() - started) * 1000.0)
+            results.append({k: sorted((m.x, m.y) for m in v) for k, v in det.matches.items()})
+        # Первый кадр всегда полный — в среднее не входит
+        return results, statistics.mean(samples[1:])
+
+    full, full_ms = run(False)
+    vision.tile_stats = {"reused": 0, "partial": 0, "full": 0}
+    gated, gated_ms = run(True)
+    mismatches = sum(a != b for a, b in zip(full, gated))
+
+    print(f"\nКадр {base.shape[1]}x{base.shape[0]}, кадров {len(frames)}, движущихся спрайтов {args.moving}")
+    print(f"{'режим':<20} {'ms/кадр':>9}")
+    print(f"{'полный матчинг':<20} {full_ms:>9.2f}")
+    print(f"{'tile gating':<20} {gated_ms:>9.2f}  ({full_ms / gated_ms:.1f}x)")
+    print(f"\nСпеки: {vision.tile_stats}")
+    print(f"Кадров с отличиями от полного матчинга: {mismatches}")
+
+
+# ===== PARALLEL: detect_all per pool size =====
+
+def ad_scan_specs(w: int, h: int) -> list:
+    """Ad close-button scan (mirrors _find_best_close_button): 2 corners + top 30% band."""
+    corner_w, corner_h, upper_h = int(w * 0.25), int(h * 0.25), int(h * 0.30)
+    regions = [(0, 0, corner_w, corner_h), (w - corner_w, 0, corner_w, corner_h), (0, 0, w, upper_h)]
+    names = ["btn_ad_close_x", "ad_close_x_gray", "ad_close_x1"] + [f"ad{i}" for i in range(1, 11)]
+    return [
+        DetectionSpec(name, name=f"{name}@{i}", region=region)
+        for i, region in enumerate(regions)
+        for name in names
+    ]
+
+
+def bench_parallel(args) -> None:
+    vision = make_vision()
+    vision.tile_gating_enabled = False  # меряем сам матчинг
+    frames = load_frames(vision, args.frames, retina=args.retina)
+    h, w = frames[0].shape[:2]
+    batches = {"tick": tick_specs(vision, w, h), "ad scan": ad_scan_specs(w, h)}
+
+    print(f"\nЯдер: {os.cpu_count()}")
+    print(f"{'набор':<10} {'потоков':>8} {'cv threads':>11} {'ms':>9} {'x':>6} {'совпадает':>10}")
+    for label, specs in batches.items():
+        reference = base_ms = None
+        for workers in args.workers:
+            vision.executor.shutdown()
+            vision.executor = MatchExecutor(workers=workers)
+            ms = timed(lambda: [vision.detect_all(f, specs) for f in frames], args.repeat)
+            result = [(dict(d.matches), dict(d.scores)) for d in (vision.detect_all(f, specs) for f in frames)]
+            if reference is None:
+                reference, base_ms = result, ms
+            same = "да" if result == reference else "НЕТ"
+            print(f"{label:<10} {workers:>8} {cv2.getNumThreads():>11} {ms:>9.2f} {base_ms / ms:>5.1f}x {same:>10}")
+    vision.executor.shutdown()
+
+
+# ===== FFT: k x matchTemplate vs shared spectrum =====
+
+def fft_images(frame: np.ndarray) -> dict:
+    """Images the bot searches several templates in: full frame, ad band, ad corner."""
+    h, w = frame.shape[:2]
+    return {
+        "кадр": frame,
+        "полоса 30%": frame[0:int(h * 0.30), :],
+        "угол 25%": frame[0:int(h * 0.25), w - int(w * 0.25):],
+    }
+
+
+def crossover(spectrum_ms: float, shared_ms: float, direct_ms: float, limit: int = 64):
+    """Smallest k with spectrum + k·shared < k·direct (None: not within `limit`)."""
+    for k in range(1, limit + 1):
+        if spectrum_ms + k * shared_ms < k * direct_ms:
+            return k
+    return None
+
+
+def bench_fft(args) -> None:
+    vision = make_vision()
+    frame = load_frames(vision, args.frames, retina=args.retina)[0]
+    matcher = SharedSpectrumMatcher()
+    model = vision.fft.cost  # коэффициенты из FFT_MATCHING
+
+    print(f"\n{'картинка':<12} {'размер':>9} {'k':>4} {'matchTemplate':>14} {'спектр':>9} {'x':>6} {'max |Δ|':>9} {'пики':>6} {'модель':>7}")
+    for label, image in fft_images(frame).items():
+        ih, iw = image.shape[:2]
+        templates = [
+            (name, t) for name, t in sorted(vision.template_cache.items())
+            if t.shape[0] <= ih and t.shape[1] <= iw
+        ]
+        if not templates:
+            continue
+        first_win = None
+        for k in args.counts:
+            batch = [templates[i % len(templates)] for i in range(k)]
+
+            def direct():
+                return [cv2.matchTemplate(image, t, cv2.TM_CCOEFF_NORMED) for _, t in batch]
+
+            def shared():
+                spectrum = ImageSpectrum(image)
+                return [matcher.match(spectrum, name, t) for name, t in batch]
+
+            shared()  # спектры шаблонов кэшируются, как в боте
+            direct_ms = timed(direct, args.repeat)
+            shared_ms = timed(shared, args.repeat)
+            diff, same_peaks = 0.0, 0
+            for ref, res in zip(direct(), shared()):
+                diff = max(diff, float(np.abs(ref - res).max()))
+                same_peaks += cv2.minMaxLoc(ref)[3] == cv2.minMaxLoc(res)[3]
+            if first_win is None and shared_ms < direct_ms:
+                first_win = k
+            choice = "спектр" if model.prefers_shared(image.shape, [t.shape for _, t in batch]) else "direct"
+            print(f"{label:<12} {f'{iw}x{ih}':>9} {k:>4} {direct_ms:>14.2f} {shared_ms:>9.2f} "
+                  f"{direct_ms / shared_ms:>5.1f}x {diff:>9.1e} {same_peaks:>3}/{k} {choice:>7}")
+        print(f"{'':<12} выгодно с k = {first_win if first_win is not None else '—'}")
+
+    # Модель стоимости (MatchCostModel): квадратные шаблоны-вырезки разных размеров
+    # на тех же картинках → коэффициенты для FFT_MATCHING и точка перехода по k
+    direct_rows, direct_ns, spectrum_ns, template_ns, table = [], [], [], [], []
+    for label, image in fft_images(frame).items():
+        ih, iw = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        spectrum = ImageSpectrum(image)
+        dft_area = spectrum.dft_shape[0] * spectrum.dft_shape[1]
+        spec_ms = timed(lambda: ImageSpectrum(image), args.repeat)
+        spectrum_ns.append(spec_ms * 1e6 / (dft_area * channels))
+        for size in args.sizes:
+            if size >= min(ih, iw):
+                continue
+            y0, x0 = (ih - size) // 2, (iw - size) // 2
+            template = np.ascontiguousarray(image[y0:y0 + size, x0:x0 + size])
+            tspec = matcher.template_spectrum(f"crop{size}", template, spectrum.dft_shape)
+
+            def per_template():
+                spectrum._window_std.clear()  # шаблон другого размера — свои оконные суммы
+                return spectrum.match(tspec)
+
+            direct_ms = timed(lambda: cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED), args.repeat)
+            shared_ms = timed(per_template, args.repeat)
+            out_px = (ih - size + 1) * (iw - size + 1)
+            direct_rows.append((1.0, float(size)))
+            direct_ns.append(direct_ms * 1e6 / out_px)
+            template_ns.append(shared_ms * 1e6 / dft_area)
+            table.append((label, f"{iw}x{ih}", image.shape, size, crossover(spec_ms, shared_ms, direct_ms)))
+    if not table:
+        return
+    (base, per_side), *_ = np.linalg.lstsq(np.array(direct_rows), np.array(direct_ns), rcond=None)
+    fitted = MatchCostModel(
+        direct_base=float(base),
+        direct_per_side=float(per_side),
+        spectrum=float(statistics.median(spectrum_ns)),
+        per_template=float(statistics.median(template_ns)),
+    )
+
+    def model_crossover(cost: MatchCostModel, shape: tuple, size: int):
+        for k in range(1, 65):
+            if cost.prefers_shared(shape, [(size, size)] * k):
+                return k
+        return None
+
+    print(f"\n{'картинка':<12} {'размер':>9} {'шаблон':>7} {'k замер':>8} {'k модель':>9} {'k конфиг':>9}")
+    for label, size_label, shape, size, measured in table:
+        cells = [measured, model_crossover(fitted, shape, size), model_crossover(model, shape, size)]
+        cells = ["—" if k is None else str(k) for k in cells]
+        print(f"{label:<12} {size_label:>9} {f'{size}px':>7} {cells[0]:>8} {cells[1]:>9} {cells[2]:>9}")
+    print("\nFFT_MATCHING (подогнано по этой машине):")
+    print(f'    "COST_DIRECT_BASE_NS": {fitted.direct_base:.1f},')
+    print(f'    "COST_DIRECT_PER_SIDE_NS": {fitted.direct_per_side:.2f},')
+    print(f'    "COST_SPECTRUM_NS": {fitted.spectrum:.1f},')
+    print(f'    "COST_PER_TEMPLATE_NS": {fitted.per_template:.1f},')
+
+
+# ===== DIFF: per-bot frame comparisons vs FrameDiff =====
+
+def legacy_change_percent(prev: np.ndarray, new: np.ndarray) -> float:
+    """E3 GameLogic._screenshot_change_percent before FrameDiff: 3-channel absdiff + count_nonzero."""
+    diff = cv2.absdiff(prev, new)
+    return np.count_nonzero(diff > 30) / diff.size * 100.0
+
+
+def legacy_v2_mse(prev: np.ndarray, new: np.ndarray) -> float:
+    """EatV2 Vision.calculate_mse before FrameDiff: float64 copies, sum over channels / pixels."""
+    err = np.sum((prev.astype("float") - new.astype("float")) ** 2)
+    return err / float(prev.shape[0] * prev.shape[1])
+
+
+def legacy_eat_mse(prev: np.ndarray, new: np.ndarray) -> float:
+    """Eat Navigator._compute_diff before FrameDiff: float64 copies, mean over channel elements."""
+    return float(np.mean((prev.astype("float") - new.astype("float")) ** 2))
+
+
+def legacy_abs_sum(prev: np.ndarray, new: np.ndarray) -> float:
+    """E3 fly_to_bottom before FrameDiff: np.sum of the full 3-channel absdiff (limit 500000)."""
+    return float(np.sum(cv2.absdiff(prev, new)))
+
+
+def diff_pairs(frames: list, shifts: list) -> list:
+    """(label, prev, new): consecutive recorded frames + every frame scrolled by each shift (0 = walking sprites)."""
+    pairs = [(f"rec {i}-{i + 1}", frames[i], frames[i + 1])
+             for i in range(len(frames) - 1) if frames[i].shape == frames[i + 1].shape]
+    for i, frame in enumerate(frames):
+        for dy in shifts:
+            if dy == 0:
+                still = moving_sequence(frame, 2, 3)
+                pairs.append((f"#{i} still", still[0], still[1]))
+            else:
+                pairs.append((f"#{i} dy={dy}", frame, np.roll(frame, dy, axis=0).copy()))
+    return pairs
+
+
+def bench_diff(args) -> None:
+    vision = make_vision()
+    frames = load_frames(vision, args.frames, retina=args.retina)
+    pairs = diff_pairs(frames, args.shifts)
+    diff = FrameDiff(cache_size=2 * len(pairs))  # все кадры пар помещаются в кэш
+
+    print(f"\nКадр {frames[0].shape[1]}x{frames[0].shape[0]}, пар {len(pairs)}")
+    print(f"{'пара':<14} {'% стар':>7} {'% нов':>7} {'MSE V2':>9} {'MSE Eat':>9} {'MSE нов':>8} {'Σ|diff|':>11}")
+    for label, prev, new in pairs:
+        print(
+            f"{label:<14} {legacy_change_percent(prev, new):>7.1f} {diff.changed_fraction(prev, new) * 100:>7.1f} "
+            f"{legacy_v2_mse(prev, new):>9.0f} {legacy_eat_mse(prev, new):>9.0f} {diff.mse(prev, new):>8.0f} "
+            f"{legacy_abs_sum(prev, new):>11.0f}"
+        )
+
+    # Холодный FrameDiff: миниатюры строятся заново (кадры только что сняты, refresh при захвате);
+    # тёплый: обе миниатюры уже в кэше (второе и следующие сравнения того же кадра).
+    def cold(metric):
+        def run():
+            for _, prev, new in pairs:
+                diff.refresh(prev)
+                diff.refresh(new)
+                metric(prev, new)
+        return run
+
+    def warm(metric):
+        def run():
+            for _, prev, new in pairs:
+                metric(prev, new)
+        return run
+
+    rows = [
+        ("% изм.: absdiff 3 канала", warm(legacy_change_percent)),
+        ("MSE: EatV2 float64", warm(legacy_v2_mse)),
+        ("MSE: Eat float64", warm(legacy_eat_mse)),
+        ("Σ|diff|: fly_to_bottom", warm(legacy_abs_sum)),
+        ("FrameDiff % (холодный)", cold(diff.changed_fraction)),
+        ("FrameDiff MSE (холодный)", cold(diff.mse)),
+        ("FrameDiff % (кэш)", warm(diff.changed_fraction)),
+        ("FrameDiff MSE (кэш)", warm(diff.mse)),
+        ("FrameDiff полосы (кэш)", warm(lambda a, b: diff.bands(a, b, [(0.0, 0.15), (0.85, 1.0)]))),
+    ]
+    print(f"\n{'метрика':<28} {'ms/пару':>9} {'байт/пару':>12}")
+    for label, fn in rows:
+        ms = timed(fn, args.repeat) / len(pairs)
+        allocs = allocated_bytes(fn, max(1, args.repeat // 4)) / len(pairs)
+        print(f"{label:<28} {ms:>9.3f} {allocs:>12,.0f}")
+    print("\nMSE FrameDiff — серый, миниатюра 1/4: пороги MSE пересчитаны (см. FRAME_DIFF в config EatV2/Eat)")
+
+
+# ===== CAPTURE: allocations per grab =====
+
+def allocated_bytes(fn, repeat: int) -> float:
+    """Average peak bytes allocated during one fn() call (tracemalloc, numpy buffers included)."""
+    tracemalloc.start()
+    fn()  # прогрев: пул выделяет буфер при первом вызове
+    samples = []
+    for _ in range(repeat):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()  # результат сразу отпускаем, как бот отпускает старые кадры
+        samples.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return statistics.mean(samples)
+
+
+def bench_capture(args) -> None:
+    import mss
+    from mss.screenshot import ScreenShot
+
+    vision = make_vision()
+    scale = 2 if args.retina else 1
+    w, h = vision.game_region["width"] * scale, vision.game_region["height"] * scale
+    if args.grab:
+        sct = mss.mss()
+        grab = lambda: sct.grab(vision.game_region)  # noqa: E731
+    else:
+        # Без экрана: готовый mss ScreenShot из случайных BGRA-байт (сам grab не измеряется)
+        data = bytearray(np.random.default_rng(0).integers(0, 255, w * h * 4, dtype=np.uint8).tobytes())
+        shot = ScreenShot.from_size(data, w, h)
+        grab = lambda: shot  # noqa: E731
+
+    pool = FrameBufferPool()
+
+    def old():
+        return cv2.cvtColor(np.array(grab()), cv2.COLOR_BGRA2BGR)
+
+    def new():
+        return bgra_to_bgr(grab(), pool)
+
+    first = grab()
+    assert np.array_equal(old(), bgra_to_bgr(first, FrameBufferPool())), "BGR mismatch"
+
+    print(f"\nКадр {first.width}x{first.height}{' (mss grab)' if args.grab else ''}")
+    print(f"{'путь':<28} {'ms/кадр':>9} {'байт/кадр':>12}")
+    for label, fn in (("np.array + cvtColor", old), ("frombuffer + пул буферов", new)):
+        ms = timed(fn, args.repeat)
+        allocs = allocated_bytes(fn, args.repeat)
+        print(f"{label:<28} {ms:>9.3f} {allocs:>12,.0f}")
+    print(f"\nПул: {pool.stats}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EatventureBot V3 vision benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_tick = sub.add_parser("tick", help="waterfall vs detect_all per main-loop tick")
+    p_tick.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames")
+    p_tick.add_argument("--repeat", type=int, default=20)
+    p_tick.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_tick.add_argument("--grab", action="store_true", help="include real mss grabs")
+    p_tick.set_defaults(func=bench_tick)
+
+    p_nms = sub.add_parser("nms", help="find_all dedup vs vectorized peak extraction")
+    p_nms.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames")
+    p_nms.add_argument("--templates", nargs="+", default=["box_floor", "tip_coin", "upgrade_arrow"])
+    p_nms.add_argument("--thresholds", nargs="+", type=float, default=[0.5, 0.6, 0.68, 0.78, 0.85])
+    p_nms.add_argument("--repeat", type=int, default=5)
+    p_nms.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_nms.add_argument("--copies", type=int, default=8, help="template copies on the synthetic frame")
+    p_nms.set_defaults(func=bench_nms)
+
+    p_pyr = sub.add_parser("pyramid", help="full-resolution vs coarse-to-fine matching per template")
+    p_pyr.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames")
+    p_pyr.add_argument("--repeat", type=int, default=5)
+    p_pyr.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_pyr.add_argument("--copies", type=int, default=1, help="template copies on the synthetic frame (>1 gives ties)")
+    p_pyr.set_defaults(func=bench_pyramid)
+
+    p_gray = sub.add_parser("gray", help="BGR vs gray + color verification per template")
+    p_gray.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames")
+    p_gray.add_argument("--repeat", type=int, default=5)
+    p_gray.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_gray.add_argument("--copies", type=int, default=1, help="template copies on the synthetic frame (>1 gives ties)")
+    p_gray.set_defaults(func=bench_gray)
+
+    p_cap = sub.add_parser("capture", help="allocations and ms per BGRA→BGR capture conversion")
+    p_cap.add_argument("--repeat", type=int, default=200)
+    p_cap.add_argument("--retina", action="store_true", help="2x frame")
+    p_cap.add_argument("--grab", action="store_true", help="include real mss grabs")
+    p_cap.set_defaults(func=bench_capture)
+
+    p_tiles = sub.add_parser("tiles", help="full re-match vs tile change gating on a still camera")
+    p_tiles.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames (first one is the base)")
+    p_tiles.add_argument("--count", type=int, default=30, help="frames in the sequence")
+    p_tiles.add_argument("--moving", type=int, default=3, help="moving sprites per frame")
+    p_tiles.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_tiles.set_defaults(func=bench_tiles)
+
+    p_par = sub.add_parser("parallel", help="detect_all per MatchExecutor pool size")
+    p_par.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames")
+    p_par.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, os.cpu_count() or 1])
+    p_par.add_argument("--repeat", type=int, default=5)
+    p_par.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_par.set_defaults(func=bench_parallel)
+
+    p_fft = sub.add_parser("fft", help="k x matchTemplate vs one shared image spectrum")
+    p_fft.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames (first one is used)")
+    p_fft.add_argument("--counts", nargs="+", type=int, default=[1, 2, 3, 4, 6, 8, 13])
+    p_fft.add_argument("--sizes", nargs="+", type=int, default=[8, 16, 32, 64, 128],
+                       help="square template sizes for the cost-model fit")
+    p_fft.add_argument("--repeat", type=int, default=5)
+    p_fft.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_fft.set_defaults(func=bench_fft)
+
+    p_diff = sub.add_parser("diff", help="per-bot frame comparisons vs FrameDiff on cached thumbnails")
+    p_diff.add_argument("--frames", default=DEFAULT_FRAMES, help="glob of recorded frames (consecutive ones form pairs)")
+    p_diff.add_argument("--shifts", nargs="+", type=int, default=[0, 2, 8, 30, 100], help="synthetic scroll px (0 = still camera)")
+    p_diff.add_argument("--repeat", type=int, default=20)
+    p_diff.add_argument("--retina", action="store_true", help="synthetic frame at 2x")
+    p_diff.set_defaults(func=bench_diff)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+EatventureBot V3 - Shared Module Check
+
+E3, EatV2 and Eat are self-contained bots (own requirements.txt and import root),
+so modules they share are copied into each bot's core/ instead of imported from a
+common package. This check fails when the code of the copies drifts apart.
+
+Copies may differ only where the bot differs: docstrings and comments, the import
+root (`from core.x` / `from .x`), the logger assignment and log message text.
+Everything else (the AST with those parts removed) must be identical.
+
+Usage:
+    python tools/check_shared_modules.py          # exit code 1 on drift
+    python tools/check_shared_modules.py --diff   # also print the differing code
+"""
+
+import argparse
+import ast
+import difflib
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Модуль → его копии (пути от корня репозитория); первая — эталон для diff
+SHARED_MODULES = {
+    "frame_diff.py": ("E3/core", "EatV2/core", "Eat/src/core"),
+    "animation_mask.py": ("E3/core", "EatV2/core", "Eat/src/core"),
+    "input_backends.py": ("E3/core", "EatV2/core", "Eat/src/core"),
+    "screen_signature.py": ("E3/core", "EatV2/core"),
+    "pipeline.py": ("E3/core", "EatV2/core", "Eat/src/core"),
+    "capture.py": ("E3/core", "EatV2/core"),
+}
+
+LOG_METHODS = {"debug", "info", "warning", "error", "exception", "critical"}
+
+
+class _Normalize(ast.NodeTransformer):
+    """Drops the parts copies are allowed to differ in."""
+
+    def _strip_docstring(self, node):
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            node.body = body[1:] or [ast.Pass()]
+        return node
+
+    def visit_Module(self, node):
+        self.generic_visit(node)
+        node = self._strip_docstring(node)
+        # logger = logging.getLogger(...) — имя логгера своё у каждого бота
+        node.body = [
+            stmt for stmt in node.body
+            if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1
+                    and isinstance(stmt.targets[0], ast.Name) and stmt.targets[0].id == "logger")
+        ]
+        return node
+
+    def visit_ClassDef(self, node):
+        self.generic_visit(node)
+        return self._strip_docstring(node)
+
+    def visit_FunctionDef(self, node):
+        self.generic_visit(node)
+        return self._strip_docstring(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ImportFrom(self, node):
+        # from core.frame_diff / from src.core.frame_diff / from .frame_diff → frame_diff
+        if node.level or (node.module or "").split(".")[0] in ("core", "src"):
+            node.module = (node.module or "").split(".")[-1]
+            node.level = 0
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in LOG_METHODS \
+                and isinstance(func.value, ast.Name) and func.value.id in ("logger", "log"):
+            node.args, node.keywords = [], []
+        return node
+
+
+def normalized_code(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    return ast.unparse(ast.fix_missing_locations(_Normalize().visit(tree)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that modules copied between the bots stay identical")
+    parser.add_argument("--diff", action="store_true", help="print the differing code")
+    args = parser.parse_args()
+
+    drifted = 0
+    for module, folders in SHARED_MODULES.items():
+        paths = [os.path.join(folder, module) for folder in folders]
+        missing = [p for p in paths if not os.path.exists(os.path.join(REPO_ROOT, p))]
+        if missing:
+            print(f"❌ {module}: нет копии {', '.join(missing)}")
+            drifted += 1
+            continue
+        reference = normalized_code(os.path.join(REPO_ROOT, paths[0]))
+        bad = []
+        for path in paths[1:]:
+            code = normalized_code(os.path.join(REPO_ROOT, path))
+            if code == reference:
+                continue
+            bad.append(path)
+            if args.diff:
+                sys.stdout.writelines(difflib.unified_diff(
+                    reference.splitlines(True), code.splitlines(True), paths[0], path,
+                ))
+        if bad:
+            print(f"❌ {module}: код расходится с {paths[0]}: {', '.join(bad)}")
+            drifted += 1
+        else:
+            print(f"✅ {module}: {len(paths)} копии совпадают")
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+EatventureBot V3 - Asset Compiler
+
+Decodes every image under assets/ (including ads/ and No/) into the template
+pack assets/.pack/ (templates.npy + index.json, see core/template_pack.py).
+
+The bot rebuilds the pack by itself when a PNG changes; this tool forces a
+rebuild and prints what is inside.
+
+Usage:
+    python tools/compile_assets.py           # rebuild only if sources changed
+    python tools/compile_assets.py --force   # always rebuild
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)  # ASSETS_DIR is relative to project root
+
+from config import ASSETS_DIR
+from core.template_pack import TemplatePack
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EatventureBot V3 asset compiler")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the pack is up to date")
+    args = parser.parse_args()
+
+    pack = TemplatePack(ASSETS_DIR).load(rebuild=args.force)
+    print(f"Pack: {pack.pack_dir}")
+    print(f"Картинок: {len(pack.entries)}, загрузка {pack.stats['load_ms']:.1f} ms "
+          f"({'пересобран' if pack.stats['built'] else 'актуален'})")
+    print(f"\n{'файл':<36} {'размер':>9} {'варианты':<24} sha1")
+    for rel, entry in sorted(pack.entries.items()):
+        h, w = entry["shape"][:2]
+        variants = ", ".join(sorted(entry["variants"]))
+        print(f"{rel:<36} {f'{w}x{h}':>9} {variants:<24} {entry['sha1'][:10]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 # Eatventure Bot - Core Engine
 from .config import ASSETS_PATH, DEBUG_PATH, SCALE_FACTOR, CONFIDENCE_THRESHOLD
 from .logger import get_logger, save_debug_screenshot
-from .vision import find_template, find_image, find_all_images, wait_for_image
+from .vision import find_template, find_image, find_all_images, wait_for_image, wait_for_any, warm_up_animation_mask
 from .input import click_element, click_exact, long_click, hold_until_condition
 
 __all__ = [
@@ -15,6 +15,8 @@ __all__ = [
     "find_image",
     "find_all_images",
     "wait_for_image",
+    "wait_for_any",
+    "warm_up_animation_mask",
     "click_element",
     "click_exact",
     "long_click",
@@ -0,0 +1,197 @@
+"""
+Animation Mask
+Which pixels move on their own (customers, cars, cooking animations) while the
+camera stands still — learned online, per pixel, from the frames the bot captures.
+
+Raw frame comparisons count walking customers as "change" (20-30% of the screen),
+so scroll-edge / settle checks needed hand-tuned thresholds and confirmation swipes.
+Every change metric here ignores the animated pixels: at the edge of the level the
+remaining (static) pixels do not change at all, any real scroll changes many of them.
+
+Model: gray thumbnail (1/4 resolution, shared with FrameDiff — core/frame_diff.py); every observed frame updates an exponential
+moving mean and variance per pixel (d = x - mean; mean += a·d; var = (1-a)·(var + a·d²)).
+A frame where a large part changed compared to the previous one (camera moving,
+panel opening) is not learned from. Animated = std above std_threshold, dilated
+by one thumbnail pixel.
+
+When the camera moves by a measured amount the model moves with the content
+(customers walk inside the level, not on the screen); rows that come into view
+are unknown and count as static until observed.
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .frame_diff import FrameDiff
+
+
+class AnimationMask:
+    """
+    Args:
+        scale: Thumbnail scale (0.25 = 1/4 resolution)
+        alpha: Learning rate of the variance estimate (≈ 1 / frames of memory)
+        pixel_threshold: |diff| (0-255, thumbnail) that counts as a changed pixel
+        std_threshold: Temporal std (0-255) above which a pixel is animated
+        min_frames: Still-camera comparisons needed before the mask is used
+        max_learn_change: Pairs with more changed pixels (fraction) are not learned from
+        thumbs: FrameDiff whose cached thumbnails to use (its scale wins over `scale`)
+    """
+
+    def __init__(
+        self,
+        scale: float = 0.25,
+        alpha: float = 0.1,
+        pixel_threshold: int = 20,
+        std_threshold: float = 6.0,
+        min_frames: int = 6,
+        max_learn_change: float = 0.3,
+        thumbs: Optional[FrameDiff] = None,
+    ):
+        self.thumbs = thumbs if thumbs is not None else FrameDiff(scale)
+        self.scale = self.thumbs.scale
+        self.alpha = alpha
+        self.pixel_threshold = pixel_threshold
+        self.var_threshold = float(std_threshold) ** 2
+        self.min_frames = min_frames
+        self.max_learn_change = max_learn_change
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything (new level, camera moved by an unknown amount)."""
+        self._prev: Optional[np.ndarray] = None
+        self._mean: Optional[np.ndarray] = None  # float32, thumbnail size
+        self._var: Optional[np.ndarray] = None
+        self._unknown_rows: Optional[slice] = None  # строки, въехавшие после сдвига камеры
+        self._mask: Optional[np.ndarray] = None  # uint8, 255 = animated (lazy, from _var)
+        self.frames = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._var is not None and self.frames >= self.min_frames
+
+    def thumb(self, frame: np.ndarray) -> np.ndarray:
+        """Gray uint8 thumbnail of a BGR (or gray) frame (cached by FrameDiff)."""
+        return self.thumbs.thumb(frame)
+
+    # ===== LEARNING =====
+
+    def observe(self, frame: np.ndarray) -> bool:
+        """
+        Learn from a captured frame. Skipped when too much changed since the
+        previous observed frame (camera moving, panel opening).
+        Returns True if the frame was learned from.
+        """
+        thumb = self.thumb(frame)
+        prev, self._prev = self._prev, thumb
+        if self._mean is not None and self._mean.shape != thumb.shape:
+            self.reset()
+            self._prev = thumb
+            return False
+        if prev is not None and prev.shape == thumb.shape:
+            diff = cv2.absdiff(thumb, prev)
+            changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1])
+            if changed > self.max_learn_change * diff.size:
+                return False
+        value = thumb.astype(np.float32)
+        if self._mean is None:
+            self._mean = value
+            self._var = np.zeros_like(value)
+            return True
+        if self._unknown_rows is not None:
+            self._mean[self._unknown_rows] = value[self._unknown_rows]
+            self._unknown_rows = None
+        a = self.alpha
+        d = cv2.subtract(value, self._mean)
+        cv2.scaleAdd(d, a, self._mean, dst=self._mean)
+        self._var = cv2.multiply(cv2.add(self._var, cv2.multiply(d, d, scale=a)), 1.0 - a)
+        self.frames += 1
+        self._mask = None
+        return True
+
+    def camera_moved(self, content_dy: Optional[float] = None) -> None:
+        """
+        The camera moved. content_dy: measured content shift in frame px
+        (> 0 content went down on screen) — the model moves with it;
+        None — unknown shift, start over.
+        """
+        self._prev = None
+        if content_dy is None or self._mean is None:
+            self.reset()
+            return
+        rows = int(round(content_dy * self.scale))
+        h = self._mean.shape[0]
+        if abs(rows) >= h or (rows and self._unknown_rows is not None):
+            # Вышли за кадр / второй сдвиг без кадра между ними — проще начать заново
+            self.reset()
+            return
+        if rows:
+            self._mean = np.roll(self._mean, rows, axis=0)
+            self._var = np.roll(self._var, rows, axis=0)
+            # Въехавшие строки неизвестны: вариация 0 (статика), среднее — из следующего кадра
+            new_rows = slice(0, rows) if rows > 0 else slice(rows, None)
+            self._var[new_rows] = 0.0
+            self._unknown_rows = new_rows
+            self._mask = None
+
+    # ===== MASK =====
+
+    def mask(self) -> Optional[np.ndarray]:
+        """uint8 thumbnail-size mask, 255 = animated pixel. None until ready."""
+        if not self.ready:
+            return None
+        if self._mask is None:
+            animated = cv2.threshold(self._var, self.var_threshold, 255, cv2.THRESH_BINARY)[1].astype(np.uint8)
+            self._mask = cv2.dilate(animated, np.ones((3, 3), np.uint8))
+        return self._mask
+
+    def animated_fraction(self) -> Optional[float]:
+        mask = self.mask()
+        return cv2.countNonZero(mask) / mask.size if mask is not None else None
+
+    def static_region(
+        self,
+        frame_shape: Tuple[int, ...],
+        roi: Optional[Tuple[int, int, int, int]] = None,
+        size: Optional[Tuple[int, int]] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        uint8 mask of STATIC pixels (255) for a region of the frame, resized to
+        `size` (width, height) — for comparisons made at another scale/crop.
+        roi: (x, y, width, height) in frame px, None = whole frame. None until ready.
+        """
+        mask = self.mask()
+        if mask is None:
+            return None
+        if roi is not None:
+            x, y, w, h = roi
+            mh, mw = mask.shape
+            fx, fy = mw / frame_shape[1], mh / frame_shape[0]
+            x1, y1 = max(0, int(x * fx)), max(0, int(y * fy))
+            x2, y2 = min(mw, max(x1 + 1, int(round((x + w) * fx)))), min(mh, max(y1 + 1, int(round((y + h) * fy))))
+            mask = mask[y1:y2, x1:x2]
+        static = cv2.bitwise_not(mask)
+        if size is not None and (static.shape[1], static.shape[0]) != tuple(size):
+            static = cv2.resize(static, tuple(size), interpolation=cv2.INTER_NEAREST)
+        return static
+
+    # ===== METRICS =====
+
+    def changed_percent(self, prev: np.ndarray, new: np.ndarray) -> Optional[float]:
+        """
+        % of STATIC pixels that changed between two frames (animated pixels excluded).
+        None until the mask is ready (callers fall back to their raw metric).
+        """
+        mask = self.mask()
+        if mask is None:
+            return None
+        a, b = self.thumb(prev), self.thumb(new)
+        if a.shape != b.shape or a.shape != mask.shape:
+            return None
+        changed = cv2.threshold(cv2.absdiff(a, b), self.pixel_threshold, 255, cv2.THRESH_BINARY)[1]
+        static = cv2.bitwise_not(mask)
+        total = cv2.countNonZero(static)
+        if total == 0:
+            return None
+        return 100.0 * cv2.countNonZero(cv2.bitwise_and(changed, static)) / total
@@ -35,6 +35,27 @@ MENU_OPEN_DELAY = 0.5
 HOLD_DURATION = 2.0   # Задержка мышки на синей кнопке с монеткой (секунды)
 SWIPE_DURATION = 0.5
 
+# --- WAIT FOR ANY (vision.wait_for_any: ждём одну из нескольких кнопок) ---
+WAIT_FRAME_INTERVAL = 0.03     # Секунд между кадрами (одна mss-сессия на всё ожидание)
+WAIT_CHANGE_THRESHOLD = 12     # max |diff| (0-255) серой 1/4-миниатюры зон: меньше — кадр тот же, не матчим
+WAIT_REEVALUATE_SEC = 1.0      # Матчить без изменений всё равно раз в столько (медленное появление)
+
+# --- FRAME DIFF (src/core/frame_diff.py: серая миниатюра 1/4 на кадр, кэш; MSE / % изменений по ней) ---
+FRAME_DIFF_SCALE = 0.25             # Миниатюра 1/4 (её же использует маска анимаций)
+FRAME_DIFF_PIXEL_THRESHOLD = 30     # |diff| (0-255) пикселя миниатюры = изменился
+FRAME_DIFF_CACHE_SIZE = 8           # Миниатюр последних кадров в кэше
+
+# --- ANIMATION MASK (src/core/animation_mask.py: какие пиксели анимированы при неподвижной камере) ---
+# Навигатор ловит упор по % изменившихся СТАТИЧНЫХ пикселей (посетители не считаются);
+# пока маска не готова — старый порог MSE (Navigator.wall_threshold).
+ANIMATION_MASK_ENABLED = True
+ANIMATION_MASK_ALPHA = 0.05            # Скорость обучения (≈ 1/кадров памяти)
+ANIMATION_MASK_PIXEL_THRESHOLD = 20    # |diff| (0-255) пикселя миниатюры = изменился
+ANIMATION_MASK_STD_THRESHOLD = 6.0     # Временное std выше — пиксель анимированный
+ANIMATION_MASK_MIN_FRAMES = 6          # Кадров при неподвижной камере до использования маски
+ANIMATION_EDGE_CHANGE_PCT = 8.0        # % статичных пикселей меньше — контент не сдвинулся (упор)
+ANIMATION_WARM_UP_INTERVAL = 0.05      # Секунд между кадрами прогрева маски перед свайпом
+
 # --- SPATIAL MEMORY (Station Upgrader: 10 сек — не кликать ту же стрелку повторно) ---
 SPATIAL_COOLDOWN_SEC = 10.0   # Секунд — игнорировать стрелку в этом радиусе после клика
 SPATIAL_RADIUS_PX = 40        # Радиус (px) — считать "той же" стрелкой
@@ -52,3 +73,14 @@ SWEEP_PASSES_PER_SCREEN = 2      # Upgrade passes at each scroll position during
 STATION_OFFSET_X = 5   # право
 STATION_OFFSET_Y = 20  # вниз (было 40, уменьшено в 2 раза)
 CLICK_OFFSET_MAX = 5
+
+# --- INPUT BACKEND (src/core/input_backends.py) ---
+INPUT_BACKEND = "auto"   # auto (macOS → Quartz, Linux → XTest, иначе pynput/pyautogui) | quartz | xtest | pynput | pyautogui | null
+CLICK_HOLD = 0.03        # mouseDown → mouseUp одного клика (сек)
+INPUT_STEP_DELAY = 0.01  # Шаг плавного свайпа (сек)
+
+# --- PIPELINE (src/core/pipeline.py: сбор чаевых/коробок — детекция и клики в двух потоках) ---
+PIPELINE_ENABLED = True             # False — клики по одному списку, как раньше
+PIPELINE_PERCEPTION_INTERVAL = 0.0  # Секунд между детекциями (0 — подряд)
+PIPELINE_IDLE_TIMEOUT = 0.5         # Секунд ждать свежую детекцию, потом сбор окончен
+PIPELINE_MAX_QUEUE = 8              # Кликов в очереди максимум
@@ -1,21 +1,35 @@
 """
-Eatventure Bot - Input (PyAutoGUI wrappers).
+Eatventure Bot - Input (mouse actions over a pluggable backend).
 All coordinates are in LOGICAL pixels (Retina-safe).
 Human-like behaviour: slight random offset before click.
+Backend: INPUT_BACKEND in config (see input_backends.py) — no hidden
+pyautogui PAUSE, every wait is explicit here.
 """
 import random
 import time
 from collections.abc import Callable
-from typing import Tuple
+from typing import Optional, Tuple
 
-import pyautogui
-
-from .config import CLICK_OFFSET_MAX
+from .config import CLICK_HOLD, CLICK_OFFSET_MAX, INPUT_BACKEND, INPUT_STEP_DELAY
+from .input_backends import InputBackend, create_backend, linear
 from .logger import get_logger
 
-# Safety settings (macOS-compatible)
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.05
+_BACKEND: Optional[InputBackend] = None
+
+
+def get_backend() -> InputBackend:
+    """Backend created on first use (fail-safe on: mouse in a screen corner raises FailSafeException)."""
+    global _BACKEND
+    if _BACKEND is None:
+        get_logger()  # консоль/файл для логов выбора бэкенда
+        _BACKEND = create_backend(INPUT_BACKEND, failsafe=True)
+    return _BACKEND
+
+
+def set_backend(backend: InputBackend) -> None:
+    """Use this backend from now on (e.g. NullBackend for a dry run)."""
+    global _BACKEND
+    _BACKEND = backend
 
 
 def click_element(
@@ -48,14 +62,14 @@ def click_element(
     log.info("Clicked [%s] at (%d, %d)", element_name, final_x, final_y)
     log.debug("click_element: raw center (%d, %d) -> (%d, %d)", cx, cy, final_x, final_y)
 
-    pyautogui.click(final_x, final_y)
+    get_backend().click(final_x, final_y, hold=CLICK_HOLD)
 
 
 def click_exact(x: int, y: int, element_name: str = "element") -> None:
     """Click exact coordinates (no random offset). For toggle/precision actions."""
     log = get_logger()
     log.debug("Exact click [%s] at (%d, %d)", element_name, x, y)
-    pyautogui.click(x, y)
+    get_backend().click(x, y, hold=CLICK_HOLD)
 
 
 def long_click(x: int, y: int, duration: float, element_name: str = "element") -> None:
@@ -70,10 +84,7 @@ def long_click(x: int, y: int, duration: float, element_name: str = "element") -
     """
     log = get_logger()
     log.info("Held click [%s] at (%d, %d) for %.1fs", element_name, x, y, duration)
-    pyautogui.moveTo(x, y)
-    pyautogui.mouseDown()
-    time.sleep(duration)
-    pyautogui.mouseUp()
+    get_backend().click(x, y, hold=duration)
 
 
 def swipe(
@@ -81,15 +92,12 @@ def swipe(
 ) -> None:
     """
     Swipe from (x1, y1) to (x2, y2) over the given duration.
-    Uses dragRel for more reliable swiping on macOS Retina displays.
+    Press at the start, linear move while held, release at the end.
     Coordinates must be in LOGICAL pixels.
     """
     log = get_logger()
     log.debug("swipe (%d,%d) -> (%d,%d) duration=%.2f", x1, y1, x2, y2, duration)
-    pyautogui.moveTo(x1, y1)
-    dx = x2 - x1
-    dy = y2 - y1
-    pyautogui.dragRel(dx, dy, duration=duration, button="left")
+    get_backend().drag(x1, y1, x2, y2, duration=duration, step_delay=INPUT_STEP_DELAY, ease=linear)
     time.sleep(0.2)
 
 
@@ -115,17 +123,21 @@ def hold_until_condition(
     """
     log = get_logger()
     log.info("hold_until_condition [%s] at (%d, %d), max %.1fs", element_name, x, y, max_duration)
-    pyautogui.moveTo(x, y)
-    pyautogui.mouseDown()
+    backend = get_backend()
+    backend.check_failsafe()
+    backend.move(x, y)
+    backend.down(x, y)
     start = time.time()
-    while True:
-        elapsed = time.time() - start
-        if elapsed >= max_duration:
-            break
-        time.sleep(0.1)
-        if not check_function():
-            break
-    pyautogui.mouseUp()
+    try:
+        while True:
+            elapsed = time.time() - start
+            if elapsed >= max_duration:
+                break
+            time.sleep(0.1)
+            if not check_function():
+                break
+    finally:
+        backend.up(x, y)
     held = time.time() - start
     log.info("Held [%s] for %.2fs", element_name, held)
     return held
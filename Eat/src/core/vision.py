@@ -9,6 +9,8 @@ Region-locked template matching: only the game zone is captured and searched.
 Coordinates returned in LOGICAL pixels (Retina-safe). Anti-flicker via retry loop.
 """
 import os
+import sys
+import threading
 import time
 from typing import Tuple
 
@@ -19,8 +21,22 @@ from .config import (
     ASSETS_PATH,
     SCALE_FACTOR,
     CONFIDENCE_THRESHOLD,
+    WAIT_FRAME_INTERVAL,
+    WAIT_CHANGE_THRESHOLD,
+    WAIT_REEVALUATE_SEC,
+    ANIMATION_MASK_ENABLED,
+    ANIMATION_MASK_ALPHA,
+    ANIMATION_MASK_PIXEL_THRESHOLD,
+    ANIMATION_MASK_STD_THRESHOLD,
+    ANIMATION_MASK_MIN_FRAMES,
+    ANIMATION_WARM_UP_INTERVAL,
+    FRAME_DIFF_SCALE,
+    FRAME_DIFF_PIXEL_THRESHOLD,
+    FRAME_DIFF_CACHE_SIZE,
 )
 from .config import GAME_REGION as _GAME_REGION
+from .animation_mask import AnimationMask
+from .frame_diff import FrameDiff
 from .logger import get_logger, save_debug_screenshot
 
 try:
@@ -39,17 +55,77 @@ def _physical_crop_box() -> tuple[int, int, int, int]:
     return left, top, w, h
 
 
-def _capture_game_region() -> np.ndarray | None:
-    """Capture only GAME_REGION as BGR numpy array (physical pixels). Returns None on failure."""
+# Reused BGR output buffers for _capture_game_region (no per-grab allocations).
+# A buffer is reused only when no screen/crop made from it is still referenced.
+_FRAME_BUFFERS: list[np.ndarray] = []
+# Pool, frame_diff and animation_mask are shared with the pipeline's perception thread.
+_CAPTURE_LOCK = threading.Lock()
+
+
+def _frame_buffer_refs(index: int) -> int:
+    return sys.getrefcount(_FRAME_BUFFERS[index])
+
+
+_FRAME_BUFFERS.append(np.empty(1, np.uint8))
+_FREE_BUFFER_REFS = _frame_buffer_refs(0)
+_FRAME_BUFFERS.clear()
+
+
+def _acquire_frame_buffer(shape: tuple[int, ...]) -> np.ndarray:
+    """Free preallocated buffer of this shape, or a new one (pooled up to 4)."""
+    for i in range(len(_FRAME_BUFFERS)):
+        if _FRAME_BUFFERS[i].shape == shape and _frame_buffer_refs(i) <= _FREE_BUFFER_REFS:
+            return _FRAME_BUFFERS[i]
+    buf = np.empty(shape, np.uint8)
+    if len(_FRAME_BUFFERS) < 4:
+        _FRAME_BUFFERS.append(buf)
+    return buf
+
+
+# Gray thumbnail of every captured frame (cached) — all frame comparisons use it.
+frame_diff = FrameDiff(
+    scale=FRAME_DIFF_SCALE,
+    pixel_threshold=FRAME_DIFF_PIXEL_THRESHOLD,
+    cache_size=FRAME_DIFF_CACHE_SIZE,
+)
+
+# Learned from every captured frame; the navigator ignores animated pixels when looking for the wall.
+animation_mask: AnimationMask | None = (
+    AnimationMask(
+        thumbs=frame_diff,
+        alpha=ANIMATION_MASK_ALPHA,
+        pixel_threshold=ANIMATION_MASK_PIXEL_THRESHOLD,
+        std_threshold=ANIMATION_MASK_STD_THRESHOLD,
+        min_frames=ANIMATION_MASK_MIN_FRAMES,
+    )
+    if ANIMATION_MASK_ENABLED
+    else None
+)
+
+
+def _capture_game_region(sct=None) -> np.ndarray | None:
+    """
+    Capture only GAME_REGION as BGR numpy array (physical pixels). Returns None on failure.
+    sct: open mss session to reuse (wait_for_any grabs many frames), otherwise a new one.
+    """
     if mss is None:
         get_logger().warning("mss not installed; cannot capture screen")
         return None
+    if sct is None:
+        with mss.mss() as own:
+            return _capture_game_region(own)
     left, top, w, h = _physical_crop_box()
     box = {"left": left, "top": top, "width": w, "height": h}
-    with mss.mss() as sct:
-        shot = sct.grab(box)
-        frame = np.array(shot)
-        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    shot = sct.grab(box)
+    # Zero-copy view of BGRA pixels → BGR into a preallocated buffer
+    frame = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+    with _CAPTURE_LOCK:
+        out = _acquire_frame_buffer((shot.height, shot.width, 3))
+        cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=out)
+        frame_diff.refresh(out)  # pooled buffer was rewritten — rebuild its thumbnail
+        if animation_mask is not None:
+            animation_mask.observe(out)
+    return out
 
 
 def capture_screenshot() -> np.ndarray | None:
@@ -57,12 +133,46 @@ def capture_screenshot() -> np.ndarray | None:
     return _capture_game_region()
 
 
+def warm_up_animation_mask(max_frames: int = 12) -> bool:
+    """Grab a few quick frames (camera must be still) until the animation mask is ready."""
+    if animation_mask is None or mss is None:
+        return False
+    with mss.mss() as sct:
+        for _ in range(max_frames):
+            if animation_mask.ready:
+                break
+            _capture_game_region(sct)
+            time.sleep(ANIMATION_WARM_UP_INTERVAL)
+    return animation_mask.ready
+
+
 def _resolve_template_path(image_name: str) -> str:
     """Resolve image name (e.g. 'btn_buy') to full path. Adds .png if missing."""
     base = image_name if image_name.lower().endswith(".png") else f"{image_name}.png"
     return os.path.join(ASSETS_PATH, base)
 
 
+# Decoded templates {path: (mtime_ns, image)}: find_image/find_all_images poll in loops,
+# the PNG is read again only when it changes on disk.
+_TEMPLATES: dict[str, tuple[int, np.ndarray]] = {}
+
+
+def _load_template(template_path: str) -> np.ndarray | None:
+    """Cached cv2.imread(template_path). None if the file is missing or unreadable."""
+    try:
+        mtime_ns = os.stat(template_path).st_mtime_ns
+    except OSError:
+        _TEMPLATES.pop(template_path, None)
+        return None
+    cached = _TEMPLATES.get(template_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    image = cv2.imread(template_path)
+    if image is not None:
+        _TEMPLATES[template_path] = (mtime_ns, image)
+    return image
+
+
 MATCH_SCALES = (0.5, 1.0, 2.0)
 
 
@@ -121,7 +231,7 @@ def find_image(
         log.warning("Template not found: %s", template_path)
         return None
 
-    template = cv2.imread(template_path)
+    template = _load_template(template_path)
     if template is None:
         log.warning("Could not load template: %s", template_path)
         return None
@@ -170,7 +280,7 @@ def find_all_images(
         log.warning("Template not found: %s", template_path)
         return []
 
-    template = cv2.imread(template_path)
+    template = _load_template(template_path)
     if template is None:
         log.warning("Could not load template: %s", template_path)
         return []
@@ -200,25 +310,131 @@ def find_all_images(
     return results
 
 
+def _physical_roi(roi: Tuple[int, int, int, int] | None, screen: np.ndarray) -> tuple[int, int, int, int]:
+    """Logical (x, y, w, h) relative to GAME_REGION → clipped physical crop (x1, y1, x2, y2); None = whole screen."""
+    sh, sw = screen.shape[:2]
+    if roi is None:
+        return 0, 0, sw, sh
+    x, y, w, h = (int(round(v * SCALE_FACTOR)) for v in roi)
+    return max(0, x), max(0, y), min(sw, x + w), min(sh, y + h)
+
+
+def _change_thumb(screen: np.ndarray, box: tuple[int, int, int, int]) -> np.ndarray:
+    """Gray thumbnail of the watched area (frame-to-frame change check), cut from the cached frame thumbnail."""
+    x1, y1, x2, y2 = box
+    return frame_diff.thumb(screen, (x1, y1, x2 - x1, y2 - y1))
+
+
+def wait_for_any(
+    targets: dict[str, Tuple[int, int, int, int] | None],
+    timeout: float = 5.0,
+    threshold: float | None = None,
+) -> tuple[str, Tuple[int, int, int, int], float] | None:
+    """
+    Wait until ANY of several images appears. One mss session for the whole wait,
+    a frame every WAIT_FRAME_INTERVAL; all templates are matched only when the
+    searched zones changed since the last matched frame (gray 1/4 thumbnail,
+    max |diff| >= WAIT_CHANGE_THRESHOLD) and at least every WAIT_REEVALUATE_SEC.
+
+    Args:
+        targets: {image name: (x, y, w, h) LOGICAL zone relative to GAME_REGION, or None = whole region}.
+            Several found in one frame — the first in dict order wins.
+        timeout: Seconds to wait.
+        threshold: Min match confidence. Default: config.CONFIDENCE_THRESHOLD.
+
+    Returns:
+        (image name, (x, y, w, h) in LOGICAL coordinates, latency in seconds) or None on timeout.
+    """
+    conf = threshold if threshold is not None else CONFIDENCE_THRESHOLD
+    log = get_logger()
+    started = time.monotonic()
+    deadline = started + timeout
+
+    templates = {}
+    for image_name, roi in targets.items():
+        template = _load_template(_resolve_template_path(image_name))
+        if template is None:
+            log.warning("wait_for_any: template not found: %s", image_name)
+            continue
+        templates[image_name] = (template, roi)
+    if not templates or mss is None:
+        if mss is None:
+            log.warning("mss not installed; cannot capture screen")
+        return None
+
+    left, top, _, _ = _physical_crop_box()
+    frames = matched = 0
+    last_thumb = None
+    last_matched_at = 0.0
+    with mss.mss() as sct:
+        while True:
+            grab_at = time.monotonic()
+            screen = _capture_game_region(sct)
+            if screen is None:
+                return None
+            frames += 1
+            boxes = {name: _physical_roi(roi, screen) for name, (_, roi) in templates.items()}
+            watch = (
+                min(b[0] for b in boxes.values()), min(b[1] for b in boxes.values()),
+                max(b[2] for b in boxes.values()), max(b[3] for b in boxes.values()),
+            )
+            thumb = _change_thumb(screen, watch)
+            if (
+                last_thumb is None
+                or last_thumb.shape != thumb.shape
+                or grab_at - last_matched_at >= WAIT_REEVALUATE_SEC
+                or cv2.norm(thumb, last_thumb, cv2.NORM_INF) >= WAIT_CHANGE_THRESHOLD
+            ):
+                last_thumb, last_matched_at = thumb, grab_at
+                matched += 1
+                for image_name, (template, _) in templates.items():
+                    x1, y1, x2, y2 = boxes[image_name]
+                    if x2 <= x1 or y2 <= y1:
+                        continue
+                    match = match_template_multiscale(screen[y1:y2, x1:x2], template, conf)
+                    if match is None:
+                        continue
+                    best_val, (x, y), _, tw, th, best_scale = match
+                    latency = grab_at - started
+                    log.debug(
+                        "wait_for_any: '%s' conf=%.3f scale=%.1f after %.2fs (frames %d, matched %d)",
+                        image_name, best_val, best_scale, latency, frames, matched,
+                    )
+                    return (
+                        image_name,
+                        (
+                            int(round((left + x1 + x) / SCALE_FACTOR)),
+                            int(round((top + y1 + y) / SCALE_FACTOR)),
+                            int(round(tw / SCALE_FACTOR)),
+                            int(round(th / SCALE_FACTOR)),
+                        ),
+                        latency,
+                    )
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            time.sleep(max(0.0, min(WAIT_FRAME_INTERVAL - (now - grab_at), deadline - now)))
+
+    log.debug("wait_for_any(%s): nothing after %.1fs (frames %d, matched %d)", list(templates), timeout, frames, matched)
+    return None
+
+
 def wait_for_image(
     image_name: str,
     timeout: float = 5.0,
 ) -> Tuple[int, int, int, int] | None:
     """
-    Retry finding the image for up to `timeout` seconds (anti-flicker: handles 1s off / 2s on UI).
+    Wait for the image for up to `timeout` seconds (anti-flicker: handles 1s off / 2s on UI).
+    See wait_for_any (single image, whole GAME_REGION).
 
     Returns:
         (x, y, w, h) in LOGICAL coordinates, or None if timeout expires.
     """
     log = get_logger()
-    t_end = time.time() + timeout
-
-    while time.time() < t_end:
-        result = find_image(image_name)
-        if result is not None:
-            log.info("wait_for_image('%s'): found", image_name)
-            return result
-        time.sleep(0.1)
+    found = wait_for_any({image_name: None}, timeout)
+    if found is not None:
+        log.info("wait_for_image('%s'): found after %.2fs", image_name, found[2])
+        return found[1]
 
     log.warning("wait_for_image('%s'): timeout after %.1fs", image_name, timeout)
     save_debug_screenshot(f"timeout_{image_name}")
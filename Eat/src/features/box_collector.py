@@ -9,6 +9,7 @@ from typing import Tuple
 
 from src.core import config, input, vision
 from src.core.logger import get_logger
+from src.core.pipeline import Pipeline, harvest
 
 logger = get_logger()
 
@@ -64,6 +65,34 @@ def _merge_nearby(boxes: list[Tuple[int, int, int, int]], radius: int) -> list[T
     return out
 
 
+def _find_boxes() -> list[Tuple[int, int, int, int]]:
+    """Один кадр: коробки в безопасной зоне, одна на коробку."""
+    boxes = vision.find_all_images("box_floor", threshold=BOX_THRESHOLD)
+    return _merge_nearby([b for b in boxes if _inside_safe_zone(b)], BOX_MERGE_RADIUS)
+
+
+def _collect_pipelined(first: list[Tuple[int, int, int, int]], limit: int) -> int:
+    """
+    Клики по коробкам в потоке актуатора (src/core/pipeline.py): пока клик и пауза
+    BOX_CLICK_DELAY идут, следующий кадр уже ищется — коробки, попавшие в статичный
+    кадр позже первой, собираются в этом же проходе.
+    """
+    with Pipeline(
+        lambda: (None, [_center(b) for b in _find_boxes()]),
+        interval=getattr(config, "PIPELINE_PERCEPTION_INTERVAL", 0.0),
+        max_queue=getattr(config, "PIPELINE_MAX_QUEUE", 8),
+    ) as pipe:
+        start = pipe.perception.publish(None, 0.0, [_center(b) for b in first])
+        clicked = harvest(
+            pipe, start, lambda points: points,
+            lambda point: input.click_element(point, "box_floor"),
+            "box_floor", limit=limit, settle=BOX_CLICK_DELAY,
+            radius=BOX_MERGE_RADIUS,
+            timeout=getattr(config, "PIPELINE_IDLE_TIMEOUT", 0.5),
+        )
+    return len(clicked)
+
+
 def check_and_collect():
     global last_box_time
 
@@ -91,13 +120,16 @@ def check_and_collect():
     boxes = _merge_nearby(boxes, BOX_MERGE_RADIUS)
     logger.info("Box Collector: Found %d boxes (static frame, in safe zone).", len(boxes))
 
-    limit = min(BOX_CLICKS_PER_CYCLE, len(boxes))
-    count = 0
-    for box in boxes[:limit]:
-        if box:
-            input.click_element(box, "box_floor")
-            count += 1
-            time.sleep(BOX_CLICK_DELAY)
+    if getattr(config, "PIPELINE_ENABLED", False):
+        count = _collect_pipelined(boxes, BOX_CLICKS_PER_CYCLE)
+    else:
+        limit = min(BOX_CLICKS_PER_CYCLE, len(boxes))
+        count = 0
+        for box in boxes[:limit]:
+            if box:
+                input.click_element(box, "box_floor")
+                count += 1
+                time.sleep(BOX_CLICK_DELAY)
 
     logger.info("Collected %d boxes (Limit %d per cycle).", count, BOX_CLICKS_PER_CYCLE)
     last_box_time = time.time()
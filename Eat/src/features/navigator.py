@@ -12,6 +12,7 @@ import numpy as np
 from src.core import config
 from src.core.input import swipe
 from src.core.logger import get_logger
+from src.core import vision
 from src.core.vision import capture_screenshot
 
 logger = get_logger()
@@ -24,7 +25,7 @@ class Navigator:
     """
 
     def __init__(self) -> None:
-        self.wall_threshold = 800
+        self.wall_threshold = 500  # MSE серых миниатюр FrameDiff (≈ в 1.5 раза меньше прежнего MSE по каналам BGR)
         self._state: Literal["init", "at_bottom"] = "init"
         self._last_sweep_time: float = 0.0
         self._max_init_scrolls = getattr(config, "INIT_SCROLL_MAX", 15)
@@ -97,30 +98,45 @@ class Navigator:
             logger.warning("pull_back failed: %s", e)
 
     def _compute_diff(self, img_pre: np.ndarray, img_post: np.ndarray) -> float:
-        """MSE between two frames. Returns 0.0 on error."""
+        """MSE between two frames (gray 1/4 thumbnails, vision.frame_diff). Returns 0.0 on error."""
         try:
             if img_pre is None or img_post is None:
                 return 0.0
             if img_pre.shape != img_post.shape:
                 return 0.0
-            diff = np.mean((img_pre.astype("float") - img_post.astype("float")) ** 2)
-            return float(diff)
+            return vision.frame_diff.mse(img_pre, img_post)
         except Exception as e:
             logger.debug("_compute_diff error: %s", e)
             return 0.0
 
+    def _hit_wall(self, img_pre: np.ndarray, img_post: np.ndarray) -> tuple[bool, str]:
+        """
+        Content did not move between the frames. With a ready animation mask —
+        % of changed STATIC pixels (walking customers ignored); otherwise MSE < wall_threshold.
+        Returns (wall, description for the log).
+        """
+        mask = vision.animation_mask
+        change = mask.changed_percent(img_pre, img_post) if mask is not None else None
+        if mask is not None:
+            mask.camera_moved()  # сдвиг не измерен — маска учится заново на новом экране
+        if change is not None:
+            return change < config.ANIMATION_EDGE_CHANGE_PCT, f"static change={change:.1f}%"
+        diff = self._compute_diff(img_pre, img_post)
+        return diff < self.wall_threshold, f"diff={diff:.2f}"
+
     def _scroll_until_stable(
         self, direction: Literal["down", "up"], max_steps: int | None = None
     ) -> int:
         """
         Smart scroll: scroll in given direction until image stops changing.
         Returns number of scroll steps performed.
-        Stops when diff < wall_threshold (image same before/after scroll).
+        Stops when the image is the same before/after scroll (_hit_wall).
         """
         steps = 0
         limit = max_steps or self._max_init_scrolls
         for _ in range(limit):
             try:
+                vision.warm_up_animation_mask()
                 img_pre = capture_screenshot()
                 if img_pre is None:
                     continue
@@ -132,12 +148,12 @@ class Navigator:
                 img_post = capture_screenshot()
                 if img_post is None:
                     continue
-                diff = self._compute_diff(img_pre, img_post)
+                wall, measure = self._hit_wall(img_pre, img_post)
                 steps += 1
-                if diff < self.wall_threshold:
+                if wall:
                     logger.info(
-                        "Smart scroll %s: stopped at step %d (diff=%.2f).",
-                        direction, steps, diff,
+                        "Smart scroll %s: stopped at step %d (%s).",
+                        direction, steps, measure,
                     )
                     return steps
             except Exception as e:
@@ -186,6 +202,7 @@ class Navigator:
             self._run_sweep_passes_at_current_screen()
             screens += 1
 
+            vision.warm_up_animation_mask()
             img_pre = capture_screenshot()
             if img_pre is None:
                 break
@@ -194,9 +211,9 @@ class Navigator:
             img_post = capture_screenshot()
             if img_post is None:
                 break
-            diff = self._compute_diff(img_pre, img_post)
-            if diff < self.wall_threshold:
-                logger.info("Sweep: reached bottom at screen %d (diff=%.2f).", screens, diff)
+            wall, measure = self._hit_wall(img_pre, img_post)
+            if wall:
+                logger.info("Sweep: reached bottom at screen %d (%s).", screens, measure)
                 self.pull_back()
                 time.sleep(0.5)
                 self._run_sweep_passes_at_current_screen()  # final passes at bottom
@@ -77,18 +77,14 @@ def check_and_renovate() -> bool:
     logger.info("Renovator: %s — нажимаем, ждём подтверждение.", name)
     _click_and_wait(trigger, name, 0.5)
 
-    confirm = vision.wait_for_image("btn_confirm_renovate", timeout=WAIT_CONFIRM)
-    if confirm:
-        _click_and_wait(confirm, "btn_confirm_renovate", 0.5)
-        okay_after = vision.wait_for_image("btn_okay", timeout=WAIT_AFTER_RENO)
-        if okay_after:
-            _click_and_wait(okay_after, "btn_okay", 1.0)
-        return True
-
-    confirm = vision.wait_for_image("btn_fly_confirm", timeout=WAIT_CONFIRM)
-    if confirm:
-        _click_and_wait(confirm, "btn_fly_confirm", 0.5)
-        okay_after = vision.wait_for_image("btn_okay", timeout=WAIT_AFTER_FLY)
+    # Оба подтверждения ждём одновременно (раньше — 5 с одно, потом 5 с другое)
+    found = vision.wait_for_any({"btn_confirm_renovate": None, "btn_fly_confirm": None}, timeout=WAIT_CONFIRM)
+    if found:
+        confirm_name, confirm, latency = found
+        logger.info("Renovator: %s через %.1f с — нажимаем.", confirm_name, latency)
+        _click_and_wait(confirm, confirm_name, 0.5)
+        wait_after = WAIT_AFTER_RENO if confirm_name == "btn_confirm_renovate" else WAIT_AFTER_FLY
+        okay_after = vision.wait_for_image("btn_okay", timeout=wait_after)
         if okay_after:
             _click_and_wait(okay_after, "btn_okay", 1.0)
         return True
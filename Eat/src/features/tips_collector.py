@@ -10,6 +10,7 @@ from typing import Tuple
 from src.core import config
 from src.core.input import click_element
 from src.core.logger import get_logger
+from src.core.pipeline import Pipeline, harvest
 from src.core.vision import find_all_images
 
 last_collection_time = 0.0
@@ -69,6 +70,41 @@ def _merge_nearby(tips: list[Tuple[int, int, int, int]], radius: float) -> list[
     return merged
 
 
+def _find_tips() -> list[Tuple[int, int, int, int]]:
+    """Один кадр: монеты в зоне поиска, одна на монету."""
+    threshold = getattr(config, "TIPS_CONFIDENCE_THRESHOLD", 0.78)
+    merge_radius = getattr(config, "TIPS_MERGE_RADIUS", 25)
+    raw = find_all_images("tip_coin", threshold=threshold)
+    return _merge_nearby(_filter_valid_tips(raw), merge_radius)
+
+
+def _tip_center(tip: Tuple[int, int, int, int]) -> Tuple[int, int]:
+    x, y, w, h = tip
+    return (x + w // 2, y + h // 2)
+
+
+def _collect_pipelined(first: list[Tuple[int, int, int, int]], limit: int) -> int:
+    """
+    Клики по монетам в потоке актуатора (src/core/pipeline.py), пока следующий кадр
+    уже ищется: монеты, выпавшие за время сбора, собираются в этом же проходе,
+    гаснущие (уже кликнутые) повторно не кликаются.
+    """
+    with Pipeline(
+        lambda: (None, [_tip_center(t) for t in _find_tips()]),
+        interval=getattr(config, "PIPELINE_PERCEPTION_INTERVAL", 0.0),
+        max_queue=getattr(config, "PIPELINE_MAX_QUEUE", 8),
+    ) as pipe:
+        start = pipe.perception.publish(None, 0.0, [_tip_center(t) for t in first])
+        clicked = harvest(
+            pipe, start, lambda points: points,
+            lambda point: click_element(point, "tip_coin"),
+            "tip_coin", limit=limit, settle=0.06,
+            radius=getattr(config, "TIPS_MERGE_RADIUS", 25),
+            timeout=getattr(config, "PIPELINE_IDLE_TIMEOUT", 0.5),
+        )
+    return len(clicked)
+
+
 def check_and_collect_tips() -> bool:
     """
     Собирает чаевые только в игровой зоне, только при высоком совпадении.
@@ -82,12 +118,7 @@ def check_and_collect_tips() -> bool:
         return False
 
     log = get_logger()
-    threshold = getattr(config, "TIPS_CONFIDENCE_THRESHOLD", 0.78)
-    merge_radius = getattr(config, "TIPS_MERGE_RADIUS", 25)
-
-    raw = find_all_images("tip_coin", threshold=threshold)
-    filtered = _filter_valid_tips(raw)
-    unique = _merge_nearby(filtered, merge_radius)
+    unique = _find_tips()
 
     if not unique:
         return False
@@ -95,13 +126,14 @@ def check_and_collect_tips() -> bool:
     max_tips = min(8, len(unique))
     log.info("Found %d tips in game zone. Collecting %d...", len(unique), max_tips)
 
-    count = 0
-    for tip in unique[:max_tips]:
-        x, y, w, h = tip
-        cx, cy = x + w // 2, y + h // 2
-        click_element((cx, cy), "tip_coin")
-        time.sleep(0.06)
-        count += 1
+    if getattr(config, "PIPELINE_ENABLED", False):
+        count = _collect_pipelined(unique, limit=8)
+    else:
+        count = 0
+        for tip in unique[:max_tips]:
+            click_element(_tip_center(tip), "tip_coin")
+            time.sleep(0.06)
+            count += 1
 
     last_collection_time = current_time
     log.info("Collected %d tips. Cooldown active.", count)
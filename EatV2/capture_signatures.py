@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+CAPTURE SIGNATURES SCRIPT
+Records screen signatures (core/screen_signature.py) from sample frames into
+screen_signatures.json next to config.py. The bot then recognizes these screens
+by hash and skips modules that have nothing to do there (module SCREENS).
+
+Record 2-5 samples per screen (different levels / times of day); regions default
+to SCREEN_SIGNATURES["REGIONS"][screen] — parts of the screen that never move.
+
+Usage:
+    python3 capture_signatures.py add main --grab
+    python3 capture_signatures.py add ad --frames "signature_*.png"
+    python3 capture_signatures.py add renovate --grab --regions 0.1,0.3,0.8,0.35
+    python3 capture_signatures.py test --frames "*.png"
+    python3 capture_signatures.py list
+    python3 capture_signatures.py remove fly
+
+Subcommands:
+    add    - add samples of a screen (recorded PNGs or a live grab, same as the bot)
+    test   - classify frames with the saved index: screen, distance, µs per frame
+    list   - screens, regions and sample count
+    remove - forget a screen
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from config import SCREEN_SIGNATURES
+from core.screen_signature import ScreenIndex
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_index() -> ScreenIndex:
+    return ScreenIndex(
+        hash_kind=str(SCREEN_SIGNATURES.get("HASH", "dhash")),
+        max_distance=int(SCREEN_SIGNATURES.get("MAX_DISTANCE", 10)),
+        max_mean_diff=float(SCREEN_SIGNATURES.get("MAX_MEAN_DIFF", 25.0)),
+    )
+
+
+def grab_frame(delay: float) -> np.ndarray:
+    """Screenshot through Vision (exactly as the bot) after a countdown, saved next to this script."""
+    from core.vision import Vision
+
+    vision = Vision()
+    print(f"📸 Снимок через {delay:.0f} сек — откройте нужный экран игры")
+    time.sleep(delay)
+    frame = np.array(vision.take_screenshot())  # копия: буфер Vision переиспользуется
+    path = os.path.join(PROJECT_ROOT, f"signature_{datetime.now():%Y%m%d_%H%M%S}.png")
+    cv2.imwrite(path, frame)
+    print(f"   сохранён {path}")
+    return frame
+
+
+def load_frames(args) -> list:
+    """[(label, frame)] from --frames and/or --grab."""
+    frames = []
+    if args.frames:
+        for path in sorted(glob.glob(args.frames)):
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append((os.path.basename(path), frame))
+    if args.grab:
+        frames.append(("grab", grab_frame(args.delay)))
+    if not frames:
+        print("❌ Нет кадров: укажите --frames или --grab")
+    return frames
+
+
+def parse_region(text: str) -> tuple:
+    values = tuple(float(v) for v in text.split(","))
+    if len(values) != 4 or not all(0.0 <= v <= 1.0 for v in values):
+        raise argparse.ArgumentTypeError(f"область x,y,w,h долями кадра 0..1: {text}")
+    return values
+
+
+def cmd_add(args) -> int:
+    index = make_index()
+    regions = args.regions or SCREEN_SIGNATURES.get("REGIONS", {}).get(args.screen)
+    if not regions and args.screen not in index.screens:
+        print(f"❌ Для экрана '{args.screen}' нет областей: --regions x,y,w,h или SCREEN_SIGNATURES['REGIONS']")
+        return 1
+    frames = load_frames(args)
+    for label, frame in frames:
+        screen = index.add_sample(args.screen, frame, regions)
+        match = index.classify(frame)
+        print(f"✓ {args.screen} ← {label} (образцов {len(screen.hashes)}, распознаётся как {match.name if match else '?'})")
+    if frames:
+        index.save()
+        print(f"💾 {index.path}")
+    return 0 if frames else 1
+
+
+def cmd_test(args) -> int:
+    index = make_index()
+    if not len(index):
+        print(f"❌ Нет сигнатур ({index.path}) — сначала add")
+        return 1
+    frames = load_frames(args)
+    print(f"{'кадр':<40} {'экран':<18} {'бит':>4} {'мкс':>8}")
+    for label, frame in frames:
+        index.thumbs.refresh(frame)  # миниатюру бот строит при захвате — в замер не входит
+        started = time.perf_counter()
+        match = index.classify(frame)
+        us = (time.perf_counter() - started) * 1e6
+        print(f"{label:<40} {match.name if match else '?':<18} {match.distance if match else '-':>4} {us:>8.0f}")
+    return 0
+
+
+def cmd_list(args) -> int:
+    index = make_index()
+    print(f"{index.path} ({index.hash_kind}, ≤{index.max_distance} бит на область)")
+    for screen in index.screens.values():
+        regions = " ".join(",".join(f"{v:g}" for v in r) for r in screen.regions)
+        print(f"  {screen.name:<18} образцов {len(screen.hashes):>2}  области {regions}")
+    return 0
+
+
+def cmd_remove(args) -> int:
+    index = make_index()
+    if not index.remove(args.screen):
+        print(f"❌ Экрана '{args.screen}' нет")
+        return 1
+    index.save()
+    print(f"🗑️  {args.screen} удалён")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Eatventure Bot screen signatures")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def frame_args(p):
+        p.add_argument("--frames", help="glob of recorded frames")
+        p.add_argument("--grab", action="store_true", help="grab GAME_REGION from the screen")
+        p.add_argument("--delay", type=float, default=3.0, help="seconds before the grab")
+
+    p_add = sub.add_parser("add", help="add samples of a screen")
+    p_add.add_argument("screen", help="screen name (main, ad, station_popup, general_upgrades, renovate, fly)")
+    p_add.add_argument("--regions", nargs="+", type=parse_region, help="x,y,w,h fractions (default from config)")
+    frame_args(p_add)
+    p_add.set_defaults(func=cmd_add)
+
+    p_test = sub.add_parser("test", help="classify frames with the saved index")
+    frame_args(p_test)
+    p_test.set_defaults(func=cmd_test)
+
+    p_list = sub.add_parser("list", help="saved screens")
+    p_list.set_defaults(func=cmd_list)
+
+    p_rm = sub.add_parser("remove", help="forget a screen")
+    p_rm.add_argument("screen")
+    p_rm.set_defaults(func=cmd_remove)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -46,7 +46,7 @@ THRESHOLDS: dict[str, float] = {
 # TIMERS & COOLDOWNS (in seconds)
 # ============================================================================
 TIMERS: dict[str, float] = {
-    # Module cooldowns
+    # Module cooldowns (after a run that took an action; enforced by ModuleScheduler)
     "GENERAL_COOLDOWN": 30.0,      # Time between general upgrades
     "STATION_MEMORY": 20.0,        # How long to remember a clicked station
     "TIPS_COOLDOWN": 15.0,         # Time between tip collection runs
@@ -66,6 +66,21 @@ TIMERS: dict[str, float] = {
     "SCROLL_DURATION": 0.8,        # Duration of scroll animation
 }
 
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+# Какой модуль запускать следующим (core/scheduler.py): модули объявляют PRIORITY, COOLDOWN,
+# EXPECTED_COST и MAX_STALENESS, планировщик ранжирует их по полезности и запускает, пока
+# ожидаемая стоимость влезает в бюджет тика. Модуль без запуска дольше MAX_STALENESS — вне очереди.
+# Модуль, который что-то сделал, завершает тик (экран мог смениться — следующий тик снова
+# начинается с Renovator); исключение — ENDS_TICK = False (сбор чаевых).
+SCHEDULER: dict[str, float] = {
+    "TICK_BUDGET": 4.0,            # Сек на тик (первый модуль запускается всегда)
+    "COST_SMOOTHING": 0.3,         # Вес нового замера в оценке стоимости модуля (EMA)
+    "COST_SCALE": 1.0,             # Сек: модуль такой стоимости теряет половину полезности
+    "IDLE_SLEEP": 1.0,             # Пауза, если за тик никто ничего не сделал
+}
+
 # ============================================================================
 # SPATIAL MEMORY
 # ============================================================================
@@ -91,7 +106,7 @@ NAVIGATOR: dict[str, any] = {
     "MAX_SCROLL_DOWN": 15,         # Максимум скроллов ВНИЗ (уровень длиннее)
     
     # NEW: Проверка стабилизации MSE
-    "MSE_STABILITY_THRESHOLD": 200, # Если MSE меняется меньше чем на 200 - упёрлись
+    "MSE_STABILITY_THRESHOLD": 50,  # Если MSE (серая миниатюра FRAME_DIFF) меняется меньше чем на 50 - упёрлись
     "STATIC_ZONE_HEIGHT": 0.15,    # Сравниваем только верхние/нижние 15% (UI зоны)
 }
 
@@ -103,12 +118,31 @@ COLLECTOR: dict[str, int] = {
     "MAX_BOXES_PER_RUN": 3,
 }
 
+# ============================================================================
+# PIPELINE
+# ============================================================================
+# Сбор чаевых и коробок в два потока (core/pipeline.py): пока один клик и пауза после него
+# выполняются, следующий скриншот уже матчится. Клик по кадру до последнего меняющего экран
+# действия перепланируется по свежему кадру или отбрасывается. False — клики по одному списку.
+PIPELINE: dict[str, any] = {
+    "ENABLED": True,
+    "PERCEPTION_INTERVAL": 0.0,    # Сек между детекциями (0 — подряд)
+    "IDLE_TIMEOUT": 0.5,           # Сек ждать свежую детекцию, потом сбор окончен
+    "MAX_QUEUE": 8,                # Кликов в очереди максимум
+    "SAME_TARGET_PX": 25,          # Цель ближе к кликнутой — та же (ещё гаснет)
+}
+
 # ============================================================================
 # INPUT SETTINGS
 # ============================================================================
 INPUT: dict[str, any] = {
     "JITTER_RANGE": 3,             # Random jitter in pixels (±3)
     "SAFE_SPOT": (50, 50),         # Top-left safe spot for closing menus
+    # Input backend (core/input_backends.py): auto | quartz | xtest | pynput | pyautogui | null
+    # auto: macOS → Quartz, Linux → XTest, иначе pynput / pyautogui
+    "BACKEND": "auto",
+    "CLICK_HOLD": 0.03,            # mouseDown → mouseUp одного клика (сек)
+    "STEP_DELAY": 0.01,            # Шаг плавного движения/свайпа (сек)
 }
 
 # ============================================================================
@@ -129,8 +163,73 @@ VISION_SCALES: Tuple[float, ...] = (0.5, 0.6, 0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 2.
 # Priority scales for Retina displays (tested on MacBook Air M1)
 # Debug confirmed: Best matches at 0.5x-0.6x scale
 RETINA_SCALE_RANGE: Tuple[float, ...] = (0.5, 0.6, 0.75, 1.0)
-# These scales are checked FIRST for faster matching on Retina displays
-# Falls back to full VISION_SCALES if no match found
+# These scales are checked FIRST when calibrating the display scale
+# Falls back to full VISION_SCALES if no anchor is found
+
+# Калибровка масштаба: якорные шаблоны голосуют за лучший масштаб один раз за сессию
+# (и заново при смене GAME_REGION / размера кадра). Дальше все multi-scale вызовы
+# матчат только на нём, фоновая проверка иногда сверяет его с соседними масштабами.
+SCALE_CALIBRATION: dict[str, any] = {
+    "ENABLED": True,
+    "ANCHORS": ("icon_upgrades", "upgrade_arrow", "tip_coin", "btn_renovate", "btn_buy"),
+    "MIN_SCORE": 0.75,             # Якорь голосует, только если найден уверенно
+    "MIN_VOTES": 2,                # Столько якорей должны выбрать один масштаб
+    "RETRY_INTERVAL": 10.0,        # Якорей не видно — снова пробуем через N сек (до этого все VISION_SCALES)
+    "RECHECK_INTERVAL": 120.0,     # Фоновая перепроверка зафиксированного масштаба
+}
+
+# Сравнение кадров (core/frame_diff.py): серая миниатюра 1/4 на каждый кадр take_screenshot() (кэш),
+# MSE / % изменившихся пикселей / полосы считаются по ней целочисленными операциями OpenCV.
+# MSE миниатюры ≈ в 4 раза меньше прежнего MSE полного BGR-кадра (3 канала + усреднение).
+FRAME_DIFF: dict[str, any] = {
+    "SCALE": 0.25,                 # Серая миниатюра 1/4 (её же использует маска анимаций)
+    "PIXEL_THRESHOLD": 30,         # |diff| (0-255) пикселя миниатюры = изменился
+    "CACHE_SIZE": 8,               # Миниатюр последних кадров в кэше
+}
+
+# Маска анимированных пикселей (core/animation_mask.py): попиксельная временная дисперсия
+# по кадрам take_screenshot() при неподвижной камере. Навигатор определяет упор по % изменившихся
+# СТАТИЧНЫХ пикселей (посетители/машины не считаются) — с одного свайпа, фиксированный порог.
+# Пока маска не готова — старая проверка стабилизации MSE (NAVIGATOR["MSE_STABILITY_THRESHOLD"]).
+ANIMATION_MASK: dict[str, any] = {
+    "ENABLED": True,
+    "ALPHA": 0.05,                 # Скорость обучения (≈ 1/кадров памяти)
+    "PIXEL_THRESHOLD": 20,         # |diff| (0-255) пикселя миниатюры = изменился
+    "STD_THRESHOLD": 6.0,          # Временное std выше — пиксель анимированный
+    "MIN_FRAMES": 6,               # Кадров при неподвижной камере до использования маски
+    "MAX_LEARN_CHANGE": 0.3,       # Доля изменившихся пикселей больше — камера двигается, не учимся
+    "EDGE_CHANGE_PCT": 8.0,        # % статичных пикселей меньше — контент не сдвинулся (упор)
+    "WARM_UP_INTERVAL": 0.05,      # Навигатор добирает кадры перед свайпом, если маска не готова
+}
+
+# Какой сейчас экран — по 64-битным хэшам (dHash/pHash) стабильных областей (core/screen_signature.py).
+# Образцы снимает capture_signatures.py в screen_signatures.json рядом с config.py. Модули, которым
+# на распознанном экране делать нечего (класс-атрибут SCREENS), в этом цикле не запускаются;
+# неизвестный экран (или нет файла) — все модули, как раньше.
+SCREEN_SIGNATURES: dict[str, any] = {
+    "ENABLED": True,
+    "HASH": "dhash",               # dhash (быстрее) | phash (устойчивее к сдвигам на пару px)
+    "MAX_DISTANCE": 10,            # Бит из 64 на область: больше — область не совпала
+    "MAX_MEAN_DIFF": 25.0,         # Средняя яркость области (0-255): затемнение попапом не совпадёт
+    # Области по умолчанию для capture_signatures.py (x, y, w, h — доли кадра): только то,
+    # что не двигается на этом экране (HUD, меню, рамка окна)
+    "REGIONS": {
+        "main": [(0.0, 0.0, 1.0, 0.08), (0.0, 0.9, 1.0, 0.1)],
+        "station_popup": [(0.05, 0.55, 0.9, 0.3)],
+        "general_upgrades": [(0.05, 0.12, 0.9, 0.12), (0.05, 0.85, 0.9, 0.1)],
+        "ad": [(0.0, 0.0, 1.0, 0.1), (0.0, 0.88, 1.0, 0.12)],
+        "renovate": [(0.1, 0.3, 0.8, 0.35)],
+        "fly": [(0.1, 0.3, 0.8, 0.35)],
+    },
+}
+
+# Ожидание одной из кнопок (Vision.wait_for_any): кадр за кадром, все шаблоны вместе,
+# матчинг только когда зоны поиска изменились (серая миниатюра 1/4, max |diff|).
+WAIT_FOR_ANY: dict[str, float] = {
+    "FRAME_INTERVAL": 0.03,        # Сек между кадрами
+    "CHANGE_THRESHOLD": 12,        # max |diff| (0-255) меньше — кадр тот же, не матчим
+    "REEVALUATE_EVERY": 1.0,       # Без изменений всё равно матчим раз в N сек (медленное появление)
+}
 
 # ============================================================================
 # LOGGING
@@ -5,5 +5,6 @@ Contains vision processing, input management, and state tracking.
 from .vision import Vision
 from .input_manager import InputManager
 from .state_manager import StateManager
+from .scheduler import ModuleScheduler
 
-__all__ = ["Vision", "InputManager", "StateManager"]
+__all__ = ["Vision", "InputManager", "StateManager", "ModuleScheduler"]
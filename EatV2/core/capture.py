@@ -0,0 +1,241 @@
+"""
+Screen Capture
+Frames, zero-copy BGRA → BGR conversion and the optional background capture thread.
+
+np.array(sct.grab(...)) + cv2.cvtColor(BGRA2BGR) allocates two full frames per
+grab. Here the mss raw buffer is wrapped with np.frombuffer (no copy) and the
+conversion writes into a preallocated array taken from a small pool.
+
+EatV2 uses FrameBufferPool + bgra_to_bgr in Vision.take_screenshot(); CaptureService
+(background grab thread at a fixed FPS) is E3's and is not started here.
+"""
+
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import cv2
+import mss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class Frame(np.ndarray):
+    """
+    BGR screenshot with capture metadata.
+    Behaves like a plain ndarray (slicing, OpenCV); crops keep the parent's
+    frame_id and timestamp.
+    
+    Attributes:
+        frame_id: Monotonic capture number (1, 2, 3, ...)
+        timestamp: time.monotonic() when the grab started
+    """
+    
+    def __new__(cls, image: np.ndarray, frame_id: int, timestamp: float) -> "Frame":
+        obj = np.asarray(image).view(cls)
+        obj.frame_id = frame_id
+        obj.timestamp = timestamp
+        return obj
+    
+    def __array_finalize__(self, obj) -> None:
+        self.frame_id = getattr(obj, "frame_id", None)
+        self.timestamp = getattr(obj, "timestamp", None)
+    
+    @property
+    def age_ms(self) -> float:
+        """Milliseconds since capture."""
+        return (time.monotonic() - self.timestamp) * 1000.0
+
+
+class FrameBufferPool:
+    """
+    Preallocated BGR output buffers.
+
+    Frames handed out by capture_screen() stay alive in many places (frame cache,
+    prev/after screenshots in scroll loops, crops), so a buffer is reused only when
+    nothing but the pool references it — i.e. no Frame, crop or view of it is alive.
+    """
+
+    def __init__(self, max_buffers: int = 4):
+        self.max_buffers = max_buffers
+        self._buffers: List[np.ndarray] = []
+        self.stats: Dict[str, int] = {"reused": 0, "allocated": 0}
+        # Базовый refcount свободного буфера меряем тем же путём, что и в acquire()
+        # (значение зависит от версии Python)
+        self._buffers.append(np.empty(1, np.uint8))
+        self._free_refs = self._refs(0)
+        self._buffers.clear()
+
+    def _refs(self, index: int) -> int:
+        return sys.getrefcount(self._buffers[index])
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Free pooled buffer of this shape, or a new one (pooled while there is room)."""
+        for i in range(len(self._buffers)):
+            if self._buffers[i].shape == shape and self._refs(i) <= self._free_refs:
+                self.stats["reused"] += 1
+                return self._buffers[i]
+        buf = np.empty(shape, np.uint8)
+        self.stats["allocated"] += 1
+        if len(self._buffers) < self.max_buffers:
+            self._buffers.append(buf)
+        else:
+            # Размер кадра сменился (другой монитор / Retina) — вытесняем свободный буфер старого размера
+            for i in range(len(self._buffers)):
+                if self._buffers[i].shape != shape and self._refs(i) <= self._free_refs:
+                    self._buffers[i] = buf
+                    break
+        return buf
+
+
+def bgra_to_bgr(shot, pool: FrameBufferPool) -> np.ndarray:
+    """
+    Convert an mss ScreenShot to BGR without intermediate copies.
+
+    Args:
+        shot: mss ScreenShot (raw BGRA bytes, .height/.width in physical pixels)
+        pool: Output buffer pool
+
+    Returns:
+        BGR image (H, W, 3) backed by a pooled buffer.
+    """
+    h, w = shot.height, shot.width
+    bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(h, w, 4)
+    out = pool.acquire((h, w, 3))
+    cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+    return out
+
+
+class CaptureService:
+    """
+    Background capture thread with a ring buffer of the latest frames.
+
+    Frames get ids from the shared allocator (VisionSystem), so frame-cache
+    invalidation after clicks works the same for sync and background frames.
+    """
+
+    def __init__(
+        self,
+        region: Dict[str, int],
+        next_frame_id: Callable[[], int],
+        fps: float = 20.0,
+        ring_size: int = 4,
+        on_frame: Optional[Callable[[Frame], None]] = None,
+    ):
+        self.region = dict(region)
+        self.next_frame_id = next_frame_id
+        self.interval = 1.0 / max(1.0, fps)
+        self.on_frame = on_frame
+        self._ring: Deque[Frame] = deque(maxlen=max(1, ring_size))
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Кольцо держит ring_size кадров + читатели держат ещё несколько
+        self._pool = FrameBufferPool(max_buffers=ring_size + 3)
+        self._last_read_id = 0
+        self.stats: Dict[str, float] = {
+            "frames": 0,
+            "dropped": 0,  # пропущенные такты FPS (grab дольше интервала)
+            "evicted_unread": 0,  # кадры, вытесненные из кольца непрочитанными
+            "errors": 0,
+            "grab_ms_avg": 0.0,
+            "grab_ms_max": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="capture-service", daemon=True)
+        self._thread.start()
+        logger.info(f"📷 Фоновый захват запущен ({1.0 / self.interval:.0f} FPS, кольцо {self._ring.maxlen})")
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        # mss-инстанс создаём в потоке захвата (X11/Windows-хэндлы привязаны к потоку)
+        sct = mss.mss()
+        next_tick = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    frame_id = self.next_frame_id()
+                    img = bgra_to_bgr(sct.grab(self.region), self._pool)
+                    frame = Frame(img, frame_id, started)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    if self.stats["errors"] % 50 == 1:
+                        logger.warning(f"Фоновый захват: ошибка grab ({e})")
+                    self._stop.wait(self.interval)
+                    next_tick = time.monotonic()
+                    continue
+
+                grab_ms = (time.monotonic() - started) * 1000.0
+                self.stats["grab_ms_avg"] = (
+                    grab_ms if self.stats["frames"] == 0
+                    else 0.9 * self.stats["grab_ms_avg"] + 0.1 * grab_ms
+                )
+                self.stats["grab_ms_max"] = max(self.stats["grab_ms_max"], grab_ms)
+                if self.on_frame is not None:
+                    self.on_frame(frame)
+
+                with self._cond:
+                    if len(self._ring) == self._ring.maxlen and self._ring[0].frame_id > self._last_read_id:
+                        self.stats["evicted_unread"] += 1
+                    self._ring.append(frame)
+                    self.stats["frames"] += 1
+                    self._cond.notify_all()
+
+                next_tick += self.interval
+                now = time.monotonic()
+                if now > next_tick:
+                    # Не успели в такт — пропускаем такты, а не догоняем очередь
+                    self.stats["dropped"] += int((now - next_tick) / self.interval) + 1
+                    next_tick = now
+                else:
+                    self._stop.wait(next_tick - now)
+        finally:
+            sct.close()
+
+    def _mark_read(self, frame: Frame) -> Frame:
+        self._last_read_id = max(self._last_read_id, frame.frame_id)
+        return frame
+
+    def latest(self) -> Optional[Frame]:
+        """Newest frame without blocking (None until the first grab)."""
+        with self._cond:
+            if not self._ring:
+                return None
+            return self._mark_read(self._ring[-1])
+
+    def wait_for_frame_after(self, timestamp: float, timeout: float = 0.5) -> Optional[Frame]:
+        """
+        First frame whose grab started after `timestamp` (time.monotonic()).
+        Used after clicks: the screen before the click is never returned.
+        Returns None on timeout or when the service is stopped.
+        """
+        def ready() -> bool:
+            return self._stop.is_set() or any(f.timestamp > timestamp for f in self._ring)
+
+        with self._cond:
+            if not self._cond.wait_for(ready, timeout) or self._stop.is_set():
+                return None
+            for frame in self._ring:
+                if frame.timestamp > timestamp:
+                    return self._mark_read(frame)
+        return None
@@ -1,21 +1,19 @@
 """
 Input Manager - Human-like Mouse Interaction.
 Handles clicking, long-pressing, and swiping with natural variations.
+Events go through core/input_backends.py: no hidden pyautogui PAUSE,
+every wait is written out below or in config.INPUT.
 """
 import logging
 import random
 import time
-from typing import Tuple
-import pyautogui
+from typing import Optional, Tuple
 
 import config
+from .input_backends import InputBackend, create_backend, linear
 
 logger = logging.getLogger(__name__)
 
-# Configure pyautogui
-pyautogui.PAUSE = 0.05
-pyautogui.FAILSAFE = True  # Move mouse to corner to abort
-
 
 class InputManager:
     """
@@ -23,8 +21,12 @@ class InputManager:
     Provides clicking, long-pressing, and swiping functionality.
     """
     
-    def __init__(self):
+    def __init__(self, backend: Optional[InputBackend] = None):
         self.game_offset = (config.GAME_REGION[0], config.GAME_REGION[1])
+        # Fail-safe для любого бэкенда: мышь в угол экрана = FailSafeException (аварийная остановка)
+        self.backend = backend or create_backend(config.INPUT.get("BACKEND", "auto"), failsafe=True)
+        self.click_hold: float = config.INPUT.get("CLICK_HOLD", 0.03)
+        self.step_delay: float = config.INPUT.get("STEP_DELAY", 0.01)
         logger.info(f"InputManager initialized with offset: {self.game_offset}")
     
     def _add_jitter(self, x: int, y: int) -> Tuple[int, int]:
@@ -71,7 +73,7 @@ class InputManager:
             # Small random delay before click
             time.sleep(random.uniform(0.05, 0.15))
             
-            pyautogui.click(screen_x, screen_y)
+            self.backend.click(screen_x, screen_y, hold=self.click_hold)
             
             logger.debug(f"Clicked at game coords ({x}, {y}) -> screen ({screen_x}, {screen_y})")
             
@@ -120,12 +122,10 @@ class InputManager:
             logger.debug(f"Long-pressing at ({x}, {y}) for {duration}s")
             
             # Move to position
-            pyautogui.moveTo(screen_x, screen_y, duration=0.2)
+            self.backend.glide(screen_x, screen_y, 0.2, self.step_delay, linear)
             
             # Press and hold
-            pyautogui.mouseDown(screen_x, screen_y)
-            time.sleep(duration)
-            pyautogui.mouseUp()
+            self.backend.click(screen_x, screen_y, hold=duration)
             
             # Wait after long press
             time.sleep(config.TIMERS["AFTER_BUY"])
@@ -175,7 +175,6 @@ class InputManager:
             screen_end_x, screen_end_y = self._to_screen_coords(end_x, end_y)
             
             # Calculate drag distance
-            drag_x = screen_end_x - screen_start_x
             drag_y = screen_end_y - screen_start_y
             
             logger.info(
@@ -185,11 +184,14 @@ class InputManager:
             )
             
             # Move to start position
-            pyautogui.moveTo(screen_start_x, screen_start_y, duration=0.1)
+            self.backend.glide(screen_start_x, screen_start_y, 0.1, self.step_delay, linear)
             time.sleep(0.1)
             
-            # Perform drag (THIS IS THE FIX!)
-            pyautogui.drag(drag_x, drag_y, duration=duration, button='left')
+            # Perform drag: press → linear move over `duration` → release
+            self.backend.drag(
+                screen_start_x, screen_start_y, screen_end_x, screen_end_y,
+                duration=duration, step_delay=self.step_delay, ease=linear,
+            )
             
             logger.info(f"✅ Скролл выполнен, жду анимацию {config.TIMERS['SCROLL_DURATION']}s")
             
@@ -219,10 +221,8 @@ class InputManager:
         screen_x, screen_y = self._to_screen_coords(x, y)
         
         for _ in range(count):
-            pyautogui.click(screen_x, screen_y)
+            self.backend.click(screen_x, screen_y, hold=self.click_hold)
             time.sleep(0.05)
         
         time.sleep(config.TIMERS["AFTER_CLICK"])
 
-
-from typing import Optional
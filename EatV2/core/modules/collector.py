@@ -4,8 +4,12 @@ Priority: 5 (Tips) and 6 (Boxes)
 Low priority passive income collection.
 """
 import logging
+import time
+from typing import List, Tuple
 
 import config
+from ..pipeline import Pipeline, harvest
+from ..scheduler import TaskSpec
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +21,10 @@ class Collector:
     """
     
     PRIORITY = 5  # Tips priority (boxes are 6)
+    BOXES_PRIORITY = 6
+    EXPECTED_COST = 0.2    # Сек на запуск без находок (уточняется замерами)
+    MAX_STALENESS = 45.0   # Сек без запуска — собираем вне очереди (не голодаем за станциями)
+    SCREENS = ("main",)  # Распознанные экраны, где модуль работает (Vision.classify_screen)
     
     def __init__(self, vision, input_manager, state_manager):
         self.vision = vision
@@ -44,6 +52,32 @@ class Collector:
         
         return action_taken
     
+    def tasks(self) -> List[TaskSpec]:
+        """Tips and boxes are scheduled separately, each with its own cooldown (ModuleScheduler)."""
+        return [
+            TaskSpec(
+                name=f"{self.name}.tips",
+                run=self._collect_tips,
+                priority=self.PRIORITY,
+                cooldown=config.TIMERS["TIPS_COOLDOWN"],
+                expected_cost=self.EXPECTED_COST,
+                max_staleness=self.MAX_STALENESS,
+                screens=self.SCREENS,
+                ends_tick=False,  # Монеты исчезают, экран тот же — боксы можно собрать в этом же тике
+                module=self,
+            ),
+            TaskSpec(
+                name=f"{self.name}.boxes",
+                run=self._collect_boxes,
+                priority=self.BOXES_PRIORITY,
+                cooldown=config.TIMERS["BOXES_COOLDOWN"],
+                expected_cost=self.EXPECTED_COST,
+                max_staleness=self.MAX_STALENESS,
+                screens=self.SCREENS,
+                module=self,
+            ),
+        ]
+    
     def _collect_tips(self) -> bool:
         """
         Collect tip coins.
@@ -51,11 +85,7 @@ class Collector:
         Returns:
             True if tips were collected, False otherwise
         """
-        # Check cooldown
-        cooldown = config.TIMERS["TIPS_COOLDOWN"]
-        if self.state.is_on_cooldown("tips", cooldown):
-            return False
-        
+        captured_at = time.monotonic()
         screenshot = self.vision.take_screenshot()
         tips = self.vision.find_all_templates("tip_coin", screenshot=screenshot)
         
@@ -68,13 +98,14 @@ class Collector:
         
         logger.info(f"💰 Собираю {len(tips_to_collect)} чаевых (найдено {len(tips)} всего)")
         
+        if config.PIPELINE["ENABLED"]:
+            self._harvest("tip_coin", tips, captured_at, max_tips, "💰 чаевые")
+            return True
+        
         for i, (x, y, w, h) in enumerate(tips_to_collect, 1):
             self.input.click_center(x, y, w, h)
             logger.debug(f"Collected tip {i}/{len(tips_to_collect)}")
         
-        # Set cooldown
-        self.state.set_cooldown("tips")
-        
         return True
     
     def _collect_boxes(self) -> bool:
@@ -84,11 +115,7 @@ class Collector:
         Returns:
             True if boxes were collected, False otherwise
         """
-        # Check cooldown
-        cooldown = config.TIMERS["BOXES_COOLDOWN"]
-        if self.state.is_on_cooldown("boxes", cooldown):
-            return False
-        
+        captured_at = time.monotonic()
         screenshot = self.vision.take_screenshot()
         boxes = self.vision.find_all_templates("box_floor", screenshot=screenshot)
         
@@ -101,11 +128,60 @@ class Collector:
         
         logger.info(f"📦 Собираю {len(boxes_to_collect)} коробок (найдено {len(boxes)} всего)")
         
+        if config.PIPELINE["ENABLED"]:
+            self._harvest("box_floor", boxes, captured_at, max_boxes, "📦 коробка")
+            return True
+        
         for i, (x, y, w, h) in enumerate(boxes_to_collect, 1):
             self.input.click_center(x, y, w, h)
             logger.debug(f"Collected box {i}/{len(boxes_to_collect)}")
         
-        # Set cooldown
-        self.state.set_cooldown("boxes")
-        
         return True
+    
+    def _harvest(
+        self,
+        template_name: str,
+        found: List[Tuple[int, int, int, int]],
+        captured_at: float,
+        limit: int,
+        label: str,
+    ) -> int:
+        """
+        Click found items through the perception/actuation pipeline (core/pipeline.py):
+        while one click and its pause run, the next screenshot is already being matched,
+        so items that appear meanwhile are collected in the same run and an item that
+        is still fading out is not clicked twice.
+        `found` comes from the screenshot grabbed at `captured_at` (time.monotonic()):
+        the actuator re-plans clicks planned from frames older than its last screen change.
+        
+        Returns:
+            Number of clicks made
+        """
+        def centers(boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int]]:
+            return [(x + w // 2, y + h // 2) for x, y, w, h in boxes]
+        
+        def perceive():
+            screenshot = self.vision.take_screenshot()
+            return None, centers(self.vision.find_all_templates(template_name, screenshot=screenshot))
+        
+        with Pipeline(
+            perceive,
+            interval=config.PIPELINE["PERCEPTION_INTERVAL"],
+            max_queue=config.PIPELINE["MAX_QUEUE"],
+            session=self.vision.capture_session,
+        ) as pipe:
+            first = pipe.perception.publish(None, captured_at, centers(found))
+            clicked = harvest(
+                pipe, first, lambda points: points,
+                lambda point: self.input.human_click(point[0], point[1]),
+                label, limit=limit,
+                radius=config.PIPELINE["SAME_TARGET_PX"],
+                timeout=config.PIPELINE["IDLE_TIMEOUT"],
+            )
+        
+        stats = pipe.actuator.stats
+        logger.debug(
+            f"{label}: {len(clicked)} кликов, отброшено {stats['dropped']:.0f}, "
+            f"детекций {pipe.perception.stats['runs']:.0f}"
+        )
+        return len(clicked)
@@ -18,6 +18,10 @@ class GeneralUpgrades:
     """
     
     PRIORITY = 2
+    COOLDOWN = config.TIMERS["GENERAL_COOLDOWN"]  # После сработавшего запуска (ModuleScheduler)
+    EXPECTED_COST = 0.3    # Сек на запуск без действия (уточняется замерами)
+    MAX_STALENESS = 60.0   # Сек без запуска — запускаем вне очереди
+    SCREENS = ("main", "general_upgrades")  # Распознанные экраны, где модуль работает (Vision.classify_screen)
     
     def __init__(self, vision, input_manager, state_manager):
         self.vision = vision
@@ -43,13 +47,6 @@ class GeneralUpgrades:
             logger.debug("❌ icon_upgrades не найдена")
             return False
         
-        # Check cooldown AFTER finding icon
-        cooldown = config.TIMERS["GENERAL_COOLDOWN"]
-        if self.state.is_on_cooldown(self.name, cooldown):
-            remaining = self.state.get_cooldown_remaining(self.name, cooldown)
-            logger.info(f"⏰ GeneralUpgrades на cooldown ({remaining:.0f}s осталось)")
-            return False
-        
         logger.info("🎖️  Найдена иконка апгрейдов (шестеренка) - открываю меню")
         self.input.click_center(*icon)
         time.sleep(config.TIMERS["AFTER_MENU_OPEN"])
@@ -70,9 +67,7 @@ class GeneralUpgrades:
         # Close the menu
         self._close_menu()
         
-        # Set cooldown
-        self.state.set_cooldown(self.name)
-        logger.info(f"{self.name} completed - cooldown set for {cooldown}s")
+        logger.info(f"{self.name} completed - cooldown {self.COOLDOWN:.0f}s")
         
         return True
     
@@ -30,6 +30,11 @@ class Navigator:
     """
     
     PRIORITY = 10  # ИЗМЕНЕНО: Низкий приоритет - скроллим ТОЛЬКО если другие модули ничего не нашли
+    COOLDOWN = 0.0
+    EXPECTED_COST = 1.0    # Сек на свайп + ожидание остановки (уточняется замерами)
+    MAX_STALENESS = 60.0   # Сек без запуска — скроллим, даже если другие модули заняты
+    IDLE_ONLY = True       # Только в тиках, где другие модули ничего не сделали (ModuleScheduler)
+    SCREENS = ("main",)  # Не скроллим под рекламой/попапом (Vision.classify_screen)
     
     def __init__(self, vision, input_manager, state_manager):
         self.vision = vision
@@ -109,6 +114,9 @@ class Navigator:
             self.at_top = True
             return True
         
+        # Маска анимаций нужна до свайпа (камера ещё стоит)
+        self.vision.warm_up_animation_mask()
+        
         # Capture screenshot before scroll
         before = self.vision.take_screenshot()
         
@@ -118,28 +126,49 @@ class Navigator:
         # Capture screenshot after scroll
         after = self.vision.take_screenshot()
         
-        # NEW: Сравниваем только статичные зоны (верх и низ UI)
+        if self._edge_reached(before, after, f"попытка {self.scroll_attempts}/{max_scrolls}"):
+            logger.info("🎯 ДОСТИГЛИ ВЕРХА!")
+            self.nav_state = NavigatorState.SCAN_DOWN
+            self.scan_steps = 0
+            self.scroll_attempts = 0
+            self.at_top = True
+        else:
+            logger.info("⬆️  Контент сдвинулся - продолжаю вверх...")
+        return True
+    
+    def _edge_reached(self, before, after, label: str) -> bool:
+        """
+        Упёрлись ли (контент не сдвинулся после свайпа).
+        
+        С готовой маской анимаций (Vision.animation_mask) — % изменившихся СТАТИЧНЫХ
+        пикселей против фиксированного ANIMATION_MASK["EDGE_CHANGE_PCT"], с одного свайпа.
+        Иначе — старая проверка: MSE статичных зон стабилизировался между двумя свайпами.
+        """
+        mask = self.vision.animation_mask
+        change = mask.changed_percent(before, after) if mask is not None else None
+        if change is not None:
+            self.last_mse = None
+            edge = change < config.ANIMATION_MASK.get("EDGE_CHANGE_PCT", 8.0)
+            logger.info(f"📊 Изменилось {change:.1f}% статичных пикселей ({label})")
+            if not edge:
+                mask.camera_moved()  # сдвиг не измерен — маска заново
+            return edge
+        if mask is not None:
+            mask.camera_moved()
+        
+        # Сравниваем только статичные зоны (верх и низ UI)
         mse = self._calculate_static_mse(before, after)
-        logger.info(f"📊 MSE статичных зон: {mse:.1f} (попытка {self.scroll_attempts}/{max_scrolls})")
+        logger.info(f"📊 MSE статичных зон: {mse:.1f} ({label})")
         
-        # NEW: Проверка стабилизации MSE
+        # Проверка стабилизации MSE
+        edge = False
         if self.last_mse is not None:
             mse_diff = abs(mse - self.last_mse)
             stability_threshold = config.NAVIGATOR.get("MSE_STABILITY_THRESHOLD", 200)
-            
-            if mse_diff < stability_threshold:
-                logger.info(f"🎯 MSE стабилизировался (изменение: {mse_diff:.1f}) - ДОСТИГЛИ ВЕРХА!")
-                self.nav_state = NavigatorState.SCAN_DOWN
-                self.scan_steps = 0
-                self.scroll_attempts = 0
-                self.last_mse = None
-                self.at_top = True
-                return True
-            else:
-                logger.info(f"⬆️  MSE изменился на {mse_diff:.1f} - продолжаю вверх...")
-        
-        self.last_mse = mse
-        return True
+            logger.info(f"📊 MSE изменился на {mse_diff:.1f} (стабилизация < {stability_threshold})")
+            edge = mse_diff < stability_threshold
+        self.last_mse = None if edge else mse
+        return edge
     
     def _calculate_static_mse(self, img1, img2) -> float:
         """
@@ -153,21 +182,13 @@ class Navigator:
             MSE value for static zones only
         """
         try:
-            h = img1.shape[0]
             static_height_factor = config.NAVIGATOR.get("STATIC_ZONE_HEIGHT", 0.15)
-            static_h = int(h * static_height_factor)
-            
-            # Верхняя статичная зона (UI элементы)
-            top1 = img1[:static_h, :]
-            top2 = img2[:static_h, :]
-            
-            # Нижняя статичная зона (UI элементы)
-            bottom1 = img1[-static_h:, :]
-            bottom2 = img2[-static_h:, :]
             
-            # MSE для каждой зоны
-            mse_top = self.vision.calculate_mse(top1, top2)
-            mse_bottom = self.vision.calculate_mse(bottom1, bottom2)
+            # Верхняя и нижняя статичные зоны (UI элементы) — полосы миниатюр FrameDiff
+            top, bottom = self.vision.compare_bands(
+                img1, img2, [(0.0, static_height_factor), (1.0 - static_height_factor, 1.0)]
+            )
+            mse_top, mse_bottom = top.mse, bottom.mse
             
             # Средний MSE
             avg_mse = (mse_top + mse_bottom) / 2
@@ -210,6 +231,9 @@ class Navigator:
                 self.at_bottom = True
                 return True
             
+            # Маска анимаций нужна до свайпа (камера ещё стоит)
+            self.vision.warm_up_animation_mask()
+            
             # Capture screenshot before scroll
             before = self.vision.take_screenshot()
             
@@ -219,25 +243,12 @@ class Navigator:
             # Capture screenshot after scroll
             after = self.vision.take_screenshot()
             
-            # NEW: Статичный MSE
-            mse = self._calculate_static_mse(before, after)
-            logger.info(f"📊 MSE статичных зон: {mse:.1f} (шаг {scroll_step_number}/{max_scroll_down})")
-            
-            # NEW: Проверка стабилизации
-            if self.last_mse is not None:
-                mse_diff = abs(mse - self.last_mse)
-                stability_threshold = config.NAVIGATOR.get("MSE_STABILITY_THRESHOLD", 200)
-                
-                if mse_diff < stability_threshold:
-                    logger.info(f"🎯 MSE стабилизировался (изменение: {mse_diff:.1f}) - ДОСТИГЛИ ДНА!")
-                    self.nav_state = NavigatorState.CAMP_BOTTOM
-                    self.camp_counter = 0
-                    self.scan_steps = 0
-                    self.last_mse = None
-                    self.at_bottom = True
-                    return True
-            
-            self.last_mse = mse
+            if self._edge_reached(before, after, f"шаг {scroll_step_number}/{max_scroll_down}"):
+                logger.info("🎯 ДОСТИГЛИ ДНА!")
+                self.nav_state = NavigatorState.CAMP_BOTTOM
+                self.camp_counter = 0
+                self.scan_steps = 0
+                self.at_bottom = True
             return True  # Скроллили - даём цикл перезапуститься
         else:
             # Пауза - даём другим модулям поработать
@@ -262,6 +273,8 @@ class Navigator:
             
             # Немного вверх
             self._scroll_up(distance_factor=0.3)
+            if self.vision.animation_mask is not None:
+                self.vision.animation_mask.camera_moved()
             
             # Начинаем заново сканирование вниз
             self.nav_state = NavigatorState.SCAN_DOWN
@@ -337,6 +350,12 @@ class Navigator:
         
         self.input.swipe(start_x, start_y, end_x, end_y, duration)
     
+    def on_activity(self, source: str) -> None:
+        """Другой модуль что-то сделал (ModuleScheduler) - ожидание IDLE начинается заново."""
+        if self.idle_cycles:
+            logger.debug(f"✅ {source} сработал - сбросил idle Navigator")
+        self.idle_cycles = 0
+    
     def reset(self) -> None:
         """Reset navigator to initial state (useful after level change)."""
         logger.info("🔄 Navigator reset to IDLE state")
@@ -19,6 +19,10 @@ class Renovator:
     """
     
     PRIORITY = 1
+    COOLDOWN = config.TIMERS["RENOVATOR_COOLDOWN"]  # После сработавшего запуска (ModuleScheduler)
+    EXPECTED_COST = 0.2    # Сек на запуск без действия (уточняется замерами)
+    MAX_STALENESS = 10.0   # Сек без запуска — запускаем вне очереди
+    SCREENS = ("main", "renovate", "fly")  # Распознанные экраны, где модуль работает (Vision.classify_screen)
     
     def __init__(self, vision, input_manager, state_manager):
         self.vision = vision
@@ -34,30 +38,22 @@ class Renovator:
         Returns:
             True if any action was taken, False otherwise
         """
-        # Check cooldown
-        if self.state.is_on_cooldown(self.name, config.TIMERS["RENOVATOR_COOLDOWN"]):
-            return False
-        
         screenshot = self.vision.take_screenshot()
         
         # Priority 1: Handle "Okay" button (highest priority)
         if self._handle_okay(screenshot):
-            self.state.set_cooldown(self.name)
             return True
         
         # Priority 2: Handle "Open Level" button
         if self._handle_open_level(screenshot):
-            self.state.set_cooldown(self.name)
             return True
         
         # Priority 3: Handle "Renovate" (hammer) button
         if self._handle_renovate(screenshot):
-            self.state.set_cooldown(self.name)
             return True
         
         # Priority 4: Handle "Fly" (plane) button
         if self._handle_fly(screenshot):
-            self.state.set_cooldown(self.name)
             return True
         
         return False
@@ -77,10 +73,9 @@ class Renovator:
         if btn:
             logger.info("🔓 Найдена кнопка 'Open Level' - открываю уровень")
             self.input.click_center(*btn)
-            time.sleep(config.TIMERS["AFTER_CLICK"])
             
             # Look for confirmation if needed
-            self._check_for_confirmation()
+            self._check_for_confirmation(wait=config.TIMERS["AFTER_CLICK"] + 0.5)
             return True
         return False
     
@@ -90,10 +85,9 @@ class Renovator:
         if btn:
             logger.info("🔨 Найдена кнопка 'Renovate' (молоток) - делаю ремонт")
             self.input.click_center(*btn)
-            time.sleep(config.TIMERS["AFTER_RENOVATE"])
             
             # Look for confirmation
-            self._check_for_confirmation("btn_confirm_renovate")
+            self._check_for_confirmation("btn_confirm_renovate", wait=config.TIMERS["AFTER_RENOVATE"] + 0.5)
             return True
         return False
     
@@ -103,31 +97,28 @@ class Renovator:
         if btn:
             logger.info("✈️  Найдена кнопка 'Fly' (самолёт) - лечу на следующий уровень")
             self.input.click_center(*btn)
-            time.sleep(config.TIMERS["AFTER_RENOVATE"])
             
             # Look for confirmation
-            self._check_for_confirmation("btn_fly_confirm")
+            self._check_for_confirmation("btn_fly_confirm", wait=config.TIMERS["AFTER_RENOVATE"] + 0.5)
             return True
         return False
     
-    def _check_for_confirmation(self, confirm_button: str = "btn_confirm_renovate") -> bool:
+    def _check_for_confirmation(self, confirm_button: str = "btn_confirm_renovate", wait: float = 0.5) -> bool:
         """
-        Check for and click confirmation button after renovate/fly actions.
+        Wait for and click confirmation button after renovate/fly actions.
         
         Args:
             confirm_button: Name of the confirmation button template
+            wait: Max seconds to wait for the dialog (returns as soon as it appears)
             
         Returns:
             True if confirmation was found and clicked
         """
-        # Wait a moment for the confirmation dialog to appear
-        time.sleep(0.5)
+        found = self.vision.wait_for_any({confirm_button: None}, timeout=wait)
         
-        screenshot = self.vision.take_screenshot()
-        btn = self.vision.find_template(confirm_button, screenshot=screenshot)
-        
-        if btn:
-            logger.info(f"Found '{confirm_button}' - confirming action")
+        if found:
+            _, btn, latency = found
+            logger.info(f"Found '{confirm_button}' after {latency:.1f}s - confirming action")
             self.input.click_center(*btn)
             time.sleep(config.TIMERS["AFTER_CLICK"])
             return True
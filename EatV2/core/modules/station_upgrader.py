@@ -26,6 +26,10 @@ class StationUpgrader:
     """
     
     PRIORITY = 3
+    COOLDOWN = 0.0         # Повторные клики сдерживает spatial memory
+    EXPECTED_COST = 0.5    # Сек на запуск (уточняется замерами)
+    MAX_STALENESS = 20.0   # Сек без запуска — запускаем вне очереди
+    SCREENS = ("main",)  # Распознанные экраны, где модуль работает (Vision.classify_screen)
     
     def __init__(self, vision, input_manager, state_manager):
         self.vision = vision
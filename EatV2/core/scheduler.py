@@ -0,0 +1,264 @@
+"""
+Module Scheduler - Time-Budgeted Priority Scheduling.
+Decides which module runs next instead of "first module that acts wins".
+
+Each task (one per module; Collector has two: tips and boxes) declares:
+    priority       - lower number = more important (same scale as PRIORITY)
+    cooldown       - seconds after a successful run before it may run again
+    expected_cost  - typical seconds per run (refined by measured runs, EMA)
+    max_staleness  - seconds without a run after which the task is overdue
+
+Every tick the eligible tasks (right screen, off cooldown) are ranked by utility:
+    overdue (staleness >= max_staleness): ahead of everything, most overdue first
+    otherwise: 1/priority x (1 + staleness/max_staleness) x (0.5 + success rate) / (1 + cost/COST_SCALE)
+and run while their expected cost fits the remaining tick budget (the first task
+always runs). A task flagged idle_only (Navigator) runs only in ticks where nobody
+else acted, unless it is overdue.
+
+A task that acts ends the tick (ends_tick, default): its action may have changed the
+screen (popup, menu, new level), so the next tick re-classifies it and the higher-
+priority tasks (Renovator first) check it before anything else — as the old
+"first module that acts wins" loop did. Only tasks whose actions leave the screen
+as it was (ends_tick=False: Collector tips) let lower-ranked tasks run in the same
+tick. Checks that find nothing to do never end the tick, so several of them share
+one tick budget.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskSpec:
+    """One schedulable unit of work; run() returns True if an action was taken."""
+    name: str
+    run: Callable[[], bool]
+    priority: int
+    cooldown: float = 0.0
+    expected_cost: float = 0.5
+    max_staleness: float = 60.0
+    screens: Optional[Tuple[str, ...]] = None  # None = любой экран
+    idle_only: bool = False
+    ends_tick: bool = True  # Действие меняет экран — после него новый тик
+    module: object = None
+
+
+@dataclass
+class TaskStats:
+    """Per-task counters (run counts, latency, success rate)."""
+    runs: int = 0
+    successes: int = 0
+    errors: int = 0
+    overdue_runs: int = 0
+    deferred: int = 0              # Не влезла в бюджет тика
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    cost: float = 0.0              # Текущая оценка стоимости, сек (EMA)
+    last_run: float = 0.0
+    last_success: float = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        """Laplace-smoothed: a new task starts at 0.5."""
+        return (self.successes + 1) / (self.runs + 2)
+
+
+class ModuleScheduler:
+    """
+    Picks and runs module tasks by utility within a per-tick time budget.
+    Replaces the cooldown dictionary of StateManager: cooldowns start after a
+    successful run and are enforced here, modules no longer check them.
+    """
+
+    def __init__(self, vision=None):
+        settings = config.SCHEDULER
+        self.vision = vision
+        self.tick_budget = float(settings.get("TICK_BUDGET", 4.0))
+        self.cost_smoothing = float(settings.get("COST_SMOOTHING", 0.3))
+        self.cost_scale = float(settings.get("COST_SCALE", 1.0))
+        self.tasks: List[TaskSpec] = []
+        self.stats: Dict[str, TaskStats] = {}
+        self.ticks = 0
+        self.idle_ticks = 0
+        self.started = time.time()
+        logger.info(f"ModuleScheduler initialized (tick budget: {self.tick_budget:.1f}s)")
+
+    # ===== REGISTRATION =====
+
+    def add(self, task: TaskSpec) -> None:
+        """Register a task."""
+        self.tasks.append(task)
+        self.stats[task.name] = TaskStats(cost=task.expected_cost)
+
+    def add_module(self, module) -> None:
+        """
+        Register a module: its tasks() if it has several, otherwise one task
+        from the class attributes PRIORITY, COOLDOWN, EXPECTED_COST, MAX_STALENESS,
+        SCREENS, IDLE_ONLY, ENDS_TICK and the execute() method.
+        """
+        if hasattr(module, "tasks"):
+            for task in module.tasks():
+                self.add(task)
+            return
+        self.add(TaskSpec(
+            name=module.name,
+            run=module.execute,
+            priority=module.PRIORITY,
+            cooldown=getattr(module, "COOLDOWN", 0.0),
+            expected_cost=getattr(module, "EXPECTED_COST", 0.5),
+            max_staleness=getattr(module, "MAX_STALENESS", 60.0),
+            screens=getattr(module, "SCREENS", None),
+            idle_only=getattr(module, "IDLE_ONLY", False),
+            ends_tick=getattr(module, "ENDS_TICK", True),
+            module=module,
+        ))
+
+    # ===== SCHEDULING =====
+
+    def is_on_cooldown(self, task: TaskSpec, now: Optional[float] = None) -> bool:
+        """True while the cooldown after the last successful run is running."""
+        stats = self.stats[task.name]
+        if not task.cooldown or not stats.last_success:
+            return False
+        return (now or time.time()) - stats.last_success < task.cooldown
+
+    def staleness(self, task: TaskSpec, now: float) -> float:
+        """Seconds since the task last ran (since scheduler start if never)."""
+        return now - (self.stats[task.name].last_run or self.started)
+
+    def utility(self, task: TaskSpec, now: float) -> float:
+        """How much running this task now is worth (see module docstring)."""
+        stats = self.stats[task.name]
+        urgency = self.staleness(task, now) / max(task.max_staleness, 1e-3)
+        if urgency >= 1.0:
+            return 1000.0 + urgency
+        return (
+            (1.0 / max(task.priority, 1))
+            * (1.0 + urgency)
+            * (0.5 + stats.success_rate)
+            / (1.0 + stats.cost / self.cost_scale)
+        )
+
+    def _eligible(self, screen: Optional[str], done: Sequence[str], now: float) -> List[TaskSpec]:
+        """Tasks allowed on this screen, off cooldown and not yet run this tick."""
+        return [
+            task for task in self.tasks
+            if task.name not in done
+            and (screen is None or task.screens is None or screen in task.screens)
+            and not self.is_on_cooldown(task, now)
+        ]
+
+    def _classify(self) -> Optional[str]:
+        """Recognized screen name (Vision.classify_screen) or None: all tasks allowed."""
+        if self.vision is None:
+            return None
+        screen = self.vision.classify_screen()
+        if screen is not None:
+            logger.debug(f"🖼️  Экран: {screen.name} (расстояние {screen.distance})")
+        return screen.name if screen is not None else None
+
+    def run_tick(self) -> bool:
+        """
+        Run one tick: highest-utility tasks first, within the time budget.
+
+        Returns:
+            True if any task took an action
+        """
+        self.ticks += 1
+        tick_start = time.time()
+        screen = self._classify()
+        done: List[str] = []
+        acted = False
+
+        while True:
+            now = time.time()
+            elapsed = now - tick_start
+            candidates = self._eligible(screen, done, now)
+            if not candidates:
+                break
+            ranked = sorted(candidates, key=lambda t: self.utility(t, now), reverse=True)
+
+            task = None
+            for candidate in ranked:
+                overdue = self.staleness(candidate, now) >= candidate.max_staleness
+                if candidate.idle_only and acted and not overdue:
+                    continue
+                if done and elapsed + self.stats[candidate.name].cost > self.tick_budget:
+                    self.stats[candidate.name].deferred += 1
+                    done.append(candidate.name)  # в этом тике больше не предлагаем
+                    continue
+                task = candidate
+                break
+            if task is None:
+                break
+
+            done.append(task.name)
+            if self._run(task, now):
+                acted = True
+                self._notify_activity(task)
+                if task.ends_tick:
+                    # Экран мог смениться (попап, реклама, новый уровень) — следующий тик
+                    # заново его распознаёт, и задачи выше по приоритету проверяют его первыми
+                    break
+                screen = self._classify()
+
+        self.idle_ticks = 0 if acted else self.idle_ticks + 1
+        return acted
+
+    def _run(self, task: TaskSpec, now: float) -> bool:
+        """Run one task and record its latency and outcome."""
+        stats = self.stats[task.name]
+        if self.staleness(task, now) >= task.max_staleness:
+            stats.overdue_runs += 1
+            logger.debug(f"⏳ {task.name}: не запускался {self.staleness(task, now):.0f}s - запускаю вне очереди")
+
+        started = time.perf_counter()
+        try:
+            success = bool(task.run())
+        except Exception as e:
+            logger.error(f"Error in {task.name}: {e}", exc_info=True)
+            stats.errors += 1
+            success = False
+        elapsed = time.perf_counter() - started
+
+        stats.runs += 1
+        stats.total_ms += elapsed * 1000.0
+        stats.max_ms = max(stats.max_ms, elapsed * 1000.0)
+        stats.cost += self.cost_smoothing * (elapsed - stats.cost)
+        stats.last_run = time.time()
+        if success:
+            stats.successes += 1
+            stats.last_success = stats.last_run
+        return success
+
+    def _notify_activity(self, source: TaskSpec) -> None:
+        """Tell the other modules something happened (Navigator drops its idle count)."""
+        notified = set()
+        for task in self.tasks:
+            module = task.module
+            if module is None or module is source.module or id(module) in notified:
+                continue
+            notified.add(id(module))
+            hook = getattr(module, "on_activity", None)
+            if hook is not None:
+                hook(source.name)
+
+    # ===== STATISTICS =====
+
+    def report(self) -> List[str]:
+        """One line per task: runs, success rate, latency, overdue / deferred counts."""
+        lines = []
+        for task in sorted(self.tasks, key=lambda t: t.priority):
+            s = self.stats[task.name]
+            avg = s.total_ms / s.runs if s.runs else 0.0
+            lines.append(
+                f"{task.name:<16} runs {s.runs:>5} | success {s.successes / s.runs if s.runs else 0.0:>4.0%} | "
+                f"avg {avg:>6.0f}ms max {s.max_ms:>6.0f}ms | cost {s.cost:.2f}s | "
+                f"overdue {s.overdue_runs} | deferred {s.deferred} | errors {s.errors}"
+            )
+        return lines
@@ -1,10 +1,10 @@
 """
-State Manager - Spatial Memory and Timing Control.
+State Manager - Spatial Memory.
 Prevents spam-clicking by remembering recent interactions.
 """
 import logging
 import time
-from typing import Dict, Tuple, Optional
+from typing import Dict, Optional
 from dataclasses import dataclass
 
 import config
@@ -23,59 +23,13 @@ class ClickMemory:
 
 class StateManager:
     """
-    Manages bot state including spatial memory and module cooldowns.
-    Prevents repetitive clicking and ensures proper timing between actions.
+    Manages bot state shared by the modules (spatial memory).
+    Prevents repetitive clicking; module cooldowns are enforced by ModuleScheduler.
     """
     
     def __init__(self):
         self.spatial_memory = SpatialMemory()
-        self.cooldowns: Dict[str, float] = {}
         logger.info("StateManager initialized")
-    
-    def is_on_cooldown(self, key: str, cooldown_duration: float) -> bool:
-        """
-        Check if a module/action is on cooldown.
-        
-        Args:
-            key: Identifier for the module/action
-            cooldown_duration: Cooldown duration in seconds
-            
-        Returns:
-            True if on cooldown, False otherwise
-        """
-        if key not in self.cooldowns:
-            return False
-        
-        elapsed = time.time() - self.cooldowns[key]
-        return elapsed < cooldown_duration
-    
-    def set_cooldown(self, key: str) -> None:
-        """
-        Start a cooldown timer for a module/action.
-        
-        Args:
-            key: Identifier for the module/action
-        """
-        self.cooldowns[key] = time.time()
-        logger.debug(f"Cooldown set for '{key}'")
-    
-    def get_cooldown_remaining(self, key: str, cooldown_duration: float) -> float:
-        """
-        Get remaining cooldown time.
-        
-        Args:
-            key: Identifier for the module/action
-            cooldown_duration: Total cooldown duration
-            
-        Returns:
-            Remaining seconds (0 if not on cooldown)
-        """
-        if key not in self.cooldowns:
-            return 0.0
-        
-        elapsed = time.time() - self.cooldowns[key]
-        remaining = cooldown_duration - elapsed
-        return max(0.0, remaining)
 
 
 class SpatialMemory:
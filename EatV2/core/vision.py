@@ -3,13 +3,21 @@ Vision Module - OpenCV Template Matching with Multi-Scale Support.
 Handles all computer vision operations for the bot.
 """
 import logging
-from typing import Optional, List, Tuple
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, List, Tuple
 import numpy as np
 import cv2
 from mss import mss
 from PIL import Image
 
 import config
+from .animation_mask import AnimationMask
+from .capture import FrameBufferPool, bgra_to_bgr
+from .frame_diff import FrameDiff
+from .screen_signature import ScreenIndex, ScreenMatch
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +29,10 @@ class Vision:
     """
     
     def __init__(self):
-        self.sct = mss()
+        # mss на поток: хэндлы X11/Windows привязаны к потоку, который их открыл
+        # (поток конвейера core/pipeline.py открывает свой через capture_session())
+        self._sct_local = threading.local()
+        self._sct_local.sct = mss()
         self.game_region = {
             "left": config.GAME_REGION[0],
             "top": config.GAME_REGION[1],
@@ -29,21 +40,151 @@ class Vision:
             "height": config.GAME_REGION[3],
         }
         self.last_screenshot: Optional[np.ndarray] = None
+        # Reused BGR output buffers for take_screenshot() (no per-grab allocations);
+        # буфер, на который ещё ссылается кадр/кроп, не перезаписывается
+        self._frame_buffers = FrameBufferPool()
+        # Пул буферов, last_screenshot, FrameDiff и маска анимаций — из главного потока
+        # и потока конвейера
+        self._capture_lock = threading.Lock()
+        # Decoded templates {name: (mtime_ns, image)} and their resized copies for
+        # multi-scale matching {(name, mtime_ns, w, h): image} — no disk read per call.
+        # Оба кэша под одним локом: их читает и пишет ещё поток scale-recheck
+        self._templates: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._scaled_templates: Dict[Tuple[str, int, int, int], np.ndarray] = {}
+        self._template_lock = threading.Lock()
+        # Display-scale lock (SCALE_CALIBRATION): масштаб, выбранный голосованием якорей,
+        # и для какого (GAME_REGION, размер кадра) он выбран
+        self.locked_scale: Optional[float] = None
+        self._calibration_key: Optional[tuple] = None
+        self._next_calibration: float = 0.0
+        self._next_recheck: float = 0.0
+        self._recheck_thread: Optional[threading.Thread] = None
+        self._scale_lock = threading.Lock()
+        # Серая миниатюра каждого кадра take_screenshot() (кэш) — для всех сравнений кадров
+        diff_settings = config.FRAME_DIFF
+        self.frame_diff = FrameDiff(
+            scale=float(diff_settings.get("SCALE", 0.25)),
+            pixel_threshold=int(diff_settings.get("PIXEL_THRESHOLD", 30)),
+            cache_size=int(diff_settings.get("CACHE_SIZE", 8)),
+        )
+        # Какой экран — по хэшам стабильных областей (screen_signatures.json рядом с config.py)
+        self.screen_index: Optional[ScreenIndex] = None
+        signatures = config.SCREEN_SIGNATURES
+        if signatures.get("ENABLED", True):
+            self.screen_index = ScreenIndex(
+                thumbs=self.frame_diff,
+                hash_kind=str(signatures.get("HASH", "dhash")),
+                max_distance=int(signatures.get("MAX_DISTANCE", 10)),
+                max_mean_diff=float(signatures.get("MAX_MEAN_DIFF", 25.0)),
+            )
+        self.screen_stats: dict[str, int] = {}
+        # Маска анимированных пикселей: учится на каждом кадре take_screenshot()
+        self.animation_mask: Optional[AnimationMask] = None
+        settings = config.ANIMATION_MASK
+        if settings.get("ENABLED", True):
+            self.animation_mask = AnimationMask(
+                thumbs=self.frame_diff,
+                alpha=float(settings.get("ALPHA", 0.05)),
+                pixel_threshold=int(settings.get("PIXEL_THRESHOLD", 20)),
+                std_threshold=float(settings.get("STD_THRESHOLD", 6.0)),
+                min_frames=int(settings.get("MIN_FRAMES", 6)),
+                max_learn_change=float(settings.get("MAX_LEARN_CHANGE", 0.3)),
+            )
         logger.info(f"Vision initialized with region: {config.GAME_REGION}")
     
+    def _load_template(self, template_name: str) -> Optional[np.ndarray]:
+        """
+        Template by name, decoded once and kept in memory.
+        Re-read only when the PNG on disk changes (mtime), e.g. after capture_templates.py.
+        """
+        template_path = config.ASSETS_PATH / f"{template_name}.png"
+        with self._template_lock:
+            try:
+                mtime_ns = os.stat(template_path).st_mtime_ns
+            except OSError:
+                self._templates.pop(template_name, None)
+                logger.warning(f"Template not found: {template_path}")
+                return None
+            
+            cached = self._templates.get(template_name)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+            
+            template = cv2.imread(str(template_path))
+            if template is None:
+                logger.error(f"Failed to load template: {template_path}")
+                return None
+            if cached is not None:
+                # Шаблон перезаписан — старые масштабированные копии больше не нужны
+                self._scaled_templates = {
+                    k: v for k, v in self._scaled_templates.items() if k[0] != template_name
+                }
+            self._templates[template_name] = (mtime_ns, template)
+            return template
+    
+    def _scaled_template(self, template_name: str, template: np.ndarray, width: int, height: int) -> np.ndarray:
+        """
+        Resized copy of a cached template (computed once per size and file version).
+        A template that was reloaded meanwhile is resized but not cached.
+        """
+        with self._template_lock:
+            cached = self._templates.get(template_name)
+            if cached is None or cached[1] is not template:
+                key = None
+            else:
+                key = (template_name, cached[0], width, height)
+                scaled = self._scaled_templates.get(key)
+                if scaled is not None:
+                    return scaled
+        scaled = cv2.resize(template, (width, height))
+        if key is not None:
+            with self._template_lock:
+                current = self._templates.get(template_name)
+                if current is not None and current[0] == key[1]:
+                    self._scaled_templates[key] = scaled
+        return scaled
+    
+    @contextmanager
+    def capture_session(self):
+        """Own mss instance for the current (worker) thread, closed when the with-block ends."""
+        if getattr(self._sct_local, "sct", None) is not None:
+            yield
+            return
+        self._sct_local.sct = mss()
+        try:
+            yield
+        finally:
+            sct, self._sct_local.sct = self._sct_local.sct, None
+            try:
+                sct.close()
+            except Exception as e:
+                logger.debug(f"mss close: {e}")
+    
+    def _grabber(self):
+        """mss instance of the current thread (created on first use)."""
+        sct = getattr(self._sct_local, "sct", None)
+        if sct is None:
+            sct = mss()
+            self._sct_local.sct = sct
+        return sct
+    
     def take_screenshot(self) -> np.ndarray:
         """
         Capture the game region and convert to OpenCV format (BGR).
+        The mss buffer is wrapped without copying and converted into a reused buffer.
         
         Returns:
             np.ndarray: Screenshot in BGR format
         """
         try:
-            sct_img = self.sct.grab(self.game_region)
-            # Convert to numpy array and BGR format
-            img = np.array(sct_img)
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            self.last_screenshot = img_bgr
+            sct_img = self._grabber().grab(self.game_region)
+            with self._capture_lock:
+                # Zero-copy view of BGRA pixels → BGR into a free pooled buffer
+                img_bgr = bgra_to_bgr(sct_img, self._frame_buffers)
+                self.last_screenshot = img_bgr
+                self.frame_diff.refresh(img_bgr)  # буфер из пула перезаписан — миниатюра заново
+                if self.animation_mask is not None:
+                    self.animation_mask.observe(img_bgr)
             return img_bgr
         except Exception as e:
             logger.error(f"Failed to capture screenshot: {e}")
@@ -71,15 +212,9 @@ class Vision:
         if screenshot is None:
             screenshot = self.take_screenshot()
         
-        # Load template
-        template_path = config.ASSETS_PATH / f"{template_name}.png"
-        if not template_path.exists():
-            logger.warning(f"Template not found: {template_path}")
-            return None
-        
-        template = cv2.imread(str(template_path))
+        # Load template (cached, see _load_template)
+        template = self._load_template(template_name)
         if template is None:
-            logger.error(f"Failed to load template: {template_path}")
             return None
         
         # Get threshold
@@ -88,7 +223,7 @@ class Vision:
         
         # Perform matching
         if use_multiscale:
-            result = self._match_multiscale(screenshot, template, threshold)
+            result = self._match_multiscale(screenshot, template_name, template, threshold)
         else:
             result = self._match_single_scale(screenshot, template, threshold)
         
@@ -97,6 +232,96 @@ class Vision:
         
         return result
     
+    def wait_for_any(
+        self,
+        targets: Dict[str, Optional[Tuple[int, int, int, int]]],
+        timeout: float,
+        threshold: Optional[float] = None,
+    ) -> Optional[Tuple[str, Tuple[int, int, int, int], float]]:
+        """
+        Wait until any of several templates appears.
+        
+        Frames are taken every WAIT_FOR_ANY["FRAME_INTERVAL"]; all templates are matched
+        together, and only when their search regions changed since the last matched frame
+        (gray 1/4 thumbnail, max |diff| >= CHANGE_THRESHOLD) or REEVALUATE_EVERY passed.
+        
+        Args:
+            targets: {template name: (x, y, w, h) search region in screenshot px, or None = whole};
+                several found in one frame — the first in dict order wins
+            timeout: Seconds to wait
+            threshold: Confidence threshold (uses config per template if None)
+            
+        Returns:
+            (template name, (x, y, w, h) in screenshot px, latency in seconds) or None on timeout
+        """
+        settings = config.WAIT_FOR_ANY
+        interval = float(settings.get("FRAME_INTERVAL", 0.03))
+        change_threshold = float(settings.get("CHANGE_THRESHOLD", 12))
+        reevaluate = float(settings.get("REEVALUATE_EVERY", 1.0))
+        started = time.monotonic()
+        deadline = started + timeout
+        
+        templates = {}
+        for name, region in targets.items():
+            template = self._load_template(name)
+            if template is not None:
+                templates[name] = (template, region)
+        if not templates:
+            return None
+        
+        frames = matched = 0
+        last_thumb: Optional[np.ndarray] = None
+        last_matched_at = 0.0
+        while True:
+            grab_at = time.monotonic()
+            screenshot = self.take_screenshot()
+            frames += 1
+            sh, sw = screenshot.shape[:2]
+            boxes = {}
+            for name, (_, region) in templates.items():
+                x, y, w, h = region if region is not None else (0, 0, sw, sh)
+                boxes[name] = (max(0, x), max(0, y), min(sw, x + w), min(sh, y + h))
+            x1 = min(b[0] for b in boxes.values())
+            y1 = min(b[1] for b in boxes.values())
+            x2 = max(b[2] for b in boxes.values())
+            y2 = max(b[3] for b in boxes.values())
+            gray = cv2.cvtColor(screenshot[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+            thumb = cv2.resize(
+                gray, (max(1, gray.shape[1] // 4), max(1, gray.shape[0] // 4)), interpolation=cv2.INTER_AREA
+            )
+            
+            if (
+                last_thumb is None
+                or last_thumb.shape != thumb.shape
+                or grab_at - last_matched_at >= reevaluate
+                or cv2.norm(thumb, last_thumb, cv2.NORM_INF) >= change_threshold
+            ):
+                last_thumb, last_matched_at = thumb, grab_at
+                matched += 1
+                # Масштаб — по полному кадру (калибровка привязана к его размеру), матчинг — в зонах
+                scales = self._active_scales(screenshot)
+                for name, (template, _) in templates.items():
+                    bx1, by1, bx2, by2 = boxes[name]
+                    if bx2 <= bx1 or by2 <= by1:
+                        continue
+                    thr = threshold if threshold is not None else config.THRESHOLDS.get(name, config.DEFAULT_THRESHOLD)
+                    result = self._match_multiscale(screenshot[by1:by2, bx1:bx2], name, template, thr, scales=scales)
+                    if result:
+                        x, y, w, h = result
+                        latency = grab_at - started
+                        logger.debug(
+                            f"'{name}' появился через {latency * 1000:.0f}ms (кадров {frames}, матчинг {matched})"
+                        )
+                        return name, (bx1 + x, by1 + y, w, h), latency
+            
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            time.sleep(max(0.0, min(interval - (now - grab_at), deadline - now)))
+        
+        logger.debug(f"wait_for_any {list(templates)}: ничего за {timeout:.1f}s (кадров {frames}, матчинг {matched})")
+        return None
+    
     def find_all_templates(
         self,
         template_name: str,
@@ -119,15 +344,9 @@ class Vision:
         if screenshot is None:
             screenshot = self.take_screenshot()
         
-        # Load template
-        template_path = config.ASSETS_PATH / f"{template_name}.png"
-        if not template_path.exists():
-            logger.warning(f"Template not found: {template_path}")
-            return []
-        
-        template = cv2.imread(str(template_path))
+        # Load template (cached, see _load_template)
+        template = self._load_template(template_name)
         if template is None:
-            logger.error(f"Failed to load template: {template_path}")
             return []
         
         # Get threshold
@@ -136,7 +355,7 @@ class Vision:
         
         # NEW: Multi-scale matching for find_all
         if use_multiscale:
-            return self._find_all_multiscale(screenshot, template, threshold)
+            return self._find_all_multiscale(screenshot, template_name, template, threshold)
         
         # OLD: Single scale (fallback)
         h, w = template.shape[:2]
@@ -165,6 +384,7 @@ class Vision:
     def _find_all_multiscale(
         self,
         screenshot: np.ndarray,
+        template_name: str,
         template: np.ndarray,
         threshold: float,
         scales: Optional[Tuple[float, ...]] = None
@@ -176,7 +396,7 @@ class Vision:
             List of tuples (x, y, w, h) for each match across all scales
         """
         if scales is None:
-            scales = config.VISION_SCALES
+            scales = self._active_scales(screenshot)
         
         all_matches = []
         h, w = template.shape[:2]
@@ -192,7 +412,7 @@ class Vision:
                 continue
             
             try:
-                scaled_template = cv2.resize(template, (scaled_w, scaled_h))
+                scaled_template = self._scaled_template(template_name, template, scaled_w, scaled_h)
                 result = cv2.matchTemplate(screenshot, scaled_template, cv2.TM_CCOEFF_NORMED)
                 locations = np.where(result >= threshold)
                 
@@ -246,6 +466,7 @@ class Vision:
     def _match_multiscale(
         self,
         screenshot: np.ndarray,
+        template_name: str,
         template: np.ndarray,
         threshold: float,
         scales: Optional[Tuple[float, ...]] = None
@@ -256,15 +477,17 @@ class Vision:
         
         Args:
             screenshot: Screenshot to search in
+            template_name: Template name (key of the scaled-copy cache)
             template: Template to find
             threshold: Confidence threshold
-            scales: Tuple of scale factors to try (uses config if None)
+            scales: Tuple of scale factors to try (None = locked scale, or
+                config.VISION_SCALES until calibration succeeds)
             
         Returns:
             Tuple of (x, y, w, h, scale, confidence) if match found, None otherwise
         """
         if scales is None:
-            scales = config.VISION_SCALES
+            scales = self._active_scales(screenshot)
         
         best_match = None
         best_confidence = threshold
@@ -285,7 +508,7 @@ class Vision:
             if scaled_w > screenshot.shape[1] or scaled_h > screenshot.shape[0]:
                 continue
             
-            scaled_template = cv2.resize(template, (scaled_w, scaled_h))
+            scaled_template = self._scaled_template(template_name, template, scaled_w, scaled_h)
             
             # Match
             try:
@@ -307,10 +530,209 @@ class Vision:
         
         return best_match
     
+    # ------------------------------------------------------------------
+    # Display-scale calibration
+    # ------------------------------------------------------------------
+    
+    def _calibration_key_for(self, screenshot: np.ndarray) -> tuple:
+        return (tuple(config.GAME_REGION), screenshot.shape[:2])
+    
+    def _active_scales(self, screenshot: np.ndarray) -> Tuple[float, ...]:
+        """
+        Scales for a multi-scale call: only the locked scale once calibrated,
+        all VISION_SCALES until the anchors have voted.
+        """
+        settings = config.SCALE_CALIBRATION
+        if not settings.get("ENABLED", True):
+            return config.VISION_SCALES
+        
+        key = self._calibration_key_for(screenshot)
+        if self.locked_scale is not None and key != self._calibration_key:
+            logger.info("GAME_REGION / размер кадра изменился — перекалибровка масштаба")
+            with self._scale_lock:
+                self.locked_scale = None
+            self._next_calibration = 0.0
+        
+        if self.locked_scale is None:
+            now = time.monotonic()
+            if now >= self._next_calibration:
+                self._next_calibration = now + float(settings.get("RETRY_INTERVAL", 10.0))
+                self.calibrate_scale(screenshot)
+            if self.locked_scale is None:
+                return config.VISION_SCALES
+        
+        self._maybe_recheck_scale(screenshot)
+        return (self.locked_scale,)
+    
+    def _anchor_best_scale(
+        self,
+        screenshot: np.ndarray,
+        template_name: str,
+        template: np.ndarray,
+        scales: Tuple[float, ...]
+    ) -> Tuple[Optional[float], float]:
+        """(scale with the highest score, that score) for one anchor template."""
+        best_scale, best_score = None, -1.0
+        h, w = template.shape[:2]
+        for scale in scales:
+            scaled_w, scaled_h = int(w * scale), int(h * scale)
+            if scaled_w <= 0 or scaled_h <= 0:
+                continue
+            if scaled_w > screenshot.shape[1] or scaled_h > screenshot.shape[0]:
+                continue
+            scaled_template = self._scaled_template(template_name, template, scaled_w, scaled_h)
+            result = cv2.matchTemplate(screenshot, scaled_template, cv2.TM_CCOEFF_NORMED)
+            max_val = cv2.minMaxLoc(result)[1]
+            if max_val > best_score:
+                best_scale, best_score = scale, max_val
+        return best_scale, best_score
+    
+    def _vote_scales(
+        self,
+        screenshot: np.ndarray,
+        scales: Tuple[float, ...]
+    ) -> Tuple[Optional[float], int, int]:
+        """
+        Every visible anchor votes for its best scale.
+        
+        Returns:
+            (winning scale or None, its votes, anchors that voted)
+        """
+        settings = config.SCALE_CALIBRATION
+        min_score = float(settings.get("MIN_SCORE", 0.75))
+        votes: Dict[float, List[float]] = {}
+        for name in settings.get("ANCHORS", ()):
+            template = self._load_template(name)
+            if template is None:
+                continue
+            threshold = max(min_score, config.THRESHOLDS.get(name, config.DEFAULT_THRESHOLD))
+            scale, score = self._anchor_best_scale(screenshot, name, template, scales)
+            if scale is None or score < threshold:
+                continue
+            votes.setdefault(scale, []).append(score)
+            logger.debug(f"Scale vote: {name} → {scale:.2f}x ({score:.2f})")
+        
+        if not votes:
+            return None, 0, 0
+        # Больше голосов, при равенстве — больше суммарная уверенность
+        winner = max(votes, key=lambda s: (len(votes[s]), sum(votes[s])))
+        return winner, len(votes[winner]), sum(len(v) for v in votes.values())
+    
+    def calibrate_scale(self, screenshot: Optional[np.ndarray] = None) -> Optional[float]:
+        """
+        Find the display scale by voting across SCALE_CALIBRATION["ANCHORS"]:
+        RETINA_SCALE_RANGE first, the full VISION_SCALES if no anchor is found there.
+        Locks the scale when at least MIN_VOTES anchors agree.
+        
+        Returns:
+            Locked scale, or None if the anchors are not visible / disagree
+        """
+        if screenshot is None:
+            screenshot = self.take_screenshot()
+        
+        min_votes = int(config.SCALE_CALIBRATION.get("MIN_VOTES", 2))
+        scale, count, voters = self._vote_scales(screenshot, config.RETINA_SCALE_RANGE)
+        if count < min_votes:
+            scale, count, voters = self._vote_scales(screenshot, config.VISION_SCALES)
+        if scale is None or count < min_votes:
+            logger.debug(f"Scale calibration: недостаточно якорей ({count}/{min_votes}), пока все масштабы")
+            return None
+        
+        self._lock_scale(scale, self._calibration_key_for(screenshot))
+        logger.info(f"🔒 Масштаб дисплея зафиксирован: {scale:.2f}x (голосов {count}/{voters})")
+        return scale
+    
+    def _lock_scale(self, scale: float, key: tuple) -> None:
+        """Lock the scale and pre-resize every template in assets/ to it."""
+        with self._scale_lock:
+            self.locked_scale = scale
+            self._calibration_key = key
+        self._next_recheck = time.monotonic() + float(config.SCALE_CALIBRATION.get("RECHECK_INTERVAL", 120.0))
+        for path in sorted(config.ASSETS_PATH.glob("*.png")):
+            template = self._load_template(path.stem)
+            if template is None:
+                continue
+            h, w = template.shape[:2]
+            if int(w * scale) > 0 and int(h * scale) > 0:
+                self._scaled_template(path.stem, template, int(w * scale), int(h * scale))
+    
+    def _maybe_recheck_scale(self, screenshot: np.ndarray) -> None:
+        """Every RECHECK_INTERVAL: re-vote in a background thread on a copy of this frame."""
+        now = time.monotonic()
+        if now < self._next_recheck:
+            return
+        if self._recheck_thread is not None and self._recheck_thread.is_alive():
+            return
+        self._next_recheck = now + float(config.SCALE_CALIBRATION.get("RECHECK_INTERVAL", 120.0))
+        self._recheck_thread = threading.Thread(
+            target=self._recheck_scale,
+            args=(screenshot.copy(), self._calibration_key_for(screenshot)),
+            name="scale-recheck",
+            daemon=True,
+        )
+        self._recheck_thread.start()
+    
+    def _recheck_scale(self, screenshot: np.ndarray, key: tuple) -> None:
+        """Vote between the locked scale and its neighbours in VISION_SCALES; switch on a clear winner."""
+        locked = self.locked_scale
+        if locked is None:
+            return
+        try:
+            scales = tuple(sorted(config.VISION_SCALES))
+            i = scales.index(locked) if locked in scales else None
+            candidates = scales[max(0, i - 1):i + 2] if i is not None else (locked,)
+            scale, count, voters = self._vote_scales(screenshot, candidates)
+        except Exception as e:
+            logger.debug(f"Scale recheck failed: {e}")
+            return
+        
+        min_votes = int(config.SCALE_CALIBRATION.get("MIN_VOTES", 2))
+        if scale is None or scale == locked or count < min_votes or key != self._calibration_key:
+            # Якорей не видно или масштаб подтверждён — оставляем как есть
+            return
+        self._lock_scale(scale, key)
+        logger.warning(f"🔁 Масштаб дисплея изменился: {locked:.2f}x → {scale:.2f}x (голосов {count}/{voters})")
+    
+    def warm_up_animation_mask(self, max_frames: int = 12) -> bool:
+        """
+        Take a few quick screenshots (camera must be still) until the animation
+        mask is ready. Returns True if it is.
+        """
+        mask = self.animation_mask
+        if mask is None:
+            return False
+        interval = float(config.ANIMATION_MASK.get("WARM_UP_INTERVAL", 0.05))
+        for _ in range(max_frames):
+            if mask.ready:
+                break
+            self.take_screenshot()
+            time.sleep(interval)
+        return mask.ready
+    
+    def classify_screen(self, screenshot: Optional[np.ndarray] = None) -> Optional[ScreenMatch]:
+        """
+        Known screen of the screenshot (ScreenIndex), or None: unknown screen,
+        empty index or signatures disabled.
+        
+        Args:
+            screenshot: Screenshot to classify (None = take a new one)
+        """
+        if self.screen_index is None or not len(self.screen_index):
+            return None
+        if screenshot is None:
+            screenshot = self.take_screenshot()
+            if screenshot is None:
+                return None
+        screen = self.screen_index.classify(screenshot)
+        key = screen.name if screen is not None else "unknown"
+        self.screen_stats[key] = self.screen_stats.get(key, 0) + 1
+        return screen
+    
     def calculate_mse(self, img1: np.ndarray, img2: np.ndarray) -> float:
         """
         Calculate Mean Squared Error between two images.
         Used for detecting if screen has changed (e.g., hit scroll wall).
+        Computed on the cached gray 1/4 thumbnails (FrameDiff), not on full BGR frames.
         
         Args:
             img1: First image
@@ -320,17 +742,25 @@ class Vision:
             MSE value (lower means more similar)
         """
         try:
-            # Ensure same size
-            if img1.shape != img2.shape:
-                img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
-            
-            err = np.sum((img1.astype("float") - img2.astype("float")) ** 2)
-            err /= float(img1.shape[0] * img1.shape[1])
-            return err
+            return self.frame_diff.mse(img1, self._same_size(img1, img2))
         except Exception as e:
             logger.error(f"MSE calculation failed: {e}")
             return float('inf')
     
+    def compare_bands(self, img1: np.ndarray, img2: np.ndarray, bands) -> list:
+        """
+        FrameDiff.bands (changed fraction + MSE per horizontal band) for two screenshots.
+        Frames of different size are compared after resizing, like calculate_mse.
+        """
+        return self.frame_diff.bands(img1, self._same_size(img1, img2), bands)
+    
+    @staticmethod
+    def _same_size(img1: np.ndarray, img2: np.ndarray) -> np.ndarray:
+        """img2 resized to img1 (window resize, Retina switch) — FrameDiff treats other sizes as changed."""
+        if img1.shape[:2] != img2.shape[:2]:
+            return cv2.resize(img2, (img1.shape[1], img1.shape[0]))
+        return img2
+    
     def get_region_screenshot(self, x: int, y: int, w: int, h: int) -> np.ndarray:
         """
         Extract a region from the last screenshot.
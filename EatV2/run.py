@@ -8,7 +8,7 @@ import time
 from pynput import keyboard
 
 import config
-from core import Vision, InputManager, StateManager
+from core import Vision, InputManager, StateManager, ModuleScheduler
 from core.modules import (
     Renovator,
     GeneralUpgrades,
@@ -92,9 +92,17 @@ class EatventureBot:
         # Sort by priority (lower number = higher priority)
         self.modules.sort(key=lambda m: m.PRIORITY)
         
-        logger.info(f"Initialized {len(self.modules)} modules:")
+        # Scheduler: which module runs next (priority, cooldown, cost, staleness)
+        self.scheduler = ModuleScheduler(self.vision)
         for module in self.modules:
-            logger.info(f"  - {module.name} (Priority: {module.PRIORITY})")
+            self.scheduler.add_module(module)
+        
+        logger.info(f"Initialized {len(self.modules)} modules ({len(self.scheduler.tasks)} tasks):")
+        for task in sorted(self.scheduler.tasks, key=lambda t: t.priority):
+            logger.info(
+                f"  - {task.name} (Priority: {task.priority}, cooldown {task.cooldown:.0f}s, "
+                f"max staleness {task.max_staleness:.0f}s)"
+            )
         
         # Emergency stop
         self.emergency_stop = EmergencyStop()
@@ -119,33 +127,15 @@ class EatventureBot:
                 if self.loop_count % 50 == 0:
                     self._log_statistics()
                 
-                # Execute modules in priority order
-                action_taken = False
-                
-                for module in self.modules:
-                    try:
-                        if module.execute():
-                            action_taken = True
-                            
-                            # НОВОЕ: Если любой модуль (кроме Navigator) что-то сделал,
-                            # сбрасываем idle_cycles у Navigator
-                            if module.name != "Navigator":
-                                for nav in self.modules:
-                                    if nav.name == "Navigator":
-                                        nav.idle_cycles = 0
-                                        logger.debug("✅ Модуль сработал - сбросил idle Navigator")
-                                        break
-                            
-                            # After any action, continue to next loop
-                            # (allows Renovator to re-check immediately)
-                            break
-                    except Exception as e:
-                        logger.error(f"Error in {module.name}: {e}", exc_info=True)
+                # Модули по полезности в пределах бюджета тика (ModuleScheduler): экран,
+                # cooldown, давность запуска и стоимость учитывает планировщик
+                action_taken = self.scheduler.run_tick()
                 
                 # If no action was taken, idle briefly
                 if not action_taken:
-                    logger.info("💤 Нет действий - отдыхаю 1 секунду...")
-                    time.sleep(1.0)
+                    idle_sleep = config.SCHEDULER.get("IDLE_SLEEP", 1.0)
+                    logger.info(f"💤 Нет действий - отдыхаю {idle_sleep:.1f}s...")
+                    time.sleep(idle_sleep)
         
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
@@ -163,6 +153,12 @@ class EatventureBot:
         logger.info("-" * 60)
         logger.info(f"Statistics: Loop {self.loop_count} | Runtime: {hours}h {minutes}m")
         logger.info(f"Spatial Memory: {self.state_manager.spatial_memory.get_memory_count()} active")
+        if self.vision.screen_stats:
+            screens = ", ".join(f"{name} {count}" for name, count in sorted(self.vision.screen_stats.items()))
+            logger.info(f"Screens: {screens}")
+        logger.info(f"Scheduler: {self.scheduler.ticks} ticks, {self.scheduler.idle_ticks} idle in a row")
+        for line in self.scheduler.report():
+            logger.info(f"  {line}")
         logger.info("-" * 60)
     
     def shutdown(self):